@@ -0,0 +1,368 @@
+"""
+Admission Control for the Prediction API
+Bounds the work admitted at once in phone numbers (not requests), queues the
+rest in priority lanes (interactive ahead of bulk) and applies a token bucket
+per client, so one bulk client cannot saturate the workers for everyone.
+Rejected requests get 429 with a Retry-After hint.
+"""
+import math
+import time
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+
+from src.config import API_CONFIG
+
+# Lanes in priority order
+LANES = ('interactive', 'bulk')
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request is not admitted
+
+    Attributes:
+    -----------
+    reason : str
+        'rate_limited', 'queue_full' or 'queue_timeout'
+    retry_after : float
+        Seconds the client should wait before retrying
+    """
+
+    def __init__(self, reason, retry_after, message):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self):
+        """Retry-After value (whole seconds, at least 1)"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+@asynccontextmanager
+async def unlimited_slot():
+    """Stand-in for AdmissionController.slot when admission control is off"""
+    yield 0
+
+# ====================================================================================
+# TOKEN BUCKET
+# ====================================================================================
+
+class TokenBucket:
+    """
+    Token bucket นับเป็นจำนวนเบอร์
+
+    Parameters:
+    -----------
+    rate : float
+        Numbers per second added to the bucket
+    burst : float
+        Bucket size (a request larger than burst is charged a full bucket)
+    """
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+
+    def take(self, n):
+        """
+        Take n tokens
+
+        Returns:
+        --------
+        wait : float
+            0.0 if the tokens were taken, otherwise seconds until they are
+            available (nothing is taken)
+        """
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        n = min(float(n), self.burst)
+        if self.tokens >= n:
+            self.tokens -= n
+            return 0.0
+        if self.rate <= 0:
+            return math.inf
+        return (n - self.tokens) / self.rate
+
+    def refund(self, n):
+        """Give back the tokens take(n) charged (the request was not admitted)"""
+        self.tokens = min(self.burst, self.tokens + min(float(n), self.burst))
+
+# ====================================================================================
+# ADMISSION CONTROLLER
+# ====================================================================================
+
+class AdmissionController:
+    """
+    จำกัดงานที่รับเข้ามาพร้อมกัน (นับเป็นเบอร์) พร้อม priority lanes และ rate limit ต่อ client
+
+    Parameters:
+    -----------
+    max_numbers : int, optional
+        Numbers being predicted at once (None = API_CONFIG['admission_max_numbers'])
+    max_queued : int, optional
+        Numbers allowed to wait for capacity (None = API_CONFIG['admission_max_queued'])
+    bulk_share : float, optional
+        Fraction of max_numbers the bulk lane may use, the rest stays free for
+        interactive requests (None = API_CONFIG['admission_bulk_share'])
+    queue_timeout : float, optional
+        Seconds a request may wait for capacity (None = API_CONFIG['admission_queue_timeout'])
+    rate, burst : float, optional
+        Default token bucket per client in numbers per second and bucket size
+        (None = API_CONFIG['rate_limit_per_second'] / ['rate_limit_burst']; rate 0 = no limit)
+    api_keys : dict, optional
+        API key -> {'rate': ..., 'burst': ...}; only listed keys get their own bucket,
+        other clients are limited per address (None = API_CONFIG['api_keys'])
+    """
+
+    def __init__(self, max_numbers=None, max_queued=None, bulk_share=None, queue_timeout=None,
+                 rate=None, burst=None, api_keys=None, max_clients=10000):
+        config = API_CONFIG
+        self.max_numbers = max(1, int(max_numbers or config.get('admission_max_numbers', 2000)))
+        self.max_queued = max(0, int(config.get('admission_max_queued', 10000) if max_queued is None else max_queued))
+        bulk_share = config.get('admission_bulk_share', 0.8) if bulk_share is None else bulk_share
+        self.bulk_limit = max(1, int(self.max_numbers * bulk_share))
+        self.queue_timeout = config.get('admission_queue_timeout', 10) if queue_timeout is None else queue_timeout
+        self.rate = float(config.get('rate_limit_per_second', 0) if rate is None else rate)
+        self.burst = float(config.get('rate_limit_burst', 1000) if burst is None else burst)
+        self.api_keys = dict(config.get('api_keys') or {}) if api_keys is None else dict(api_keys)
+        self.max_clients = max_clients
+
+        self.in_flight = {lane: 0 for lane in LANES}
+        self.queued = {lane: 0 for lane in LANES}
+        self.admitted = {lane: 0 for lane in LANES}
+        self.rejected = {'rate_limited': 0, 'queue_full': 0, 'queue_timeout': 0}
+        self._waiters = {lane: deque() for lane in LANES}
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    # ============ Rate limits ============
+
+    def client_key(self, api_key=None, address=None):
+        """Configured API keys are limited per key; everyone else per address"""
+        if api_key and api_key in self.api_keys:
+            return f'key:{api_key}'
+        return f'addr:{address or "unknown"}'
+
+    def _bucket(self, client):
+        bucket = self._buckets.get(client)
+        if bucket is not None:
+            self._buckets.move_to_end(client)
+            return bucket
+        limits = self.api_keys.get(client[4:], {}) if client.startswith('key:') else {}
+        rate = limits.get('rate', self.rate)
+        if not rate:
+            return None
+        bucket = self._buckets[client] = TokenBucket(rate, limits.get('burst', self.burst))
+        while len(self._buckets) > self.max_clients:
+            # Forget the least recently seen client (a full bucket loses nothing)
+            self._buckets.popitem(last=False)
+        return bucket
+
+    def _take_tokens(self, n, client):
+        bucket = self._bucket(client) if client is not None else None
+        return bucket.take(n) if bucket is not None else 0.0
+
+    def _refund_tokens(self, n, client):
+        with self._lock:
+            bucket = self._buckets.get(client) if client is not None else None
+            if bucket is not None:
+                bucket.refund(n)
+
+    # ============ Capacity ============
+
+    def _cost(self, n, lane):
+        # A request larger than its lane is admitted alone rather than never
+        return max(1, min(int(n), self.max_numbers if lane == 'interactive' else self.bulk_limit))
+
+    def _fits(self, cost, lane):
+        if sum(self.in_flight.values()) + cost > self.max_numbers:
+            return False
+        return lane == 'interactive' or self.in_flight['bulk'] + cost <= self.bulk_limit
+
+    def _may_start(self, cost, lane):
+        # Nobody waiting in this lane or a higher-priority one
+        for other in LANES[:LANES.index(lane) + 1]:
+            if self._waiters[other]:
+                return False
+        return self._fits(cost, lane)
+
+    def _retry_after(self):
+        return float(API_CONFIG.get('admission_retry_after', 1))
+
+    def _reject(self, reason, retry_after, message):
+        self.rejected[reason] += 1
+        return AdmissionRejected(reason, retry_after, message)
+
+    def try_admit(self, n, lane='interactive', client=None):
+        """
+        รับงานทันทีถ้ามีที่ว่าง ไม่รอคิว (Flask / threaded servers)
+
+        Capacity is checked first, so a request rejected as busy keeps the
+        client's rate-limit tokens.
+
+        Returns:
+        --------
+        cost : int
+            Pass to release() when the work is done
+
+        Raises:
+        -------
+        AdmissionRejected
+        """
+        cost = self._cost(n, lane)
+        with self._lock:
+            if not self._may_start(cost, lane):
+                raise self._reject('queue_full', self._retry_after(), "Server is at capacity")
+            wait = self._take_tokens(n, client)
+            if wait > 0:
+                raise self._reject('rate_limited', wait, f"Rate limit exceeded for {n} numbers")
+            self.in_flight[lane] += cost
+            self.admitted[lane] += 1
+        return cost
+
+    async def admit(self, n, lane='interactive', client=None, wait=False, timeout=None):
+        """
+        รับงาน n เบอร์ (รอคิวตาม priority ได้ไม่เกิน queue_timeout)
+
+        Parameters:
+        -----------
+        wait : bool
+            Sleep through rate limits and a full queue instead of rejecting
+            (streams: the upload is slowed down instead of failing mid-stream)
+        timeout : float, optional
+            Queue wait for this request (None = queue_timeout)
+
+        Tokens are charged before queueing (a rate-limited stream sleeps first)
+        and refunded if the request is not admitted after all (queue full,
+        queue timeout or client gone).
+
+        Returns:
+        --------
+        cost : int
+            Pass to release() when the work is done
+
+        Raises:
+        -------
+        AdmissionRejected
+        """
+        while True:
+            with self._lock:
+                retry = self._take_tokens(n, client)
+            if retry == 0:
+                break
+            if not wait or math.isinf(retry):
+                raise self._reject('rate_limited', retry, f"Rate limit exceeded for {n} numbers")
+            await asyncio.sleep(retry)
+
+        try:
+            return await self._wait_for_capacity(self._cost(n, lane), lane, wait, timeout)
+        except BaseException:
+            self._refund_tokens(n, client)
+            raise
+
+    async def _wait_for_capacity(self, cost, lane, wait, timeout):
+        """Capacity part of admit(): start now or queue in the lane"""
+        while True:
+            with self._lock:
+                if self._may_start(cost, lane):
+                    self.in_flight[lane] += cost
+                    self.admitted[lane] += 1
+                    return cost
+                if sum(self.queued.values()) + cost <= self.max_queued:
+                    future = asyncio.get_running_loop().create_future()
+                    self._waiters[lane].append((cost, future))
+                    self.queued[lane] += cost
+                    break
+                if not wait:
+                    raise self._reject('queue_full', self._retry_after(),
+                                       f"Server is at capacity ({sum(self.queued.values())} numbers queued)")
+            await asyncio.sleep(self._retry_after())
+
+        timeout = self.queue_timeout if timeout is None else timeout
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._forget(cost, lane, future)
+                self._dispatch()
+            raise self._reject('queue_timeout', self._retry_after(),
+                               f"Waited {timeout}s for capacity")
+        except asyncio.CancelledError:
+            # Client went away while queued (or was admitted at the same moment)
+            with self._lock:
+                if future.done() and not future.cancelled():
+                    self.in_flight[lane] -= cost
+                else:
+                    self._forget(cost, lane, future)
+                self._dispatch()
+            raise
+        return cost
+
+    def _forget(self, cost, lane, future):
+        try:
+            self._waiters[lane].remove((cost, future))
+            self.queued[lane] -= cost
+        except ValueError:
+            pass
+
+    def release(self, cost, lane='interactive'):
+        """คืนที่ให้ request ที่รออยู่ (interactive ก่อน bulk)"""
+        with self._lock:
+            self.in_flight[lane] -= cost
+            self._dispatch()
+
+    def _dispatch(self):
+        # Admit waiters in lane order, FIFO within a lane
+        for other in LANES:
+            waiters = self._waiters[other]
+            while waiters:
+                waiting_cost, future = waiters[0]
+                if future.done():
+                    waiters.popleft()
+                    self.queued[other] -= waiting_cost
+                    continue
+                if not self._fits(waiting_cost, other):
+                    # Lower lanes never overtake a waiting higher-priority request
+                    return
+                waiters.popleft()
+                self.queued[other] -= waiting_cost
+                self.in_flight[other] += waiting_cost
+                self.admitted[other] += 1
+                future.set_result(True)
+
+    @asynccontextmanager
+    async def slot(self, n, lane='interactive', client=None, wait=False, timeout=None):
+        """async with: admit() ... release()"""
+        cost = await self.admit(n, lane, client, wait, timeout)
+        try:
+            yield cost
+        finally:
+            self.release(cost, lane)
+
+    @contextmanager
+    def slot_nowait(self, n, lane='interactive', client=None):
+        """with: try_admit() ... release()"""
+        cost = self.try_admit(n, lane, client)
+        try:
+            yield cost
+        finally:
+            self.release(cost, lane)
+
+    def stats(self):
+        """Capacity, queue depth and rejection counters (numbers per lane)"""
+        with self._lock:
+            return {
+                'max_numbers': self.max_numbers,
+                'bulk_limit': self.bulk_limit,
+                'max_queued': self.max_queued,
+                'in_flight': dict(self.in_flight),
+                'queued': dict(self.queued),
+                'admitted': dict(self.admitted),
+                'rejected': dict(self.rejected),
+                'clients': len(self._buckets)
+            }
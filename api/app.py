@@ -6,6 +6,7 @@ Supports both FastAPI and Flask
 """
 import os
 import sys
+import asyncio
 from typing import List, Dict, Optional
 from datetime import datetime
 
@@ -13,15 +14,150 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from api.prediction import PredictionPipeline, create_prediction_service
+from api.batching import MicroBatcher
+from api.executor import PredictionExecutor, ExecutorBusyError
+from api.model_reload import (ModelReloader, warmup_numbers, resolve_reload_path, prepare_pipeline,
+                              artifact_mtime)
+from api.streaming import stream_predictions, LineTooLongError
+from api.inference_server import InferenceClient, BlockingInferenceClient, RemotePipeline
+from api.prefork import serve_prefork, mapped_array_bytes
+from api.model_registry import ModelRegistry, UnknownModelError, load_registry, DEFAULT_MODEL
+from api.admission import AdmissionController, AdmissionRejected, unlimited_slot
+from api.rule_pricing import load_rule_pricer
+from api.metrics import (RequestMetricsMiddleware, register_service_collector, render_metrics,
+                         count_error, count_degraded)
+from src.config import API_CONFIG
+
+# ====================================================================================
+# SHARED HELPERS
+# ====================================================================================
+
+def cache_stats(service):
+    """Prediction cache counters for /health (None when caching is off)"""
+    if service is None or service.cache is None:
+        return None
+    return {"model_version": service.model_version, **service.cache.stats()}
+
+def inference_socket():
+    """Inference daemon socket (INFERENCE_SOCKET or API_CONFIG); None = load the model in this worker"""
+    return os.getenv("INFERENCE_SOCKET") or API_CONFIG.get('inference_socket')
+
+def model_artifact_path():
+    """Artifact served by this process (MODEL_PATH)"""
+    return os.getenv("MODEL_PATH", "../models/deployed/best_model.pkl")
+
+def load_model_registry(model_path):
+    """Extra models of API_CONFIG['models'] served next to MODEL_PATH (None = single model)"""
+    model_configs = API_CONFIG.get('models')
+    if not model_configs:
+        return None
+    return load_registry(model_configs, os.path.dirname(os.path.abspath(model_path)))
+
+# Work admitted at once (in numbers), priority lanes and per-client rate limits
+admission_controller = AdmissionController() if API_CONFIG.get('admission_control', True) else None
+
+def admission_client(api_key, address):
+    """Rate-limit bucket of a request (configured X-API-Key, else client address)"""
+    if admission_controller is None:
+        return None
+    return admission_controller.client_key(api_key, address)
+
+def registry_args(service, model_name):
+    """
+    Routing argument for registry calls (X-Model header)
+    
+    Raises:
+    -------
+    UnknownModelError
+        The registry does not host model_name
+    """
+    if not model_name or not isinstance(service, ModelRegistry):
+        return ()
+    if model_name not in service.models:
+        raise UnknownModelError(model_name)
+    return (model_name,)
+
+# Calibrated rules (<model>.rules.pkl) that answer when the model cannot
+rule_pricer = None
+
+def load_fallback_pricer(model_path):
+    """Load the rule-based pricer of model_path (the current one stays if there is none)"""
+    global rule_pricer
+    rule_pricer = load_rule_pricer(model_path) or rule_pricer
+    return rule_pricer
+
+def overload_reason(error):
+    """Degraded reason of an execution error (None = not an overload)"""
+    if isinstance(error, ExecutorBusyError):
+        return 'queue_full'
+    if isinstance(error, ConnectionError):
+        return 'inference_unavailable'
+    if isinstance(error, asyncio.TimeoutError):
+        return 'timeout'
+    return None
+
+def degraded_answer(fallback, reason):
+    """
+    Rule-based result of fallback = (method, phone_number(s)), marked degraded
+    
+    Returns:
+    --------
+    result : dict or None
+        None without calibrated rules or for methods the rules cannot answer
+        (explanations); the caller then keeps its 503 / 429
+    """
+    if rule_pricer is None or fallback is None:
+        return None
+    method, numbers = fallback
+    if method == 'predict_single':
+        count_degraded(reason)
+        return rule_pricer.predict_single(numbers, reason)
+    if method == 'predict_batch':
+        result = rule_pricer.predict_batch(numbers, reason)
+        count_degraded(reason, result['successful'])
+        return result
+    return None
+
+def degraded_status(service):
+    """/health status: the rules keep a service without a model answering"""
+    if service:
+        return "healthy"
+    return "degraded" if rule_pricer is not None else "unhealthy"
+
+# Pipeline loaded by the pre-fork parent; forked workers adopt it instead of loading
+preloaded = None
+
+def preload_pipeline(model_path):
+    """
+    โหลด + ตรวจสอบ + warmup โมเดลครั้งเดียวใน parent ก่อน fork workers
+    
+    Returns:
+    --------
+    pipeline : PredictionPipeline or None
+        None if loading failed (each worker then loads the model itself)
+    """
+    global preloaded
+    mtime = artifact_mtime(model_path)
+    try:
+        # First load: unknown feature names are reported, not rejected (see ModelReloader.reload)
+        pipeline = prepare_pipeline(model_path, strict=False)
+    except Exception as e:
+        print(f"❌ Pre-fork: Error loading model: {str(e)}")
+        return None
+    preloaded = {'pipeline': pipeline, 'model_path': model_path, 'mtime': mtime,
+                 'registry': load_model_registry(model_path)}
+    print(f"✅ Pre-fork: Model loaded once for all workers "
+          f"({mapped_array_bytes(pipeline) / 2**20:.1f} MB memory-mapped)")
+    return pipeline
 
 # ====================================================================================
 # FASTAPI IMPLEMENTATION
 # ====================================================================================
 
 try:
-    from fastapi import FastAPI, HTTPException, Request
+    from fastapi import FastAPI, HTTPException, Request, Header
     from fastapi.middleware.cors import CORSMiddleware
-    from fastapi.responses import JSONResponse
+    from fastapi.responses import JSONResponse, StreamingResponse, Response
     from pydantic import BaseModel, Field
     
     # Pydantic models for request/response
@@ -31,15 +167,33 @@ try:
     class BatchPredictionRequest(BaseModel):
         phone_numbers: List[str] = Field(..., description="List of phone numbers")
     
+    class ReloadRequest(BaseModel):
+        model_path: Optional[str] = Field(None, description="New artifact (default: current MODEL_PATH)")
+    
     class PredictionResponse(BaseModel):
         success: bool
         phone_number: str
         predicted_price: Optional[float] = None
         price_range: Optional[Dict[str, float]] = None
         tier: Optional[str] = None
+        model: Optional[str] = None
+        degraded: bool = False
+        degraded_reason: Optional[str] = None
         error: Optional[str] = None
         timestamp: str
     
+    class BodyStreamingResponse(StreamingResponse):
+        """
+        StreamingResponse whose generator reads the request body while streaming
+        
+        The default response also listens for client disconnects on the same
+        receive channel, which would steal request body messages.
+        """
+        async def __call__(self, scope, receive, send):
+            await self.stream_response(send)
+            if self.background is not None:
+                await self.background()
+    
     # Create FastAPI app
     fastapi_app = FastAPI(
         title="Phone Number Price Prediction API",
@@ -56,21 +210,167 @@ try:
         allow_headers=["*"],
     )
     
+    # Per-endpoint latency and status counts for /metrics
+    fastapi_app.add_middleware(RequestMetricsMiddleware)
+    
     # Initialize prediction service
     prediction_service = None
+    prediction_executor = None
+    predict_batcher = None
+    model_reloader = None
+    model_registry = None
+    
+    # Cache, pool and model-version values are read when /metrics is scraped
+    register_service_collector(lambda: {
+        'service': prediction_service,
+        'executor': prediction_executor,
+        'batcher': predict_batcher,
+        'admission': admission_controller
+    })
+    
+    async def install_pipeline(pipeline, model_path):
+        """Swap in a loaded and warmed-up pipeline (in-flight requests finish on the old one)"""
+        global prediction_service, prediction_executor, predict_batcher, model_registry
+        
+        if model_registry is not None:
+            # The reloaded MODEL_PATH model replaces the registry's default model
+            pipeline = model_registry = model_registry.with_model(DEFAULT_MODEL, pipeline)
+        
+        if prediction_executor is None:
+            # CPU work runs on the execution pool so the event loop stays responsive
+            # (registry models are only loaded in this process → thread pool)
+            prediction_executor = PredictionExecutor(pipeline, model_path=model_path,
+                                                     kind='thread' if model_registry is not None else None)
+            
+            # Concurrent /predict calls share batched predict passes on the pool
+            if API_CONFIG.get('micro_batching', False):
+                predict_batcher = MicroBatcher(pipeline, executor=prediction_executor)
+                predict_batcher.start()
+        else:
+            await prediction_executor.swap(pipeline, model_path, warmup_numbers(8))
+            if predict_batcher is not None:
+                predict_batcher.pipeline = pipeline
+        
+        prediction_service = pipeline
+        load_fallback_pricer(model_path)
+    
+    async def remote_status():
+        """Inference daemon status (model metadata copied to prediction_service); None if unreachable"""
+        try:
+            status = await asyncio.wait_for(prediction_executor.call('status'), 5)
+        except (ConnectionError, asyncio.TimeoutError) as e:
+            print(f"⚠️ FastAPI: Inference server unavailable: {str(e)}")
+            return None
+        prediction_service.update(status)
+        return status
+    
+    def uses_inference_server():
+        return isinstance(prediction_service, RemotePipeline)
     
     @fastapi_app.on_event("startup")
     async def startup_event():
-        """Load model on startup"""
-        global prediction_service
+        """Load and warm up the model on startup (or connect to the inference daemon)"""
+        global model_reloader, prediction_service, prediction_executor, model_registry
         
-        model_path = os.getenv("MODEL_PATH", "../models/deployed/best_model.pkl")
+        # Rules first: they answer while the model loads or if it never does
+        await asyncio.get_running_loop().run_in_executor(None, load_fallback_pricer, model_artifact_path())
         
-        try:
-            prediction_service = create_prediction_service(model_path)
+        socket_path = inference_socket()
+        if socket_path:
+            # Thin worker: the daemon owns the model and micro-batches across all workers
+            prediction_executor = InferenceClient(socket_path)
+            prediction_service = RemotePipeline()
+            if await remote_status() is not None:
+                print(f"✅ FastAPI: Using inference server at {socket_path}")
+            return
+        
+        model_path = model_artifact_path()
+        model_reloader = ModelReloader(model_path, install_pipeline)
+        
+        if preloaded is not None:
+            # Forked worker: the parent already loaded and warmed up the models
+            model_registry = preloaded['registry']
+            status = await model_reloader.adopt(preloaded['pipeline'], model_path, preloaded['mtime'])
+        else:
+            model_registry = await asyncio.get_running_loop().run_in_executor(
+                None, load_model_registry, model_path)
+            status = await model_reloader.reload()
+        if status['success']:
             print("✅ FastAPI: Model loaded successfully")
-        except Exception as e:
-            print(f"❌ FastAPI: Error loading model: {str(e)}")
+        else:
+            print(f"❌ FastAPI: Error loading model: {status['error']}")
+        
+        # Watch the model file even if the first load failed
+        model_reloader.start_watcher()
+    
+    @fastapi_app.on_event("shutdown")
+    async def shutdown_event():
+        """Stop the model watcher, the micro-batch dispatcher and the execution pool"""
+        global prediction_executor, predict_batcher
+        if model_reloader is not None:
+            await model_reloader.stop_watcher()
+        if model_registry is not None:
+            model_registry.shadow.stop()
+        if predict_batcher is not None:
+            await predict_batcher.stop()
+            predict_batcher = None
+        if prediction_executor is not None:
+            prediction_executor.shutdown()
+            prediction_executor = None
+    
+    def degraded_or_raise(fallback, reason, status_code, detail):
+        """Rule-based answer of fallback, else HTTPException(status_code)"""
+        result = degraded_answer(fallback, reason)
+        if result is None:
+            raise HTTPException(status_code=status_code, detail=detail)
+        return result
+    
+    async def run_prediction(awaitable, fallback=None):
+        """
+        Await pool work with API_CONFIG['timeout'] (busy → 503, timeout → 504)
+        
+        With fallback = (method, phone_number(s)) an overloaded pool answers with
+        the calibrated rules instead (marked degraded).
+        """
+        try:
+            return await asyncio.wait_for(awaitable, API_CONFIG.get('timeout'))
+        except (ExecutorBusyError, ConnectionError) as e:
+            reason = overload_reason(e)
+            count_error(reason)
+            return degraded_or_raise(fallback, reason, 503, str(e))
+        except asyncio.TimeoutError:
+            count_error('timeout')
+            return degraded_or_raise(fallback, 'timeout', 504, "Prediction timed out")
+    
+    async def predict_or_degrade(http_request, n_numbers, lane, call, fallback):
+        """
+        Admitted call() with rule-based fallback
+        
+        Without a model, with the server at capacity or the pool busy / too slow,
+        the calibrated rules answer instead (marked degraded). Rate-limited
+        clients still get 429.
+        """
+        if not prediction_service:
+            return degraded_or_raise(fallback, 'model_unavailable', 503, "Model not loaded")
+        # With rules loaded a queued request waits less before they answer it
+        timeout = API_CONFIG.get('degraded_queue_timeout') if rule_pricer is not None else None
+        try:
+            async with admission_slot(http_request, n_numbers, lane, timeout=timeout):
+                return await run_prediction(call(), fallback)
+        except AdmissionRejected as e:
+            result = None if e.reason == 'rate_limited' else degraded_answer(fallback, e.reason)
+            if result is None:
+                raise
+            count_error(e.reason)
+            return result
+    
+    def admission_slot(http_request, n_numbers, lane, wait=False, timeout=None):
+        """Admission for n_numbers in a lane ('interactive' or 'bulk'); rejected → 429"""
+        if admission_controller is None:
+            return unlimited_slot()
+        client = admission_client(http_request.headers.get("X-API-Key"),
+                                  http_request.client.host if http_request.client else None)
+        return admission_controller.slot(n_numbers, lane, client, wait, timeout)
     
     @fastapi_app.get("/")
     async def root():
@@ -82,53 +382,221 @@ try:
             "endpoints": {
                 "/predict": "Single phone number prediction",
                 "/predict_batch": "Batch prediction",
+                "/predict_stream": "Bulk NDJSON prediction (streamed results)",
                 "/explain": "Prediction explanation",
-                "/health": "Service health check"
+                "/explain_batch": "Batch prediction explanations",
+                "/health": "Service health check",
+                "/metrics": "Prometheus metrics",
+                "/health/live": "Liveness probe",
+                "/health/ready": "Readiness probe",
+                "/admin/reload": "Load, warm up and swap in a model (POST)"
             }
         }
     
     @fastapi_app.get("/health")
     async def health_check():
         """Health check endpoint"""
+        if uses_inference_server():
+            status = await remote_status()
+            return {
+                "status": degraded_status(status and status['ready']),
+                "timestamp": datetime.now().isoformat(),
+                "model_loaded": bool(status and status['ready']),
+                "cache": status['cache'] if status else None,
+                "executor": status['executor'] if status else None,
+                "model": status['model'] if status else None,
+                "inference_server": prediction_executor.stats(),
+                "degraded_mode": rule_pricer.stats() if rule_pricer else None
+            }
         return {
-            "status": "healthy" if prediction_service else "unhealthy",
+            "status": degraded_status(prediction_service),
             "timestamp": datetime.now().isoformat(),
-            "model_loaded": prediction_service is not None
+            "model_loaded": prediction_service is not None,
+            "cache": cache_stats(prediction_service),
+            "executor": prediction_executor.stats() if prediction_executor else None,
+            "model": model_reloader.status() if model_reloader else None,
+            "registry": prediction_service.stats() if isinstance(prediction_service, ModelRegistry) else None,
+            "admission": admission_controller.stats() if admission_controller else None,
+            "degraded_mode": rule_pricer.stats() if rule_pricer else None
         }
     
-    @fastapi_app.post("/predict", response_model=PredictionResponse)
-    async def predict_single(request: PhoneNumberRequest):
-        """Predict price for a single phone number"""
-        if not prediction_service:
-            raise HTTPException(status_code=503, detail="Model not loaded")
+    @fastapi_app.get("/metrics")
+    async def metrics():
+        """Prometheus text-format metrics"""
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
+    
+    @fastapi_app.get("/health/live")
+    async def liveness():
+        """Liveness: the process and its event loop respond"""
+        return {"status": "alive", "timestamp": datetime.now().isoformat()}
+    
+    @fastapi_app.get("/health/ready")
+    async def readiness():
+        """Readiness: a validated, warmed-up model is serving"""
+        if uses_inference_server():
+            status = await remote_status()
+            ready = bool(status and status['ready'])
+            reloading = bool(status and status['model']['reloading'])
+            unknown_features = status['model'].get('unknown_features', []) if status else []
+        else:
+            ready = prediction_service is not None and model_reloader is not None and model_reloader.ready
+            reloading = model_reloader.reloading if model_reloader else False
+            unknown_features = model_reloader.unknown_features if model_reloader else []
+        content = {
+            "ready": ready,
+            "model_version": prediction_service.model_version if prediction_service else None,
+            "reloading": reloading,
+            "unknown_features": unknown_features,
+            "timestamp": datetime.now().isoformat()
+        }
+        return JSONResponse(status_code=200 if ready else 503, content=content)
+    
+    @fastapi_app.post("/admin/reload")
+    async def reload_model(request: ReloadRequest = None, x_admin_token: Optional[str] = Header(None)):
+        """Load, validate and warm up a model artifact, then swap it in"""
+        admin_token = os.getenv("ADMIN_TOKEN")
+        if admin_token and x_admin_token != admin_token:
+            raise HTTPException(status_code=403, detail="Invalid admin token")
+        if uses_inference_server():
+            # The daemon checks the path and reports the HTTP status
+            status = await run_prediction(prediction_executor.call('reload', request.model_path if request else None))
+            status_code = status.pop('status_code', 200 if status['success'] else 422)
+            await remote_status()
+            return JSONResponse(status_code=status_code, content=status)
+        if model_reloader is None:
+            raise HTTPException(status_code=503, detail="Service not started")
+        if model_reloader.reloading:
+            raise HTTPException(status_code=409, detail="A model reload is already running")
         
-        result = prediction_service.predict_single(request.phone_number)
+        model_path = request.model_path if request else None
+        if model_path is not None:
+            # Artifacts are pickles: only accept files next to the configured model
+            try:
+                model_path = resolve_reload_path(model_reloader.model_path, model_path)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        
+        status = await model_reloader.reload(model_path)
+        return JSONResponse(status_code=200 if status['success'] else 422, content=status)
+    
+    @fastapi_app.post("/predict", response_model=PredictionResponse)
+    async def predict_single(request: PhoneNumberRequest, http_request: Request,
+                             x_model: Optional[str] = Header(None)):
+        """Predict price for a single phone number (X-Model picks a registry model)"""
+        model_args = registry_args(prediction_service, x_model)
+        if predict_batcher is not None and not model_args:
+            call = lambda: predict_batcher.submit(request.phone_number)
+        else:
+            call = lambda: prediction_executor.call('predict_single', request.phone_number, *model_args)
+        result = await predict_or_degrade(http_request, 1, 'interactive', call,
+                                          ('predict_single', request.phone_number))
         return PredictionResponse(**result)
     
     @fastapi_app.post("/predict_batch")
-    async def predict_batch(request: BatchPredictionRequest):
+    async def predict_batch(request: BatchPredictionRequest, http_request: Request,
+                            x_model: Optional[str] = Header(None)):
         """Predict prices for multiple phone numbers"""
-        if not prediction_service:
-            raise HTTPException(status_code=503, detail="Model not loaded")
-        
         if len(request.phone_numbers) > 100:
             raise HTTPException(status_code=400, detail="Maximum 100 phone numbers per request")
         
-        result = prediction_service.predict_batch(request.phone_numbers)
-        return result
+        model_args = registry_args(prediction_service, x_model)
+        return await predict_or_degrade(
+            http_request, len(request.phone_numbers), 'bulk',
+            lambda: prediction_executor.call('predict_batch', request.phone_numbers, True, *model_args),
+            ('predict_batch', request.phone_numbers)
+        )
+    
+    @fastapi_app.post("/predict_stream")
+    async def predict_stream(request: Request, x_model: Optional[str] = Header(None)):
+        """
+        Bulk valuation: newline-delimited numbers or JSON objects in, NDJSON out
+        
+        Results are streamed per chunk (API_CONFIG['stream_chunk_size']) in input order.
+        """
+        if not prediction_service and rule_pricer is None:
+            raise HTTPException(status_code=503, detail="Model not loaded")
+        model_args = registry_args(prediction_service, x_model)
+        
+        async def predict_chunk(phone_numbers):
+            fallback = ('predict_batch', phone_numbers)
+            if not prediction_service:
+                return degraded_answer(fallback, 'model_unavailable')
+            # Cache is read but not filled by bulk catalogs; over the limits the upload is slowed down
+            async with admission_slot(request, len(phone_numbers), 'bulk', wait=True):
+                try:
+                    return await asyncio.wait_for(prediction_executor.call('predict_batch', phone_numbers, False,
+                                                                           *model_args),
+                                                  API_CONFIG.get('timeout'))
+                except (ExecutorBusyError, ConnectionError, asyncio.TimeoutError) as e:
+                    # An overloaded chunk is priced by the rules instead of failing its lines
+                    result = degraded_answer(fallback, overload_reason(e))
+                    if result is None:
+                        raise
+                    return result
+        
+        # The first chunk is read before the response starts so an over-long line there is a 413
+        results = stream_predictions(request.stream(), predict_chunk)
+        try:
+            first = await results.__anext__()
+        except StopAsyncIteration:
+            first = None
+        except LineTooLongError as e:
+            count_error('line_too_long')
+            raise HTTPException(status_code=413, detail=str(e))
+        
+        async def body():
+            if first is None:
+                return
+            yield first
+            async for lines in results:
+                yield lines
+        
+        return BodyStreamingResponse(body(), media_type="application/x-ndjson")
     
     @fastapi_app.post("/explain")
-    async def explain_prediction(request: PhoneNumberRequest):
+    async def explain_prediction(request: PhoneNumberRequest, http_request: Request,
+                                 x_model: Optional[str] = Header(None)):
         """Get detailed explanation for prediction"""
         if not prediction_service:
             raise HTTPException(status_code=503, detail="Model not loaded")
         
-        result = prediction_service.explain_prediction(request.phone_number)
+        model_args = registry_args(prediction_service, x_model)
+        async with admission_slot(http_request, 1, 'interactive'):
+            result = await run_prediction(prediction_executor.call('explain_prediction', request.phone_number,
+                                                                   *model_args))
         return result
     
+    @fastapi_app.post("/explain_batch")
+    async def explain_batch(request: BatchPredictionRequest, http_request: Request,
+                            x_model: Optional[str] = Header(None)):
+        """Explanations for multiple phone numbers (one feature pass and one contribution call)"""
+        if not prediction_service:
+            raise HTTPException(status_code=503, detail="Model not loaded")
+        
+        if len(request.phone_numbers) > 100:
+            raise HTTPException(status_code=400, detail="Maximum 100 phone numbers per request")
+        
+        model_args = registry_args(prediction_service, x_model)
+        async with admission_slot(http_request, len(request.phone_numbers), 'bulk'):
+            result = await run_prediction(prediction_executor.call('explain_batch', request.phone_numbers, True,
+                                                                   *model_args))
+        return result
+    
+    @fastapi_app.exception_handler(AdmissionRejected)
+    async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+        count_error(exc.reason)
+        return JSONResponse(status_code=429, content={"detail": str(exc), "reason": exc.reason},
+                            headers={"Retry-After": exc.retry_after_header})
+    
+    @fastapi_app.exception_handler(UnknownModelError)
+    async def unknown_model_handler(request: Request, exc: UnknownModelError):
+        return JSONResponse(status_code=400, content={"detail": f"Unknown model: {exc.args[0]}"})
+    
     # Exception handler
     @fastapi_app.exception_handler(Exception)
     async def general_exception_handler(request: Request, exc: Exception):
+        count_error('unhandled')
         return JSONResponse(
             status_code=500,
             content={
@@ -163,13 +631,78 @@ try:
         """Initialize model for Flask"""
         global flask_prediction_service
         
-        model_path = os.getenv("MODEL_PATH", "../models/deployed/best_model.pkl")
+        # Rules first: they answer if the model cannot be loaded
+        load_fallback_pricer(model_artifact_path())
+        
+        socket_path = inference_socket()
+        if socket_path:
+            # Requests are forwarded to the inference daemon (no model in this process)
+            client = BlockingInferenceClient(socket_path)
+            flask_prediction_service = RemotePipeline(client)
+            try:
+                flask_prediction_service.update(client.call('status'))
+                print(f"✅ Flask: Using inference server at {socket_path}")
+            except ConnectionError as e:
+                print(f"⚠️ Flask: Inference server unavailable: {str(e)}")
+            return
         
+        if preloaded is not None:
+            # Forked worker: the parent already loaded and warmed up the models
+            pipeline, registry = preloaded['pipeline'], preloaded['registry']
+        else:
+            model_path = model_artifact_path()
+            try:
+                pipeline = create_prediction_service(model_path)
+                print("✅ Flask: Model loaded successfully")
+            except Exception as e:
+                print(f"❌ Flask: Error loading model: {str(e)}")
+                return
+            registry = load_model_registry(model_path)
+        
+        flask_prediction_service = registry.with_model(DEFAULT_MODEL, pipeline) if registry else pipeline
+    
+    # Admission lane per service method
+    FLASK_LANES = {'predict_single': 'interactive', 'explain_prediction': 'interactive',
+                   'predict_batch': 'bulk', 'explain_batch': 'bulk'}
+    
+    def flask_call(method, *args):
+        """
+        Call the prediction service (X-Model header picks a registry model)
+        
+        Flask handles requests on threads, so admission never queues: a server at
+        capacity or an empty token bucket answers 429 right away. Without a model,
+        at capacity or with the inference daemon down, predictions come from the
+        calibrated rules instead (marked degraded).
+        """
+        fallback = (method, args[0])
+        if flask_prediction_service is None:
+            return degraded_answer(fallback, 'model_unavailable')
+        model_args = registry_args(flask_prediction_service, request.headers.get("X-Model"))
+        call = getattr(flask_prediction_service, method)
+        lane = FLASK_LANES[method]
+        client = admission_client(request.headers.get("X-API-Key"), request.remote_addr)
         try:
-            flask_prediction_service = create_prediction_service(model_path)
-            print("✅ Flask: Model loaded successfully")
-        except Exception as e:
-            print(f"❌ Flask: Error loading model: {str(e)}")
+            if admission_controller is None:
+                return call(*args, *model_args)
+            with admission_controller.slot_nowait(len(args[0]) if lane == 'bulk' else 1, lane, client):
+                return call(*args, *model_args)
+        except (AdmissionRejected, ConnectionError) as e:
+            reason = e.reason if isinstance(e, AdmissionRejected) else overload_reason(e)
+            result = None if reason == 'rate_limited' else degraded_answer(fallback, reason)
+            if result is None:
+                raise
+            count_error(reason)
+            return result
+    
+    @flask_app.errorhandler(UnknownModelError)
+    def flask_unknown_model(error):
+        return jsonify({"error": f"Unknown model: {error.args[0]}"}), 400
+    
+    @flask_app.errorhandler(AdmissionRejected)
+    def flask_admission_rejected(error):
+        count_error(error.reason)
+        return (jsonify({"error": str(error), "reason": error.reason}), 429,
+                {"Retry-After": error.retry_after_header})
     
     @flask_app.route("/")
     def flask_root():
@@ -182,6 +715,7 @@ try:
                 "/predict": "Single phone number prediction (POST)",
                 "/predict_batch": "Batch prediction (POST)",
                 "/explain": "Prediction explanation (POST)",
+                "/explain_batch": "Batch prediction explanations (POST)",
                 "/health": "Service health check (GET)"
             }
         })
@@ -190,15 +724,24 @@ try:
     def flask_health():
         """Health check endpoint"""
         return jsonify({
-            "status": "healthy" if flask_prediction_service else "unhealthy",
+            "status": degraded_status(flask_prediction_service),
             "timestamp": datetime.now().isoformat(),
-            "model_loaded": flask_prediction_service is not None
+            "model_loaded": flask_prediction_service is not None,
+            "cache": cache_stats(flask_prediction_service),
+            "admission": admission_controller.stats() if admission_controller else None,
+            "degraded_mode": rule_pricer.stats() if rule_pricer else None
         })
     
+    @flask_app.route("/metrics")
+    def flask_metrics():
+        """Prometheus text-format metrics"""
+        body, content_type = render_metrics()
+        return body, 200, {"Content-Type": content_type}
+    
     @flask_app.route("/predict", methods=["POST"])
     def flask_predict():
         """Predict price for a single phone number"""
-        if not flask_prediction_service:
+        if not flask_prediction_service and rule_pricer is None:
             return jsonify({"error": "Model not loaded"}), 503
         
         data = request.get_json()
@@ -206,13 +749,13 @@ try:
         if not data or "phone_number" not in data:
             return jsonify({"error": "phone_number required"}), 400
         
-        result = flask_prediction_service.predict_single(data["phone_number"])
+        result = flask_call("predict_single", data["phone_number"])
         return jsonify(result)
     
     @flask_app.route("/predict_batch", methods=["POST"])
     def flask_predict_batch():
         """Predict prices for multiple phone numbers"""
-        if not flask_prediction_service:
+        if not flask_prediction_service and rule_pricer is None:
             return jsonify({"error": "Model not loaded"}), 503
         
         data = request.get_json()
@@ -223,7 +766,7 @@ try:
         if len(data["phone_numbers"]) > 100:
             return jsonify({"error": "Maximum 100 phone numbers per request"}), 400
         
-        result = flask_prediction_service.predict_batch(data["phone_numbers"])
+        result = flask_call("predict_batch", data["phone_numbers"], True)
         return jsonify(result)
     
     @flask_app.route("/explain", methods=["POST"])
@@ -237,7 +780,24 @@ try:
         if not data or "phone_number" not in data:
             return jsonify({"error": "phone_number required"}), 400
         
-        result = flask_prediction_service.explain_prediction(data["phone_number"])
+        result = flask_call("explain_prediction", data["phone_number"])
+        return jsonify(result)
+    
+    @flask_app.route("/explain_batch", methods=["POST"])
+    def flask_explain_batch():
+        """Explanations for multiple phone numbers"""
+        if not flask_prediction_service:
+            return jsonify({"error": "Model not loaded"}), 503
+        
+        data = request.get_json()
+        
+        if not data or "phone_numbers" not in data:
+            return jsonify({"error": "phone_numbers array required"}), 400
+        
+        if len(data["phone_numbers"]) > 100:
+            return jsonify({"error": "Maximum 100 phone numbers per request"}), 400
+        
+        result = flask_call("explain_batch", data["phone_numbers"], True)
         return jsonify(result)
     
     @flask_app.errorhandler(Exception)
@@ -292,31 +852,56 @@ def create_app(framework="fastapi"):
 # RUN SERVERS
 # ====================================================================================
 
-def run_fastapi(host="0.0.0.0", port=8000):
-    """Run FastAPI server"""
+def run_fastapi(host="0.0.0.0", port=8000, workers=None):
+    """
+    Run FastAPI server
+    
+    workers > 1 (default API_CONFIG['workers']) starts the pre-fork mode: the model
+    is loaded once here and the forked workers share it.
+    """
     if not FASTAPI_AVAILABLE:
         print("❌ FastAPI not available")
         return
     
     try:
         import uvicorn
-        print(f"🚀 Starting FastAPI server on http://{host}:{port}")
-        print("📖 API documentation available at http://localhost:8000/docs")
-        uvicorn.run(fastapi_app, host=host, port=port)
     except ImportError:
         print("❌ Uvicorn not installed. Install with: pip install uvicorn")
+        return
+    
+    workers = workers or API_CONFIG.get('workers', 1)
+    print(f"🚀 Starting FastAPI server on http://{host}:{port}")
+    print("📖 API documentation available at http://localhost:8000/docs")
+    if workers <= 1:
+        uvicorn.run(fastapi_app, host=host, port=port)
+        return
+    
+    if not inference_socket():
+        preload_pipeline(model_artifact_path())
+    serve_prefork(lambda sock: uvicorn.Server(uvicorn.Config(fastapi_app)).run(sockets=[sock]),
+                  host, port, workers)
 
-def run_flask(host="0.0.0.0", port=5000, debug=False):
-    """Run Flask server"""
+def run_flask(host="0.0.0.0", port=5000, debug=False, workers=None):
+    """Run Flask server (workers > 1 = pre-fork mode, see run_fastapi)"""
     if not FLASK_AVAILABLE:
         print("❌ Flask not available")
         return
     
+    workers = workers or API_CONFIG.get('workers', 1)
+    if workers > 1 and not inference_socket():
+        preload_pipeline(model_artifact_path())
+    
     # Initialize model
     init_flask_model()
     
     print(f"🚀 Starting Flask server on http://{host}:{port}")
-    flask_app.run(host=host, port=port, debug=debug)
+    if workers <= 1:
+        flask_app.run(host=host, port=port, debug=debug)
+        return
+    
+    from werkzeug.serving import make_server
+    serve_prefork(lambda sock: make_server(host, port, flask_app, threaded=True, fd=sock.fileno()).serve_forever(),
+                  host, port, workers)
 
 # ====================================================================================
 # MAIN
@@ -335,10 +920,12 @@ if __name__ == "__main__":
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind to")
     parser.add_argument("--port", type=int, default=8000, help="Port to bind to")
     parser.add_argument("--debug", action="store_true", help="Enable debug mode (Flask only)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Pre-forked worker processes sharing one loaded model")
     
     args = parser.parse_args()
     
     if args.framework == "fastapi":
-        run_fastapi(host=args.host, port=args.port)
+        run_fastapi(host=args.host, port=args.port, workers=args.workers)
     else:
-        run_flask(host=args.host, port=args.port, debug=args.debug)
+        run_flask(host=args.host, port=args.port, debug=args.debug, workers=args.workers)
@@ -0,0 +1,201 @@
+"""
+Async Micro-Batching for the Prediction API
+Concurrent single-number requests are queued and, within a short window, run as
+one predict_batch call on a worker thread so the event loop is never blocked.
+A request that finds the queue empty is dispatched at once, and up to one batch
+per executor worker runs at a time.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from src.config import API_CONFIG
+from api.executor import PredictionExecutor, ExecutorBusyError
+
+# ====================================================================================
+# MICRO-BATCHER
+# ====================================================================================
+
+class MicroBatcher:
+    """
+    รวม request เดี่ยวที่เข้ามาพร้อมกันเป็น batch เดียว
+
+    Parameters:
+    -----------
+    pipeline : PredictionPipeline
+        Loaded prediction pipeline
+    max_batch_size : int, optional
+        Maximum numbers per batch (None = API_CONFIG['micro_batch_size'])
+    max_wait_ms : float, optional
+        How long the first queued request waits for companions when others are
+        already queued behind it (None = API_CONFIG['micro_batch_wait_ms'])
+    executor : PredictionExecutor or concurrent.futures.Executor, optional
+        Where batches run (default: one dedicated thread, one batch at a time)
+    max_queue_depth : int, optional
+        Maximum waiting requests (None = API_CONFIG['max_queue_depth'])
+    max_concurrent_batches : int, optional
+        Batches running at the same time (None = the executor's worker count)
+    """
+
+    def __init__(self, pipeline, max_batch_size=None, max_wait_ms=None, executor=None,
+                 max_queue_depth=None, max_concurrent_batches=None):
+        self.pipeline = pipeline
+        if max_batch_size is None:
+            max_batch_size = API_CONFIG.get('micro_batch_size', 64)
+        if max_wait_ms is None:
+            max_wait_ms = API_CONFIG.get('micro_batch_wait_ms', 2)
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        if max_queue_depth is None:
+            max_queue_depth = API_CONFIG.get('max_queue_depth', 1000)
+        self.max_queue_depth = max(1, int(max_queue_depth))
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='predict')
+        if max_concurrent_batches is None:
+            # PredictionExecutor.max_workers, or the worker count of a concurrent.futures pool
+            max_concurrent_batches = getattr(self.executor, 'max_workers', getattr(self.executor, '_max_workers', 1))
+        self.max_concurrent_batches = max(1, int(max_concurrent_batches))
+        self._queue = None
+        self._task = None
+        self._slots = None
+        self._batches = set()
+        self.n_batches = 0
+        self.n_items = 0
+
+    # ============ Lifecycle ============
+
+    def start(self):
+        """เริ่ม dispatcher (ต้องเรียกภายใน event loop)"""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """หยุด dispatcher และยกเลิก request ที่ยังค้างในคิว"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            for task in list(self._batches):
+                task.cancel()
+            await asyncio.gather(*self._batches, return_exceptions=True)
+            while not self._queue.empty():
+                _, future = self._queue.get_nowait()
+                if not future.done():
+                    future.cancel()
+        if self._own_executor:
+            self.executor.shutdown(wait=False)
+            self._own_executor = False
+
+    # ============ Requests ============
+
+    async def submit(self, phone_number):
+        """
+        ทำนายราคาเบอร์เดียวผ่าน micro-batch
+
+        Returns:
+        --------
+        result : dict
+            Same result as pipeline.predict_single
+
+        Raises:
+        -------
+        ExecutorBusyError
+            max_queue_depth requests are already waiting
+        """
+        if self._task is None:
+            self.start()
+        if self._queue.qsize() >= self.max_queue_depth:
+            raise ExecutorBusyError(f"Prediction queue is full ({self.max_queue_depth} requests)")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((phone_number, future))
+        return await future
+
+    def stats(self):
+        """Batch counters"""
+        return {
+            'batches': self.n_batches,
+            'items': self.n_items,
+            'mean_batch_size': self.n_items / self.n_batches if self.n_batches else 0.0,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'in_flight': len(self._batches)
+        }
+
+    # ============ Dispatch loop ============
+
+    async def _call(self, method, *args):
+        if isinstance(self.executor, PredictionExecutor):
+            return await self.executor.call(method, *args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, getattr(self.pipeline, method), *args)
+
+    async def _collect(self):
+        """รอ request แรก แล้วรวบ request ที่ตามมาภายใน max_wait"""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        if self._queue.empty():
+            # Nothing to coalesce with: a lone request does not wait for the window
+            return batch
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Collect only once a worker is free, so requests keep queueing (and batching) meanwhile
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = loop.create_task(self._dispatch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _dispatch(self, batch):
+        try:
+            # Requests whose client already went away are dropped
+            batch = [(number, future) for number, future in batch if not future.done()]
+            if not batch:
+                return
+            numbers = [number for number, _ in batch]
+
+            try:
+                if len(numbers) == 1:
+                    # Single request keeps the pandas-free fast path
+                    results = [await self._call('predict_single', numbers[0])]
+                else:
+                    summary = await self._call('predict_batch', numbers)
+                    results = summary['results']
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.cancel()
+                raise
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            self.n_batches += 1
+            self.n_items += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
@@ -0,0 +1,160 @@
+"""
+Prediction Execution Pool for the API
+Runs CPU-bound pipeline calls off the event loop on a thread pool (boosters
+release the GIL during predict) or a process pool with the model preloaded in
+every worker, with a bounded number of queued calls and per-call timeouts.
+"""
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from src.config import API_CONFIG
+
+# Pipeline methods that may be called through the pool
+PIPELINE_METHODS = ('predict_single', 'predict_batch', 'explain_prediction', 'explain_batch')
+
+class ExecutorBusyError(RuntimeError):
+    """Raised when the number of queued prediction calls reached max_queue_depth"""
+
+# ====================================================================================
+# PROCESS WORKERS
+# ====================================================================================
+
+# Set once per worker process by the pool initializer
+_worker_pipeline = None
+
+def _init_worker(model_path):
+    global _worker_pipeline
+    from api.prediction import PredictionPipeline
+    _worker_pipeline = PredictionPipeline(model_path=model_path)
+
+def _call_worker(method, args):
+    return getattr(_worker_pipeline, method)(*args)
+
+# ====================================================================================
+# PREDICTION EXECUTOR
+# ====================================================================================
+
+class PredictionExecutor:
+    """
+    Pool ที่รัน pipeline calls นอก event loop
+
+    Parameters:
+    -----------
+    pipeline : PredictionPipeline
+        Pipeline used by thread workers
+    model_path : str, optional
+        Model loaded by every process worker (required for kind='process')
+    kind : str, optional
+        'thread' or 'process' (None = API_CONFIG['executor'])
+    max_workers : int, optional
+        Pool size (None = API_CONFIG['executor_workers'], then CPU count)
+    max_queue_depth : int, optional
+        Maximum calls queued or running at once (None = API_CONFIG['max_queue_depth'])
+    timeout : float, optional
+        Seconds before a call is abandoned (None = API_CONFIG['timeout'])
+    """
+
+    def __init__(self, pipeline, model_path=None, kind=None, max_workers=None,
+                 max_queue_depth=None, timeout=None):
+        self.pipeline = pipeline
+        self.kind = (kind or API_CONFIG.get('executor', 'thread')).lower()
+        if max_workers is None:
+            max_workers = API_CONFIG.get('executor_workers')
+        self.max_workers = max(1, int(max_workers or os.cpu_count() or 1))
+        if max_queue_depth is None:
+            max_queue_depth = API_CONFIG.get('max_queue_depth', 1000)
+        self.max_queue_depth = max(1, int(max_queue_depth))
+        self.timeout = API_CONFIG.get('timeout') if timeout is None else timeout
+        self.in_flight = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+        if self.kind == 'thread':
+            self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='predict')
+        elif self.kind == 'process':
+            if model_path is None:
+                raise ValueError("model_path is required for a process executor")
+            self.pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                            initializer=_init_worker, initargs=(model_path,))
+        else:
+            raise ValueError(f"Unknown executor: {self.kind}. Choose 'thread' or 'process'")
+
+    async def call(self, method, *args):
+        """
+        เรียก pipeline method บน pool
+
+        Raises:
+        -------
+        ExecutorBusyError
+            max_queue_depth calls are already queued or running
+        asyncio.TimeoutError
+            The call did not finish within timeout (the worker still completes it)
+        """
+        if method not in PIPELINE_METHODS:
+            raise ValueError(f"Unknown pipeline method: {method}")
+        if self.in_flight >= self.max_queue_depth:
+            self.rejected += 1
+            raise ExecutorBusyError(f"Prediction queue is full ({self.max_queue_depth} calls)")
+
+        loop = asyncio.get_running_loop()
+        if self.kind == 'thread':
+            work = self.pool.submit(getattr(self.pipeline, method), *args)
+        else:
+            work = self.pool.submit(_call_worker, method, args)
+
+        # A timed-out call keeps its slot until the worker really finishes it
+        self.in_flight += 1
+        work.add_done_callback(lambda _: self._release(loop))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(work), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise
+
+    def _release(self, loop):
+        # Called from the worker side; the counter is only touched on the event loop
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(self._decrement)
+
+    def _decrement(self):
+        self.in_flight -= 1
+
+    async def swap(self, pipeline, model_path=None, warmup_numbers=None):
+        """
+        เปลี่ยนไปใช้ pipeline ใหม่โดยไม่ทิ้ง request ที่กำลังรัน
+
+        Thread pools switch the pipeline reference. Process pools start a new pool
+        loading model_path, warm every worker, then replace the old pool, which
+        finishes its queued calls before shutting down.
+        """
+        if self.kind == 'thread':
+            self.pipeline = pipeline
+            return
+
+        if model_path is None:
+            raise ValueError("model_path is required for a process executor")
+        pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                   initializer=_init_worker, initargs=(model_path,))
+        if warmup_numbers:
+            await asyncio.gather(*[
+                asyncio.wrap_future(pool.submit(_call_worker, 'predict_batch', (warmup_numbers,)))
+                for _ in range(self.max_workers)
+            ])
+        old_pool, self.pool, self.pipeline = self.pool, pool, pipeline
+        old_pool.shutdown(wait=False)
+
+    def stats(self):
+        """Pool counters"""
+        return {
+            'kind': self.kind,
+            'max_workers': self.max_workers,
+            'in_flight': self.in_flight,
+            'max_queue_depth': self.max_queue_depth,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out
+        }
+
+    def shutdown(self, wait=False):
+        """ปิด pool"""
+        self.pool.shutdown(wait=wait)
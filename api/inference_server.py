@@ -0,0 +1,524 @@
+"""
+Local Inference Daemon
+One process owns the model, the execution pool and the micro-batcher and serves
+every web worker over a Unix domain socket, so /predict calls from all workers
+share micro-batches and only one copy of the model is in memory. Web workers
+connect with InferenceClient (asyncio, FastAPI) or BlockingInferenceClient
+(Flask) and never load the model themselves.
+
+Run:
+    python -m api.inference_server --socket /tmp/phone_inference.sock --model models/deployed/best_model.pkl
+"""
+import os
+import sys
+import json
+import socket
+import struct
+import asyncio
+import argparse
+import threading
+from datetime import datetime
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import API_CONFIG
+from api.batching import MicroBatcher
+from api.executor import PredictionExecutor, ExecutorBusyError, PIPELINE_METHODS
+from api.model_reload import ModelReloader, warmup_numbers, resolve_reload_path
+from api.metrics import register_service_collector, METRICS_AVAILABLE
+
+# Frame: 4-byte big-endian length + UTF-8 JSON
+HEADER = struct.Struct('>I')
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+# Daemon methods besides PIPELINE_METHODS
+CONTROL_METHODS = ('status', 'reload')
+
+class InferenceServerError(RuntimeError):
+    """Raised by clients when the daemon reports a failed call"""
+
+# ====================================================================================
+# PROTOCOL
+# ====================================================================================
+
+def _json_default(value):
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+def encode_message(message):
+    """dict → length-prefixed frame"""
+    body = json.dumps(message, ensure_ascii=False, default=_json_default).encode('utf-8')
+    return HEADER.pack(len(body)) + body
+
+async def read_message(reader):
+    """
+    Next frame from an asyncio stream
+
+    Returns None when the peer closed the connection.
+    """
+    try:
+        header = await reader.readexactly(HEADER.size)
+    except asyncio.IncompleteReadError:
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Message of {length} bytes exceeds {MAX_MESSAGE_BYTES}")
+    return json.loads(await reader.readexactly(length))
+
+def _error_response(request_id, error_type, error):
+    return {'id': request_id, 'error_type': error_type, 'error': error}
+
+def _raise_remote_error(response):
+    """Re-raise a daemon error as the exception the local executor would raise"""
+    error_type, error = response['error_type'], response['error']
+    if error_type == 'busy':
+        raise ExecutorBusyError(error)
+    if error_type == 'timeout':
+        raise asyncio.TimeoutError(error)
+    raise InferenceServerError(error)
+
+# ====================================================================================
+# SERVER
+# ====================================================================================
+
+class InferenceServer:
+    """
+    Inference daemon บน Unix domain socket
+
+    Parameters:
+    -----------
+    socket_path : str
+        Socket file (API_CONFIG['inference_socket'] for web workers)
+    model_path : str
+        Artifact to serve (also watched / reloaded like the API)
+    watch_interval : float, optional
+        Model file check interval (None = API_CONFIG['model_watch_interval'])
+    """
+
+    def __init__(self, socket_path, model_path, watch_interval=None):
+        self.socket_path = socket_path
+        self.pipeline = None
+        self.executor = None
+        self.batcher = None
+        self.reloader = ModelReloader(model_path, self._install, watch_interval)
+        self.n_connections = 0
+        self.n_requests = 0
+        self.started = None
+        self._server = None
+
+    async def _install(self, pipeline, model_path):
+        """Swap in a loaded and warmed-up pipeline (same as the API's install_pipeline)"""
+        if self.executor is None:
+            self.executor = PredictionExecutor(pipeline, model_path=model_path)
+            if API_CONFIG.get('micro_batching', False):
+                self.batcher = MicroBatcher(pipeline, executor=self.executor)
+                self.batcher.start()
+        else:
+            await self.executor.swap(pipeline, model_path, warmup_numbers(8))
+            if self.batcher is not None:
+                self.batcher.pipeline = pipeline
+        self.pipeline = pipeline
+
+    # ============ Lifecycle ============
+
+    async def start(self):
+        """โหลดโมเดลแล้วเริ่มรับ connection (ต้องเรียกภายใน event loop)"""
+        status = await self.reloader.reload()
+        if not status['success']:
+            print(f"❌ Inference server: Error loading model: {status['error']}")
+        self.reloader.start_watcher()
+
+        self._server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+        # Only the service user (and its group) may send requests
+        os.chmod(self.socket_path, 0o660)
+        self.started = datetime.now()
+        print(f"🚀 Inference server listening on {self.socket_path}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.reloader.stop_watcher()
+        if self.batcher is not None:
+            await self.batcher.stop()
+            self.batcher = None
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    # ============ Requests ============
+
+    async def _handle_connection(self, reader, writer):
+        """One web worker: requests are answered as they finish (matched by id)"""
+        self.n_connections += 1
+        tasks = set()
+        try:
+            while True:
+                try:
+                    request = await read_message(reader)
+                except (ValueError, ConnectionError) as e:
+                    print(f"⚠️ Inference server: dropping connection: {str(e)}")
+                    break
+                if request is None:
+                    break
+                task = asyncio.get_running_loop().create_task(self._respond(request, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.n_connections -= 1
+            writer.close()
+
+    async def _respond(self, request, writer):
+        response = await self.dispatch(request)
+        if writer.is_closing():
+            return
+        writer.write(encode_message(response))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def dispatch(self, request):
+        """
+        Run one request
+
+        Returns:
+        --------
+        response : dict
+            {'id', 'result'} or {'id', 'error_type', 'error'} with error_type
+            'busy', 'timeout', 'unavailable', 'invalid' or 'error'
+        """
+        request_id = request.get('id')
+        method = request.get('method')
+        args = request.get('args') or []
+        self.n_requests += 1
+
+        if method == 'status':
+            return {'id': request_id, 'result': self.status()}
+        if method == 'reload':
+            return {'id': request_id, 'result': await self._reload(*args)}
+        if method not in PIPELINE_METHODS:
+            return _error_response(request_id, 'invalid', f"Unknown method: {method}")
+        if self.pipeline is None:
+            return _error_response(request_id, 'unavailable', "Model not loaded")
+
+        try:
+            if method == 'predict_single' and self.batcher is not None:
+                work = self.batcher.submit(*args)
+            else:
+                work = self.executor.call(method, *args)
+            result = await asyncio.wait_for(work, API_CONFIG.get('timeout'))
+        except ExecutorBusyError as e:
+            return _error_response(request_id, 'busy', str(e))
+        except asyncio.TimeoutError:
+            return _error_response(request_id, 'timeout', "Prediction timed out")
+        except Exception as e:
+            return _error_response(request_id, 'error', f"{type(e).__name__}: {str(e)}")
+        return {'id': request_id, 'result': result}
+
+    async def _reload(self, model_path=None):
+        """Admin reload on behalf of a web worker (status_code for its HTTP response)"""
+        if self.reloader.reloading:
+            return {'success': False, 'error': "A model reload is already running", 'status_code': 409}
+        if model_path is not None:
+            try:
+                model_path = resolve_reload_path(self.reloader.model_path, model_path)
+            except ValueError as e:
+                return {'success': False, 'error': str(e), 'status_code': 400}
+        status = await self.reloader.reload(model_path)
+        return {**status, 'status_code': 200 if status['success'] else 422}
+
+    def status(self):
+        """Model, pool and connection details for web workers' health endpoints"""
+        pipeline = self.pipeline
+        return {
+            'ready': pipeline is not None and self.reloader.ready,
+            'model_version': pipeline.model_version if pipeline else None,
+            'model_info': pipeline.model_info if pipeline else None,
+            'model': self.reloader.status(),
+            'cache': ({'model_version': pipeline.model_version, **pipeline.cache.stats()}
+                      if pipeline is not None and pipeline.cache is not None else None),
+            'executor': self.executor.stats() if self.executor else None,
+            'batcher': self.batcher.stats() if self.batcher else None,
+            'connections': self.n_connections,
+            'requests': self.n_requests,
+            'pid': os.getpid()
+        }
+
+# ====================================================================================
+# CLIENTS
+# ====================================================================================
+
+class InferenceClient:
+    """
+    asyncio client with the same call() interface as PredictionExecutor
+
+    Many requests share one connection; responses are matched by id. The
+    connection is opened on first use and reopened after the daemon restarts.
+
+    Parameters:
+    -----------
+    socket_path : str
+        Daemon socket
+    """
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.calls = 0
+        self.reconnects = 0
+        self._next_id = 0
+        self._pending = {}
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self._connect_lock = None
+
+    @property
+    def connected(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def _connect(self):
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self.connected:
+                return
+            if self._reader is not None:
+                self.reconnects += 1
+            self._reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+            self._read_task = asyncio.get_running_loop().create_task(self._read_responses(self._reader))
+
+    async def _read_responses(self, reader):
+        try:
+            while True:
+                response = await read_message(reader)
+                if response is None:
+                    break
+                future = self._pending.pop(response.get('id'), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        except (ValueError, ConnectionError):
+            pass
+        finally:
+            # Connection lost: every waiting call fails, the next call reconnects
+            if self._writer is not None:
+                self._writer.close()
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Inference server connection closed"))
+            self._pending.clear()
+
+    async def call(self, method, *args):
+        """
+        เรียก method บน inference daemon
+
+        Raises:
+        -------
+        ExecutorBusyError
+            The daemon's queue is full
+        asyncio.TimeoutError
+            The daemon abandoned the call after its timeout
+        ConnectionError
+            The daemon is not running or the connection was lost
+        InferenceServerError
+            Any other failure reported by the daemon
+        """
+        if not self.connected:
+            try:
+                await self._connect()
+            except OSError as e:
+                raise ConnectionError(f"Inference server unavailable at {self.socket_path}: {str(e)}")
+
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        self.calls += 1
+        try:
+            self._writer.write(encode_message({'id': request_id, 'method': method, 'args': list(args)}))
+            await self._writer.drain()
+            response = await future
+        finally:
+            self._pending.pop(request_id, None)
+
+        if 'error_type' in response:
+            if response['error_type'] == 'unavailable':
+                raise ConnectionError(response['error'])
+            _raise_remote_error(response)
+        return response['result']
+
+    def stats(self):
+        return {
+            'socket_path': self.socket_path,
+            'connected': self.connected,
+            'in_flight': len(self._pending),
+            'calls': self.calls,
+            'reconnects': self.reconnects,
+            # Same keys as PredictionExecutor.stats (counted by the daemon)
+            'rejected': 0,
+            'timed_out': 0
+        }
+
+    def shutdown(self):
+        if self._read_task is not None:
+            self._read_task.cancel()
+            self._read_task = None
+        if self._writer is not None:
+            self._writer.close()
+
+class BlockingInferenceClient:
+    """
+    Synchronous client for threaded web servers (one connection per thread)
+
+    Parameters:
+    -----------
+    socket_path : str
+        Daemon socket
+    timeout : float, optional
+        Socket timeout in seconds (None = API_CONFIG['timeout'])
+    """
+
+    def __init__(self, socket_path, timeout=None):
+        self.socket_path = socket_path
+        self.timeout = API_CONFIG.get('timeout') if timeout is None else timeout
+        self._local = threading.local()
+
+    def _socket(self):
+        sock = getattr(self._local, 'socket', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError as e:
+                sock.close()
+                raise ConnectionError(f"Inference server unavailable at {self.socket_path}: {str(e)}")
+            self._local.socket = sock
+            self._local.next_id = 0
+        return sock
+
+    def _receive(self, sock, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Inference server connection closed")
+            data += chunk
+        return bytes(data)
+
+    def call(self, method, *args):
+        """Blocking call (same errors as InferenceClient.call; socket.timeout on timeout)"""
+        sock = self._socket()
+        self._local.next_id += 1
+        request_id = self._local.next_id
+        try:
+            sock.sendall(encode_message({'id': request_id, 'method': method, 'args': list(args)}))
+            (length,) = HEADER.unpack(self._receive(sock, HEADER.size))
+            response = json.loads(self._receive(sock, length))
+        except (OSError, ConnectionError):
+            # Reconnect on the next call
+            sock.close()
+            self._local.socket = None
+            raise
+
+        if 'error_type' in response:
+            if response['error_type'] == 'unavailable':
+                raise ConnectionError(response['error'])
+            _raise_remote_error(response)
+        return response['result']
+
+class RemotePipeline:
+    """
+    PredictionPipeline stand-in for web workers served by the daemon
+
+    Holds the daemon's model metadata (model_info, model_version) for health and
+    metrics; the pipeline methods need a BlockingInferenceClient.
+    """
+
+    # Cached on the daemon
+    cache = None
+
+    def __init__(self, client=None, status=None):
+        self.client = client
+        self.model_info = {}
+        self.model_version = None
+        if status is not None:
+            self.update(status)
+
+    def update(self, status):
+        """Take model metadata from a daemon status"""
+        self.model_info = status.get('model_info') or {}
+        self.model_version = status.get('model_version')
+
+    def predict_single(self, phone_number):
+        return self.client.call('predict_single', phone_number)
+
+    def predict_batch(self, phone_numbers, cache_results=True):
+        return self.client.call('predict_batch', phone_numbers, cache_results)
+
+    def explain_prediction(self, phone_number):
+        return self.client.call('explain_prediction', phone_number)
+
+    def explain_batch(self, phone_numbers, cache_results=True):
+        return self.client.call('explain_batch', phone_numbers, cache_results)
+
+# ====================================================================================
+# MAIN
+# ====================================================================================
+
+def run_inference_server(socket_path=None, model_path=None, metrics_port=None):
+    """
+    Run the daemon until interrupted
+
+    Parameters:
+    -----------
+    socket_path : str, optional
+        Default: API_CONFIG['inference_socket']
+    model_path : str, optional
+        Default: MODEL_PATH environment variable
+    metrics_port : int, optional
+        Serve the daemon's Prometheus metrics (pipeline stages, cache, pool) on this port
+    """
+    socket_path = socket_path or API_CONFIG.get('inference_socket')
+    if not socket_path:
+        raise ValueError("socket_path is required (or set API_CONFIG['inference_socket'])")
+    model_path = model_path or os.getenv("MODEL_PATH", "../models/deployed/best_model.pkl")
+
+    server = InferenceServer(socket_path, model_path)
+    if metrics_port and METRICS_AVAILABLE:
+        from prometheus_client import start_http_server
+        from api.metrics import REGISTRY
+        register_service_collector(lambda: {'service': server.pipeline, 'executor': server.executor,
+                                            'batcher': server.batcher})
+        start_http_server(metrics_port, registry=REGISTRY)
+        print(f"📊 Inference server metrics on :{metrics_port}/metrics")
+
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("\n👋 Inference server stopped")
+
+def main():
+    parser = argparse.ArgumentParser(description="Phone number inference daemon")
+    parser.add_argument('--socket', default=None, help="Unix socket path (default: API_CONFIG['inference_socket'])")
+    parser.add_argument('--model', default=None, help="Model artifact (default: MODEL_PATH)")
+    parser.add_argument('--metrics-port', type=int, default=None, help="Prometheus metrics port")
+    args = parser.parse_args()
+    run_inference_server(args.socket, args.model, args.metrics_port)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+Prometheus Metrics for the Prediction API
+Per-stage latency histograms, batch-size distributions and error counters are
+recorded in-process; cache, pool and model-version values are read from the live
+objects only when /metrics is scraped. Without prometheus_client every recording
+function is a no-op.
+"""
+import time
+
+try:
+    from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+    from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+    METRICS_AVAILABLE = True
+except ImportError:
+    METRICS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = 'text/plain; version=0.0.4; charset=utf-8'
+
+# PredictionPipeline stages
+STAGES = ['validation', 'features', 'preprocessing', 'predict', 'serialization']
+
+# 50µs .. 30s
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 10000)
+
+# ====================================================================================
+# METRICS
+# ====================================================================================
+
+if METRICS_AVAILABLE:
+    REGISTRY = CollectorRegistry()
+
+    STAGE_SECONDS = Histogram('phone_api_stage_seconds', 'PredictionPipeline stage latency',
+                              ['stage'], buckets=LATENCY_BUCKETS, registry=REGISTRY)
+    REQUEST_SECONDS = Histogram('phone_api_request_seconds', 'HTTP request latency',
+                                ['endpoint'], buckets=LATENCY_BUCKETS, registry=REGISTRY)
+    REQUESTS = Counter('phone_api_requests', 'HTTP requests', ['endpoint', 'status'], registry=REGISTRY)
+    BATCH_SIZE = Histogram('phone_api_batch_size', 'Numbers per predict_batch call',
+                           buckets=BATCH_BUCKETS, registry=REGISTRY)
+    MODEL_BATCH_ROWS = Histogram('phone_api_model_batch_rows', 'Rows per model predict call (after cache hits)',
+                                 buckets=BATCH_BUCKETS, registry=REGISTRY)
+    ERRORS = Counter('phone_api_errors', 'Errors by type', ['type'], registry=REGISTRY)
+    DEGRADED = Counter('phone_api_degraded_numbers', 'Numbers priced by the rule-based fallback',
+                       ['reason'], registry=REGISTRY)
+
+    # Pre-bound label children keep the per-call cost to one observe()
+    _STAGE_CHILDREN = {stage: STAGE_SECONDS.labels(stage) for stage in STAGES}
+
+def observe_stage(stage, started):
+    """
+    บันทึกเวลาของ stage ตั้งแต่ started (time.perf_counter)
+
+    Returns:
+    --------
+    now : float
+        perf_counter value to use as the start of the next stage
+    """
+    now = time.perf_counter()
+    if METRICS_AVAILABLE:
+        _STAGE_CHILDREN[stage].observe(now - started)
+    return now
+
+def observe_batch(n_numbers, n_model_rows):
+    """ขนาด batch ที่เข้ามา และจำนวนแถวที่ส่งเข้าโมเดลจริง"""
+    if METRICS_AVAILABLE:
+        BATCH_SIZE.observe(n_numbers)
+        if n_model_rows:
+            MODEL_BATCH_ROWS.observe(n_model_rows)
+
+def count_error(error_type, n=1):
+    """นับ error ตามประเภท"""
+    if METRICS_AVAILABLE and n:
+        ERRORS.labels(error_type).inc(n)
+
+def count_degraded(reason, n=1):
+    """นับเบอร์ที่ตอบด้วย rule-based pricing แทนโมเดล"""
+    if METRICS_AVAILABLE and n:
+        DEGRADED.labels(reason).inc(n)
+
+def observe_request(endpoint, status, seconds):
+    """Latency และจำนวน request ต่อ endpoint"""
+    if METRICS_AVAILABLE:
+        REQUEST_SECONDS.labels(endpoint).observe(seconds)
+        REQUESTS.labels(endpoint, str(status)).inc()
+
+# ====================================================================================
+# LIVE STATE COLLECTOR
+# ====================================================================================
+
+class ServiceCollector:
+    """
+    Exports cache, pool, micro-batch and model values at scrape time
+
+    Parameters:
+    -----------
+    get_state : callable
+        Returns a dict with optional 'service', 'executor' and 'batcher' entries
+    """
+
+    def __init__(self, get_state):
+        self.get_state = get_state
+
+    def collect(self):
+        state = self.get_state()
+        service = state.get('service')
+
+        model = GaugeMetricFamily('phone_api_model_info', 'Serving model (value is always 1)',
+                                  labels=['model_name', 'model_version'])
+        if service is not None:
+            model.add_metric([str(service.model_info.get('model_name', 'Unknown')),
+                              str(service.model_version)], 1)
+        yield model
+
+        cache = service.cache.stats() if service is not None and service.cache is not None else None
+        if cache is not None:
+            for name in ['hits', 'misses', 'evictions', 'expirations', 'invalidations']:
+                yield CounterMetricFamily(f'phone_api_cache_{name}', f'Prediction cache {name}',
+                                          value=cache[name])
+            yield GaugeMetricFamily('phone_api_cache_entries', 'Prediction cache entries', value=cache['size'])
+            yield GaugeMetricFamily('phone_api_cache_hit_ratio', 'Prediction cache hit ratio since start',
+                                    value=cache['hit_rate'])
+
+        executor = state.get('executor')
+        if executor is not None:
+            stats = executor.stats()
+            yield GaugeMetricFamily('phone_api_executor_in_flight', 'Prediction calls queued or running',
+                                    value=stats['in_flight'])
+            yield CounterMetricFamily('phone_api_executor_rejected', 'Calls rejected (queue full)',
+                                      value=stats['rejected'])
+            yield CounterMetricFamily('phone_api_executor_timed_out', 'Calls that timed out',
+                                      value=stats['timed_out'])
+
+        batcher = state.get('batcher')
+        if batcher is not None:
+            stats = batcher.stats()
+            yield GaugeMetricFamily('phone_api_micro_batch_queued', 'Requests waiting for a micro-batch',
+                                    value=stats['queued'])
+            yield GaugeMetricFamily('phone_api_micro_batch_mean_size', 'Mean micro-batch size',
+                                    value=stats['mean_batch_size'])
+
+        admission = state.get('admission')
+        if admission is not None:
+            stats = admission.stats()
+            for name, title, kind in [('in_flight', 'Numbers being predicted', GaugeMetricFamily),
+                                      ('queued', 'Numbers waiting for admission', GaugeMetricFamily),
+                                      ('admitted', 'Requests admitted', CounterMetricFamily)]:
+                family = kind(f'phone_api_admission_{name}', f'{title} per lane', labels=['lane'])
+                for lane, value in stats[name].items():
+                    family.add_metric([lane], value)
+                yield family
+            rejected = CounterMetricFamily('phone_api_admission_rejected', 'Requests rejected with 429',
+                                           labels=['reason'])
+            for reason, value in stats['rejected'].items():
+                rejected.add_metric([reason], value)
+            yield rejected
+
+def register_service_collector(get_state):
+    """ลงทะเบียน ServiceCollector (ครั้งเดียวต่อ process)"""
+    if METRICS_AVAILABLE:
+        REGISTRY.register(ServiceCollector(get_state))
+
+def render_metrics():
+    """
+    Prometheus text exposition
+
+    Returns:
+    --------
+    (body, content_type) : (bytes, str)
+    """
+    if not METRICS_AVAILABLE:
+        return b'# prometheus_client not installed. Install with: pip install prometheus-client\n', CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+# ====================================================================================
+# ASGI MIDDLEWARE
+# ====================================================================================
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording latency and status per route template
+
+    The route path ('/predict') is used as the label, never the raw URL, so the
+    number of series stays bounded. Streaming responses are timed until their
+    last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not METRICS_AVAILABLE:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get('route')
+            endpoint = getattr(route, 'path', None) or 'unmatched'
+            observe_request(endpoint, status[0], time.perf_counter() - started)
@@ -0,0 +1,509 @@
+"""
+Multi-Model Registry
+Hosts several loaded artifacts (e.g. the current best model and a
+TierSpecificPricePredictor candidate) behind the PredictionPipeline interface.
+Numbers are routed by weight (sticky per number) or by an explicit model name;
+one feature pass per request covers every routed model. Shadow models are
+evaluated on a background thread after the response is built and their
+outputs are appended to an NDJSON log for offline comparison.
+"""
+import os
+import json
+import queue
+import zlib
+import time
+import hashlib
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.config import API_CONFIG, LOGS_PATH
+from api.prediction import PredictionPipeline
+from api.metrics import observe_stage, count_error
+from api.model_reload import prepare_pipeline
+
+# Registry name of the MODEL_PATH artifact
+DEFAULT_MODEL = 'default'
+
+class UnknownModelError(KeyError):
+    """Raised when a request names a model the registry does not host"""
+
+# ====================================================================================
+# HELPERS
+# ====================================================================================
+
+def market_fingerprint(market_stats):
+    """
+    Hash ของ market statistics ของ artifact
+
+    Pipelines with the same fingerprint produce identical feature values and can
+    share one feature pass (None = default market features).
+    """
+    if market_stats is None:
+        return None
+    digest = hashlib.sha1()
+
+    def update(value):
+        if isinstance(value, dict):
+            for key in sorted(value, key=str):
+                digest.update(repr(key).encode())
+                update(value[key])
+        elif isinstance(value, np.ndarray):
+            digest.update(str(value.dtype).encode())
+            digest.update(np.ascontiguousarray(value))
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                update(item)
+        else:
+            digest.update(repr(value).encode())
+
+    update(market_stats)
+    return digest.hexdigest()
+
+def _predict_prices(pipeline, X):
+    """Prices of a feature frame without touching the serving latency metrics"""
+    if pipeline.preprocessor is not None:
+        X = pipeline.preprocessor.transform(X)
+    return np.expm1(np.asarray(pipeline.model.predict(X), dtype=float))
+
+# ====================================================================================
+# SHADOW EVALUATOR
+# ====================================================================================
+
+class ShadowEvaluator:
+    """
+    ประเมิน shadow models บน background thread และบันทึกผลเป็น NDJSON
+
+    Jobs are queued without blocking; when the queue is full a job is dropped
+    (counted in stats) so the serving path never waits for shadow work.
+
+    Parameters:
+    -----------
+    log_path : str, optional
+        NDJSON output (None = API_CONFIG['shadow_log'], then LOGS_PATH/shadow_predictions.jsonl)
+    max_queue : int, optional
+        Jobs waiting at most (None = API_CONFIG['shadow_queue_size'])
+    """
+
+    def __init__(self, log_path=None, max_queue=None):
+        self.log_path = (log_path or API_CONFIG.get('shadow_log')
+                         or os.path.join(LOGS_PATH, 'shadow_predictions.jsonl'))
+        if max_queue is None:
+            max_queue = API_CONFIG.get('shadow_queue_size', 1000)
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._thread = None
+        self._lock = threading.Lock()
+        self.n_jobs = 0
+        self.n_dropped = 0
+        self.n_errors = 0
+        self._compared = {}
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='shadow', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """หยุด thread หลังทำงานที่อยู่ในคิวเสร็จ"""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, models, shadows, job):
+        """
+        Queue one evaluation job (never blocks)
+
+        Parameters:
+        -----------
+        models : dict
+            name -> pipeline snapshot of the registry that served the request
+        shadows : list
+            Shadow model names to evaluate
+        job : dict
+            numbers, served (model name, price or None) per number, the request's
+            feature frames (fingerprint, numbers, frame), which cover the first numbers,
+            and the market fingerprint of each shadow model
+        """
+        self.start()
+        try:
+            self._queue.put_nowait((models, shadows, job))
+        except queue.Full:
+            self.n_dropped += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self.evaluate(*item)
+            except Exception as e:
+                self.n_errors += 1
+                print(f"⚠️ Shadow evaluation failed: {str(e)}")
+
+    def evaluate(self, models, shadows, job):
+        """Predict job numbers with every shadow model and append one log line per number and model"""
+        numbers = job['numbers']
+        timestamp = datetime.now().isoformat()
+        lines = []
+        for name in shadows:
+            pipeline = models[name]
+            X = _shadow_features(pipeline, job['fingerprints'][name], numbers, job['frames'])
+            shadow_prices = _predict_prices(pipeline, X)
+            for number, (served_by, price), shadow_price in zip(numbers, job['served'], shadow_prices):
+                if price is None:
+                    # The served model failed on this number
+                    continue
+                lines.append(json.dumps({
+                    'timestamp': timestamp,
+                    'phone_number': number,
+                    'model': served_by,
+                    'model_version': models[served_by].model_version,
+                    'predicted_price': float(price),
+                    'shadow_model': name,
+                    'shadow_version': pipeline.model_version,
+                    'shadow_price': float(shadow_price)
+                }))
+                self._compare(name, price, shadow_price)
+
+        if lines:
+            os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+        self.n_jobs += 1
+
+    def _compare(self, name, price, shadow_price):
+        count, total = self._compared.get(name, (0, 0.0))
+        self._compared[name] = (count + 1, total + abs(np.log1p(shadow_price) - np.log1p(price)))
+
+    def stats(self):
+        """Queue counters and mean |log price difference| per shadow model"""
+        return {
+            'log_path': self.log_path,
+            'jobs': self.n_jobs,
+            'queued': self._queue.qsize(),
+            'dropped': self.n_dropped,
+            'errors': self.n_errors,
+            'models': {
+                name: {'compared': count, 'mean_abs_log_diff': total / count}
+                for name, (count, total) in self._compared.items()
+            }
+        }
+
+def _shadow_features(pipeline, fingerprint, numbers, frames):
+    """
+    Feature frame of a shadow model for the job numbers
+
+    Rows and columns already computed on the serving path (same market
+    statistics) are reused; only the rest is computed here.
+    """
+    names = pipeline.feature_names
+    parts = []
+    n_framed = 0
+    for frame_fingerprint, frame_numbers, frame in frames:
+        if frame_fingerprint == fingerprint:
+            missing = [name for name in names if name not in frame.columns]
+            if missing:
+                frame = pd.concat([frame, pipeline._create_features(frame_numbers, missing)], axis=1)
+            parts.append(frame[names])
+        else:
+            parts.append(pipeline._create_features(frame_numbers, names))
+        n_framed += len(frame_numbers)
+    if n_framed < len(numbers):
+        parts.append(pipeline._create_features(numbers[n_framed:], names))
+    return parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
+
+# ====================================================================================
+# MODEL REGISTRY
+# ====================================================================================
+
+class ModelRegistry:
+    """
+    หลายโมเดลหลัง interface เดียวกับ PredictionPipeline (ผลลัพธ์มี 'model' = ชื่อโมเดลที่ตอบ)
+
+    Routing: an explicit model name (X-Model header) wins; otherwise each number
+    is assigned by a hash of the number against the serving weights, so the same
+    number always gets the same model (and its cached result). Shadow models
+    receive no traffic; they are evaluated on every successful prediction.
+
+    Parameters:
+    -----------
+    shadow : ShadowEvaluator, optional
+        Background evaluator shared by registry copies (created if None)
+    """
+
+    def __init__(self, shadow=None):
+        self.models = {}
+        self.weights = {}
+        self.shadows = []
+        self.fingerprints = {}
+        self.shadow = shadow or ShadowEvaluator()
+
+    # ============ Models ============
+
+    def add(self, name, pipeline, weight=None, shadow=False):
+        """Host a loaded pipeline (weight None keeps a weight set earlier, else 0)"""
+        if not pipeline.feature_names:
+            raise ValueError(f"Model '{name}' has no feature_names; the registry needs them to share features")
+        self.models[name] = pipeline
+        if weight is not None or name not in self.weights:
+            self.weights[name] = float(weight or 0.0)
+        if shadow and name not in self.shadows:
+            self.shadows.append(name)
+        self.fingerprints[name] = market_fingerprint(pipeline.market_stats)
+        return self
+
+    def with_model(self, name, pipeline):
+        """
+        Copy of the registry with one model replaced (used for reloads)
+
+        Requests already running keep the previous registry and pipeline.
+        """
+        registry = ModelRegistry(self.shadow)
+        registry.models = dict(self.models)
+        registry.weights = dict(self.weights)
+        registry.shadows = list(self.shadows)
+        registry.fingerprints = dict(self.fingerprints)
+        return registry.add(name, pipeline)
+
+    def route(self, cleaned_number, model=None):
+        """
+        Name of the model serving a number
+
+        Raises:
+        -------
+        UnknownModelError
+            model is not hosted by this registry
+        """
+        if model is not None:
+            if model not in self.models:
+                raise UnknownModelError(model)
+            return model
+        serving = [(name, self.weights[name]) for name in self.models
+                   if name not in self.shadows and self.weights[name] > 0]
+        total = sum(weight for _, weight in serving)
+        if total <= 0:
+            return DEFAULT_MODEL if DEFAULT_MODEL in self.models else next(iter(self.models))
+        point = zlib.crc32(str(cleaned_number).encode()) / 2 ** 32 * total
+        for name, weight in serving:
+            point -= weight
+            if point < 0:
+                return name
+        return serving[-1][0]
+
+    @property
+    def default(self):
+        return self.models.get(DEFAULT_MODEL) or next(iter(self.models.values()))
+
+    # ============ PredictionPipeline interface ============
+
+    @property
+    def model(self):
+        return self.default.model
+
+    @property
+    def feature_names(self):
+        return self.default.feature_names
+
+    @property
+    def cache(self):
+        return self.default.cache
+
+    @property
+    def model_info(self):
+        return dict(self.default.model_info, models=self.stats()['models'])
+
+    @property
+    def model_version(self):
+        return ', '.join(f"{name}={pipeline.model_version}" for name, pipeline in self.models.items())
+
+    def validate_phone_number(self, phone_number):
+        return self.default.validate_phone_number(phone_number)
+
+    def predict_single(self, phone_number, model=None):
+        """predict_single of the routed model (shadow models evaluated in the background)"""
+        is_valid, cleaned_number = self.validate_phone_number(phone_number)
+        name = self.route(cleaned_number if is_valid else phone_number, model)
+        result = self.models[name].predict_single(phone_number)
+        if result['success']:
+            self._submit_shadow([result['phone_number']], [(name, result['predicted_price'])], [])
+        return dict(result, model=name)
+
+    def predict_batch(self, phone_numbers, cache_results=True, model=None):
+        """
+        predict_batch across the hosted models
+
+        Uncached numbers of all routed models share one feature pass (the union
+        of their feature names) per set of market statistics.
+        """
+        routes = {}
+
+        def route(cleaned_number):
+            if cleaned_number not in routes:
+                routes[cleaned_number] = self.route(cleaned_number, model)
+            return self.models[routes[cleaned_number]]
+
+        results, pending = self.default._validate_batch(phone_numbers, 'predict', route=route)
+
+        # Group uncached numbers by model, then models by market statistics
+        groups = {}
+        for cleaned_number in pending:
+            name = routes[cleaned_number]
+            groups.setdefault(self.fingerprints[name], {}).setdefault(name, []).append(cleaned_number)
+
+        frames = []
+        for fingerprint, by_model in groups.items():
+            numbers = [number for names in by_model.values() for number in names]
+            feature_names = list(dict.fromkeys(
+                feature for name in by_model for feature in self.models[name].feature_names
+            ))
+            try:
+                started = time.perf_counter()
+                frame = self.models[next(iter(by_model))]._create_features(numbers, feature_names)
+                observe_stage('features', started)
+            except Exception as e:
+                self._fail(results, pending, numbers, e)
+                continue
+            frames.append((fingerprint, numbers, frame))
+
+            offset = 0
+            for name, model_numbers in by_model.items():
+                rows = frame.iloc[offset:offset + len(model_numbers)]
+                offset += len(model_numbers)
+                self._predict_rows(name, model_numbers, rows, results, pending, cache_results)
+
+        # Shadow comparison: freshly computed numbers first (their frames are reused), then cached ones
+        served = {}
+        for result in results:
+            if result['success']:
+                served.setdefault(result['phone_number'], result['predicted_price'])
+        numbers = [number for _, frame_numbers, _ in frames for number in frame_numbers]
+        numbers += [number for number in served if number not in pending]
+        self._submit_shadow(numbers, [(routes[number], served.get(number)) for number in numbers], frames)
+
+        results = [dict(result, model=routes[result['phone_number']]) if result['success'] else result
+                   for result in results]
+        return PredictionPipeline._batch_summary(results)
+
+    def _predict_rows(self, name, numbers, rows, results, pending, cache_results):
+        """Predict one model's rows of the shared feature frame and fill results"""
+        pipeline = self.models[name]
+        try:
+            X = rows[pipeline.feature_names].reset_index(drop=True)
+            predicted_prices = np.expm1(pipeline._predict_frame(X))
+            started = time.perf_counter()
+            summaries = pipeline._summary_features(X)
+            for cleaned_number, predicted_price, features in zip(numbers, predicted_prices, summaries):
+                result = pipeline._build_result(cleaned_number, predicted_price, features)
+                if cache_results:
+                    pipeline._cache_put('predict', cleaned_number, result)
+                for i in pending[cleaned_number]:
+                    results[i] = result
+            observe_stage('serialization', started)
+        except Exception as e:
+            self._fail(results, pending, numbers, e)
+
+    @staticmethod
+    def _fail(results, pending, numbers, error):
+        count_error('prediction_error', len(numbers))
+        for cleaned_number in numbers:
+            for i in pending[cleaned_number]:
+                results[i] = {
+                    'success': False,
+                    'error': f'Prediction error: {str(error)}',
+                    'phone_number': cleaned_number
+                }
+
+    def explain_prediction(self, phone_number, model=None):
+        """explain_prediction of the routed model"""
+        is_valid, cleaned_number = self.validate_phone_number(phone_number)
+        name = self.route(cleaned_number if is_valid else phone_number, model)
+        return dict(self.models[name].explain_prediction(phone_number), model=name)
+
+    def explain_batch(self, phone_numbers, cache_results=True, model=None):
+        """explain_batch per routed model, results in input order"""
+        positions = {}
+        for i, phone in enumerate(phone_numbers):
+            is_valid, cleaned_number = self.validate_phone_number(phone)
+            positions.setdefault(self.route(cleaned_number if is_valid else phone, model), []).append(i)
+
+        results = [None] * len(phone_numbers)
+        for name, indices in positions.items():
+            summary = self.models[name].explain_batch([phone_numbers[i] for i in indices], cache_results)
+            for i, result in zip(indices, summary['results']):
+                results[i] = dict(result, model=name)
+        return PredictionPipeline._batch_summary(results)
+
+    # ============ Shadow + stats ============
+
+    def _submit_shadow(self, numbers, served, frames):
+        if self.shadows and numbers:
+            self.shadow.submit(dict(self.models), list(self.shadows), {
+                'numbers': numbers,
+                'served': served,
+                'frames': frames,
+                'fingerprints': {name: self.fingerprints[name] for name in self.shadows}
+            })
+
+    def stats(self):
+        """Hosted models, routing weights and shadow evaluation counters"""
+        total = sum(weight for name, weight in self.weights.items()
+                    if name in self.models and name not in self.shadows)
+        return {
+            'models': {
+                name: {
+                    'model_name': pipeline.model_info.get('model_name'),
+                    'model_version': pipeline.model_version,
+                    'weight': self.weights[name],
+                    'traffic_share': (self.weights[name] / total
+                                      if total and name not in self.shadows else 0.0),
+                    'shadow': name in self.shadows
+                }
+                for name, pipeline in self.models.items()
+            },
+            'shadow': self.shadow.stats()
+        }
+
+# ====================================================================================
+# LOADING
+# ====================================================================================
+
+def load_registry(model_configs, model_dir=None, shadow=None):
+    """
+    โหลดโมเดลเพิ่มเติมจาก API_CONFIG['models'] (ยังไม่รวมโมเดล default)
+
+    Parameters:
+    -----------
+    model_configs : dict
+        name -> {'path': artifact, 'weight': float, 'shadow': bool}; relative paths
+        are resolved against model_dir. An entry named DEFAULT_MODEL only sets the
+        weight of the MODEL_PATH model (default 1.0).
+    model_dir : str, optional
+        Directory of the MODEL_PATH artifact
+
+    Returns:
+    --------
+    registry : ModelRegistry
+        Add the default pipeline with registry.with_model(DEFAULT_MODEL, pipeline).
+        Entries that fail to load are reported and skipped.
+    """
+    registry = ModelRegistry(shadow)
+    registry.weights[DEFAULT_MODEL] = float(model_configs.get(DEFAULT_MODEL, {}).get('weight', 1.0))
+    for name, config in model_configs.items():
+        if name == DEFAULT_MODEL:
+            continue
+        path = os.path.join(model_dir or '', config['path'])
+        try:
+            registry.add(name, prepare_pipeline(path), config.get('weight', 0.0), config.get('shadow', False))
+            print(f"✅ Registry: {name} loaded from {path}")
+        except Exception as e:
+            print(f"❌ Registry: Error loading {name} ({path}): {str(e)}")
+    return registry
@@ -0,0 +1,337 @@
+"""
+Zero-Downtime Model Reload
+Loads a model artifact in the background, checks its feature names against the
+feature engine, warms it up and only then hands it to the server, which swaps
+its pipeline reference. Requests keep using the previous model until the swap.
+
+Feature names the engine cannot produce are filled with 0 at serving time and
+reported in status(). The *_x_* / *_div_* / polynomial columns that
+training/main.py preprocessing builds from engine features are always accepted;
+a reload rejects any other unknown name the serving model did not already have
+(the previous model keeps serving), the first load accepts it.
+"""
+import os
+import re
+import asyncio
+from functools import partial
+from datetime import datetime
+
+import numpy as np
+
+from src.config import API_CONFIG
+from src.feature_registry import get_all_feature_names
+from src.compiled_model import compiled_artifact_path
+from api.prediction import PredictionPipeline
+
+# Representative numbers always included in the warmup batch
+WARMUP_NUMBERS = ['0812345678', '0888888888', '0999999999', '0856565656', '0987654321', '0899998888']
+
+class ModelValidationError(ValueError):
+    """Raised when a new model artifact cannot serve predictions"""
+
+# ====================================================================================
+# PREPARE
+# ====================================================================================
+
+def warmup_numbers(n_numbers=None, seed=0):
+    """WARMUP_NUMBERS + เบอร์สุ่ม (deterministic) รวม n_numbers เบอร์"""
+    if n_numbers is None:
+        n_numbers = API_CONFIG.get('warmup_size', 64)
+    rng = np.random.default_rng(seed)
+    numbers = list(WARMUP_NUMBERS)
+    while len(numbers) < n_numbers:
+        numbers.append('0' + ''.join(map(str, rng.integers(0, 10, 9))))
+    return numbers[:max(1, n_numbers)]
+
+# create_interaction_features: '<a>_x_<b>', '<a>_div_<b>'
+INTERACTION_SEPARATORS = ('_x_', '_div_')
+# create_polynomial_features (PolynomialFeatures.get_feature_names_out): 'a^2', 'a b'
+POLYNOMIAL_POWER = re.compile(r'\^\d+$')
+
+def unknown_feature_names(pipeline):
+    """feature_names ของโมเดลที่ feature engine สร้างไม่ได้ (serving ใส่ค่า 0)"""
+    return sorted(set(pipeline.feature_names or []) - set(get_all_feature_names()))
+
+def is_training_column(name, known):
+    """
+    True ถ้า name เป็น feature ที่ training preprocessing สร้างจาก feature ใน known
+    (interaction / polynomial columns of training/main.py run_preprocessing_pipeline)
+    """
+    if name in known:
+        return True
+    for separator in INTERACTION_SEPARATORS:
+        start = name.find(separator)
+        while start > 0:
+            if (is_training_column(name[:start], known)
+                    and is_training_column(name[start + len(separator):], known)):
+                return True
+            start = name.find(separator, start + 1)
+    factors = [POLYNOMIAL_POWER.sub('', factor) for factor in name.split(' ')]
+    return factors != [name] and all(factor in known for factor in factors)
+
+def validate_pipeline(pipeline, strict=True, tolerated=()):
+    """
+    ตรวจว่าโมเดลใหม่ใช้งานได้กับ feature engine ปัจจุบัน
+
+    Parameters:
+    -----------
+    pipeline : PredictionPipeline
+        Loaded pipeline
+    strict : bool
+        Reject unknown feature names that are neither training columns
+        (is_training_column) nor tolerated (False = only warn)
+    tolerated : iterable
+        Unknown names the serving model already has
+
+    Returns:
+    --------
+    unknown : list
+        Feature names unknown to the feature engine
+
+    Raises:
+    -------
+    ModelValidationError
+        No model, or (strict) new feature names no training step produces
+    """
+    if pipeline.model is None:
+        raise ModelValidationError("Artifact contains no model")
+    unknown = unknown_feature_names(pipeline)
+    if strict and unknown:
+        known, tolerated = set(get_all_feature_names()), set(tolerated)
+        rejected = [name for name in unknown if name not in tolerated and not is_training_column(name, known)]
+        if rejected:
+            preview = ', '.join(rejected[:5]) + (' ...' if len(rejected) > 5 else '')
+            raise ModelValidationError(f"{len(rejected)} feature names unknown to the feature engine: {preview}")
+    if unknown:
+        preview = ', '.join(unknown[:5]) + (' ...' if len(unknown) > 5 else '')
+        print(f"⚠️  {len(unknown)} feature names unknown to the feature engine: {preview} (filled with 0)")
+    return unknown
+
+def warmup_pipeline(pipeline, numbers=None):
+    """
+    รัน batch / single / explain / explain_batch หนึ่งรอบเพื่อให้ lazy initialization และ caches พร้อม
+
+    Raises:
+    -------
+    ModelValidationError
+        Any warmup prediction failed or is not finite
+    """
+    numbers = warmup_numbers() if numbers is None else numbers
+
+    # Warmup numbers should neither fill the cache nor count as cache hits/misses
+    cache, pipeline.cache = pipeline.cache, None
+    try:
+        summary = pipeline.predict_batch(numbers)
+        results = summary['results'] + [pipeline.predict_single(number) for number in numbers[:8]]
+        results.append(pipeline.explain_prediction(numbers[0]))
+        results += pipeline.explain_batch(numbers[:8])['results']
+    finally:
+        pipeline.cache = cache
+    for result in results:
+        if not result['success']:
+            raise ModelValidationError(f"Warmup prediction failed: {result['error']}")
+        if not np.isfinite(result['predicted_price']):
+            raise ModelValidationError(f"Warmup prediction is not finite for {result['phone_number']}")
+
+def resolve_reload_path(current_model_path, model_path):
+    """
+    Absolute path of a requested artifact, relative to the current model's directory
+
+    Raises:
+    -------
+    ValueError
+        The artifact is outside that directory (artifacts are pickles)
+    """
+    model_dir = os.path.dirname(os.path.abspath(current_model_path))
+    model_path = os.path.abspath(os.path.join(model_dir, model_path))
+    if os.path.dirname(model_path) != model_dir:
+        raise ValueError("model_path must be in the model directory")
+    return model_path
+
+def artifact_mtime(model_path):
+    """Latest mtime of an artifact and its compiled export (None = neither exists)"""
+    # A compiled export written after the artifact also counts as a change
+    mtimes = []
+    for path in (model_path, compiled_artifact_path(model_path)):
+        try:
+            mtimes.append(os.path.getmtime(path))
+        except OSError:
+            pass
+    return max(mtimes) if mtimes else None
+
+def prepare_pipeline(model_path, numbers=None, strict=True, tolerated=()):
+    """โหลด + ตรวจสอบ + warmup โมเดลใหม่ (ยังไม่ swap); strict, tolerated: see validate_pipeline"""
+    pipeline = PredictionPipeline(model_path=model_path)
+    validate_pipeline(pipeline, strict, tolerated)
+    warmup_pipeline(pipeline, numbers)
+    return pipeline
+
+# ====================================================================================
+# RELOADER
+# ====================================================================================
+
+class ModelReloader:
+    """
+    จัดการการโหลดโมเดลใหม่แบบไม่หยุดบริการ
+
+    Parameters:
+    -----------
+    model_path : str
+        Artifact path (also the file watched for changes)
+    on_swap : callable
+        on_swap(pipeline, model_path), awaited if it is a coroutine function;
+        installs a prepared pipeline
+    watch_interval : float, optional
+        Seconds between model file checks (None = API_CONFIG['model_watch_interval'],
+        0 = no watcher)
+    """
+
+    def __init__(self, model_path, on_swap, watch_interval=None):
+        self.model_path = model_path
+        self.on_swap = on_swap
+        if watch_interval is None:
+            watch_interval = API_CONFIG.get('model_watch_interval', 0)
+        self.watch_interval = watch_interval or 0
+        self.ready = False
+        self.unknown_features = []
+        self.n_reloads = 0
+        self.last_reload = None
+        self._lock = asyncio.Lock()
+        self._watcher = None
+        self._loaded_mtime = None
+
+    @property
+    def reloading(self):
+        return self._lock.locked()
+
+    async def reload(self, model_path=None):
+        """
+        โหลดโมเดลใน background thread แล้ว swap เมื่อพร้อม
+
+        The previous model keeps serving if loading, validation or warmup fails.
+        Once a model is serving, a reload fails on unknown feature names that
+        model did not have and no training step produces; the first load
+        accepts them (see unknown_features).
+
+        Returns:
+        --------
+        status : dict
+            Outcome of this reload (also kept as last_reload)
+        """
+        model_path = model_path or self.model_path
+        async with self._lock:
+            started = datetime.now()
+            mtime = artifact_mtime(model_path)
+            loop = asyncio.get_running_loop()
+            try:
+                # Nothing to fall back on before the first load: serve it and report the names
+                prepare = partial(prepare_pipeline, model_path, strict=self.ready, tolerated=self.unknown_features)
+                pipeline = await loop.run_in_executor(None, prepare)
+                await self._swap(pipeline, model_path)
+            except Exception as e:
+                return self._failed(model_path, e, started)
+            return self._succeeded(pipeline, model_path, mtime, started)
+
+    async def adopt(self, pipeline, model_path=None, mtime=None):
+        """
+        ติดตั้ง pipeline ที่โหลด + warmup ไว้แล้ว (เช่น โหลดใน pre-fork parent ก่อน fork)
+
+        Parameters:
+        -----------
+        pipeline : PredictionPipeline
+            Prepared pipeline (see prepare_pipeline)
+        model_path : str, optional
+            Artifact it was loaded from (default: self.model_path)
+        mtime : float, optional
+            artifact_mtime() when it was loaded, so the watcher still picks up
+            an artifact replaced since then (None = now)
+
+        Returns:
+        --------
+        status : dict
+            Same as reload()
+        """
+        model_path = model_path or self.model_path
+        async with self._lock:
+            started = datetime.now()
+            if mtime is None:
+                mtime = artifact_mtime(model_path)
+            try:
+                await self._swap(pipeline, model_path)
+            except Exception as e:
+                return self._failed(model_path, e, started)
+            return self._succeeded(pipeline, model_path, mtime, started)
+
+    async def _swap(self, pipeline, model_path):
+        swapped = self.on_swap(pipeline, model_path)
+        if asyncio.iscoroutine(swapped):
+            await swapped
+
+    def _failed(self, model_path, error, started):
+        print(f"❌ Model reload failed ({model_path}): {str(error)}")
+        self.last_reload = {
+            'success': False,
+            'model_path': model_path,
+            'error': str(error),
+            'timestamp': started.isoformat()
+        }
+        return self.last_reload
+
+    def _succeeded(self, pipeline, model_path, mtime, started):
+        self.model_path = model_path
+        self._loaded_mtime = mtime
+        self.ready = True
+        self.unknown_features = unknown_feature_names(pipeline)
+        self.n_reloads += 1
+        self.last_reload = {
+            'success': True,
+            'model_path': model_path,
+            'model_version': pipeline.model_version,
+            'duration_seconds': (datetime.now() - started).total_seconds(),
+            'timestamp': started.isoformat()
+        }
+        print(f"✅ Model ready: {pipeline.model_version}")
+        return self.last_reload
+
+    # ============ File watcher ============
+
+    def start_watcher(self):
+        """ตรวจ mtime ของไฟล์โมเดลทุก watch_interval วินาที (ต้องเรียกภายใน event loop)"""
+        if self.watch_interval > 0 and self._watcher is None:
+            self._watcher = asyncio.get_running_loop().create_task(self._watch())
+
+    async def stop_watcher(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            mtime = artifact_mtime(self.model_path)
+            if mtime is None or mtime == self._loaded_mtime or self.reloading:
+                continue
+            # Wait for a stable file so a half-written artifact is not loaded
+            await asyncio.sleep(min(self.watch_interval, 1.0))
+            if artifact_mtime(self.model_path) != mtime:
+                continue
+            print(f"🔄 Model file changed: {self.model_path}")
+            status = await self.reload()
+            if not status['success']:
+                # Do not retry the same broken file on every tick
+                self._loaded_mtime = mtime
+
+    def status(self):
+        """Readiness details for health endpoints"""
+        return {
+            'ready': self.ready,
+            'reloading': self.reloading,
+            'model_path': self.model_path,
+            'unknown_features': self.unknown_features,
+            'n_reloads': self.n_reloads,
+            'last_reload': self.last_reload
+        }
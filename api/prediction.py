@@ -8,6 +8,9 @@ import numpy as np
 import pandas as pd
 import joblib
 import json
+import time
+import copy
+import itertools
 from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
@@ -17,6 +20,17 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import features module
 from src.features import create_masterpiece_features
+from src.config import API_CONFIG
+from src.data_handler import get_artifact_market_stats
+from src.feature_fastpath import SingleNumberFeatures
+from src.fast_inference import compile_preprocessor, array_predictor, array_contributions
+from src.compiled_model import resolve_serving_artifact
+from api.prediction_cache import PredictionCache
+from api.metrics import observe_stage, observe_batch, count_error
+
+# Process-wide load sequence: every load_model (on any pipeline instance, e.g. the
+# fresh pipeline a hot reload builds) gets a distinct model_version
+_LOAD_SEQUENCE = itertools.count(1)
 
 # ====================================================================================
 # PREDICTION PIPELINE CLASS
@@ -27,6 +41,16 @@ class PredictionPipeline:
     Production-ready prediction pipeline for phone number price prediction
     """
     
+    # Feature values reported with every prediction
+    SUMMARY_FEATURES = ['ending_score', 'power_sum', 'special_lucky_score', 'rarity_score']
+    
+    # Feature values reported with every explanation (grouped as shown in the UI)
+    EXPLAIN_FEATURES = {
+        'ความมงคล': ['ending_score', 'special_lucky_score', 'power_sum'],
+        'ความหายาก': ['rarity_score', 'unique_digits', 'complexity_score'],
+        'รูปแบบพิเศษ': ['sequence_score', 'mirror_pattern', 'wave_pattern']
+    }
+    
     def __init__(self, model_path=None, config_path=None):
         """
         Initialize prediction pipeline
@@ -41,7 +65,19 @@ class PredictionPipeline:
         self.model = None
         self.feature_names = None
         self.preprocessor = None
+        self.market_stats = None
         self.model_info = {}
+        self.fast_features = None
+        self.array_contributions = None
+        self.model_version = None
+        
+        # Prediction cache (API_CONFIG cache_predictions / cache_ttl / cache_max_entries)
+        self.cache = None
+        if API_CONFIG.get('cache_predictions', False):
+            self.cache = PredictionCache(
+                max_entries=API_CONFIG.get('cache_max_entries', 100000),
+                ttl=API_CONFIG.get('cache_ttl', 3600)
+            )
         
         # Load model if path provided
         if model_path:
@@ -54,33 +90,75 @@ class PredictionPipeline:
     def load_model(self, model_path):
         """Load model from file"""
         try:
+            # Prefer the NumPy-only compiled export (no training framework imports)
+            if API_CONFIG.get('use_compiled_model', True):
+                model_path = resolve_serving_artifact(model_path)
             print(f"📦 Loading model from: {model_path}")
             
-            # Load model data
-            model_data = joblib.load(model_path)
+            # Load model data (numpy arrays such as market tables are memory-mapped)
+            model_data = joblib.load(model_path, mmap_mode='r')
+            self.market_stats = get_artifact_market_stats(model_data)
             
             # Extract components based on structure
             if isinstance(model_data, dict):
                 # New format with metadata
                 self.model = model_data.get('model')
                 self.feature_names = model_data.get('feature_names', [])
+                self.preprocessor = model_data.get('preprocessor')
                 self.model_info = {
                     'model_name': model_data.get('model_name', 'Unknown'),
                     'r2_score': model_data.get('r2_score', 0),
-                    'timestamp': model_data.get('timestamp', 'Unknown')
+                    'timestamp': model_data.get('timestamp', 'Unknown'),
+                    'compiled': 'compiled_from' in model_data
                 }
             else:
                 # Old format - just the model
                 self.model = model_data
                 self.feature_names = []
+                self.preprocessor = None
                 self.model_info = {'model_name': 'Legacy Model'}
             
+            self._compile_fast_path()
+            
+            # New model version → cached predictions of the previous model are invalid
+            self.model_version = f"{self.model_info.get('model_name')}@{self.model_info.get('timestamp', 'Unknown')}#{next(_LOAD_SEQUENCE)}"
+            if self.cache is not None:
+                self.cache.clear()
+            
             print(f"✅ Model loaded successfully: {self.model_info.get('model_name')}")
+            if self.market_stats is None:
+                print("⚠️ Model has no market statistics - using default market features")
             
         except Exception as e:
             print(f"❌ Error loading model: {str(e)}")
             raise
     
+    def _compile_fast_path(self):
+        """
+        Single-number path: features straight into a float32 buffer, array
+        preprocessing and native array predict (needs the model's feature_names)
+        """
+        self.fast_features = None
+        self.array_contributions = None
+        if not self.feature_names:
+            return
+        
+        self.fast_features = SingleNumberFeatures(self.feature_names, self.market_stats)
+        self.array_transform = compile_preprocessor(self.preprocessor, self.feature_names)
+        self.array_predict = array_predictor(self.model)
+        self._summary_positions = [
+            (name, self.feature_names.index(name) if name in self.feature_names else None)
+            for name in self.SUMMARY_FEATURES
+        ]
+        
+        # Explanations: model features first, then the reported features the model does not use
+        explain_names = [name for names in self.EXPLAIN_FEATURES.values() for name in names]
+        self.explain_feature_names = list(self.feature_names) + [
+            name for name in dict.fromkeys(explain_names) if name not in self.feature_names
+        ]
+        self.explain_features = SingleNumberFeatures(self.explain_feature_names, self.market_stats)
+        self.array_contributions = array_contributions(self.model)
+    
     def load_config(self, config_path):
         """Load configuration from file"""
         try:
@@ -94,7 +172,8 @@ class PredictionPipeline:
             print(f"❌ Error loading config: {str(e)}")
             self.config = {}
     
-    def validate_phone_number(self, phone_number):
+    @staticmethod
+    def validate_phone_number(phone_number):
         """
         Validate phone number format
         
@@ -130,6 +209,29 @@ class PredictionPipeline:
         
         return is_valid, phone_str if is_valid else None
     
+    def _cache_get(self, kind, cleaned_number):
+        """
+        Cached result (fresh timestamp) or None
+        
+        Returns a deep copy: callers may mutate the response (including the
+        nested price_range / features / model_info dicts) without touching the
+        cached entry.
+        """
+        if self.cache is None:
+            return None
+        result = self.cache.get((kind, self.model_version, cleaned_number))
+        if result is None:
+            return None
+        result = copy.deepcopy(result)
+        result['timestamp'] = datetime.now().isoformat()
+        return result
+    
+    def _cache_put(self, kind, cleaned_number, result):
+        """Cache successful results only (a deep copy, so the returned result stays the caller's)"""
+        if self.cache is not None and result.get('success'):
+            self.cache.put((kind, self.model_version, cleaned_number), copy.deepcopy(result))
+        return result
+    
     def predict_single(self, phone_number):
         """
         Predict price for a single phone number
@@ -145,114 +247,252 @@ class PredictionPipeline:
             Prediction result with metadata
         """
         # Validate phone number
+        started = time.perf_counter()
         is_valid, cleaned_number = self.validate_phone_number(phone_number)
+        observe_stage('validation', started)
         
         if not is_valid:
+            count_error('invalid_number')
             return {
                 'success': False,
                 'error': 'Invalid phone number format',
                 'phone_number': phone_number
             }
         
+        cached = self._cache_get('predict', cleaned_number)
+        if cached is not None:
+            return cached
+        
         try:
-            # Create dataframe
-            df = pd.DataFrame([{
-                'phone_number': cleaned_number,
-                'price': 0  # Dummy price for feature creation
-            }])
-            
-            # Create features
-            features_df = create_masterpiece_features(df)
-            
-            # Select features if feature names are available
-            if self.feature_names:
-                # Ensure all required features exist
-                missing_features = set(self.feature_names) - set(features_df.columns)
-                if missing_features:
-                    # Add missing features with default values
-                    for feat in missing_features:
-                        features_df[feat] = 0
-                
-                # Select features in correct order
-                features_df = features_df[self.feature_names]
+            if self.fast_features is not None:
+                return self._cache_put('predict', cleaned_number, self._predict_single_fast(cleaned_number))
             
-            # Make prediction (log scale)
-            prediction_log = self.model.predict(features_df)[0]
+            started = time.perf_counter()
+            features_df = self._create_features([cleaned_number])
+            observe_stage('features', started)
             
-            # Convert to price
-            predicted_price = np.expm1(prediction_log)
+            # Make prediction (log scale) and convert to price
+            predicted_price = np.expm1(self._predict_frame(features_df)[0])
             
-            # Get confidence interval (if model supports it)
-            confidence_low = predicted_price * 0.8  # Default 80%
-            confidence_high = predicted_price * 1.2  # Default 120%
-            
-            # Determine price tier
-            if predicted_price >= 100000:
-                tier = 'Ultra Premium'
-            elif predicted_price >= 50000:
-                tier = 'Premium'
-            elif predicted_price >= 20000:
-                tier = 'High'
-            elif predicted_price >= 5000:
-                tier = 'Medium'
-            else:
-                tier = 'Standard'
-            
-            # Create result
-            result = {
-                'success': True,
-                'phone_number': cleaned_number,
-                'predicted_price': float(predicted_price),
-                'price_range': {
-                    'low': float(confidence_low),
-                    'high': float(confidence_high)
-                },
-                'tier': tier,
-                'model_info': self.model_info,
-                'features': {
-                    'ending_score': float(features_df.get('ending_score', [0])[0]),
-                    'power_sum': float(features_df.get('power_sum', [0])[0]),
-                    'special_lucky_score': float(features_df.get('special_lucky_score', [0])[0]),
-                    'rarity_score': float(features_df.get('rarity_score', [0])[0])
-                },
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            return result
+            started = time.perf_counter()
+            result = self._build_result(cleaned_number, predicted_price, self._summary_features(features_df)[0])
+            observe_stage('serialization', started)
+            return self._cache_put('predict', cleaned_number, result)
             
         except Exception as e:
+            count_error('prediction_error')
             return {
                 'success': False,
                 'error': f'Prediction error: {str(e)}',
                 'phone_number': cleaned_number
             }
     
-    def predict_batch(self, phone_numbers):
+    def _predict_single_fast(self, cleaned_number):
+        """predict_single without pandas (same values as the DataFrame path)"""
+        started = time.perf_counter()
+        X = self.fast_features.vector(cleaned_number)
+        features = {
+            name: float(X[0, position]) if position is not None else 0.0
+            for name, position in self._summary_positions
+        }
+        started = observe_stage('features', started)
+        if self.array_transform is not None:
+            X = self.array_transform(X)
+            started = observe_stage('preprocessing', started)
+        
+        # Make prediction (log scale) and convert to price
+        predicted_price = np.expm1(self.array_predict(X)[0])
+        started = observe_stage('predict', started)
+        
+        result = self._build_result(cleaned_number, predicted_price, features)
+        observe_stage('serialization', started)
+        return result
+    
+    def _predict_frame(self, features_df):
+        """Apply the fitted preprocessor (if any) and predict log prices"""
+        started = time.perf_counter()
+        if self.preprocessor is not None:
+            features_df = self.preprocessor.transform(features_df)
+            started = observe_stage('preprocessing', started)
+        predictions = np.asarray(self.model.predict(features_df))
+        observe_stage('predict', started)
+        return predictions
+    
+    def _create_features(self, cleaned_numbers, feature_names=None):
+        """
+        สร้าง feature matrix ของเบอร์ที่ผ่านการตรวจสอบแล้ว (หนึ่ง feature pass ต่อ batch)
+        
+        feature_names defaults to the model's features
+        """
+        feature_names = feature_names or self.feature_names
+        df = pd.DataFrame({
+            'phone_number': cleaned_numbers,
+            'price': 0  # Dummy price for feature creation
+        })
+        
+        # Create features (minimal plan when feature names are known)
+        features_df = create_masterpiece_features(
+            df, self.market_stats, feature_names=feature_names or None, verbose=False
+        )
+        
+        # Select features if feature names are available
+        if feature_names:
+            # Ensure all required features exist
+            missing_features = set(feature_names) - set(features_df.columns)
+            if missing_features:
+                # Add missing features with default values
+                for feat in missing_features:
+                    features_df[feat] = 0
+            
+            # Select features in correct order
+            features_df = features_df[feature_names]
+        
+        return features_df
+    
+    def _summary_features(self, features_df):
+        """Per-row dict of SUMMARY_FEATURES (0 when the model does not use a feature)"""
+        columns = {
+            name: (features_df[name].to_numpy(dtype=float) if name in features_df.columns
+                   else np.zeros(len(features_df)))
+            for name in self.SUMMARY_FEATURES
+        }
+        return [
+            {name: float(values[i]) for name, values in columns.items()}
+            for i in range(len(features_df))
+        ]
+    
+    @staticmethod
+    def _price_tier(predicted_price):
+        """Determine price tier"""
+        if predicted_price >= 100000:
+            return 'Ultra Premium'
+        elif predicted_price >= 50000:
+            return 'Premium'
+        elif predicted_price >= 20000:
+            return 'High'
+        elif predicted_price >= 5000:
+            return 'Medium'
+        return 'Standard'
+    
+    def _build_result(self, cleaned_number, predicted_price, features):
+        """Prediction result for one number"""
+        # Get confidence interval (if model supports it)
+        confidence_low = predicted_price * 0.8  # Default 80%
+        confidence_high = predicted_price * 1.2  # Default 120%
+        
+        return {
+            'success': True,
+            'phone_number': cleaned_number,
+            'predicted_price': float(predicted_price),
+            'price_range': {
+                'low': float(confidence_low),
+                'high': float(confidence_high)
+            },
+            'tier': self._price_tier(predicted_price),
+            'model_info': dict(self.model_info),
+            'features': features,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def predict_batch(self, phone_numbers, cache_results=True):
         """
         Predict prices for multiple phone numbers
         
+        Cached numbers are served from the prediction cache; the remaining valid
+        numbers share one feature pass and one model.predict call. Invalid numbers
+        keep their individual error entries.
+        
         Parameters:
         -----------
         phone_numbers : list
             List of phone numbers
+        cache_results : bool
+            Store new predictions in the cache (bulk jobs pass False so large
+            catalogs do not evict frequently requested numbers)
         
         Returns:
         --------
         results : list
             List of prediction results
         """
-        results = []
+        results, pending = self._validate_batch(phone_numbers, 'predict')
+        
+        if pending:
+            # One prediction per distinct uncached number
+            cleaned_numbers = list(pending)
+            try:
+                started = time.perf_counter()
+                features_df = self._create_features(cleaned_numbers)
+                observe_stage('features', started)
+                predicted_prices = np.expm1(self._predict_frame(features_df))
+                started = time.perf_counter()
+                summaries = self._summary_features(features_df)
+                for cleaned_number, predicted_price, features in zip(cleaned_numbers, predicted_prices, summaries):
+                    result = self._build_result(cleaned_number, predicted_price, features)
+                    if cache_results:
+                        self._cache_put('predict', cleaned_number, result)
+                    for i in pending[cleaned_number]:
+                        results[i] = result
+                observe_stage('serialization', started)
+            except Exception as e:
+                count_error('prediction_error', len(pending))
+                for cleaned_number, positions in pending.items():
+                    for i in positions:
+                        results[i] = {
+                            'success': False,
+                            'error': f'Prediction error: {str(e)}',
+                            'phone_number': cleaned_number
+                        }
+        
+        return self._batch_summary(results)
+    
+    def _validate_batch(self, phone_numbers, kind, route=None):
+        """
+        Validate a batch and look up cached results
         
-        # Process each phone number
-        for phone in phone_numbers:
-            result = self.predict_single(phone)
-            results.append(result)
+        route(cleaned_number) returns the pipeline whose cache serves that number
+        (default: this pipeline; see api.model_registry)
         
-        # Summary statistics
+        Returns:
+        --------
+        results : list
+            Cached results and invalid-number errors (None = still to compute)
+        pending : dict
+            Distinct uncached cleaned number -> positions in phone_numbers
+        """
+        results = [None] * len(phone_numbers)
+        pending = {}
+        n_invalid = 0
+        
+        started = time.perf_counter()
+        for i, phone in enumerate(phone_numbers):
+            is_valid, cleaned_number = self.validate_phone_number(phone)
+            if is_valid:
+                if cleaned_number not in pending:
+                    cached = (route(cleaned_number) if route else self)._cache_get(kind, cleaned_number)
+                    if cached is not None:
+                        results[i] = cached
+                        continue
+                pending.setdefault(cleaned_number, []).append(i)
+            else:
+                n_invalid += 1
+                results[i] = {
+                    'success': False,
+                    'error': 'Invalid phone number format',
+                    'phone_number': phone
+                }
+        observe_stage('validation', started)
+        observe_batch(len(phone_numbers), len(pending))
+        count_error('invalid_number', n_invalid)
+        return results, pending
+    
+    @staticmethod
+    def _batch_summary(results):
+        """Totals and price statistics of a batch"""
         successful = [r for r in results if r['success']]
         
         summary = {
-            'total': len(phone_numbers),
+            'total': len(results),
             'successful': len(successful),
             'failed': len(results) - len(successful),
             'results': results
@@ -273,6 +513,9 @@ class PredictionPipeline:
         """
         Explain prediction for a phone number
         
+        One feature pass serves both the prediction and the explanation (see
+        explain_batch).
+        
         Parameters:
         -----------
         phone_number : str
@@ -283,22 +526,117 @@ class PredictionPipeline:
         explanation : dict
             Detailed explanation of prediction
         """
-        # First get prediction
-        prediction = self.predict_single(phone_number)
-        
-        if not prediction['success']:
-            return prediction
-        
-        # Validate and clean phone number
-        _, cleaned_number = self.validate_phone_number(phone_number)
+        return self.explain_batch([phone_number])['results'][0]
+    
+    def explain_batch(self, phone_numbers, cache_results=True):
+        """
+        Explain predictions for multiple phone numbers
         
-        # Create features
-        df = pd.DataFrame([{'phone_number': cleaned_number, 'price': 0}])
-        features_df = create_masterpiece_features(df)
+        The uncached numbers share one feature pass, one model.predict call and one
+        contribution call. The features needed for the explanation are built in the
+        same pass as the model features, and each new prediction is also cached for
+        /predict.
         
-        # Get feature values
-        feature_values = features_df.iloc[0].to_dict()
+        Parameters:
+        -----------
+        phone_numbers : list
+            List of phone numbers
+        cache_results : bool
+            Store new explanations and predictions in the cache
         
+        Returns:
+        --------
+        summary : dict
+            Same layout as predict_batch; successful results carry 'explanation'
+        """
+        results, pending = self._validate_batch(phone_numbers, 'explain')
+        
+        if pending:
+            cleaned_numbers = list(pending)
+            try:
+                explanations = self._explain_numbers(cleaned_numbers, cache_results)
+                for cleaned_number, explanation in zip(cleaned_numbers, explanations):
+                    if cache_results:
+                        self._cache_put('explain', cleaned_number, explanation)
+                    for i in pending[cleaned_number]:
+                        results[i] = explanation
+            except Exception as e:
+                count_error('prediction_error', len(pending))
+                for cleaned_number, positions in pending.items():
+                    for i in positions:
+                        results[i] = {
+                            'success': False,
+                            'error': f'Prediction error: {str(e)}',
+                            'phone_number': cleaned_number
+                        }
+        
+        return self._batch_summary(results)
+    
+    def _explain_numbers(self, cleaned_numbers, cache_results=True):
+        """Predictions + explanations of validated, uncached numbers (one feature pass)"""
+        started = time.perf_counter()
+        if self.fast_features is None:
+            # Legacy artifact without feature names: full feature frame, no contributions
+            df = pd.DataFrame({'phone_number': cleaned_numbers, 'price': 0})
+            features_df = create_masterpiece_features(df, self.market_stats, verbose=False)
+            started = observe_stage('features', started)
+            log_prices = self._predict_frame(features_df)
+            started = time.perf_counter()
+            summaries = self._summary_features(features_df)
+            records = features_df.to_dict('records')
+            contributions = None
+        else:
+            if len(cleaned_numbers) == 1:
+                X = self.explain_features.vector(cleaned_numbers[0])
+            else:
+                X = self._create_features(cleaned_numbers, self.explain_feature_names).to_numpy(dtype=np.float32)
+            started = observe_stage('features', started)
+            
+            X_model = X[:, :len(self.feature_names)]
+            if self.array_transform is not None:
+                X_model = self.array_transform(X_model)
+                started = observe_stage('preprocessing', started)
+            log_prices = np.asarray(self.array_predict(X_model), dtype=np.float64)
+            contributions = self._contributions(X_model)
+            started = observe_stage('predict', started)
+            
+            summaries = [
+                {name: float(X[i, position]) if position is not None else 0.0
+                 for name, position in self._summary_positions}
+                for i in range(len(cleaned_numbers))
+            ]
+            records = [dict(zip(self.explain_feature_names, row.tolist())) for row in X]
+        
+        explanations = []
+        for i, cleaned_number in enumerate(cleaned_numbers):
+            prediction = self._build_result(cleaned_number, np.expm1(log_prices[i]), summaries[i])
+            if cache_results:
+                self._cache_put('predict', cleaned_number, prediction)
+            explanation = self._explanation(cleaned_number, records[i],
+                                            None if contributions is None else contributions[i])
+            explanations.append({**prediction, 'explanation': explanation})
+        observe_stage('serialization', started)
+        return explanations
+    
+    def _contributions(self, X):
+        """
+        Per-feature contributions (log price) of preprocessed rows, or None when the
+        model has no contribution output or the preprocessor changes the columns
+        """
+        if self.array_contributions is None:
+            return None
+        try:
+            contributions = np.asarray(self.array_contributions(X), dtype=np.float64)
+        except Exception as e:
+            count_error('contributions_failed')
+            print(f"⚠️ Feature contributions failed: {str(e)}")
+            return None
+        if contributions.ndim != 2 or contributions.shape[1] != len(self.feature_names) + 1:
+            return None
+        return contributions
+    
+    def _explanation(self, cleaned_number, feature_values, contributions=None):
+        """Key drivers, grouped feature values and (if available) top feature contributions"""
         # Identify key drivers
         key_drivers = []
         
@@ -318,31 +656,27 @@ class PredictionPipeline:
         if lucky_count >= 6:
             key_drivers.append(f"เลขมงคลมาก ({lucky_count}/10) - ราคาสูง")
         
-        # Create explanation
         explanation = {
-            **prediction,
-            'explanation': {
-                'key_drivers': key_drivers,
-                'feature_analysis': {
-                    'ความมงคล': {
-                        'ending_score': feature_values.get('ending_score', 0),
-                        'special_lucky_score': feature_values.get('special_lucky_score', 0),
-                        'power_sum': feature_values.get('power_sum', 0)
-                    },
-                    'ความหายาก': {
-                        'rarity_score': feature_values.get('rarity_score', 0),
-                        'unique_digits': feature_values.get('unique_digits', 0),
-                        'complexity_score': feature_values.get('complexity_score', 0)
-                    },
-                    'รูปแบบพิเศษ': {
-                        'sequence_score': feature_values.get('sequence_score', 0),
-                        'mirror_pattern': feature_values.get('mirror_pattern', 0),
-                        'wave_pattern': feature_values.get('wave_pattern', 0)
-                    }
-                }
+            'key_drivers': key_drivers,
+            'feature_analysis': {
+                group: {name: feature_values.get(name, 0) for name in names}
+                for group, names in self.EXPLAIN_FEATURES.items()
             }
         }
         
+        # Model contributions on the log-price scale (bias + contributions = log1p(price))
+        if contributions is not None:
+            top = np.argsort(-np.abs(contributions[:-1]), kind='stable')[:API_CONFIG.get('explain_top_features', 5)]
+            explanation['base_value'] = float(contributions[-1])
+            explanation['feature_contributions'] = [
+                {
+                    'feature': self.feature_names[j],
+                    'value': float(feature_values.get(self.feature_names[j], 0)),
+                    'contribution': float(contributions[j])
+                }
+                for j in top if contributions[j] != 0
+            ]
+        
         return explanation
 
 # ====================================================================================
@@ -0,0 +1,89 @@
+"""
+In-Process Prediction Cache
+Bounded LRU cache with TTL expiry for serving results. Keys include the model
+version so entries from a previous model are never returned.
+"""
+import time
+import threading
+from collections import OrderedDict
+
+# ====================================================================================
+# PREDICTION CACHE
+# ====================================================================================
+
+class PredictionCache:
+    """
+    Thread-safe LRU + TTL cache
+
+    Parameters:
+    -----------
+    max_entries : int
+        Maximum number of entries (least recently used entries are evicted)
+    ttl : float
+        Seconds an entry stays valid (None or <= 0 = no expiry)
+    clock : callable, optional
+        Monotonic time source (for tests)
+    """
+
+    def __init__(self, max_entries=100000, ttl=3600, clock=time.monotonic):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """ค่าที่ cache ไว้ หรือ None (นับ hit/miss)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is not None and expires_at <= self._clock():
+                    del self._entries[key]
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        """เก็บค่า (แทนที่ค่าเดิม) และตัด entry ที่เก่าที่สุดเมื่อเกินขนาด"""
+        expires_at = self._clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """ล้างทุก entry (เช่น เมื่อโหลดโมเดลใหม่)"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """Counters for /health"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,185 @@
+"""
+Pre-fork Serving
+Loads and warms up the model once in a parent process, then forks web workers
+that inherit it instead of each loading their own copy. NumPy arrays of the
+artifact are memory-mapped (shared page cache) and the parent's object heap is
+frozen before forking, so the model pages stay shared between workers.
+"""
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import traceback
+
+import numpy as np
+
+# ====================================================================================
+# HELPERS
+# ====================================================================================
+
+def bind_socket(host, port, backlog=2048):
+    """Listening TCP socket created before forking; every worker accepts on it"""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def freeze_heap():
+    """
+    ย้าย object ที่มีอยู่ทั้งหมดออกจาก GC ก่อน fork
+
+    The garbage collector writes to the header of every object it scans, which
+    would copy the parent's pages into each worker; frozen objects are skipped.
+    """
+    gc.collect()
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+
+def mapped_array_bytes(obj, _seen=None):
+    """
+    ขนาดรวม (bytes) ของ np.memmap ใน object graph ของโมเดล/pipeline
+
+    Follows dicts, lists, tuples and instance attributes; arrays owned by
+    compiled extensions (e.g. sklearn Tree nodes) are not visible here.
+    """
+    seen = set() if _seen is None else _seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.memmap):
+        return obj.nbytes
+    if isinstance(obj, np.ndarray):
+        return 0
+    if isinstance(obj, dict):
+        children = obj.values()
+    elif isinstance(obj, (list, tuple)):
+        children = obj
+    elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+        children = vars(obj).values()
+    else:
+        return 0
+    return sum(mapped_array_bytes(child, seen) for child in children)
+
+# ====================================================================================
+# SUPERVISOR
+# ====================================================================================
+
+class PreforkSupervisor:
+    """
+    Fork และดูแล worker processes (restart เมื่อ worker ตาย)
+
+    Parameters:
+    -----------
+    worker_main : callable
+        worker_main(worker_id), run in each forked child; the child exits when it returns
+    workers : int
+        Number of worker processes
+    restart_delay : float
+        Seconds to wait before replacing a worker that died (avoids a crash loop)
+    graceful_timeout : float
+        Seconds workers get to finish after SIGTERM before they are killed
+    """
+
+    def __init__(self, worker_main, workers, restart_delay=1.0, graceful_timeout=30.0):
+        self.worker_main = worker_main
+        self.workers = max(1, int(workers))
+        self.restart_delay = restart_delay
+        self.graceful_timeout = graceful_timeout
+        self.children = {}
+        self.n_restarts = 0
+        self.stopping = False
+        self._deadline = None
+
+    def spawn(self, worker_id):
+        pid = os.fork()
+        if pid == 0:
+            # Child: default signal handling (the server installs its own) and never return
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                self.worker_main(worker_id)
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        self.children[pid] = worker_id
+        return pid
+
+    def stop(self, signum=None, frame=None):
+        """ส่ง SIGTERM ให้ทุก worker (เรียกจาก signal handler ได้)"""
+        if not self.stopping:
+            self.stopping = True
+            self._deadline = time.monotonic() + self.graceful_timeout
+        self._signal_children(signal.SIGTERM)
+
+    def _signal_children(self, signum):
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        """Fork all workers and supervise them until stop() (SIGTERM / SIGINT)"""
+        previous = {signum: signal.signal(signum, self.stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            for worker_id in range(self.workers):
+                self.spawn(worker_id)
+            print(f"✅ Pre-fork: {self.workers} workers started (parent pid {os.getpid()})")
+            self._supervise()
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+    def _supervise(self):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                if self._deadline is not None and time.monotonic() > self._deadline:
+                    print("⚠️ Pre-fork: workers did not stop in time - killing them")
+                    self._signal_children(signal.SIGKILL)
+                    self._deadline = None
+                time.sleep(0.1)
+                continue
+            worker_id = self.children.pop(pid, None)
+            if worker_id is None or self.stopping:
+                continue
+            print(f"⚠️ Pre-fork: worker {worker_id} (pid {pid}) exited with status {status} - restarting")
+            time.sleep(self.restart_delay)
+            if not self.stopping:
+                self.n_restarts += 1
+                self.spawn(worker_id)
+
+def serve_prefork(serve, host, port, workers, backlog=2048, **supervisor_kwargs):
+    """
+    Bind once, freeze the heap and fork workers that all serve the same socket
+
+    Parameters:
+    -----------
+    serve : callable
+        serve(sock) runs a web server on the inherited listening socket
+    host, port : str, int
+        Bind address
+    workers : int
+        Number of worker processes
+    """
+    sock = bind_socket(host, port, backlog)
+    freeze_heap()
+    supervisor = PreforkSupervisor(lambda worker_id: serve(sock), workers, **supervisor_kwargs)
+    try:
+        supervisor.run()
+    finally:
+        sock.close()
+    return supervisor
@@ -0,0 +1,401 @@
+"""
+Rule-Based Degraded Mode
+Prices a number from three handcrafted signals (final_premium_score_v4,
+tier_classification_score and the price_tier of calculate_market_price_features)
+with a piecewise-linear mapping plus a per-tier lookup, calibrated offline
+against the trained model. No model and no full feature pass is needed, so the
+API can keep answering (marked degraded) when the model failed to load or the
+prediction pool is overloaded.
+"""
+import os
+import sys
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import joblib
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import API_CONFIG
+from src.features import calculate_market_price_features
+from src.feature_fastpath import SCALAR_FEATURES
+from src.feature_registry import (compute_features, final_premium_score_v4, premium_signal_strength,
+                                  DEFAULT_MARKET_PRICE)
+from src.compiled_model import COMPILED_SUFFIX
+from api.prediction import PredictionPipeline
+
+# Sibling file written next to the model artifact
+RULES_SUFFIX = '.rules.pkl'
+
+# model_name / 'model' of degraded results
+RULE_MODEL_NAME = 'rules'
+
+RULE_FEATURES = ['final_premium_score_v4', 'tier_classification_score']
+
+# Digit features read by final_premium_score_v4 / premium_signal_strength (argument order)
+_PREMIUM_INPUTS = ['ending_power_score', 'famous_sequence_score_advanced', 'special_lucky_score_advanced',
+                   'rarity_score', 'mathematical_beauty_score', 'market_demand_score',
+                   'position_weighted_score', 'abc_position_score_advanced', 'wave_pattern',
+                   'number_balance']
+_SIGNAL_INPUTS = ['premium_suffix_score', 'high_digit_tail_ratio', 'high_digit_cluster_score']
+
+# ====================================================================================
+# HANDCRAFTED SIGNALS
+# ====================================================================================
+
+def rule_signals(number):
+    """
+    สัญญาณ rule-based ของเบอร์เดียว (ไม่ใช้ NumPy, same values as the engine)
+
+    Market statistics are not used (market_premium_suffix_price is the default
+    price), so the signals do not depend on any model artifact.
+
+    Returns:
+    --------
+    signals : tuple
+        (final_premium_score_v4, tier_classification_score, price_tier)
+    """
+    rare_penalty = SCALAR_FEATURES['rare_digit_penalty'](number)
+    signal = premium_signal_strength(*[SCALAR_FEATURES[name](number) for name in _SIGNAL_INPUTS], rare_penalty)
+    score = final_premium_score_v4(*[SCALAR_FEATURES[name](number) for name in _PREMIUM_INPUTS],
+                                   signal, DEFAULT_MARKET_PRICE, rare_penalty)
+    return (float(score), float(SCALAR_FEATURES['tier_classification_score'](number)),
+            calculate_market_price_features(number)['price_tier'])
+
+def rule_signals_batch(numbers):
+    """
+    rule_signals ของหลายเบอร์ (one vectorized feature pass)
+
+    Returns:
+    --------
+    scores, tiers, price_tiers : np.ndarray
+    """
+    columns = compute_features(numbers, None, RULE_FEATURES)
+    price_tiers = np.array([calculate_market_price_features(number)['price_tier'] for number in numbers],
+                           dtype=np.int64)
+    return (np.asarray(columns['final_premium_score_v4'], dtype=np.float64),
+            np.asarray(columns['tier_classification_score'], dtype=np.float64), price_tiers)
+
+# ====================================================================================
+# RULE PRICER
+# ====================================================================================
+
+class RulePricer:
+    """
+    Piecewise-linear score → log price mapping with a (tier, price_tier) offset table
+
+    Parameters:
+    -----------
+    knots, log_prices : array-like
+        Mapping of final_premium_score_v4 to log1p(price) (flat outside the knots)
+    offsets : dict
+        (tier_classification_score, price_tier) -> log price correction
+    info : dict, optional
+        Calibration metadata (model_name, n_numbers, mae_log, r2, interval, ...)
+    cache_size : int, optional
+        Numbers whose price is kept (None = API_CONFIG['rule_cache_size'])
+    """
+
+    def __init__(self, knots, log_prices, offsets, info=None, cache_size=None):
+        self.knots = np.asarray(knots, dtype=np.float64)
+        self.log_prices = np.asarray(log_prices, dtype=np.float64)
+        self.offsets = dict(offsets)
+        self.info = dict(info or {})
+        self.interval = tuple(self.info.get('interval', (np.log(0.8), np.log(1.2))))
+        self.model_info = {
+            'model_name': RULE_MODEL_NAME,
+            'calibrated_against': self.info.get('model_name'),
+            'timestamp': self.info.get('calibrated_at', 'Unknown'),
+            'degraded': True
+        }
+        if cache_size is None:
+            cache_size = API_CONFIG.get('rule_cache_size', 65536)
+        self._cached_price = lru_cache(maxsize=cache_size)(self._price)
+
+    # ============ Artifact ============
+
+    def to_artifact(self):
+        """Plain dict (NumPy arrays and tuples only) for joblib"""
+        return {
+            'knots': self.knots,
+            'log_prices': self.log_prices,
+            'offsets': [(tier, price_tier, value) for (tier, price_tier), value in self.offsets.items()],
+            'info': self.info
+        }
+
+    @classmethod
+    def from_artifact(cls, data, cache_size=None):
+        offsets = {(float(tier), int(price_tier)): float(value) for tier, price_tier, value in data['offsets']}
+        return cls(data['knots'], data['log_prices'], offsets, data.get('info'), cache_size)
+
+    # ============ Pricing ============
+
+    def _price(self, number):
+        score, tier, price_tier = rule_signals(number)
+        # np.interp on a Python float returns a NumPy scalar (no array allocation)
+        log_price = float(np.interp(score, self.knots, self.log_prices)) + self.offsets.get((tier, price_tier), 0.0)
+        return float(np.expm1(log_price)), (score, tier, price_tier)
+
+    def price(self, number):
+        """
+        ราคาจากกฎของเบอร์ที่ผ่านการตรวจสอบแล้ว
+
+        Returns:
+        --------
+        price : float
+        signals : tuple
+            (final_premium_score_v4, tier_classification_score, price_tier)
+        """
+        return self._cached_price(number)
+
+    def prices(self, numbers):
+        """Vectorized price() for many numbers (no per-number cache)"""
+        scores, tiers, price_tiers = rule_signals_batch(numbers)
+        offsets = np.array([self.offsets.get(key, 0.0) for key in zip(tiers.tolist(), price_tiers.tolist())])
+        log_prices = np.interp(scores, self.knots, self.log_prices) + offsets
+        return np.expm1(log_prices), scores, tiers, price_tiers
+
+    # ============ PredictionPipeline-shaped results ============
+
+    def _build_result(self, cleaned_number, predicted_price, signals, reason):
+        score, tier, price_tier = signals
+        low, high = self.interval
+        return {
+            'success': True,
+            'phone_number': cleaned_number,
+            'predicted_price': float(predicted_price),
+            'price_range': {
+                'low': float(predicted_price * np.exp(low)),
+                'high': float(predicted_price * np.exp(high))
+            },
+            'tier': PredictionPipeline._price_tier(predicted_price),
+            'model': RULE_MODEL_NAME,
+            'model_info': self.model_info,
+            'features': {
+                'final_premium_score_v4': float(score),
+                'tier_classification_score': float(tier),
+                'price_tier': int(price_tier)
+            },
+            'degraded': True,
+            'degraded_reason': reason,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def predict_single(self, phone_number, reason=None):
+        """predict_single answered by the rules (marked degraded)"""
+        is_valid, cleaned_number = PredictionPipeline.validate_phone_number(phone_number)
+        if not is_valid:
+            return {
+                'success': False,
+                'error': 'Invalid phone number format',
+                'phone_number': phone_number
+            }
+        predicted_price, signals = self.price(cleaned_number)
+        return self._build_result(cleaned_number, predicted_price, signals, reason)
+
+    def predict_batch(self, phone_numbers, reason=None):
+        """predict_batch answered by the rules (one vectorized pass, marked degraded)"""
+        results = [None] * len(phone_numbers)
+        pending = {}
+        for i, phone in enumerate(phone_numbers):
+            is_valid, cleaned_number = PredictionPipeline.validate_phone_number(phone)
+            if is_valid:
+                pending.setdefault(cleaned_number, []).append(i)
+            else:
+                results[i] = {
+                    'success': False,
+                    'error': 'Invalid phone number format',
+                    'phone_number': phone
+                }
+
+        if pending:
+            cleaned_numbers = list(pending)
+            predicted_prices, scores, tiers, price_tiers = self.prices(cleaned_numbers)
+            for j, cleaned_number in enumerate(cleaned_numbers):
+                result = self._build_result(cleaned_number, predicted_prices[j],
+                                            (scores[j], tiers[j], price_tiers[j]), reason)
+                for i in pending[cleaned_number]:
+                    results[i] = result
+
+        summary = PredictionPipeline._batch_summary(results)
+        summary['degraded'] = True
+        summary['degraded_reason'] = reason
+        return summary
+
+    def stats(self):
+        """Calibration quality and price cache counters for /health"""
+        cache = self._cached_price.cache_info()
+        return {
+            'calibrated_against': self.info.get('model_name'),
+            'calibrated_at': self.info.get('calibrated_at'),
+            'n_numbers': self.info.get('n_numbers'),
+            'mae_log': self.info.get('mae_log'),
+            'r2': self.info.get('r2'),
+            'knots': len(self.knots),
+            'offsets': len(self.offsets),
+            'cache': {'hits': cache.hits, 'misses': cache.misses, 'entries': cache.currsize}
+        }
+
+# ====================================================================================
+# OFFLINE CALIBRATION
+# ====================================================================================
+
+def calibrate_rule_pricer(phone_numbers, predicted_prices, n_knots=32, shrinkage=1.0, n_iterations=5,
+                          model_name=None):
+    """
+    Fit the rules to the trained model's predictions
+
+    The score axis is cut at quantiles; each knot sits at the median score of its
+    bin with the median predicted log price. Residuals are averaged per
+    (tier_classification_score, price_tier) group and shrunk towards 0 so rare
+    groups do not get large corrections. Both parts are refitted in turn.
+
+    Parameters:
+    -----------
+    phone_numbers : list of str
+        Cleaned 10-digit phone numbers
+    predicted_prices : array-like
+        Model prices of phone_numbers (not log)
+    n_knots : int
+        Maximum number of knots
+    shrinkage : float
+        Pseudo-count of each offset group
+    n_iterations : int
+        Backfitting rounds of mapping and offsets
+    model_name : str, optional
+        Recorded in the calibration info
+
+    Returns:
+    --------
+    pricer : RulePricer
+    """
+    phone_numbers = list(phone_numbers)
+    y = np.log1p(np.asarray(predicted_prices, dtype=np.float64))
+    if len(phone_numbers) == 0 or len(phone_numbers) != len(y):
+        raise ValueError("phone_numbers and predicted_prices must be non-empty and of equal length")
+    scores, tiers, price_tiers = rule_signals_batch(phone_numbers)
+
+    # Knots at the median score of each quantile bin
+    edges = np.unique(np.quantile(scores, np.linspace(0, 1, n_knots + 1)))
+    bins = np.clip(np.searchsorted(edges, scores, side='right') - 1, 0, max(len(edges) - 2, 0))
+    _, bins = np.unique(bins, return_inverse=True)
+    knots = np.array([np.median(scores[bins == b]) for b in range(bins.max() + 1)])
+    groups, group = np.unique(np.column_stack([tiers, price_tiers]), axis=0, return_inverse=True)
+    group = group.reshape(-1)
+    counts = np.bincount(group)
+
+    # Backfitting: score mapping on the tier-corrected prices, then shrunk mean
+    # residual per (tier, price_tier) group, repeated until both settle
+    group_offsets = np.zeros(len(groups))
+    for _ in range(n_iterations):
+        target = y - group_offsets[group]
+        log_prices = np.array([np.median(target[bins == b]) for b in range(len(knots))])
+        base = np.interp(scores, knots, log_prices)
+        group_offsets = np.bincount(group, y - base, minlength=len(groups)) / (counts + shrinkage)
+    offsets = {(float(tier), int(price_tier)): float(value)
+               for (tier, price_tier), value in zip(groups.tolist(), group_offsets)}
+
+    error = y - base - group_offsets[group]
+    variance = np.var(y)
+    info = {
+        'model_name': model_name,
+        'calibrated_at': datetime.now().isoformat(),
+        'n_numbers': len(phone_numbers),
+        'mae_log': float(np.mean(np.abs(error))),
+        'r2': float(1 - np.var(error) / variance) if variance > 0 else 0.0,
+        # Price range of degraded results: 10th / 90th percentile of the log error
+        'interval': (float(np.quantile(error, 0.1)), float(np.quantile(error, 0.9)))
+    }
+    return RulePricer(knots, log_prices, offsets, info)
+
+def rule_pricer_path(model_path):
+    """models/best_model.pkl (or .compiled.pkl) → models/best_model.rules.pkl"""
+    if model_path.endswith(COMPILED_SUFFIX):
+        return model_path[:-len(COMPILED_SUFFIX)] + RULES_SUFFIX
+    return os.path.splitext(model_path)[0] + RULES_SUFFIX
+
+def export_rule_pricer(model_path, phone_numbers, output_path=None, max_numbers=200000, chunk_size=5000,
+                       seed=0):
+    """
+    Calibrate the rules against a model artifact and write <model>.rules.pkl
+
+    Parameters:
+    -----------
+    model_path : str
+        Artifact written by save_models / deploy_model
+    phone_numbers : list of str
+        Numbers to calibrate on (training catalog); invalid numbers are skipped
+    output_path : str, optional
+        Default: rule_pricer_path(model_path)
+    max_numbers : int
+        Random sample size for large catalogs
+
+    Returns:
+    --------
+    output_path : str
+    """
+    numbers = list(dict.fromkeys(str(number) for number in phone_numbers))
+    if len(numbers) > max_numbers:
+        rng = np.random.default_rng(seed)
+        numbers = [numbers[i] for i in sorted(rng.choice(len(numbers), max_numbers, replace=False))]
+
+    pipeline = PredictionPipeline(model_path)
+    calibration_numbers, prices = [], []
+    for start in range(0, len(numbers), chunk_size):
+        for result in pipeline.predict_batch(numbers[start:start + chunk_size], False)['results']:
+            if result['success']:
+                calibration_numbers.append(result['phone_number'])
+                prices.append(result['predicted_price'])
+
+    pricer = calibrate_rule_pricer(calibration_numbers, prices,
+                                   model_name=pipeline.model_info.get('model_name'))
+    output_path = output_path or rule_pricer_path(model_path)
+    joblib.dump(pricer.to_artifact(), output_path)
+    print(f"   🧮 Rule-based pricing calibrated on {len(calibration_numbers):,} numbers "
+          f"(R² vs model: {pricer.info['r2']:.3f}) → {output_path}")
+    return output_path
+
+def load_rule_pricer(model_path=None):
+    """
+    Calibrated rules for degraded mode
+
+    Reads API_CONFIG['rule_pricing_path'] or the sibling of model_path. Only NumPy
+    and joblib are needed, so the rules load even when the model artifact cannot.
+
+    Returns:
+    --------
+    pricer : RulePricer or None
+        None when degraded mode is off or no calibrated rules exist
+    """
+    if not API_CONFIG.get('degraded_mode', True):
+        return None
+    path = API_CONFIG.get('rule_pricing_path') or (rule_pricer_path(model_path) if model_path else None)
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        pricer = RulePricer.from_artifact(joblib.load(path))
+    except Exception as e:
+        print(f"⚠️ Rule-based pricing not loaded from {path}: {str(e)}")
+        return None
+    print(f"✅ Rule-based degraded mode ready ({path}, R² vs model: {pricer.info.get('r2', 0):.3f})")
+    return pricer
+
+# ====================================================================================
+# MAIN
+# ====================================================================================
+
+if __name__ == "__main__":
+    import argparse
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Calibrate rule-based degraded pricing against a model")
+    parser.add_argument("--model", required=True, help="Model artifact (e.g. models/deployed/best_model.pkl)")
+    parser.add_argument("--data", required=True, help="CSV with a phone_number column")
+    parser.add_argument("--output", default=None, help="Default: <model>.rules.pkl")
+    parser.add_argument("--max-numbers", type=int, default=200000, help="Calibration sample size")
+
+    args = parser.parse_args()
+    catalog = pd.read_csv(args.data, dtype={'phone_number': str})
+    export_rule_pricer(args.model, catalog['phone_number'], args.output, args.max_numbers)
@@ -0,0 +1,184 @@
+"""
+Streaming NDJSON Bulk Valuation
+Reads newline-delimited phone numbers (bare numbers or JSON objects) from a byte
+stream, predicts them in fixed-size chunks and yields one NDJSON result line per
+input line as each chunk finishes. Memory use depends on the chunk size only.
+"""
+import json
+import time
+
+from src.config import API_CONFIG
+from api.metrics import observe_stage, count_error
+
+# ====================================================================================
+# INPUT PARSING
+# ====================================================================================
+
+class LineTooLongError(ValueError):
+    """An input line (or the unterminated rest of the body) exceeded the line limit"""
+
+    def __init__(self, line_number, max_line_bytes):
+        super().__init__(f"Line {line_number} exceeds {max_line_bytes} bytes")
+        self.line_number = line_number
+
+def _json_default(value):
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+def parse_line(line):
+    """
+    แปลงหนึ่งบรรทัดเป็น (phone_number, extra fields)
+
+    Accepted forms: 0812345678 / "0812345678" / {"phone_number": "...", "id": ...}.
+    Extra fields of a JSON object are echoed back with its result.
+
+    Raises:
+    -------
+    ValueError
+        Malformed JSON or an object without phone_number
+    """
+    if line[:1] in ('{', '"'):
+        record = json.loads(line)
+        if isinstance(record, str):
+            return record, {}
+        if not isinstance(record, dict) or 'phone_number' not in record:
+            raise ValueError("JSON lines must be objects with a phone_number field")
+        extra = {key: value for key, value in record.items() if key != 'phone_number'}
+        return str(record['phone_number']), extra
+    return line, {}
+
+def resolve_max_line_bytes(max_line_bytes=None):
+    """ความยาวสูงสุดต่อบรรทัด (bytes) จาก argument หรือ API_CONFIG"""
+    if max_line_bytes is None:
+        max_line_bytes = API_CONFIG.get('stream_max_line_bytes', 4096)
+    return max(1, int(max_line_bytes))
+
+async def iter_records(byte_chunks, max_line_bytes=None):
+    """
+    Records from an async byte stream (split on newlines, blank lines skipped)
+
+    Only the unfinished line is buffered, so a body without newlines would grow
+    it without bound; lines longer than max_line_bytes stop the stream instead.
+
+    Yields:
+    -------
+    (line_number, phone_number or None, extra, error or None)
+
+    Raises:
+    -------
+    LineTooLongError
+        A line longer than max_line_bytes (None = API_CONFIG['stream_max_line_bytes'])
+    """
+    max_line_bytes = resolve_max_line_bytes(max_line_bytes)
+    buffer = b''
+    line_number = 0
+
+    def parse(raw):
+        line = raw.decode('utf-8', errors='replace').strip()
+        if not line:
+            return None
+        try:
+            phone_number, extra = parse_line(line)
+            return line_number, phone_number, extra, None
+        except ValueError as e:
+            return line_number, None, {}, str(e)
+
+    async for chunk in byte_chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for raw in lines:
+            line_number += 1
+            if len(raw) > max_line_bytes:
+                raise LineTooLongError(line_number, max_line_bytes)
+            record = parse(raw)
+            if record is not None:
+                yield record
+        if len(buffer) > max_line_bytes:
+            raise LineTooLongError(line_number + 1, max_line_bytes)
+    if buffer:
+        line_number += 1
+        record = parse(buffer)
+        if record is not None:
+            yield record
+
+# ====================================================================================
+# STREAMING PREDICTION
+# ====================================================================================
+
+def resolve_stream_chunk_size(chunk_size=None):
+    """เบอร์ต่อ chunk จาก argument หรือ API_CONFIG (ไม่เกิน max_batch_size)"""
+    if chunk_size is None:
+        chunk_size = API_CONFIG.get('stream_chunk_size', 1000)
+    return max(1, min(int(chunk_size), API_CONFIG.get('max_batch_size', 10000)))
+
+def _result_line(line_number, extra, result):
+    return json.dumps({**extra, 'line': line_number, **result},
+                      ensure_ascii=False, default=_json_default) + '\n'
+
+async def stream_predictions(byte_chunks, predict_batch, chunk_size=None, max_line_bytes=None):
+    """
+    ทำนายราคาจาก NDJSON stream ทีละ chunk
+
+    A line longer than max_line_bytes ends the stream: before the first result
+    is yielded LineTooLongError propagates (the endpoint answers 413), later
+    the lines read so far are flushed and a final error line is yielded.
+
+    Parameters:
+    -----------
+    byte_chunks : async iterable of bytes
+        Request body
+    predict_batch : coroutine function
+        predict_batch(phone_numbers) -> PredictionPipeline.predict_batch summary
+    chunk_size : int, optional
+        Numbers per predict_batch call (None = API_CONFIG['stream_chunk_size'])
+    max_line_bytes : int, optional
+        Longest accepted input line (None = API_CONFIG['stream_max_line_bytes'])
+
+    Yields:
+    -------
+    line : str
+        One NDJSON result per input line, in input order
+    """
+    chunk_size = resolve_stream_chunk_size(chunk_size)
+    pending = []
+
+    async def flush():
+        numbers = [phone_number for _, phone_number, _, error in pending if error is None]
+        results = iter([])
+        if numbers:
+            try:
+                results = iter((await predict_batch(numbers))['results'])
+            except Exception as e:
+                count_error('stream_chunk_failed', len(numbers))
+                failure = {'success': False, 'error': f'Prediction error: {str(e) or type(e).__name__}'}
+                results = iter([dict(failure, phone_number=number) for number in numbers])
+        started = time.perf_counter()
+        lines = []
+        for line_number, phone_number, extra, error in pending:
+            if error is not None:
+                result = {'success': False, 'error': error}
+            else:
+                result = next(results)
+            lines.append(_result_line(line_number, extra, result))
+        count_error('invalid_input', len(pending) - len(numbers))
+        observe_stage('serialization', started)
+        pending.clear()
+        return ''.join(lines)
+
+    streaming = False
+    try:
+        async for record in iter_records(byte_chunks, max_line_bytes):
+            pending.append(record)
+            if len(pending) >= chunk_size:
+                streaming = True
+                yield await flush()
+    except LineTooLongError as e:
+        if not streaming:
+            raise
+        count_error('line_too_long')
+        lines = await flush() if pending else ''
+        yield lines + _result_line(e.line_number, {}, {'success': False, 'error': str(e)})
+        return
+    if pending:
+        yield await flush()
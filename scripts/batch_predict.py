@@ -31,6 +31,7 @@ sys.path.insert(0, str(PROJECT_ROOT))
 from src.config import BASE_PATH, MODEL_PATH, BATCH_CONFIG
 from src.data_loader import load_data_multi_format, auto_detect_phone_column
 from src.features import create_masterpiece_features
+from src.data_handler import get_artifact_market_stats
 
 
 # ====================================================================================
@@ -57,6 +58,7 @@ class BatchPredictor:
         self.model_info = {}
         self.feature_names = []
         self.preprocessor = None
+        self.market_stats = None
 
         self._load_model()
 
@@ -66,7 +68,8 @@ class BatchPredictor:
             print(f"📦 Loading model from: {self.model_path}")
 
         try:
-            model_data = joblib.load(self.model_path)
+            model_data = joblib.load(self.model_path, mmap_mode='r')
+            self.market_stats = get_artifact_market_stats(model_data)
 
             if isinstance(model_data, dict):
                 self.model = model_data.get('model')
@@ -125,9 +128,11 @@ class BatchPredictor:
         for i in iterator:
             batch = phone_numbers.iloc[i:i + batch_size]
 
-            # Create features for batch
+            # Create features for batch (only those used by the model)
             batch_df = pd.DataFrame({'phone_number': batch})
-            features_df = create_masterpiece_features(batch_df)
+            features_df = create_masterpiece_features(
+                batch_df, self.market_stats, feature_names=self.feature_names or None
+            )
 
             # Select features used by model
             if self.feature_names:
@@ -215,11 +220,11 @@ class BatchPredictor:
 
         # Add top features if requested
         if include_features and self.feature_names:
-            # Create features
-            features_df = create_masterpiece_features(df)
-
             # Add top 5 most important features
             top_features = self.feature_names[:5] if len(self.feature_names) >= 5 else self.feature_names
+
+            # Create only the top features
+            features_df = create_masterpiece_features(df, self.market_stats, feature_names=top_features)
             for feat in top_features:
                 if feat in features_df.columns:
                     df_output[f'feat_{feat}'] = features_df[feat]
@@ -27,6 +27,7 @@ sys.path.insert(0, str(PROJECT_ROOT))
 
 from src.config import MODEL_PATH
 from src.features import create_masterpiece_features
+from src.data_handler import get_artifact_market_stats
 
 
 # ====================================================================================
@@ -69,7 +70,8 @@ def predict_single(
         print(f"📱 Phone Number: {phone_clean}")
         print(f"📦 Loading model...")
 
-    model_data = joblib.load(model_path)
+    model_data = joblib.load(model_path, mmap_mode='r')
+    market_stats = get_artifact_market_stats(model_data)
 
     if isinstance(model_data, dict):
         model = model_data.get('model')
@@ -93,7 +95,7 @@ def predict_single(
         print(f"🔧 Creating features...")
 
     df = pd.DataFrame({'phone_number': [phone_clean]})
-    features_df = create_masterpiece_features(df)
+    features_df = create_masterpiece_features(df, market_stats)
 
     # Select features
     if feature_names:
@@ -0,0 +1,866 @@
+"""
+Compiled Array-Based Model for Serving
+Flattens the trees of a trained model (XGBoost, LightGBM, CatBoost, scikit-learn
+forests / boosting, also inside WeightedEnsemble, AdvancedStackingEnsemble,
+VotingRegressor and StackingRegressor) into contiguous NumPy arrays and predicts
+with a vectorized traversal. A compiled artifact only needs NumPy to load and
+predict, so the serving process never imports the training frameworks.
+"""
+import os
+import json
+import tempfile
+
+import numpy as np
+import pandas as pd
+import joblib
+import warnings
+warnings.filterwarnings('ignore')
+
+from src.fast_inference import compile_preprocessor, array_predictor
+
+# Sibling file written next to the original artifact
+COMPILED_SUFFIX = '.compiled.pkl'
+
+# Objectives whose raw margin is the prediction (no link function)
+XGBOOST_IDENTITY_OBJECTIVES = {'reg:squarederror', 'reg:linear', 'reg:pseudohubererror',
+                               'reg:absoluteerror', 'reg:quantileerror'}
+LIGHTGBM_IDENTITY_OBJECTIVES = {'regression', 'regression_l2', 'l2', 'mean_squared_error', 'mse',
+                                'regression_l1', 'l1', 'mean_absolute_error', 'mae',
+                                'huber', 'fair', 'quantile'}
+CATBOOST_IDENTITY_LOSSES = {'RMSE', 'MAE', 'Quantile', 'MAPE', 'Huber', 'Lq', 'Expectile'}
+SKLEARN_IDENTITY_LOSSES = {'squared_error', 'absolute_error', 'huber', 'quantile', 'ls', 'lad'}
+
+# Cells of the (rows x trees) node matrix processed at once
+TRAVERSAL_BLOCK = 1 << 18
+
+class CompiledModelMismatchError(ValueError):
+    """Raised when compiled predictions differ from the original model"""
+
+# ====================================================================================
+# COMPILED ESTIMATORS
+# ====================================================================================
+
+def _as_matrix(X):
+    if isinstance(X, pd.DataFrame):
+        X = X.to_numpy(dtype=np.float64)
+    X = np.asarray(X)
+    return X.reshape(1, -1) if X.ndim == 1 else X
+
+class CompiledTrees:
+    """
+    Tree ensemble stored as flat node arrays (leaves point to themselves)
+
+    prediction = base + scale * sum over trees of value[leaf]
+
+    Parameters:
+    -----------
+    feature, threshold, left, right, value, missing_left : np.ndarray
+        Per-node arrays of all trees (indices are global)
+    roots : np.ndarray
+        Root node of each tree
+    max_depth : int
+        Number of traversal steps needed to reach every leaf
+    strict : bool
+        True: go left when x < threshold (XGBoost), False: x <= threshold
+    input_dtype : numpy dtype
+        Precision the original library compares in (float32 or float64)
+    zero_missing : np.ndarray, optional
+        Per-node flags for LightGBM missing_type 'Zero' (0 is treated as missing)
+    missing_value : float, optional
+        Input value to treat as missing besides NaN (XGBoost 'missing' parameter)
+    node_value : np.ndarray, optional
+        Mean prediction of every node's subtree (for contributions; default: value)
+    """
+
+    def __init__(self, feature, threshold, left, right, value, missing_left, roots, max_depth,
+                 strict=False, input_dtype=np.float32, scale=1.0, base=0.0,
+                 zero_missing=None, missing_value=None, node_value=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.missing_left = np.ascontiguousarray(missing_left, dtype=bool)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.strict = strict
+        self.input_dtype = np.dtype(input_dtype)
+        self.scale = float(scale)
+        self.base = float(base)
+        self.zero_missing = None if zero_missing is None or not np.any(zero_missing) \
+            else np.ascontiguousarray(zero_missing, dtype=bool)
+        self.missing_value = missing_value
+        # children[2 * node] = left, children[2 * node + 1] = right (one gather per level)
+        self.children = np.ascontiguousarray(np.column_stack([self.left, self.right]).ravel())
+        self.node_value = self.value if node_value is None else np.ascontiguousarray(node_value, dtype=np.float64)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def _prepare(self, X):
+        X = np.ascontiguousarray(_as_matrix(X), dtype=self.input_dtype)
+        if self.missing_value is not None and not np.isnan(self.missing_value):
+            X = np.where(X == self.missing_value, np.nan, X).astype(self.input_dtype)
+        return X
+
+    def _paths(self, X):
+        """
+        Traverse all trees one level at a time
+
+        Yields:
+        -------
+        (nodes, next_nodes, offsets) per level; the final next_nodes are the leaves
+        """
+        n_rows, n_columns = X.shape
+        flat = X.ravel()
+        offsets = (np.arange(n_rows, dtype=np.int64) * n_columns)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            x = flat[offsets + self.feature[nodes]]
+            threshold = self.threshold[nodes]
+            go_left = x < threshold if self.strict else x <= threshold
+            missing = np.isnan(x)
+            if self.zero_missing is not None:
+                missing |= self.zero_missing[nodes] & (np.abs(x) <= 1e-35)
+            if missing.any():
+                go_left = np.where(missing, self.missing_left[nodes], go_left)
+            next_nodes = self.children[2 * nodes + ~go_left]
+            # Every (row, tree) pair reached a leaf before max_depth
+            if np.array_equal(next_nodes, nodes):
+                break
+            yield nodes, next_nodes, offsets
+            nodes = next_nodes
+        yield nodes, nodes, offsets
+
+    def _leaves(self, X):
+        """Leaf node of every (row, tree) pair"""
+        for _, leaves, _ in self._paths(X):
+            pass
+        return leaves
+
+    def predict(self, X):
+        X = self._prepare(X)
+        output = np.empty(len(X), dtype=np.float64)
+        step = max(1, TRAVERSAL_BLOCK // max(1, self.n_trees))
+        for start in range(0, len(X), step):
+            leaves = self._leaves(X[start:start + step])
+            output[start:start + step] = self.value[leaves].sum(axis=1)
+        return self.base + self.scale * output
+
+    def contributions(self, X):
+        """
+        Per-feature contributions along each decision path (Saabas attribution,
+        same as XGBoost approx_contribs): every split adds the change of the
+        subtree mean to its feature
+
+        Returns:
+        --------
+        contributions : np.ndarray, shape (n_rows, n_features + 1)
+            Last column is the bias; each row sums to predict(X)
+        """
+        X = self._prepare(X)
+        n_rows, n_columns = X.shape
+        output = np.zeros((n_rows, n_columns + 1), dtype=np.float64)
+        step = max(1, TRAVERSAL_BLOCK // max(1, self.n_trees))
+        for start in range(0, n_rows, step):
+            chunk = X[start:start + step]
+            size = len(chunk) * n_columns
+            block = np.zeros(size, dtype=np.float64)
+            for nodes, next_nodes, offsets in self._paths(chunk):
+                delta = self.node_value[next_nodes] - self.node_value[nodes]
+                columns = offsets + self.feature[nodes]
+                block += np.bincount(columns.ravel(), weights=delta.ravel(), minlength=size)
+            output[start:start + step, :n_columns] = block.reshape(len(chunk), n_columns)
+        output[:, :n_columns] *= self.scale
+        output[:, n_columns] = self.base + self.scale * self.node_value[self.roots].sum()
+        return output
+
+class CompiledObliviousTrees:
+    """
+    CatBoost symmetric trees: one (feature, border) pair per depth level
+
+    leaf index = sum over levels of (x[feature] > border) << level
+
+    leaf_weights (training documents per leaf, 0 for padding leaves of shallower
+    trees) are only used to attribute contributions.
+    """
+
+    def __init__(self, features, borders, nan_true, leaf_values, scale=1.0, bias=0.0, leaf_weights=None):
+        self.features = np.ascontiguousarray(features, dtype=np.int32)
+        self.borders = np.ascontiguousarray(borders, dtype=np.float32)
+        self.nan_true = np.ascontiguousarray(nan_true, dtype=bool)
+        self.leaf_values = np.ascontiguousarray(leaf_values, dtype=np.float64)
+        self.scale = float(scale)
+        self.bias = float(bias)
+        self.leaf_weights = np.ones_like(self.leaf_values) if leaf_weights is None \
+            else np.ascontiguousarray(leaf_weights, dtype=np.float64)
+
+    def _leaves(self, X):
+        n_trees, depth = self.features.shape
+        x = X[:, self.features]
+        bits = np.where(np.isnan(x), self.nan_true, x > self.borders)
+        return bits.astype(np.int64) @ (1 << np.arange(depth)).astype(np.int64)
+
+    def _chunks(self, X):
+        X = np.ascontiguousarray(_as_matrix(X), dtype=np.float32)
+        step = max(1, TRAVERSAL_BLOCK // max(1, self.features.size))
+        for start in range(0, len(X), step):
+            yield start, X[start:start + step]
+
+    def predict(self, X):
+        tree_index = np.arange(len(self.features))[None, :]
+        output = np.empty(len(_as_matrix(X)), dtype=np.float64)
+        for start, chunk in self._chunks(X):
+            leaves = self._leaves(chunk)
+            output[start:start + len(chunk)] = self.leaf_values[tree_index, leaves].sum(axis=1)
+        return self.bias + self.scale * output
+
+    def _prefix_means(self):
+        """
+        Weighted mean leaf value given the first k levels (k = 0 .. depth)
+
+        means[k][t, leaf & (2**k - 1)]; means[depth] are the leaf values themselves
+        """
+        n_trees, depth = self.features.shape
+        # Padding levels compare against +inf; a tiny weight keeps empty real leaves averaged
+        real_depth = np.isfinite(self.borders).sum(axis=1)
+        real = np.arange(self.leaf_values.shape[1])[None, :] < (1 << real_depth)[:, None]
+        weights = np.where(real, self.leaf_weights + 1e-12, 0.0)
+        weighted = self.leaf_values * weights
+        means = []
+        for level in range(depth + 1):
+            shape = (n_trees, -1, 1 << level)
+            totals = weights.reshape(shape).sum(axis=1)
+            means.append(np.divide(weighted.reshape(shape).sum(axis=1), totals,
+                                   out=np.zeros_like(totals), where=totals > 0))
+        means[depth] = self.leaf_values
+        return means
+
+    def contributions(self, X):
+        """Path attribution per level (see CompiledTrees.contributions)"""
+        n_trees, depth = self.features.shape
+        means = self._prefix_means()
+        tree_index = np.arange(n_trees)[None, :]
+        n_rows, n_columns = _as_matrix(X).shape
+        output = np.zeros((n_rows, n_columns + 1), dtype=np.float64)
+        for start, chunk in self._chunks(X):
+            leaves = self._leaves(chunk)
+            previous = means[0][tree_index, 0]
+            rows = (np.arange(len(chunk)) * n_columns)[:, None]
+            block = np.zeros(len(chunk) * n_columns, dtype=np.float64)
+            for level in range(depth):
+                current = means[level + 1][tree_index, leaves & ((1 << (level + 1)) - 1)]
+                columns = np.broadcast_to(rows + self.features[None, :, level], current.shape)
+                block += np.bincount(columns.ravel(), weights=(current - previous).ravel(),
+                                     minlength=len(block))
+                previous = current
+            output[start:start + len(chunk), :n_columns] = block.reshape(len(chunk), n_columns)
+        output[:, :n_columns] *= self.scale
+        output[:, n_columns] = self.bias + self.scale * means[0][:, 0].sum()
+        return output
+
+class CompiledLinear:
+    """Linear model: X @ coef + intercept"""
+
+    def __init__(self, coef, intercept):
+        self.coef = np.ascontiguousarray(np.ravel(coef), dtype=np.float64)
+        self.intercept = float(np.ravel(intercept)[0]) if np.ndim(intercept) else float(intercept)
+
+    def predict(self, X):
+        return np.asarray(_as_matrix(X), dtype=np.float64) @ self.coef + self.intercept
+
+    def contributions(self, X):
+        X = np.asarray(_as_matrix(X), dtype=np.float64)
+        return np.column_stack([X * self.coef, np.full(len(X), self.intercept)])
+
+class CompiledAverage:
+    """(Weighted) mean of sub-model predictions (WeightedEnsemble, VotingRegressor)"""
+
+    def __init__(self, estimators, weights=None):
+        self.estimators = estimators
+        self.weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+
+    def predict(self, X):
+        X = _as_matrix(X)
+        predictions = np.column_stack([estimator.predict(X) for estimator in self.estimators])
+        if self.weights is not None:
+            return np.average(predictions, axis=1, weights=self.weights)
+        return np.mean(predictions, axis=1)
+
+    def contributions(self, X):
+        X = _as_matrix(X)
+        weights = np.ones(len(self.estimators)) if self.weights is None else self.weights
+        weights = weights / weights.sum()
+        return sum(weight * estimator.contributions(X) for weight, estimator in zip(weights, self.estimators))
+
+class CompiledStack:
+    """StackingRegressor: final estimator on base predictions (plus X with passthrough)"""
+
+    def __init__(self, estimators, final_estimator, passthrough=False):
+        self.estimators = estimators
+        self.final_estimator = final_estimator
+        self.passthrough = passthrough
+
+    def predict(self, X):
+        X = _as_matrix(X)
+        meta = np.column_stack([estimator.predict(X) for estimator in self.estimators])
+        if self.passthrough:
+            meta = np.hstack([meta, np.asarray(X, dtype=np.float64)])
+        return self.final_estimator.predict(meta)
+
+    def contributions(self, X):
+        """Base-model contributions pushed through a linear final estimator"""
+        if not isinstance(self.final_estimator, CompiledLinear):
+            raise NotImplementedError("Contributions need a linear final estimator")
+        X = _as_matrix(X)
+        coef = self.final_estimator.coef
+        output = sum(weight * estimator.contributions(X) for weight, estimator in zip(coef, self.estimators))
+        if self.passthrough:
+            output[:, :-1] += np.asarray(X, dtype=np.float64) * coef[len(self.estimators):]
+        output[:, -1] += self.final_estimator.intercept
+        return output
+
+class CompiledModel:
+    """
+    Serving wrapper: predict() accepts a DataFrame or an array in feature_names order
+
+    Parameters:
+    -----------
+    estimator : compiled estimator
+        Root of the compiled tree (CompiledTrees, CompiledAverage, ...)
+    source : str
+        Class name of the original model
+    feature_names : list, optional
+        Column order used when a DataFrame is passed
+    """
+
+    def __init__(self, estimator, source, feature_names=None):
+        self.estimator = estimator
+        self.source = source
+        self.feature_names = list(feature_names) if feature_names else None
+
+    def predict(self, X):
+        if isinstance(X, pd.DataFrame) and self.feature_names:
+            X = X[self.feature_names]
+        return self.estimator.predict(_as_matrix(X))
+
+    def contributions(self, X):
+        """
+        Per-feature contributions to the raw prediction (log price)
+
+        Raises:
+        -------
+        NotImplementedError
+            A component (e.g. a non-linear stacking meta model) cannot be attributed
+        """
+        if isinstance(X, pd.DataFrame) and self.feature_names:
+            X = X[self.feature_names]
+        return self.estimator.contributions(_as_matrix(X))
+
+    def __repr__(self):
+        return f"CompiledModel({self.source})"
+
+# ====================================================================================
+# SCIKIT-LEARN
+# ====================================================================================
+
+class _NodeArrays:
+    """Collects the nodes of several trees into global arrays"""
+
+    def __init__(self):
+        self.feature, self.threshold, self.left, self.right = [], [], [], []
+        self.value, self.missing_left, self.zero_missing, self.roots = [], [], [], []
+        self.node_value = []
+        self.max_depth = 0
+        self.n_nodes = 0
+
+    def add_tree(self, feature, threshold, left, right, value, missing_left, depth, zero_missing=None,
+                 cover=None):
+        """
+        Add one tree (child index -1 marks a leaf; indices are local to the tree)
+
+        cover (training weight per node) gives the subtree means used for
+        contributions; without it the node values already are those means.
+        """
+        left = np.asarray(left, dtype=np.int64)
+        right = np.asarray(right, dtype=np.int64)
+        local = np.arange(len(left))
+        leaf = left < 0
+        offset = self.n_nodes
+        self.feature.append(np.where(leaf, 0, feature))
+        self.threshold.append(np.asarray(threshold, dtype=np.float64))
+        self.left.append(np.where(leaf, local, left) + offset)
+        self.right.append(np.where(leaf, local, right) + offset)
+        self.value.append(np.asarray(value, dtype=np.float64))
+        self.node_value.append(self.value[-1] if cover is None else _subtree_means(left, right, value, cover))
+        self.missing_left.append(np.asarray(missing_left, dtype=bool))
+        self.zero_missing.append(np.zeros(len(left), dtype=bool) if zero_missing is None
+                                 else np.asarray(zero_missing, dtype=bool))
+        self.roots.append(offset)
+        self.max_depth = max(self.max_depth, int(depth))
+        self.n_nodes += len(left)
+
+    def build(self, threshold_dtype=np.float64, **kwargs):
+        return CompiledTrees(
+            np.concatenate(self.feature), np.concatenate(self.threshold).astype(threshold_dtype),
+            np.concatenate(self.left), np.concatenate(self.right), np.concatenate(self.value),
+            np.concatenate(self.missing_left), np.array(self.roots), self.max_depth,
+            zero_missing=np.concatenate(self.zero_missing), node_value=np.concatenate(self.node_value), **kwargs
+        )
+
+def _subtree_means(left, right, value, cover):
+    """Cover-weighted mean leaf value below every node (children have larger indices)"""
+    means = np.asarray(value, dtype=np.float64).copy()
+    cover = np.asarray(cover, dtype=np.float64).copy()
+    for node in range(len(left) - 1, -1, -1):
+        if left[node] >= 0:
+            l, r = left[node], right[node]
+            total = cover[l] + cover[r]
+            means[node] = (means[l] * cover[l] + means[r] * cover[r]) / total if total > 0 \
+                else (means[l] + means[r]) / 2
+            cover[node] = total
+    return means
+
+def _add_sklearn_tree(nodes, estimator, value_scale=1.0):
+    tree = estimator.tree_
+    missing_left = getattr(tree, 'missing_go_to_left', None)
+    if missing_left is None:
+        missing_left = np.zeros(tree.node_count, dtype=bool)
+    nodes.add_tree(tree.feature, tree.threshold, tree.children_left, tree.children_right,
+                   tree.value[:, 0, 0] * value_scale, missing_left, tree.max_depth)
+
+def _compile_sklearn_trees(estimators, scale=1.0, base=0.0):
+    nodes = _NodeArrays()
+    for estimator in estimators:
+        if getattr(estimator, 'n_outputs_', 1) != 1:
+            raise NotImplementedError("Only single-output trees can be compiled")
+        _add_sklearn_tree(nodes, estimator)
+    return nodes.build(input_dtype=np.float32, scale=scale, base=base)
+
+def _compile_gradient_boosting(model):
+    if getattr(model, 'loss', 'squared_error') not in SKLEARN_IDENTITY_LOSSES:
+        raise NotImplementedError(f"GradientBoostingRegressor loss '{model.loss}' is not supported")
+    init = model.init_
+    if init == 'zero':
+        base = 0.0
+    elif hasattr(init, 'constant_'):
+        base = float(np.ravel(init.constant_)[0])
+    else:
+        raise NotImplementedError("GradientBoostingRegressor init must be a DummyRegressor or 'zero'")
+    return _compile_sklearn_trees(model.estimators_[:, 0], scale=model.learning_rate, base=base)
+
+def _compile_hist_gradient_boosting(model):
+    if getattr(model, 'loss', 'squared_error') not in SKLEARN_IDENTITY_LOSSES:
+        raise NotImplementedError(f"HistGradientBoostingRegressor loss '{model.loss}' is not supported")
+    if getattr(model, '_preprocessor', None) is not None:
+        raise NotImplementedError("Categorical features of HistGradientBoostingRegressor are not supported")
+    nodes = _NodeArrays()
+    for predictors in model._predictors:
+        predictor_nodes = predictors[0].nodes
+        if 'is_categorical' in predictor_nodes.dtype.names and predictor_nodes['is_categorical'].any():
+            raise NotImplementedError("Categorical splits are not supported")
+        leaf = predictor_nodes['is_leaf'].astype(bool)
+        nodes.add_tree(predictor_nodes['feature_idx'], predictor_nodes['num_threshold'],
+                       np.where(leaf, -1, predictor_nodes['left']), np.where(leaf, -1, predictor_nodes['right']),
+                       predictor_nodes['value'], predictor_nodes['missing_go_to_left'],
+                       predictor_nodes['depth'].max(), cover=predictor_nodes['count'])
+    base = float(np.ravel(model._baseline_prediction)[0])
+    return nodes.build(input_dtype=np.float64, base=base)
+
+def _compile_stacking(model):
+    if any(method != 'predict' for method in getattr(model, 'stack_method_', [])):
+        raise NotImplementedError("Only stack_method='predict' is supported")
+    return CompiledStack([compile_estimator(estimator) for estimator in model.estimators_],
+                         compile_estimator(model.final_estimator_), model.passthrough)
+
+def _compile_voting(model):
+    return CompiledAverage([compile_estimator(estimator) for estimator in model.estimators_], model.weights)
+
+# ====================================================================================
+# XGBOOST / LIGHTGBM / CATBOOST
+# ====================================================================================
+
+def _parse_base_score(value):
+    if isinstance(value, str):
+        value = value.strip('[]').split(',')[0]
+    return float(value)
+
+def _compile_xgboost(model):
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    learner = json.loads(bytes(booster.save_raw(raw_format='json')))['learner']
+    objective = learner['objective']['name']
+    if objective not in XGBOOST_IDENTITY_OBJECTIVES:
+        raise NotImplementedError(f"XGBoost objective '{objective}' is not supported")
+    gradient_booster = learner['gradient_booster']
+    if gradient_booster['name'] != 'gbtree':
+        raise NotImplementedError(f"XGBoost booster '{gradient_booster['name']}' is not supported")
+    trees = gradient_booster['model']['trees']
+
+    # Same iterations as fast_inference.array_predictor (best_iteration when set)
+    best_iteration = getattr(model, 'best_iteration', None)
+    if best_iteration is not None:
+        indptr = gradient_booster['model'].get('iteration_indptr')
+        if indptr is not None:
+            trees = trees[:indptr[best_iteration + 1]]
+        else:
+            per_iteration = int(gradient_booster['model']['gbtree_model_param'].get('num_parallel_tree', 1))
+            trees = trees[:(best_iteration + 1) * per_iteration]
+
+    nodes = _NodeArrays()
+    for tree in trees:
+        if tree.get('categories_nodes'):
+            raise NotImplementedError("XGBoost categorical splits are not supported")
+        left = np.array(tree['left_children'])
+        conditions = np.array(tree['split_conditions'], dtype=np.float32)
+        nodes.add_tree(tree['split_indices'], conditions, left, tree['right_children'],
+                       np.where(left < 0, conditions, 0.0), np.array(tree['default_left'], dtype=bool),
+                       _tree_depth(left, tree['right_children']), cover=tree['sum_hessian'])
+    missing = getattr(model, 'missing', np.nan)
+    base = _parse_base_score(learner['learner_model_param']['base_score'])
+    return nodes.build(threshold_dtype=np.float32, strict=True, input_dtype=np.float32, base=base,
+                       missing_value=None if missing is None else float(missing))
+
+def _tree_depth(left, right):
+    left, right = np.asarray(left), np.asarray(right)
+    depth, max_depth, stack = {0: 0}, 0, [0]
+    while stack:
+        node = stack.pop()
+        if left[node] >= 0:
+            for child in (left[node], right[node]):
+                depth[child] = depth[node] + 1
+                max_depth = max(max_depth, depth[child])
+                stack.append(child)
+    return max_depth
+
+def _compile_lightgbm(model):
+    booster = getattr(model, 'booster_', model)
+    dump = booster.dump_model()
+    objective = str(dump.get('objective', 'regression')).split()
+    if objective[0] not in LIGHTGBM_IDENTITY_OBJECTIVES or 'sqrt' in objective:
+        raise NotImplementedError(f"LightGBM objective '{' '.join(objective)}' is not supported")
+    if dump.get('num_tree_per_iteration', 1) != 1:
+        raise NotImplementedError("Only single-output LightGBM models are supported")
+
+    nodes = _NodeArrays()
+    for tree_info in dump['tree_info']:
+        feature, threshold, left, right, value, missing_left, zero_missing = [], [], [], [], [], [], []
+        cover = []
+        depth = 0
+        stack = [(tree_info['tree_structure'], None, None, 0)]
+        while stack:
+            node, parent, side, level = stack.pop()
+            index = len(feature)
+            if parent is not None:
+                (left if side == 'left' else right)[parent] = index
+            depth = max(depth, level)
+            if 'leaf_value' in node or 'split_feature' not in node:
+                if 'leaf_coeff' in node:
+                    raise NotImplementedError("LightGBM linear trees are not supported")
+                feature.append(0)
+                threshold.append(0.0)
+                value.append(node.get('leaf_value', 0.0))
+                cover.append(node.get('leaf_count', 0))
+                missing_left.append(False)
+                zero_missing.append(False)
+                left.append(-1)
+                right.append(-1)
+                continue
+            if node.get('decision_type', '<=') != '<=':
+                raise NotImplementedError("LightGBM categorical splits are not supported")
+            missing_type = node.get('missing_type', 'None')
+            feature.append(node['split_feature'])
+            threshold.append(float(node['threshold']))
+            value.append(0.0)
+            cover.append(node.get('internal_count', 0))
+            # NaN → 0.0 unless missing_type is NaN; missing values follow default_left
+            missing_left.append(bool(node.get('default_left', True)) if missing_type != 'None'
+                                else 0.0 <= float(node['threshold']))
+            zero_missing.append(missing_type == 'Zero')
+            left.append(-1)
+            right.append(-1)
+            stack.append((node['right_child'], index, 'right', level + 1))
+            stack.append((node['left_child'], index, 'left', level + 1))
+        nodes.add_tree(feature, threshold, left, right, value, missing_left, depth, zero_missing, cover)
+
+    scale = 1.0 / max(1, len(dump['tree_info'])) if dump.get('average_output') else 1.0
+    return nodes.build(input_dtype=np.float64, scale=scale)
+
+def _compile_catboost(model):
+    loss = str(model.get_all_params().get('loss_function', 'RMSE')).split(':')[0]
+    if loss not in CATBOOST_IDENTITY_LOSSES:
+        raise NotImplementedError(f"CatBoost loss '{loss}' is not supported")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'model.json')
+        model.save_model(path, format='json')
+        with open(path) as f:
+            dump = json.load(f)
+
+    features_info = dump.get('features_info', {})
+    if features_info.get('categorical_features') or features_info.get('text_features'):
+        raise NotImplementedError("CatBoost categorical / text features are not supported")
+    float_features = {info['feature_index']: info for info in features_info.get('float_features', [])}
+
+    trees = dump['oblivious_trees']
+    depth = max([len(tree.get('splits') or []) for tree in trees] + [1])
+    features = np.zeros((len(trees), depth), dtype=np.int32)
+    # Padding levels compare against +inf → bit 0, so the leaf index is unchanged
+    borders = np.full((len(trees), depth), np.inf, dtype=np.float32)
+    nan_true = np.zeros((len(trees), depth), dtype=bool)
+    leaf_values = np.zeros((len(trees), 1 << depth), dtype=np.float64)
+    leaf_weights = np.ones((len(trees), 1 << depth), dtype=np.float64)
+    for t, tree in enumerate(trees):
+        splits = tree.get('splits') or []
+        for level, split in enumerate(splits):
+            if split.get('split_type', 'FloatFeature') != 'FloatFeature':
+                raise NotImplementedError(f"CatBoost split type '{split['split_type']}' is not supported")
+            info = float_features[split['float_feature_index']]
+            features[t, level] = info.get('flat_feature_index', split['float_feature_index'])
+            borders[t, level] = split['border']
+            nan_true[t, level] = info.get('nan_value_treatment') == 'AsTrue'
+        values = tree['leaf_values']
+        if len(values) != 1 << len(splits):
+            raise NotImplementedError("Only single-output CatBoost models are supported")
+        leaf_values[t, :len(values)] = values
+        if len(tree.get('leaf_weights') or []) == len(values):
+            leaf_weights[t, :len(values)] = tree['leaf_weights']
+
+    scale, bias = dump.get('scale_and_bias', [1.0, [0.0]])
+    return CompiledObliviousTrees(features, borders, nan_true, leaf_values, scale=scale,
+                                  bias=np.ravel(bias)[0] if np.ndim(bias) else bias, leaf_weights=leaf_weights)
+
+# ====================================================================================
+# COMPILE
+# ====================================================================================
+
+def compile_estimator(model):
+    """
+    แปลงโมเดลที่ train แล้วเป็น compiled estimator (NumPy arrays เท่านั้น)
+
+    Raises:
+    -------
+    NotImplementedError
+        Model type, objective or split type without an array equivalent
+    """
+    name = type(model).__name__
+    module = type(model).__module__
+
+    if module.startswith('xgboost'):
+        return _compile_xgboost(model)
+    if module.startswith('lightgbm'):
+        return _compile_lightgbm(model)
+    if module.startswith('catboost'):
+        return _compile_catboost(model)
+
+    # Project ensembles (src.model_utils) are recognised by their attributes
+    if hasattr(model, 'stacking_regressor'):
+        return compile_estimator(model.stacking_regressor)
+    if name == 'WeightedEnsemble' or (isinstance(getattr(model, 'models', None), list)
+                                      and hasattr(model, 'weights')):
+        return CompiledAverage([compile_estimator(sub_model) for _, sub_model in model.models], model.weights)
+
+    if name in ('DecisionTreeRegressor', 'ExtraTreeRegressor'):
+        return _compile_sklearn_trees([model])
+    if name in ('RandomForestRegressor', 'ExtraTreesRegressor'):
+        return _compile_sklearn_trees(model.estimators_, scale=1.0 / len(model.estimators_))
+    if name == 'GradientBoostingRegressor':
+        return _compile_gradient_boosting(model)
+    if name == 'HistGradientBoostingRegressor':
+        return _compile_hist_gradient_boosting(model)
+    if name == 'StackingRegressor':
+        return _compile_stacking(model)
+    if name == 'VotingRegressor':
+        return _compile_voting(model)
+    if module.startswith('sklearn.linear_model') and hasattr(model, 'coef_'):
+        if np.ndim(model.coef_) > 1 and np.shape(model.coef_)[0] != 1:
+            raise NotImplementedError("Only single-output linear models are supported")
+        return CompiledLinear(model.coef_, getattr(model, 'intercept_', 0.0))
+    if isinstance(model, (CompiledTrees, CompiledObliviousTrees, CompiledLinear,
+                          CompiledAverage, CompiledStack)):
+        return model
+
+    raise NotImplementedError(f"Cannot compile model type {name}")
+
+def compile_model(model, feature_names=None):
+    """compile_estimator + CompiledModel wrapper (DataFrame or array input)"""
+    if isinstance(model, CompiledModel):
+        return model
+    return CompiledModel(compile_estimator(model), type(model).__name__, feature_names)
+
+# ====================================================================================
+# EXPORT
+# ====================================================================================
+
+def compiled_artifact_path(model_path):
+    """models/best_model.pkl → models/best_model.compiled.pkl"""
+    if model_path.endswith(COMPILED_SUFFIX):
+        return model_path
+    return os.path.splitext(model_path)[0] + COMPILED_SUFFIX
+
+def resolve_serving_artifact(model_path):
+    """
+    Compiled sibling of model_path when it exists and is not older than the original
+    (a retrained artifact without a fresh export keeps serving the original)
+    """
+    compiled_path = compiled_artifact_path(model_path)
+    if compiled_path == model_path or not os.path.exists(compiled_path):
+        return model_path
+    try:
+        if os.path.getmtime(compiled_path) < os.path.getmtime(model_path):
+            return model_path
+    except OSError:
+        return model_path
+    return compiled_path
+
+def verification_numbers(n_numbers=256, seed=0):
+    """เบอร์สุ่ม (deterministic) สำหรับเทียบผลทำนาย"""
+    rng = np.random.default_rng(seed)
+    numbers = ['0812345678', '0888888888', '0999999999', '0856565656', '0987654321']
+    while len(numbers) < n_numbers:
+        numbers.append('0' + ''.join(map(str, rng.integers(0, 10, 9))))
+    return numbers
+
+def verify_compiled_model(model, compiled, X, rtol=1e-4, atol=1e-4):
+    """
+    เทียบผลทำนายของ compiled model กับโมเดลเดิม
+
+    Returns:
+    --------
+    max_abs_diff : float
+
+    Raises:
+    -------
+    CompiledModelMismatchError
+        Any prediction outside the tolerance
+    """
+    expected = np.asarray(model.predict(X), dtype=np.float64)
+    result = compiled.predict(X)
+    max_abs_diff = float(np.max(np.abs(result - expected))) if len(expected) else 0.0
+    if not np.allclose(result, expected, rtol=rtol, atol=atol):
+        raise CompiledModelMismatchError(
+            f"Compiled predictions differ from {type(model).__name__} (max abs diff {max_abs_diff:.3g})"
+        )
+    return max_abs_diff
+
+def verify_fast_path(compiled_path, numbers, expected, rtol=1e-4, atol=1e-4):
+    """
+    โหลด compiled artifact แบบ serving แล้วเทียบ single-number fast path กับผลของโมเดลเดิม
+
+    Replays PredictionPipeline.predict_single: memory-mapped load, SingleNumberFeatures,
+    the array preprocessor and the array predictor, one number at a time.
+
+    Parameters:
+    -----------
+    compiled_path : str
+        Written compiled artifact
+    numbers : list
+        Cleaned 10-digit numbers
+    expected : np.ndarray
+        Original model's log-price predictions for numbers (DataFrame path)
+
+    Returns:
+    --------
+    max_abs_diff : float
+
+    Raises:
+    -------
+    CompiledModelMismatchError
+        Any fast-path prediction outside the tolerance
+    """
+    from src.feature_fastpath import SingleNumberFeatures
+    from src.data_handler import get_artifact_market_stats
+
+    model_data = joblib.load(compiled_path, mmap_mode='r')
+    feature_names = list(model_data['feature_names'])
+    fast_features = SingleNumberFeatures(feature_names, get_artifact_market_stats(model_data))
+    transform = compile_preprocessor(model_data.get('preprocessor'), feature_names)
+    predict = array_predictor(model_data['model'])
+
+    result = np.empty(len(numbers))
+    for i, number in enumerate(numbers):
+        X = fast_features.vector(number)
+        if transform is not None:
+            X = transform(X)
+        result[i] = predict(X)[0]
+    max_abs_diff = float(np.max(np.abs(result - expected))) if len(expected) else 0.0
+    if not np.allclose(result, expected, rtol=rtol, atol=atol):
+        raise CompiledModelMismatchError(
+            f"Single-number predictions of {compiled_path} differ from the original model "
+            f"(max abs diff {max_abs_diff:.3g})"
+        )
+    return max_abs_diff
+
+def export_compiled_model(model_path, output_path=None, n_verify=256):
+    """
+    เขียน compiled artifact ข้าง model artifact เดิม
+
+    The compiled artifact has the same keys (feature_names, market_stats, ...) with
+    the model replaced by a CompiledModel and the preprocessor by its array replay,
+    so PredictionPipeline loads it without the training frameworks. Predictions are
+    checked against the original model on generated numbers before writing, and
+    the written artifact's single-number fast path after writing (the file is
+    removed if it differs).
+
+    Parameters:
+    -----------
+    model_path : str
+        Artifact written by save_models / deploy_model
+    output_path : str, optional
+        Default: <model_path without .pkl>.compiled.pkl
+    n_verify : int
+        Numbers used for the equivalence check (0 = skip)
+
+    Returns:
+    --------
+    output_path : str
+
+    Raises:
+    -------
+    NotImplementedError
+        The model cannot be compiled
+    CompiledModelMismatchError
+        Compiled predictions differ from the original model
+    """
+    from src.features import create_masterpiece_features
+    from src.data_handler import get_artifact_market_stats
+
+    model_data = joblib.load(model_path)
+    if not isinstance(model_data, dict) or not model_data.get('feature_names'):
+        raise NotImplementedError("Only artifacts with feature_names can be compiled")
+    feature_names = list(model_data['feature_names'])
+    model = model_data['model']
+    preprocessor = model_data.get('preprocessor')
+
+    compiled = compile_model(model, feature_names)
+    compiled_preprocessor = compile_preprocessor(preprocessor, feature_names)
+
+    max_abs_diff = None
+    if n_verify:
+        numbers = verification_numbers(n_verify)
+        df = pd.DataFrame({'phone_number': numbers, 'price': 0})
+        features_df = create_masterpiece_features(df, get_artifact_market_stats(model_data),
+                                                  feature_names=feature_names, verbose=False)[feature_names]
+        X = preprocessor.transform(features_df) if preprocessor is not None else features_df
+        max_abs_diff = verify_compiled_model(model, compiled, X)
+
+    output_path = output_path or compiled_artifact_path(model_path)
+    joblib.dump({
+        **model_data,
+        'model': compiled,
+        'preprocessor': compiled_preprocessor,
+        'compiled_from': type(model).__name__,
+        'compiled_max_abs_diff': max_abs_diff
+    }, output_path)
+    if n_verify:
+        try:
+            verify_fast_path(output_path, numbers, np.asarray(model.predict(X), dtype=np.float64))
+        except Exception:
+            # Serving prefers the compiled sibling: never leave a mismatching one behind
+            os.remove(output_path)
+            raise
+    print(f"   ⚡ Compiled {type(model).__name__} to {output_path}")
+    return output_path
@@ -126,7 +126,24 @@ BATCH_CONFIG = {
     'include_confidence': True,
     'include_features': False,
     'parallel_processing': True,
-    'n_workers': -1
+    'n_workers': -1,
+    'feature_chunk_size': 100000  # numbers per worker task in parallel feature generation
+}
+
+# ====================================================================================
+# FEATURE STORE CONFIGURATION
+# ====================================================================================
+FEATURE_STORE_CONFIG = {
+    'enabled': True,
+    'store_dir': os.path.join(DATA_PATH, 'features', 'store')
+}
+
+# ====================================================================================
+# FEATURE MATRIX CONFIGURATION
+# ====================================================================================
+FEATURE_MATRIX_CONFIG = {
+    'compact_dtypes': True,     # int8 flags/counts, float32 scores
+    'matrix_dtype': 'float32'   # dtype of the NumPy matrix output (as_matrix=True)
 }
 
 # ====================================================================================
@@ -141,7 +158,40 @@ API_CONFIG = {
     'max_batch_size': 10000,
     'timeout': 300,
     'cache_predictions': True,
-    'cache_ttl': 3600
+    'cache_ttl': 3600,
+    'cache_max_entries': 100000,
+    'micro_batching': True,  # รวม /predict ที่เข้ามาพร้อมกันเป็น batch เดียว
+    'micro_batch_size': 64,
+    'micro_batch_wait_ms': 2,
+    'executor': 'thread',  # 'thread' หรือ 'process' (โหลดโมเดลในทุก worker)
+    'executor_workers': None,  # None = จำนวน CPU
+    'max_queue_depth': 1000,  # จำนวน request ที่รอได้สูงสุด เกินนี้ตอบ 503
+    'warmup_size': 64,  # จำนวนเบอร์ที่ใช้ warmup โมเดลใหม่ก่อน swap
+    'model_watch_interval': 0,  # วินาที; > 0 = reload เมื่อไฟล์โมเดลเปลี่ยน
+    'stream_chunk_size': 1000,  # เบอร์ต่อ chunk ของ /predict_stream
+    'stream_max_line_bytes': 4096,  # บรรทัดที่ยาวกว่านี้ใน /predict_stream ตอบ 413
+    'use_compiled_model': True,  # ใช้ <model>.compiled.pkl (NumPy เท่านั้น) เมื่อมีไฟล์ที่ใหม่กว่า
+    'explain_top_features': 5,  # จำนวน feature contributions ต่อ explanation
+    'inference_socket': None,  # Unix socket ของ inference daemon (None = โหลดโมเดลในทุก worker)
+    'workers': 1,  # > 1 = pre-fork: โหลดโมเดลครั้งเดียวใน parent แล้ว fork workers ที่ใช้ memory ร่วมกัน
+    # โมเดลเพิ่มเติมที่ serve คู่กับ MODEL_PATH ('default'): name -> {'path', 'weight', 'shadow'}
+    # e.g. {'tier': {'path': 'tier_model.pkl', 'weight': 0.1}, 'candidate': {'path': 'candidate.pkl', 'shadow': True}}
+    'models': {},
+    'shadow_log': None,  # NDJSON ผล shadow model (None = logs/shadow_predictions.jsonl)
+    'shadow_queue_size': 1000,  # shadow jobs ที่รอได้สูงสุด เกินนี้ทิ้ง (ไม่เพิ่ม latency)
+    'admission_control': True,  # จำกัดงานที่รับพร้อมกัน + rate limit ต่อ client (เกิน = 429)
+    'admission_max_numbers': 2000,  # จำนวนเบอร์ที่ทำนายพร้อมกันได้สูงสุด
+    'admission_max_queued': 10000,  # จำนวนเบอร์ที่รอคิวได้สูงสุด
+    'admission_bulk_share': 0.8,  # สัดส่วนที่งาน bulk ใช้ได้ (ที่เหลือกันไว้ให้ /predict, /explain)
+    'admission_queue_timeout': 10,  # วินาทีที่รอคิวได้ก่อนตอบ 429
+    'admission_retry_after': 1,  # Retry-After (วินาที) เมื่อคิวเต็ม
+    'rate_limit_per_second': 1000,  # เบอร์ต่อวินาทีต่อ client (0 = ไม่จำกัด)
+    'rate_limit_burst': 5000,
+    'api_keys': {},  # X-API-Key -> {'rate', 'burst'}; key อื่นถูกจำกัดตาม IP
+    'degraded_mode': True,  # ตอบด้วย rule-based pricing เมื่อโหลดโมเดลไม่ได้หรือ overload
+    'rule_pricing_path': None,  # None = <model>.rules.pkl ข้างไฟล์โมเดล
+    'degraded_queue_timeout': 1,  # วินาทีที่รอคิว admission ก่อนตอบด้วยกฎ (แทน admission_queue_timeout)
+    'rule_cache_size': 65536  # เบอร์ที่เก็บราคาจากกฎไว้
 }
 
 # ====================================================================================
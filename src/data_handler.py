@@ -353,13 +353,101 @@ def calculate_sample_weights(df, is_train=True):
     print(f"✅ Sample weights calculated for {len(df)} samples")
     return df
 
-def calculate_market_statistics(train_df):
+# Pattern slices of the market statistics: (name, slice, minimum length, is suffix)
+# Ending and ABC patterns share one namespace (a 3-digit ending and an ABC block
+# with the same digits are pooled)
+MARKET_PATTERN_SLICES = [
+    ('ending_3', slice(-3, None), 3, True),
+    ('ending_4', slice(-4, None), 4, True),
+    ('abc', slice(3, 6), 6, False),
+]
+
+# Pattern lengths stored in array-backed market tables (the 2-digit tables are only
+# filled by hand-made statistics; training statistics use 3-/4-digit patterns)
+MARKET_TABLE_LENGTHS = [2, 3, 4]
+
+def _pattern_price_groups(train_df):
+    """
+    ราคาต่อ pattern แบบ vectorized (grouped median / count)
+
+    Returns:
+    --------
+    all_stats, suffix_stats : pd.DataFrame
+        Index = pattern (first-occurrence order), columns = median, count
+    """
+    phones = train_df['phone_number'].astype(str)
+    prices = train_df['price'].to_numpy()
+    lengths = phones.str.len().to_numpy()
+
+    parts = []
+    for slot, (_, part, min_length, is_suffix) in enumerate(MARKET_PATTERN_SLICES):
+        rows = np.flatnonzero(lengths >= min_length)
+        parts.append(pd.DataFrame({
+            'pattern': phones.str[part].to_numpy()[rows],
+            'price': prices[rows],
+            # row-major occurrence order of the original row loop
+            'order': rows * len(MARKET_PATTERN_SLICES) + slot,
+            'is_suffix': is_suffix
+        }))
+    occurrences = pd.concat(parts, ignore_index=True)
+
+    def aggregate(frame):
+        grouped = frame.groupby('pattern', sort=False)
+        stats = pd.DataFrame({
+            'median': grouped['price'].median(),
+            'count': grouped.size(),
+            'order': grouped['order'].min()
+        })
+        if frame['price'].isna().any():
+            # np.median semantics: a missing price makes the median NaN
+            stats.loc[frame['price'].isna().groupby(frame['pattern'], sort=False).any(), 'median'] = np.nan
+        return stats.sort_values('order', kind='stable')
+
+    suffixes = occurrences[occurrences['is_suffix'].to_numpy()]
+    suffixes = suffixes[suffixes['pattern'].isin(list(PREMIUM_SUFFIX_WEIGHTS)).to_numpy()]
+    return aggregate(occurrences), aggregate(suffixes)
+
+def market_stats_to_arrays(market_stats):
+    """
+    แปลง market statistics แบบ dict เป็นตาราง array ตามความยาว pattern
+
+    Pattern p of length L is stored at index int(p) of a 10**L table. Missing
+    prices are NaN and missing popularity is 0. Non-numeric patterns are dropped.
+    """
+    if market_stats.get('format') == 'arrays':
+        return market_stats
+    arrays = {key: value for key, value in market_stats.items()
+              if key not in ('avg_prices', 'popularity', 'premium_suffix_stats')}
+    for key, dtype, missing in [('avg_prices', np.float64, np.nan),
+                                ('popularity', np.float64, 0),
+                                ('premium_suffix_stats', np.float64, np.nan)]:
+        tables = {length: np.full(10 ** length, missing, dtype=dtype) for length in MARKET_TABLE_LENGTHS}
+        for pattern, value in market_stats.get(key, {}).items():
+            if len(pattern) in tables and pattern.isdigit() and pattern.isascii():
+                tables[len(pattern)][int(pattern)] = value
+        arrays[key] = tables
+    arrays['format'] = 'arrays'
+    return arrays
+
+def get_artifact_market_stats(model_data):
+    """
+    market statistics ที่บันทึกไว้กับ model artifact (array tables)
+
+    Returns None for legacy artifacts (features fall back to default market prices).
+    Arrays stay memory-mapped when the artifact was loaded with mmap_mode='r'.
+    """
+    if not isinstance(model_data, dict) or model_data.get('market_stats') is None:
+        return None
+    return market_stats_to_arrays(model_data['market_stats'])
+
+def calculate_market_statistics(train_df, as_arrays=False):
     """
     Calculate market statistics from TRAINING data only
     
     Parameters:
     -----------
     train_df : DataFrame with 'phone_number' and 'price' columns
+    as_arrays : bool, return array-backed tables (see market_stats_to_arrays)
     
     Returns:
     --------
@@ -367,48 +455,19 @@ def calculate_market_statistics(train_df):
     """
     print("📊 Calculating market statistics from TRAINING data...")
     
-    pattern_prices = {}
-    premium_suffix_prices = defaultdict(list)
-    
-    for idx, row in train_df.iterrows():
-        phone = str(row['phone_number'])
-        price = row['price']
-        
-        # Ending patterns
-        for length in [3, 4]:
-            if len(phone) >= length:
-                pattern = phone[-length:]
-                if pattern not in pattern_prices:
-                    pattern_prices[pattern] = []
-                pattern_prices[pattern].append(price)
-                if pattern in PREMIUM_SUFFIX_WEIGHTS:
-                    premium_suffix_prices[pattern].append(price)
-        
-        # ABC pattern
-        if len(phone) >= 6:
-            abc = phone[3:6]
-            if abc not in pattern_prices:
-                pattern_prices[abc] = []
-            pattern_prices[abc].append(price)
+    all_stats, suffix_stats = _pattern_price_groups(train_df)
     
     # Calculate averages and popularity
-    pattern_avg_prices = {}
-    pattern_popularity = {}
-    
-    for pattern, prices in pattern_prices.items():
-        if len(prices) >= 2:
-            pattern_avg_prices[pattern] = np.median(prices)
-            pattern_popularity[pattern] = len(prices)
+    all_stats = all_stats[all_stats['count'].to_numpy() >= 2]
+    pattern_avg_prices = dict(zip(all_stats.index, all_stats['median'].to_numpy()))
+    pattern_popularity = dict(zip(all_stats.index, all_stats['count'].tolist()))
     
     print(f"✅ Market statistics calculated from {len(train_df)} training samples")
 
-    premium_suffix_stats = {
-        suffix: float(np.median(prices))
-        for suffix, prices in premium_suffix_prices.items()
-        if len(prices) >= 2
-    }
+    suffix_stats = suffix_stats[suffix_stats['count'].to_numpy() >= 2]
+    premium_suffix_stats = dict(zip(suffix_stats.index, suffix_stats['median'].astype(float).tolist()))
 
-    return {
+    market_stats = {
         'avg_prices': pattern_avg_prices,
         'popularity': pattern_popularity,
         'n_train_samples': len(train_df),
@@ -416,3 +475,6 @@ def calculate_market_statistics(train_df):
         'global_median': float(train_df['price'].median()),
         'global_mean': float(train_df['price'].mean())
     }
+    if as_arrays:
+        return market_stats_to_arrays(market_stats)
+    return market_stats
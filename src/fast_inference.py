@@ -0,0 +1,219 @@
+"""
+Array-Based Inference Helpers for Low-Latency Serving
+Applies a fitted preprocessor and the model directly to a float32 feature matrix
+(feature_names column order) without building DataFrames.
+"""
+import numpy as np
+import pandas as pd
+import warnings
+warnings.filterwarnings('ignore')
+
+# Columns AdvancedPreprocessor treats as categorical when filling missing values
+PREPROCESSOR_CATEGORICAL_COLUMNS = ['complexity_class', 'estimated_tier', 'market_position',
+                                    'predicted_price_category']
+
+# ====================================================================================
+# PREPROCESSOR
+# ====================================================================================
+
+def _affine_params(estimator):
+    """(shift, scale) of a fitted StandardScaler/RobustScaler, None for other estimators"""
+    name = type(estimator).__name__
+    if name == 'StandardScaler':
+        shift, scale = estimator.mean_, estimator.scale_
+    elif name == 'RobustScaler':
+        shift, scale = estimator.center_, estimator.scale_
+    else:
+        return None
+    shift = 0.0 if shift is None else np.asarray(shift, dtype=np.float64)
+    scale = 1.0 if scale is None else np.asarray(scale, dtype=np.float64)
+    return shift, scale
+
+def _apply_estimator(estimator, affine, values):
+    if affine is not None:
+        return (values - affine[0]) / affine[1]
+    return estimator.transform(values)
+
+def _is_categorical(name):
+    return name in PREPROCESSOR_CATEGORICAL_COLUMNS or '_bin_' in name or '_qbin_' in name
+
+def _fill_missing(values, categorical):
+    """AdvancedPreprocessor missing-value rules: batch median / batch mode (0 if all missing)"""
+    missing = np.isnan(values)
+    if not missing.any():
+        return values
+    values = values.copy()
+    for j in np.flatnonzero(missing.any(axis=0)):
+        column = values[:, j]
+        present = column[~missing[:, j]]
+        if categorical[j]:
+            if len(present):
+                uniques, counts = np.unique(present, return_counts=True)
+                fill = uniques[np.argmax(counts)]
+            else:
+                fill = 0.0
+        else:
+            fill = np.median(present) if len(present) else np.nan
+        column[missing[:, j]] = fill
+    return values
+
+class ArrayPreprocessor:
+    """
+    Fitted AdvancedPreprocessor replayed on float32 matrices (picklable)
+
+    Parameters:
+    -----------
+    steps : list of tuple
+        (column positions, categorical flags, estimator, affine) per feature group;
+        the estimator is only kept when the group is not an affine scaler
+    feature_names : list
+        Column order of the input matrices
+    """
+
+    def __init__(self, steps, feature_names):
+        self.steps = steps
+        self.feature_names = list(feature_names)
+
+    def __call__(self, X):
+        X = np.array(X, dtype=np.float32)
+        for positions, categorical, estimator, affine in self.steps:
+            values = _fill_missing(X[:, positions].astype(np.float64), categorical)
+            X[:, positions] = _apply_estimator(estimator, affine, values)
+        return X
+
+    def transform(self, X):
+        """Same as calling the object (DataFrames in feature_names order are accepted)"""
+        if isinstance(X, pd.DataFrame):
+            X = X[self.feature_names].to_numpy(dtype=np.float32)
+        return self(X)
+
+class FramePreprocessor:
+    """Array interface for any other preprocessor (DataFrame transform per call)"""
+
+    def __init__(self, preprocessor, feature_names):
+        self.preprocessor = preprocessor
+        self.feature_names = list(feature_names)
+
+    def __call__(self, X):
+        # Same float64 values as the DataFrame path (float32 arithmetic can flip tree splits)
+        X = np.asarray(X, dtype=np.float64)
+        result = self.preprocessor.transform(pd.DataFrame(X, columns=self.feature_names))
+        return np.asarray(result, dtype=np.float64)
+
+def compile_preprocessor(preprocessor, feature_names):
+    """
+    สร้างฟังก์ชัน transform แบบ array สำหรับ preprocessor ที่ fit แล้ว
+
+    AdvancedPreprocessor groups are replayed per column block (StandardScaler and
+    RobustScaler as precomputed affine maps); any other preprocessor falls back to
+    its DataFrame transform.
+
+    Parameters:
+    -----------
+    preprocessor : object or None
+        Fitted preprocessor from the model artifact
+    feature_names : list
+        Column order of the matrices passed to the returned function
+
+    Returns:
+    --------
+    transform : ArrayPreprocessor, FramePreprocessor or None
+        transform(X) -> float32 matrix, float64 for FramePreprocessor (None when
+        there is no preprocessor)
+    """
+    if preprocessor is None or isinstance(preprocessor, (ArrayPreprocessor, FramePreprocessor)):
+        return preprocessor
+
+    if not hasattr(preprocessor, 'feature_groups'):
+        return FramePreprocessor(preprocessor, feature_names)
+
+    index = {name: i for i, name in enumerate(feature_names)}
+    steps = []
+    for group_name, features in preprocessor.feature_groups.items():
+        estimator = preprocessor.scalers.get(group_name, preprocessor.transformers.get(group_name))
+        columns = [name for name in features if name in index]
+        if estimator is None or not columns:
+            continue
+        # The DataFrame path raises (and skips the group) when columns differ from fit
+        fitted = getattr(estimator, 'feature_names_in_', None)
+        if fitted is not None and list(fitted) != columns:
+            continue
+        if fitted is None and getattr(estimator, 'n_features_in_', len(columns)) != len(columns):
+            continue
+        positions = np.array([index[name] for name in columns])
+        categorical = np.array([_is_categorical(name) for name in columns])
+        affine = _affine_params(estimator)
+        steps.append((positions, categorical, estimator if affine is None else None, affine))
+
+    return ArrayPreprocessor(steps, feature_names)
+
+# ====================================================================================
+# MODEL
+# ====================================================================================
+
+def array_predictor(model):
+    """
+    Prediction function for a float32 matrix using the booster's native array API
+
+    LightGBM and XGBoost sklearn wrappers are bypassed (same iteration and
+    missing-value settings as their predict); other models use model.predict.
+    """
+    booster = getattr(model, 'booster_', None)
+    if booster is not None and type(model).__module__.startswith('lightgbm'):
+        return booster.predict
+
+    if hasattr(model, 'get_booster') and type(model).__module__.startswith('xgboost'):
+        booster = model.get_booster()
+        best_iteration = getattr(model, 'best_iteration', None)
+        iteration_range = (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+        missing = getattr(model, 'missing', np.nan)
+
+        def predict(X):
+            return booster.inplace_predict(X, iteration_range=iteration_range, missing=missing)
+        return predict
+
+    return model.predict
+
+def array_contributions(model):
+    """
+    Per-feature contribution function for a float32 matrix, or None
+
+    Boosters use their native output (XGBoost pred_contribs, LightGBM pred_contrib,
+    CatBoost ShapValues); compiled models and compilable scikit-learn models use
+    path attribution over the flattened trees.
+
+    Returns:
+    --------
+    contributions : callable or None
+        contributions(X) -> (n_rows, n_features + 1) on the model output scale,
+        last column = bias, each row sums to the prediction
+    """
+    module = type(model).__module__
+    booster = getattr(model, 'booster_', None)
+    if booster is not None and module.startswith('lightgbm'):
+        return lambda X: booster.predict(X, pred_contrib=True)
+
+    if hasattr(model, 'get_booster') and module.startswith('xgboost'):
+        import xgboost
+        booster = model.get_booster()
+        best_iteration = getattr(model, 'best_iteration', None)
+        iteration_range = (0, best_iteration + 1) if best_iteration is not None else (0, 0)
+        missing = getattr(model, 'missing', np.nan)
+
+        def contributions(X):
+            return booster.predict(xgboost.DMatrix(X, missing=missing), pred_contribs=True,
+                                   iteration_range=iteration_range)
+        return contributions
+
+    if module.startswith('catboost'):
+        import catboost
+        return lambda X: model.get_feature_importance(catboost.Pool(X), type='ShapValues')
+
+    if hasattr(model, 'contributions'):
+        return model.contributions
+
+    from src.compiled_model import compile_model
+    try:
+        return compile_model(model).contributions
+    except NotImplementedError:
+        return None
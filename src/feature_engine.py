@@ -0,0 +1,1037 @@
+"""
+Vectorized Feature Engine for Phone Number Price Prediction
+Parses phone numbers once into an (N, 10) digit matrix and computes every
+digit-derived feature of create_masterpiece_features with NumPy array operations.
+
+Each feature function mirrors the active scalar function in src/features.py
+(the last definition of that name) and must return identical values.
+"""
+from functools import cached_property
+
+import numpy as np
+
+from src.config import CONFIG
+from src.features import PREMIUM_PREFIX_WEIGHTS, HIGH_VALUE_DIGITS, SEQUENCE_MATCHER
+
+N_DIGITS = 10
+
+# ====================================================================================
+# LOOKUP TABLES (built once from CONFIG)
+# ====================================================================================
+
+def _digit_table(values, dtype=np.int64):
+    """ตาราง lookup ขนาด 10 จาก dict/set ของตัวเลข"""
+    table = np.zeros(10, dtype=dtype)
+    if isinstance(values, dict):
+        for d, v in values.items():
+            table[int(d)] = v
+    else:
+        for d in values:
+            table[int(d)] = 1
+    return table
+
+def _code_table(keys, length, values=None, dtype=np.int64):
+    """ตาราง lookup ขนาด 10**length ตามรหัสตัวเลขของ key"""
+    table = np.zeros(10 ** length, dtype=dtype)
+    for i, key in enumerate(keys):
+        if len(key) == length:
+            table[int(key)] = 1 if values is None else values[i]
+    return table
+
+def _suffix_tables(mapping, lengths):
+    """ตาราง (ค่า, มี key หรือไม่) แยกตามความยาว prefix/suffix"""
+    tables = {}
+    for length in lengths:
+        keys = [k for k in mapping if len(k) == length]
+        found = _code_table(keys, length, dtype=bool)
+        value = _code_table(keys, length, [mapping[k] for k in keys], dtype=np.float64)
+        tables[length] = (value, found)
+    return tables
+
+POWER_TABLE = _digit_table(CONFIG['POWER_WEIGHTS'])
+GOOD_DIGIT_TABLE = _digit_table(CONFIG['GOOD_DIGITS'])
+BAD_DIGIT_TABLE = _digit_table(CONFIG['BAD_DIGITS'])
+POWER_DIGIT_TABLE = _digit_table('5689')       # d in '56899'
+HIGH_DIGIT_TABLE = _digit_table(HIGH_VALUE_DIGITS)
+RARE_DIGIT_TABLE = _digit_table('034')
+PRIME_DIGIT_TABLE = _digit_table('2357')
+
+PREMIUM_PAIR_TABLE = _code_table(CONFIG['PREMIUM_PAIRS'], 2)
+SPECIAL_LUCKY_TABLE = _code_table(
+    list(CONFIG['SPECIAL_LUCKY_PAIRS']), 2,
+    [v['score'] for v in CONFIG['SPECIAL_LUCKY_PAIRS'].values()]
+)
+MYSTICAL_PAIR_TABLE = _code_table(list(CONFIG['MYSTICAL_PAIRS']), 2, list(CONFIG['MYSTICAL_PAIRS'].values()))
+FORBIDDEN_PAIR_TABLE = _code_table(CONFIG['FORBIDDEN_PAIRS'], 2)
+FIB_PAIR_TABLE = _code_table([str(v).zfill(2) for v in [0, 1, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89]], 2)
+SQUARE_PAIR_TABLE = _code_table([str(v * v).zfill(2) for v in range(1, 10)], 2)
+
+PREFIX_SPECIAL = {
+    '088': 50, '089': 45, '081': 40, '086': 35,
+    '095': 30, '096': 28, '097': 26, '098': 24
+}
+PREFIX_SPECIAL_TABLES = _suffix_tables(PREFIX_SPECIAL, [3])[3]
+PREMIUM_PREFIX_TABLE = _code_table(list(PREMIUM_PREFIX_WEIGHTS), 3,
+                                   list(PREMIUM_PREFIX_WEIGHTS.values()), dtype=np.float64)
+
+COMPLEXITY_TABLE = np.array(
+    [CONFIG['COMPLEXITY_SCORES']['very_simple']] * 3 +
+    [CONFIG['COMPLEXITY_SCORES']['simple']] +
+    [CONFIG['COMPLEXITY_SCORES']['moderate']] * 2 +
+    [CONFIG['COMPLEXITY_SCORES']['complex']] * 2 +
+    [CONFIG['COMPLEXITY_SCORES']['very_complex']] * 3
+)
+
+ENDING_PATTERN_LABELS = np.array(['all_different', 'double_double', 'one_pair', 'quad', 'triple_plus'])
+
+POSITION_WEIGHTS = np.array([0.5, 0.6, 0.7, 0.8, 0.9, 1.0, 1.2, 1.5, 1.8, 2.0])
+POSITION_WEIGHTS_ADVANCED = np.array([0.3, 0.4, 0.5, 0.8, 0.9, 1.0, 1.5, 2.0, 2.5, 3.0])
+ABC_MULTIPLIERS = np.array([3, 2, 2, 1, 1, 2, 3, 3, 3, 3])
+ABC_A_POSITIONS = [0, 6, 7, 8, 9]
+
+# ====================================================================================
+# DIGIT MATRIX
+# ====================================================================================
+
+def parse_phone_numbers(numbers):
+    """
+    แปลงเบอร์โทรเป็น digit matrix (N, 10) ชนิด uint8
+
+    Parameters:
+    -----------
+    numbers : array-like of str
+        Cleaned 10-digit phone numbers
+
+    Returns:
+    --------
+    digits : np.ndarray
+        (N, 10) uint8 matrix of digits
+    """
+    values = np.asarray(numbers, dtype=object).astype(str)
+    if len(values) == 0:
+        return np.zeros((0, N_DIGITS), dtype=np.uint8)
+
+    try:
+        raw = values.astype('S')
+    except UnicodeEncodeError:
+        raise ValueError("phone_number must contain only digits")
+
+    if raw.dtype.itemsize != N_DIGITS:
+        raise ValueError(f"phone_number must be exactly {N_DIGITS} digits")
+
+    digits = raw.view(np.uint8).reshape(len(values), N_DIGITS) - ord('0')
+    if (digits > 9).any():
+        raise ValueError(f"phone_number must be exactly {N_DIGITS} digits")
+
+    return digits
+
+class DigitMatrix:
+    """
+    Digit matrix (N, 10) พร้อม cache ของ array กลางที่ feature หลายตัวใช้ร่วมกัน
+    """
+
+    def __init__(self, digits):
+        self.digits = np.ascontiguousarray(digits, dtype=np.uint8)
+
+    @classmethod
+    def from_numbers(cls, numbers):
+        """สร้างจาก list/Series ของเบอร์โทร"""
+        return cls(parse_phone_numbers(numbers))
+
+    @classmethod
+    def from_codes(cls, codes):
+        """สร้างจากรหัสเบอร์ 10 หลักแบบ int64"""
+        codes = np.asarray(codes, dtype=np.int64)
+        powers = 10 ** np.arange(N_DIGITS - 1, -1, -1, dtype=np.int64)
+        return cls((codes[:, None] // powers) % 10)
+
+    def __len__(self):
+        return self.digits.shape[0]
+
+    @cached_property
+    def d(self):
+        """ตัวเลขเป็น int64 สำหรับคำนวณ"""
+        return self.digits.astype(np.int64)
+
+    @cached_property
+    def counts(self):
+        """จำนวนครั้งของเลขแต่ละตัว (N, 10)"""
+        counts = np.zeros((len(self), 10), dtype=np.int64)
+        for digit in range(10):
+            counts[:, digit] = (self.digits == digit).sum(axis=1)
+        return counts
+
+    @cached_property
+    def unique(self):
+        """จำนวนตัวเลขที่ไม่ซ้ำ"""
+        return (self.counts > 0).sum(axis=1)
+
+    @cached_property
+    def power(self):
+        """พลังเลขตามตำแหน่ง (N, 10)"""
+        return POWER_TABLE[self.digits]
+
+    @cached_property
+    def power_sum(self):
+        return self.power.sum(axis=1)
+
+    @cached_property
+    def digit_sum(self):
+        return self.d.sum(axis=1)
+
+    @cached_property
+    def is_power_digit(self):
+        """ตัวเลขอยู่ใน '56899' หรือไม่ (N, 10)"""
+        return POWER_DIGIT_TABLE[self.digits].astype(bool)
+
+    @cached_property
+    def eq(self):
+        """ตัวเลขติดกันเท่ากัน (N, 9)"""
+        return self.digits[:, 1:] == self.digits[:, :-1]
+
+    @cached_property
+    def step(self):
+        """ผลต่างตัวเลขติดกัน (N, 9)"""
+        return self.d[:, 1:] - self.d[:, :-1]
+
+    @cached_property
+    def asc(self):
+        return self.step == 1
+
+    @cached_property
+    def desc(self):
+        return self.step == -1
+
+    @cached_property
+    def run_lengths(self):
+        """ความยาว run ของเลขซ้ำที่จบ ณ แต่ละตำแหน่ง (N, 10)"""
+        runs = np.ones((len(self), N_DIGITS), dtype=np.int64)
+        for i in range(1, N_DIGITS):
+            runs[:, i] = np.where(self.eq[:, i - 1], runs[:, i - 1] + 1, 1)
+        return runs
+
+    @cached_property
+    def max_run(self):
+        return self.run_lengths.max(axis=1)
+
+    @cached_property
+    def mirror(self):
+        """n[j] == n[9-j] สำหรับ j = 0..4 (N, 5)"""
+        return self.digits[:, :5] == self.digits[:, :4:-1]
+
+    @cached_property
+    def pairs(self):
+        """รหัสคู่เลข 2 ตัว (N, 9)"""
+        return self.windows(2)
+
+    @cached_property
+    def codes(self):
+        """รหัสเบอร์ทั้ง 10 หลักเป็น int64 (ใช้เป็น key)"""
+        return self.prefix_code(N_DIGITS)
+
+    @cached_property
+    def last_4(self):
+        return self.digits[:, 6:]
+
+    @cached_property
+    def last_4_unique(self):
+        tail = self.last_4
+        distinct = np.ones(len(self), dtype=np.int64)
+        for i in range(1, 4):
+            distinct += (tail[:, i:i + 1] != tail[:, :i]).all(axis=1)
+        return distinct
+
+    def windows(self, length):
+        """รหัสตัวเลขของทุก substring ความยาว length (N, 11 - length)"""
+        cache = self.__dict__.setdefault('_windows', {})
+        if length not in cache:
+            n_windows = N_DIGITS - length + 1
+            codes = np.zeros((len(self), n_windows), dtype=np.int64)
+            for k in range(length):
+                codes = codes * 10 + self.d[:, k:k + n_windows]
+            cache[length] = codes
+        return cache[length]
+
+    def suffix_code(self, length):
+        """รหัสตัวเลขของ length ตัวท้าย"""
+        return self.windows(length)[:, -1]
+
+    def prefix_code(self, length):
+        """รหัสตัวเลขของ length ตัวแรก"""
+        return self.windows(length)[:, 0]
+
+    @cached_property
+    def pattern_matches(self):
+        """Match list ของ SEQUENCE_MATCHER ทั้ง batch: (rows, pattern_ids, starts)"""
+        return SEQUENCE_MATCHER.scan_windows(self.windows)
+
+    def _pattern_matrix(self, where=None):
+        rows, pattern_ids, starts = self.pattern_matches
+        if where is not None:
+            mask = where(starts, SEQUENCE_MATCHER.lengths[pattern_ids])
+            rows, pattern_ids = rows[mask], pattern_ids[mask]
+        matrix = np.zeros((len(self), len(SEQUENCE_MATCHER.patterns)), dtype=bool)
+        matrix[rows, pattern_ids] = True
+        return matrix
+
+    @cached_property
+    def pattern_present(self):
+        """pattern อยู่ในเบอร์ (N, P)"""
+        return self._pattern_matrix()
+
+    @cached_property
+    def pattern_ends(self):
+        """n.endswith(pattern) (N, P)"""
+        return self._pattern_matrix(lambda start, length: start + length == N_DIGITS)
+
+    @cached_property
+    def pattern_in_tail(self):
+        """pattern in n[-4:] (N, P)"""
+        return self._pattern_matrix(lambda start, length: start >= N_DIGITS - 4)
+
+    @cached_property
+    def pattern_in_head(self):
+        """pattern in n[:3] (N, P)"""
+        return self._pattern_matrix(lambda start, length: start + length <= 3)
+
+    def hits(self, key):
+        """ตำแหน่งที่ substring key ปรากฏ (N, 11 - len(key))"""
+        return self.windows(len(key)) == int(key)
+
+    def contains(self, key):
+        """key in n"""
+        return self.hits(key).any(axis=1)
+
+    def contains_any(self, keys):
+        result = np.zeros(len(self), dtype=bool)
+        for key in keys:
+            result |= self.contains(key)
+        return result
+
+# ====================================================================================
+# HELPERS
+# ====================================================================================
+
+def _sequential_sum(terms):
+    """รวมคอลัมน์จากซ้ายไปขวา ให้ลำดับการบวก float ตรงกับ sum() ของ Python"""
+    total = terms[:, 0].astype(np.float64)
+    for k in range(1, terms.shape[1]):
+        total = total + terms[:, k]
+    return total
+
+def _block_repeat(dm, length):
+    """has_repeating_pattern / has_repeated_block"""
+    shifted = dm.digits[:, length:] == dm.digits[:, :-length]
+    result = np.zeros(len(dm), dtype=bool)
+    for i in range(N_DIGITS - length * 2 + 1):
+        result |= shifted[:, i:i + length].all(axis=1)
+    return result.astype(np.int64)
+
+def _table_suffixes(dm, name, lengths=(4, 3, 2)):
+    """
+    ค่า suffix ของ table แยกตามความยาว จาก match list
+
+    Returns:
+    --------
+    list of (length, found, value)
+    """
+    suffixes = []
+    for length in lengths:
+        ids = SEQUENCE_MATCHER.table_ids(name, length)
+        values = SEQUENCE_MATCHER.table_values(name, length)
+        ends = dm.pattern_ends[:, ids]
+        # suffix ความยาวเดียวกันตรงได้อย่างมากหนึ่ง key
+        found = ends.any(axis=1)
+        value = np.where(ends, values, 0).sum(axis=1) if len(ids) else np.zeros(len(dm))
+        suffixes.append((length, found, value))
+    return suffixes
+
+def _suffix_lookup(dm, name):
+    """ค่าจาก table suffix (4 → 3 → 2 ตัวท้าย) แบบ first match"""
+    value = np.zeros(len(dm), dtype=np.float64)
+    length_used = np.zeros(len(dm), dtype=np.int64)
+    for length, found, suffix_value in _table_suffixes(dm, name):
+        hit = found & (length_used == 0)
+        value[hit] = suffix_value[hit]
+        length_used[hit] = length
+    return value, length_used
+
+def _count_runs(flags):
+    """จำนวน run ของ True ที่ต่อเนื่องกัน"""
+    return flags[:, 0].astype(np.int64) + (flags[:, 1:] & ~flags[:, :-1]).sum(axis=1)
+
+def _positional_sequence_scores(dm, name, end_mult, tail_mult=None, head_mult=None, additive=True):
+    """
+    คะแนนจาก table sequence ที่ได้จาก match list
+    บวกตามลำดับ key ของ table (เหมือน loop ใน scalar function)
+    """
+    ids = SEQUENCE_MATCHER.table_ids(name)
+    scores = SEQUENCE_MATCHER.table_values(name)
+    present = dm.pattern_present[:, ids]
+    ends = dm.pattern_ends[:, ids]
+    if additive:
+        terms = [np.where(present, scores, 0), np.where(ends, scores * end_mult, 0)]
+    else:
+        base = np.where(ends, scores * end_mult,
+               np.where(dm.pattern_in_tail[:, ids], scores * tail_mult,
+               np.where(dm.pattern_in_head[:, ids], scores * head_mult, scores)))
+        terms = [np.where(present, base, 0)]
+    # สลับคอลัมน์ให้เป็น key1, bonus1, key2, bonus2, ...
+    ordered = np.stack(terms, axis=2).reshape(len(dm), -1)
+    return _sequential_sum(np.column_stack([np.zeros(len(dm)), ordered]))
+
+# ====================================================================================
+# BASIC FEATURES
+# ====================================================================================
+
+def digit_sum(dm):
+    return dm.digit_sum
+
+def unique_digits(dm):
+    return dm.unique
+
+def max_consecutive(dm):
+    return dm.max_run
+
+def has_pattern_2(dm):
+    return _block_repeat(dm, 2)
+
+def has_pattern_3(dm):
+    return _block_repeat(dm, 3)
+
+def good_digit_count(dm):
+    return GOOD_DIGIT_TABLE[dm.digits].sum(axis=1)
+
+def bad_digit_count(dm):
+    return BAD_DIGIT_TABLE[dm.digits].sum(axis=1)
+
+def premium_pair_count(dm):
+    return PREMIUM_PAIR_TABLE[dm.pairs].sum(axis=1)
+
+def ending_score(dm):
+    value, _ = _suffix_lookup(dm, 'ENDING_PREMIUM')
+    return value.astype(np.int64)
+
+def sequence_score(dm):
+    ids = SEQUENCE_MATCHER.table_ids('LUCKY_SEQUENCES')
+    scores = SEQUENCE_MATCHER.table_values('LUCKY_SEQUENCES')
+    return np.where(dm.pattern_present[:, ids], scores, 0).sum(axis=1)
+
+def has_triple(dm):
+    return (dm.max_run >= 3).astype(np.int64)
+
+def has_quad(dm):
+    return (dm.max_run >= 4).astype(np.int64)
+
+def ascending_count(dm):
+    return dm.asc.sum(axis=1)
+
+def descending_count(dm):
+    return dm.desc.sum(axis=1)
+
+def mirror_pattern(dm):
+    full = dm.mirror.all(axis=1)
+    partial = dm.mirror[:, :3].all(axis=1)
+    return np.where(full, 2, np.where(partial, 1, 0))
+
+def complexity_score(dm):
+    return COMPLEXITY_TABLE[dm.unique]
+
+def power_sum(dm):
+    return dm.power_sum
+
+def special_lucky_score(dm):
+    return SPECIAL_LUCKY_TABLE[dm.pairs].sum(axis=1)
+
+def mystical_pair_score(dm):
+    return MYSTICAL_PAIR_TABLE[dm.pairs].sum(axis=1)
+
+def has_forbidden(dm):
+    return FORBIDDEN_PAIR_TABLE[dm.pairs].any(axis=1).astype(np.int64)
+
+def digit_count(dm, digit):
+    return dm.counts[:, digit]
+
+def position_power(dm, position):
+    return dm.power[:, position]
+
+# ====================================================================================
+# ADVANCED FEATURES V3.0
+# ====================================================================================
+
+def sum_diff_halves(dm):
+    return np.abs(dm.d[:, :5].sum(axis=1) - dm.d[:, 5:].sum(axis=1))
+
+def num_peaks(dm):
+    mid = dm.d[:, 1:-1]
+    return ((mid > dm.d[:, :-2]) & (mid > dm.d[:, 2:])).sum(axis=1)
+
+def num_valleys(dm):
+    mid = dm.d[:, 1:-1]
+    return ((mid < dm.d[:, :-2]) & (mid < dm.d[:, 2:])).sum(axis=1)
+
+def longest_increasing(dm):
+    d = dm.d
+    lis = np.ones((len(dm), N_DIGITS), dtype=np.int64)
+    for i in range(1, N_DIGITS):
+        for j in range(i):
+            lis[:, i] = np.where(d[:, i] > d[:, j], np.maximum(lis[:, i], lis[:, j] + 1), lis[:, i])
+    return lis.max(axis=1)
+
+def digit_entropy(dm):
+    # Counter() เรียง key ตามตำแหน่งที่พบครั้งแรก จึงบวกตามลำดับเดียวกัน
+    counts = dm.counts
+    first_pos = np.full((len(dm), 10), N_DIGITS, dtype=np.int64)
+    for i in range(N_DIGITS - 1, -1, -1):
+        first_pos[np.arange(len(dm)), dm.digits[:, i]] = i
+    probs = counts / N_DIGITS
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = np.where(counts > 0, probs * np.log2(probs), 0.0)
+    order = np.argsort(first_pos, axis=1, kind='stable')
+    return -_sequential_sum(np.take_along_axis(terms, order, axis=1))
+
+def run_length_encoding(dm):
+    return 1 + (~dm.eq).sum(axis=1)
+
+def digit_distance_sum(dm):
+    return np.abs(dm.step).sum(axis=1)
+
+def unique_ratio(dm):
+    return dm.unique / N_DIGITS
+
+def has_arithmetic_seq(dm):
+    step = dm.step
+    return ((step[:, 1:] == step[:, :-1]) & (step[:, :-1] != 0)).any(axis=1).astype(np.int64)
+
+def _n_distinct(codes):
+    ordered = np.sort(codes, axis=1)
+    return 1 + (ordered[:, 1:] != ordered[:, :-1]).sum(axis=1)
+
+def num_unique_pairs(dm):
+    return _n_distinct(dm.pairs)
+
+def num_unique_triplets(dm):
+    return _n_distinct(dm.windows(3))
+
+def num_unique_no_zero(dm):
+    return (dm.counts[:, 1:] > 0).sum(axis=1)
+
+def power_digit_ratio(dm):
+    return dm.is_power_digit.sum(axis=1) / N_DIGITS
+
+def weighted_power_score(dm):
+    return (dm.d * dm.power).sum(axis=1)
+
+# ====================================================================================
+# FEATURES V2.0
+# ====================================================================================
+
+def digit_variance(dm):
+    return np.var(dm.d, axis=1)
+
+def alternating_pattern_score(dm):
+    d = dm.digits
+    return ((d[:, :-2] == d[:, 2:]) & (d[:, :-2] != d[:, 1:-1])).sum(axis=1) * 10
+
+def ascending_sequences(dm):
+    return _count_runs(dm.asc)
+
+def descending_sequences(dm):
+    return _count_runs(dm.desc)
+
+def symmetry_score(dm):
+    score = np.where(dm.mirror.all(axis=1), 50, 0)
+    for length in [2, 3, 4]:
+        score = score + np.where(dm.mirror[:, :length].all(axis=1), length * 5, 0)
+    return score
+
+def has_lucky_combo(dm):
+    ids = SEQUENCE_MATCHER.table_ids('LUCKY_COMBOS')
+    return dm.pattern_present[:, ids].any(axis=1).astype(np.int64)
+
+def first_4_sum(dm):
+    return dm.d[:, :4].sum(axis=1)
+
+def middle_2_sum(dm):
+    return dm.d[:, 4:6].sum(axis=1)
+
+def last_4_sum(dm):
+    return dm.d[:, 6:].sum(axis=1)
+
+def middle_section_power(dm):
+    middle = dm.digits[:, 3:7]
+    all_same = (middle == middle[:, :1]).all(axis=1)
+    repeating = (middle[:, 0] == middle[:, 2]) & (middle[:, 1] == middle[:, 3])
+    power_count = dm.is_power_digit[:, 3:7].sum(axis=1)
+    return np.where(all_same, 40, 0) + np.where(repeating, 20, 0) + power_count * 5
+
+def max_ending_score(dm):
+    tail = dm.last_4
+    code = dm.suffix_code(4)
+    unique = dm.last_4_unique
+    perfect = np.isin(code, [8888, 9999, 6666, 5555, 1688, 2688])
+
+    # AAAB: เลขใดเลขหนึ่งซ้ำ 3 ตัว
+    has_three = np.zeros(len(dm), dtype=bool)
+    for i in range(4):
+        has_three |= (tail == tail[:, i:i + 1]).sum(axis=1) == 3
+
+    step = np.diff(tail.astype(np.int64), axis=1)
+    sequential = (step == 1).all(axis=1) | (step == -1).all(axis=1)
+
+    score = np.select(
+        [unique == 1, unique == 2, unique == 3],
+        [150, np.where(has_three, 100, 80), 50],
+        default=np.where(sequential, 60, 20)
+    )
+    return np.where(perfect, 200, score)
+
+def _repeat_scores(dm):
+    power = dm.is_power_digit
+    eq = dm.eq
+    triple = eq[:, :-1] & eq[:, 1:]
+    quad = triple[:, :-1] & eq[:, 2:]
+    double_score = (eq * (5 + 5 * power[:, :-1])).sum(axis=1)
+    triple_score = (triple * (20 + 10 * power[:, :-2])).sum(axis=1)
+    quad_score = (quad * (50 + 25 * power[:, :-3])).sum(axis=1)
+    return double_score, triple_score, quad_score
+
+def double_score(dm):
+    return _repeat_scores(dm)[0]
+
+def triple_score(dm):
+    return _repeat_scores(dm)[1]
+
+def quad_score(dm):
+    return _repeat_scores(dm)[2]
+
+def digit_spread(dm, digit):
+    present = dm.digits == digit
+    positions = np.arange(N_DIGITS)
+    last_pos = np.where(present, positions, -1).max(axis=1)
+    first_pos = np.where(present, positions, N_DIGITS).min(axis=1)
+    return np.where(dm.counts[:, digit] > 1, last_pos - first_pos, 0)
+
+def digit_in_end(dm, digit):
+    return (dm.digits[:, 6:] == digit).any(axis=1).astype(np.int64)
+
+# ====================================================================================
+# MASTER FEATURES V4.0
+# ====================================================================================
+
+def position_weights(dm):
+    return _sequential_sum(dm.d * POSITION_WEIGHTS)
+
+def ending_pattern_type(dm):
+    tail = dm.last_4
+    unique = dm.last_4_unique
+    triple_plus = ((tail[:, 0] == tail[:, 1]) & (tail[:, 1] == tail[:, 2])) | \
+                  ((tail[:, 1] == tail[:, 2]) & (tail[:, 2] == tail[:, 3]))
+    label = np.select(
+        [unique == 1, unique == 2, unique == 3],
+        [3, np.where(triple_plus, 4, 1), 2],
+        default=0
+    )
+    return ENDING_PATTERN_LABELS[label]
+
+def prefix_score(dm):
+    code = dm.prefix_code(3)
+    table, found = PREFIX_SPECIAL_TABLES
+    return np.where(found[code], table[code], dm.power[:, :3].sum(axis=1)).astype(np.int64)
+
+def middle_pattern_score(dm):
+    middle = dm.digits[:, 3:7]
+    all_same = (middle == middle[:, :1]).all(axis=1)
+    repeating = (middle[:, 0] == middle[:, 2]) & (middle[:, 1] == middle[:, 3])
+    ascending = dm.asc[:, 3:6].all(axis=1)
+    return np.select([all_same, repeating, ascending], [40, 20, 30], default=0)
+
+def weighted_sum_score(dm):
+    return _sequential_sum(dm.d * POSITION_WEIGHTS + dm.power * POSITION_WEIGHTS)
+
+def special_to_power_ratio(dm):
+    special = dm.is_power_digit.sum(axis=1)
+    normal = N_DIGITS - special
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(normal == 0, 10.0, special / normal)
+
+def power_to_sum_ratio(dm):
+    total = dm.digit_sum
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total == 0, 0.0, dm.power_sum / total)
+
+def ending_power_concentration(dm):
+    total = dm.power_sum
+    ending = dm.power[:, 6:].sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        concentration = ending / total
+    concentration = np.where(ending > 15, concentration * 1.5, concentration)
+    return np.where(total == 0, 0.0, concentration * 100)
+
+def negative_pairs_count(dm):
+    return FORBIDDEN_PAIR_TABLE[dm.pairs].sum(axis=1)
+
+def investment_grade_score(dm):
+    code = dm.suffix_code(4)
+    score = np.where(np.isin(code, [8888, 9999, 6666, 5555]), 100,
+            np.where(np.isin(code, [8899, 6688, 5566]), 80,
+            np.where(dm.last_4_unique == 1, 60, 0)))
+    score = score + np.where(dm.contains_any(['888', '999']), 40, 0)
+    score = score + np.where(dm.contains_any(['168', '268']), 30, 0)
+    unique_ratio_ = dm.unique / N_DIGITS
+    score = score + np.where(unique_ratio_ < 0.3, 50, np.where(unique_ratio_ < 0.5, 30, 0))
+    return score
+
+def market_tier_score(dm):
+    eq = dm.eq
+    last_5_same = eq[:, 5:].all(axis=1)
+    last_7_same = eq[:, 3:].all(axis=1)
+    return np.select(
+        [
+            last_5_same | last_7_same,
+            dm.last_4_unique == 1,
+            dm.contains_any(['8888', '9999', '6666', '123456', '234567']),
+            dm.contains_any(['888', '999', '666', '168', '268']),
+            eq[:, 7:].all(axis=1) | (dm.pairs[:, 6:] == 88).any(axis=1) | (dm.pairs[:, 6:] == 99).any(axis=1)
+        ],
+        [1000, 800, 600, 400, 200],
+        default=100
+    )
+
+def has_triple_power(dm):
+    eq = dm.eq
+    triple = eq[:, :-1] & eq[:, 1:] & dm.is_power_digit[:, :-2]
+    return triple.any(axis=1).astype(np.int64)
+
+def position_weighted_score(dm):
+    return _sequential_sum((dm.d + dm.power) * POSITION_WEIGHTS_ADVANCED)
+
+def ending_power_score(dm):
+    score = np.zeros(len(dm), dtype=np.float64)
+    for length, found, value in _table_suffixes(dm, 'ENDING_PREMIUM'):
+        score = score + np.where(found, value * (length / 2), 0)
+    score = score + dm.is_power_digit[:, 6:].sum(axis=1) * 10
+    unique = dm.last_4_unique
+    return np.where(unique == 1, score * 3, np.where(unique == 2, score * 1.5, score))
+
+def mirror_score(dm):
+    d = dm.digits
+    score = np.where(dm.mirror.all(axis=1), 100, 0)
+    for length in [2, 3, 4, 5]:
+        for i in range(N_DIGITS - length * 2 + 1):
+            matched = np.ones(len(dm), dtype=bool)
+            for k in range(length):
+                matched &= d[:, i + k] == d[:, i + 2 * length - 1 - k]
+            score = score + np.where(matched, length * 10, 0)
+    tail_2 = (d[:, 8] == d[:, 7]) & (d[:, 9] == d[:, 6])
+    tail_3 = (d[:, 7] == d[:, 6]) & (d[:, 8] == d[:, 5]) & (d[:, 9] == d[:, 4])
+    return score + np.where(tail_2, 30, 0) + np.where(tail_3, 50, 0)
+
+def number_balance(dm):
+    diff = sum_diff_halves(dm)
+    return np.select([diff == 0, diff <= 5, diff <= 10], [50, 30, 15], default=0)
+
+def famous_sequence_score(dm):
+    return _positional_sequence_scores(dm, 'FAMOUS_SEQUENCES', end_mult=0.5)
+
+def famous_sequence_score_advanced(dm):
+    return _positional_sequence_scores(dm, 'FAMOUS_SEQUENCES', end_mult=2.5,
+                                       tail_mult=1.8, head_mult=1.3, additive=False)
+
+def wave_pattern(dm):
+    sign = np.sign(dm.step)
+    previous = np.zeros(len(dm), dtype=np.int64)
+    n_changes = np.zeros(len(dm), dtype=np.int64)
+    wave_count = np.zeros(len(dm), dtype=np.int64)
+    for i in range(N_DIGITS - 1):
+        current = sign[:, i]
+        nonzero = current != 0
+        wave_count += nonzero & (previous != 0) & (current != previous)
+        n_changes += nonzero
+        previous = np.where(nonzero, current, previous)
+    return np.where((n_changes >= 3) & (wave_count >= 3), wave_count * 10, 0)
+
+def rarity_score(dm):
+    unique = dm.unique
+    max_repeat = dm.counts.max(axis=1)
+    score = np.where(unique <= 2, 100, np.where(unique <= 3, 60, 0))
+    score = score + np.where(max_repeat >= 5, 80, np.where(max_repeat >= 4, 50, 0))
+    special = dm.pattern_present[:, SEQUENCE_MATCHER.table_ids('RARITY_SEQUENCES')].any(axis=1)
+    return score + np.where(special, 70, 0)
+
+def mathematical_beauty_score(dm):
+    pairs = dm.pairs
+    score = FIB_PAIR_TABLE[pairs].sum(axis=1) * 20
+    score = score + SQUARE_PAIR_TABLE[pairs].sum(axis=1) * 15
+    step = dm.step
+    score = score + np.where((step == step[:, :1]).all(axis=1), 40, 0)
+    d = dm.digits
+    alternating = (d[:, ::2] == d[:, :1]).all(axis=1) & (d[:, 1::2] == d[:, 1:2]).all(axis=1)
+    return score + np.where(alternating, 30, 0)
+
+def abc_position_score_advanced(dm):
+    score = (dm.power * ABC_MULTIPLIERS).sum(axis=1)
+    return score + dm.is_power_digit[:, ABC_A_POSITIONS].sum(axis=1) * 10
+
+# ====================================================================================
+# SPECIAL FEATURES V5.0
+# ====================================================================================
+
+def special_lucky_score_advanced(dm):
+    pair_scores = SPECIAL_LUCKY_TABLE[dm.pairs].astype(np.float64)
+    multipliers = np.array([1, 1, 1, 1.5, 1.5, 1.5, 2.5, 2.5, 2.5])
+    score = _sequential_sum(np.column_stack([np.zeros(len(dm)), pair_scores * multipliers]))
+    triples = np.isin(dm.windows(3), [888, 999, 666, 168, 268, 369]).sum(axis=1)
+    score = score + triples * 50
+    score = score + np.where(dm.counts[:, 8] >= 4, 100, 0)
+    return score + np.where(dm.counts[:, 9] >= 3, 80, 0)
+
+def market_demand_score(dm):
+    demand = _positional_sequence_scores(dm, 'MARKET_POPULAR_PATTERNS', end_mult=0.5)
+    tail_4_same = dm.last_4_unique == 1
+    tail_3_same = dm.eq[:, 7:].all(axis=1)
+    demand = demand + np.where(tail_4_same, 150, np.where(tail_3_same, 80, 0))
+    return demand + np.where(dm.unique <= 4, 60, 0)
+
+def tier_classification_score(dm):
+    code = dm.suffix_code(4)
+    eq = dm.eq
+    tail_triples = np.isin(dm.windows(3)[:, 6:], [888, 999, 168, 268]).any(axis=1)
+    double_56789 = (eq & (dm.digits[:, 1:] >= 5)).any(axis=1)
+    classification = np.select(
+        [
+            np.isin(code, [8888, 9999, 6666, 5555]),
+            dm.last_4_unique == 1,
+            dm.contains_any(['888888', '999999', '123456']),
+            tail_triples,
+            eq[:, 7:].all(axis=1) | double_56789
+        ],
+        [1000, 800, 600, 400, 200],
+        default=100
+    )
+    return np.where(dm.unique <= 3, classification * 1.5, classification)
+
+def premium_suffix_score(dm):
+    value, length = _suffix_lookup(dm, 'PREMIUM_SUFFIX_WEIGHTS')
+    return value * length
+
+def premium_prefix_score(dm):
+    return PREMIUM_PREFIX_TABLE[dm.prefix_code(3)]
+
+def high_digit_ratio(dm):
+    return HIGH_DIGIT_TABLE[dm.digits].sum(axis=1) / N_DIGITS
+
+def high_digit_tail_ratio(dm):
+    return HIGH_DIGIT_TABLE[dm.last_4].sum(axis=1) / 4
+
+def high_digit_cluster_score(dm):
+    high = HIGH_DIGIT_TABLE[dm.digits].astype(bool)
+    cluster = np.zeros(len(dm), dtype=np.int64)
+    max_cluster = np.zeros(len(dm), dtype=np.int64)
+    for i in range(N_DIGITS):
+        cluster = np.where(high[:, i], cluster + 1, 0)
+        max_cluster = np.maximum(max_cluster, cluster)
+    tail_bonus = np.where(high[:, -1] & high[:, -2], 1.5, 0)
+    return np.where(max_cluster == 0, 0.0, max_cluster * 1.0 + tail_bonus)
+
+def pair_diversity_score(dm):
+    return _n_distinct(dm.pairs) / (N_DIGITS - 1)
+
+def rare_digit_penalty(dm):
+    return RARE_DIGIT_TABLE[dm.digits].sum(axis=1) / N_DIGITS
+
+# ====================================================================================
+# PREFIX / SUFFIX BLOCK TABLES
+# ====================================================================================
+
+SUFFIX_BLOCK_LENGTH = 4
+PREFIX_BLOCK_LENGTH = 3
+
+class BlockTable:
+    """
+    Feature table สำหรับทุกค่าของ block ตัวเลข (prefix หรือ suffix)
+
+    Features ที่ขึ้นกับ block เดียวถูกคำนวณครั้งเดียวต่อค่า block
+    (10,000 แถวสำหรับ 4 ตัวท้าย) แล้วแต่ละเบอร์ได้ค่าด้วย integer-index gather
+
+    Parameters:
+    -----------
+    length : int
+        Number of digits in the block
+    position : str
+        'suffix' or 'prefix'
+    """
+
+    def __init__(self, length, position='suffix'):
+        if position not in ('suffix', 'prefix'):
+            raise ValueError("position must be 'suffix' or 'prefix'")
+        self.length = length
+        self.position = position
+        self._tables = {}
+
+    @cached_property
+    def matrix(self):
+        """DigitMatrix ของทุกค่า block (ตำแหน่งอื่นเป็น 0)"""
+        codes = np.arange(10 ** self.length)
+        block = (codes[:, None] // 10 ** np.arange(self.length - 1, -1, -1)) % 10
+        digits = np.zeros((len(codes), N_DIGITS), dtype=np.uint8)
+        if self.position == 'suffix':
+            digits[:, N_DIGITS - self.length:] = block
+        else:
+            digits[:, :self.length] = block
+        return DigitMatrix(digits)
+
+    def codes(self, dm):
+        """รหัส block ของแต่ละเบอร์"""
+        if self.position == 'suffix':
+            return dm.suffix_code(self.length)
+        return dm.prefix_code(self.length)
+
+    def table(self, func):
+        """ตารางค่า feature ของทุก block (สร้างครั้งแรกที่ใช้)"""
+        table = self._tables.get(func)
+        if table is None:
+            table = self._tables[func] = np.asarray(func(self.matrix))
+        return table
+
+    def lookup(self, func, dm):
+        return self.table(func)[self.codes(dm)]
+
+    def clear(self):
+        self._tables.clear()
+
+SUFFIX_BLOCK = BlockTable(SUFFIX_BLOCK_LENGTH, 'suffix')
+PREFIX_BLOCK = BlockTable(PREFIX_BLOCK_LENGTH, 'prefix')
+
+def block_feature(func, block):
+    """ห่อ feature ที่ขึ้นกับ block เดียวให้ใช้ gather จาก BlockTable"""
+    def gather(dm):
+        return block.lookup(func, dm)
+    gather.__name__ = getattr(func, '__name__', 'block_feature')
+    gather.__doc__ = func.__doc__
+    gather.block = block
+    gather.compute = func
+    return gather
+
+def suffix_feature(func):
+    """feature ที่ขึ้นกับ 4 ตัวท้ายเท่านั้น"""
+    return block_feature(func, SUFFIX_BLOCK)
+
+def prefix_feature(func):
+    """feature ที่ขึ้นกับ 3 ตัวแรกเท่านั้น"""
+    return block_feature(func, PREFIX_BLOCK)
+
+# ====================================================================================
+# FEATURE GROUPS (same column order as create_masterpiece_features)
+# ====================================================================================
+
+BASIC_FEATURES = [
+    ('digit_sum', digit_sum),
+    ('unique_digits', unique_digits),
+    ('max_consecutive', max_consecutive),
+    ('has_pattern_2', has_pattern_2),
+    ('has_pattern_3', has_pattern_3),
+    ('good_digit_count', good_digit_count),
+    ('bad_digit_count', bad_digit_count),
+    ('premium_pair_count', premium_pair_count),
+    ('ending_score', suffix_feature(ending_score)),
+    ('sequence_score', sequence_score),
+    ('has_triple', has_triple),
+    ('has_quad', has_quad),
+    ('ascending_count', ascending_count),
+    ('descending_count', descending_count),
+    ('mirror_pattern', mirror_pattern),
+    ('complexity_score', complexity_score),
+    ('power_sum', power_sum),
+    ('special_lucky_score', special_lucky_score),
+    ('mystical_pair_score', mystical_pair_score),
+    ('has_forbidden', has_forbidden),
+] + [
+    (f'count_{digit}', lambda dm, digit=digit: digit_count(dm, digit)) for digit in range(10)
+] + [
+    (f'pos_{i}_power', lambda dm, i=i: position_power(dm, i)) for i in range(10)
+]
+
+ADVANCED_FEATURES = [
+    ('sum_diff_halves', sum_diff_halves),
+    ('num_peaks', num_peaks),
+    ('num_valleys', num_valleys),
+    ('longest_increasing', longest_increasing),
+    ('digit_entropy', digit_entropy),
+    ('run_length_encoding', run_length_encoding),
+    ('digit_distance_sum', digit_distance_sum),
+    ('unique_ratio', unique_ratio),
+    ('has_arithmetic_seq', has_arithmetic_seq),
+    ('num_unique_pairs', num_unique_pairs),
+    ('num_unique_triplets', num_unique_triplets),
+    ('num_unique_no_zero', num_unique_no_zero),
+    ('power_digit_ratio', power_digit_ratio),
+    ('weighted_power_score', weighted_power_score),
+    ('digit_variance', digit_variance),
+    ('alternating_pattern_score', alternating_pattern_score),
+    ('ascending_sequences', ascending_sequences),
+    ('descending_sequences', descending_sequences),
+    ('has_repeated_block_2', has_pattern_2),
+    ('has_repeated_block_3', has_pattern_3),
+    ('max_consecutive_same', max_consecutive),
+    ('symmetry_score', symmetry_score),
+    ('has_lucky_combo', has_lucky_combo),
+    ('first_4_sum', first_4_sum),
+    ('middle_2_sum', middle_2_sum),
+    ('last_4_sum', suffix_feature(last_4_sum)),
+    ('middle_section_power', middle_section_power),
+    ('max_ending_score', suffix_feature(max_ending_score)),
+    ('double_score', double_score),
+    ('triple_score', triple_score),
+    ('quad_score', quad_score),
+]
+for _digit in range(10):
+    ADVANCED_FEATURES += [
+        (f'digit_{_digit}_count', lambda dm, digit=_digit: digit_count(dm, digit)),
+        (f'digit_{_digit}_spread', lambda dm, digit=_digit: digit_spread(dm, digit)),
+        (f'digit_{_digit}_in_end', suffix_feature(lambda dm, digit=_digit: digit_in_end(dm, digit))),
+    ]
+
+MASTER_FEATURES = [
+    ('position_weights', position_weights),
+    ('ending_pattern_type', suffix_feature(ending_pattern_type)),
+    ('prefix_score', prefix_feature(prefix_score)),
+    ('middle_pattern_score', middle_pattern_score),
+    ('weighted_sum_score', weighted_sum_score),
+    ('special_to_power_ratio', special_to_power_ratio),
+    ('power_to_sum_ratio', power_to_sum_ratio),
+    ('ending_power_concentration', ending_power_concentration),
+    ('negative_pairs_count', negative_pairs_count),
+    ('investment_grade_score', investment_grade_score),
+    ('market_tier_score', market_tier_score),
+    ('has_triple_power', has_triple_power),
+    ('position_weighted_score', position_weighted_score),
+    ('ending_power_score', suffix_feature(ending_power_score)),
+    ('mirror_score', mirror_score),
+    ('number_balance', number_balance),
+    ('famous_sequence_score', famous_sequence_score),
+    ('famous_sequence_score_advanced', famous_sequence_score_advanced),
+    ('wave_pattern', wave_pattern),
+    ('rarity_score', rarity_score),
+    ('mathematical_beauty_score', mathematical_beauty_score),
+    ('abc_position_score_advanced', abc_position_score_advanced),
+]
+
+SPECIAL_FEATURES = [
+    ('special_lucky_score_advanced', special_lucky_score_advanced),
+    ('market_demand_score', market_demand_score),
+    ('tier_classification_score', tier_classification_score),
+    ('premium_suffix_score', suffix_feature(premium_suffix_score)),
+    ('premium_prefix_score', prefix_feature(premium_prefix_score)),
+    ('high_digit_ratio', high_digit_ratio),
+    ('high_digit_tail_ratio', suffix_feature(high_digit_tail_ratio)),
+    ('high_digit_cluster_score', high_digit_cluster_score),
+    ('pair_diversity_score', pair_diversity_score),
+    ('rare_digit_penalty', rare_digit_penalty),
+]
+
+def add_feature_group(df, dm, group):
+    """เพิ่ม features ของ group ลงใน DataFrame (index เดียวกับ df)"""
+    for name, func in group:
+        df[name] = func(dm)
+    return df
@@ -0,0 +1,249 @@
+"""
+Single-Number Feature Fast Path
+Computes the feature vector of one phone number with the scalar functions of
+src.features, straight into a preallocated float32 buffer in the model's
+feature_names order. No DataFrame is built and no per-feature NumPy call is made
+for digit features; the number is scanned for sequence patterns once and every
+pattern-based feature reads that match set. Values equal the vectorized engine.
+"""
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from src import features as F
+from src.config import CONFIG
+from src.features import SEQUENCE_MATCHER
+from src.feature_registry import (
+    DEFAULT_MARKET_PRICE,
+    build_execution_plan,
+    market_tables
+)
+
+# ====================================================================================
+# SCALAR FEATURES
+# ====================================================================================
+
+# Multi-output scalar functions: computed once per number for all of their columns
+_double_triple_quad_scores = lru_cache(maxsize=8)(F.get_double_triple_quad_scores)
+_digit_positions = lru_cache(maxsize=64)(F.analyze_digit_positions_advanced)
+
+# Scalar implementation of every engine column (equal to the vectorized engine)
+SCALAR_FEATURES = {
+    'digit_sum': F.get_digit_sum,
+    'unique_digits': F.get_unique_digits,
+    'max_consecutive': F.get_max_consecutive_digit,
+    'has_pattern_2': lambda x: F.has_repeating_pattern(x, 2),
+    'has_pattern_3': lambda x: F.has_repeating_pattern(x, 3),
+    'good_digit_count': F.get_good_digit_count,
+    'bad_digit_count': F.get_bad_digit_count,
+    'premium_pair_count': F.get_premium_pair_count,
+    'ending_score': F.get_ending_score,
+    'sequence_score': F.get_sequence_score,
+    'has_triple': F.has_triple_repeat,
+    'has_quad': F.has_quad_repeat,
+    'ascending_count': F.get_ascending_count,
+    'descending_count': F.get_descending_count,
+    'mirror_pattern': F.has_mirror_pattern,
+    'complexity_score': F.get_complexity_score,
+    'power_sum': F.get_power_sum,
+    'special_lucky_score': F.get_special_lucky_score,
+    'mystical_pair_score': F.get_mystical_pair_score,
+    'has_forbidden': F.has_forbidden_pair,
+    'sum_diff_halves': F.get_sum_diff_halves,
+    'num_peaks': F.get_num_peaks,
+    'num_valleys': F.get_num_valleys,
+    'longest_increasing': F.get_longest_increasing_subsequence,
+    'digit_entropy': F.get_digit_entropy,
+    'run_length_encoding': F.get_run_length_encoding_size,
+    'digit_distance_sum': F.get_digit_distance_sum,
+    'unique_ratio': F.get_unique_digit_ratio,
+    'has_arithmetic_seq': F.has_arithmetic_sequence,
+    'num_unique_pairs': F.get_num_unique_pairs,
+    'num_unique_triplets': F.get_num_unique_triplets,
+    'num_unique_no_zero': lambda x: len(set(x.replace('0', ''))),
+    'power_digit_ratio': lambda x: sum(1 for d in x if d in '56899') / len(x),
+    'weighted_power_score': lambda x: sum(int(d) * CONFIG['POWER_WEIGHTS'].get(d, 0) for d in x),
+    'digit_variance': F.get_digit_variance,
+    'alternating_pattern_score': F.get_alternating_pattern_score,
+    'ascending_sequences': F.get_ascending_sequences,
+    'descending_sequences': F.get_descending_sequences,
+    'has_repeated_block_2': F.has_repeated_block,
+    'has_repeated_block_3': lambda x: F.has_repeated_block(x, 3),
+    'max_consecutive_same': F.get_max_consecutive_same,
+    'symmetry_score': F.get_symmetry_score,
+    'has_lucky_combo': F.has_lucky_combo,
+    'first_4_sum': lambda x: sum(int(d) for d in x[:4]),
+    'middle_2_sum': lambda x: sum(int(d) for d in x[4:6]),
+    'last_4_sum': lambda x: sum(int(d) for d in x[6:]),
+    'middle_section_power': F.analyze_middle_section,
+    'max_ending_score': F.analyze_ending_pattern,
+    'double_score': lambda x: _double_triple_quad_scores(x)[0],
+    'triple_score': lambda x: _double_triple_quad_scores(x)[1],
+    'quad_score': lambda x: _double_triple_quad_scores(x)[2],
+    'position_weights': F.get_position_weights,
+    'ending_pattern_type': F.get_ending_pattern_type,
+    'prefix_score': F.get_prefix_score,
+    'middle_pattern_score': F.get_middle_pattern_score,
+    'weighted_sum_score': F.get_weighted_sum_score,
+    'special_to_power_ratio': F.get_special_to_normal_ratio,
+    'power_to_sum_ratio': F.get_power_to_sum_ratio,
+    'ending_power_concentration': F.get_ending_power_concentration,
+    'negative_pairs_count': F.get_negative_pairs_count,
+    'investment_grade_score': F.get_investment_grade_score,
+    'market_tier_score': F.get_market_tier_score,
+    'has_triple_power': F.has_triple_power_digit,
+    'position_weighted_score': F.calculate_position_weighted_score,
+    'ending_power_score': F.calculate_ending_power_score,
+    'mirror_score': F.calculate_mirror_score,
+    'number_balance': F.calculate_number_balance,
+    'famous_sequence_score': F.calculate_famous_sequence_score,
+    'famous_sequence_score_advanced': F.calculate_famous_sequence_score_advanced,
+    'wave_pattern': F.get_wave_pattern_score,
+    'rarity_score': F.calculate_rarity_score,
+    'mathematical_beauty_score': F.get_mathematical_beauty_score,
+    'abc_position_score_advanced': F.calculate_abc_position_score_advanced,
+    'special_lucky_score_advanced': F.get_special_lucky_score_advanced,
+    'market_demand_score': F.calculate_market_demand_score,
+    'tier_classification_score': F.get_tier_classification_score,
+    'premium_suffix_score': F.get_premium_suffix_score,
+    'premium_prefix_score': F.get_premium_prefix_score,
+    'high_digit_ratio': F.get_high_value_digit_ratio,
+    'high_digit_tail_ratio': F.get_high_digit_tail_ratio,
+    'high_digit_cluster_score': F.get_high_value_cluster_score,
+    'pair_diversity_score': F.get_pair_diversity_score,
+    'rare_digit_penalty': F.get_rare_digit_penalty,
+}
+# Scalar functions that accept the number's SEQUENCE_MATCHER.scan matches as a second argument
+PATTERN_FEATURES = frozenset([
+    'premium_suffix_score', 'ending_score', 'sequence_score', 'famous_sequence_score',
+    'famous_sequence_score_advanced', 'rarity_score', 'market_demand_score', 'has_lucky_combo'
+])
+
+for _digit in range(10):
+    SCALAR_FEATURES[f'count_{_digit}'] = lambda x, digit=_digit: x.count(str(digit))
+    SCALAR_FEATURES[f'pos_{_digit}_power'] = lambda x, i=_digit: CONFIG['POWER_WEIGHTS'].get(x[i], 0)
+    for _key in ['count', 'spread', 'in_end']:
+        SCALAR_FEATURES[f'digit_{_digit}_{_key}'] = (
+            lambda x, digit=_digit, key=_key: _digit_positions(x, digit)[key]
+        )
+
+# ====================================================================================
+# MARKET FEATURES
+# ====================================================================================
+
+def _table_value(tables, length, code, missing):
+    table = tables.get(length)
+    return missing if table is None else table[code]
+
+def scalar_market_features(number, market_stats=None):
+    """market_features ของเบอร์เดียว (same fallbacks and precedence as the engine)"""
+    if market_stats is None:
+        return {
+            'market_avg_price_4': DEFAULT_MARKET_PRICE,
+            'market_avg_price_3': DEFAULT_MARKET_PRICE,
+            'market_avg_price_2': DEFAULT_MARKET_PRICE,
+            'market_popularity_score': 0,
+            'market_premium_suffix_price': DEFAULT_MARKET_PRICE,
+        }
+
+    tables = market_tables(market_stats)
+    global_median = market_stats.get('global_median', DEFAULT_MARKET_PRICE)
+
+    columns = {}
+    premium_value = None
+    popularity_sum = 0.0
+    for length in [4, 3, 2]:
+        code = int(number[-length:])
+        avg_price = _table_value(tables['avg_prices'], length, code, np.nan)
+        columns[f'market_avg_price_{length}'] = global_median if np.isnan(avg_price) else float(avg_price)
+
+        # Longest premium suffix wins
+        premium = _table_value(tables['premium_suffix_stats'], length, code, np.nan)
+        if premium_value is None and not np.isnan(premium):
+            premium_value = float(premium)
+        popularity_sum += _table_value(tables['popularity'], length, code, 0)
+    columns['market_premium_suffix_price'] = global_median if premium_value is None else premium_value
+    columns['market_popularity_score'] = float(popularity_sum)
+
+    return columns
+
+# ====================================================================================
+# SINGLE-NUMBER FEATURE VECTOR
+# ====================================================================================
+
+class SingleNumberFeatures:
+    """
+    Compiled feature plan for one number at a time
+
+    Parameters:
+    -----------
+    feature_names : list
+        Model feature columns (output order). Unknown names are filled with 0
+        like the DataFrame serving path.
+    market_stats : dict, optional
+        Market statistics (dict or array tables)
+    """
+
+    def __init__(self, feature_names, market_stats=None):
+        self.feature_names = list(feature_names)
+        self.market_stats = market_stats
+        self.plan = build_execution_plan(self.feature_names)
+        self.scans_patterns = any(spec.name in PATTERN_FEATURES for spec in self.plan)
+        # Inputs of derived features are stored as NumPy scalars (same ufunc semantics as the batch path)
+        self.numpy_columns = frozenset(
+            dep for spec in self.plan if spec.source not in ('digits', 'market') for dep in spec.depends
+        )
+        self._local = threading.local()
+
+    @property
+    def buffer(self):
+        """Preallocated (1, n_features) float32 buffer (one per thread)"""
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = np.zeros((1, len(self.feature_names)), dtype=np.float32)
+        return buffer
+
+    def compute(self, number):
+        """
+        คำนวณ features ตาม plan ของเบอร์ที่ผ่านการตรวจสอบแล้ว
+
+        Returns:
+        --------
+        columns : dict
+            column -> scalar value
+        """
+        columns = {}
+        numpy_columns = self.numpy_columns
+        matches = SEQUENCE_MATCHER.scan(number) if self.scans_patterns else None
+        for spec in self.plan:
+            name = spec.name
+            if spec.source == 'digits':
+                func = SCALAR_FEATURES[name]
+                value = func(number, matches) if name in PATTERN_FEATURES else func(number)
+                columns[name] = np.asarray(value)[()] if name in numpy_columns else value
+            elif spec.source == 'market':
+                for column, value in scalar_market_features(number, self.market_stats).items():
+                    columns[column] = np.float64(value) if column in numpy_columns else value
+            else:
+                # Same NumPy ufuncs as the batch path, on NumPy scalars
+                values = spec.func(*[columns[dep] for dep in spec.depends])
+                columns[name] = values if isinstance(values, np.generic) else np.asarray(values).reshape(-1)[0]
+        return columns
+
+    def vector(self, number, out=None):
+        """
+        Feature vector in feature_names order
+
+        Parameters:
+        -----------
+        number : str
+            Cleaned 10-digit phone number
+        out : np.ndarray, optional
+            (1, n_features) buffer to fill (default: this thread's preallocated
+            buffer, overwritten by the next call)
+        """
+        columns = self.compute(number)
+        out = self.buffer if out is None else out
+        out[0] = [columns.get(name, 0) for name in self.feature_names]
+        return out
@@ -0,0 +1,105 @@
+"""
+Process-Pool Feature Generation for Large Datasets
+Shards phone numbers into chunks and computes the per-number (digit and market)
+features in worker processes. Derived features are computed afterwards on the
+reassembled columns so batch-level encodings stay identical to a serial run.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.config import BATCH_CONFIG
+
+DEFAULT_CHUNK_SIZE = 100000
+
+# Set once per worker process by the pool initializer
+_worker_market_stats = None
+
+def resolve_n_workers(n_workers=None):
+    """
+    จำนวน worker จาก argument หรือ BATCH_CONFIG
+
+    None -> BATCH_CONFIG (parallel_processing / n_workers), -1 -> ทุก CPU
+    """
+    if n_workers is None:
+        if not BATCH_CONFIG.get('parallel_processing', False):
+            return 1
+        n_workers = BATCH_CONFIG.get('n_workers', -1)
+    if n_workers is None or n_workers < 1:
+        n_workers = os.cpu_count() or 1
+    return max(1, int(n_workers))
+
+def resolve_chunk_size(chunk_size=None):
+    """ขนาด chunk จาก argument หรือ BATCH_CONFIG['feature_chunk_size']"""
+    if chunk_size is None:
+        chunk_size = BATCH_CONFIG.get('feature_chunk_size', DEFAULT_CHUNK_SIZE)
+    return max(1, int(chunk_size))
+
+def _init_worker(market_stats):
+    global _worker_market_stats
+    _worker_market_stats = market_stats
+
+def _compute_chunk(codes, spec_names):
+    from src.feature_engine import DigitMatrix
+    from src.feature_registry import FEATURE_REGISTRY
+
+    dm = DigitMatrix.from_codes(codes)
+    return {
+        name: FEATURE_REGISTRY[name].compute(dm, {}, _worker_market_stats)
+        for name in spec_names
+    }
+
+def compute_specs_parallel(dm, specs, market_stats=None, n_workers=None, chunk_size=None):
+    """
+    คำนวณ digit/market specs แบบขนานด้วย process pool
+
+    Parameters:
+    -----------
+    dm : DigitMatrix
+        Numbers to process
+    specs : list of FeatureSpec
+        Non-derived specs (each row depends only on its own number)
+    market_stats : dict, optional
+        Sent once to each worker (pool initializer), not per task
+    n_workers : int, optional
+        Worker processes (None = BATCH_CONFIG)
+    chunk_size : int, optional
+        Numbers per task (None = BATCH_CONFIG)
+
+    Returns:
+    --------
+    values : dict
+        spec name -> dict of column -> array (original row order)
+    """
+    n_workers = resolve_n_workers(n_workers)
+    chunk_size = resolve_chunk_size(chunk_size)
+    n_rows = len(dm)
+    spec_names = [spec.name for spec in specs]
+
+    if n_workers == 1 or n_rows <= chunk_size:
+        return {spec.name: spec.compute(dm, {}, market_stats) for spec in specs}
+
+    codes = dm.codes
+    starts = list(range(0, n_rows, chunk_size))
+    values = {}
+
+    with ProcessPoolExecutor(max_workers=min(n_workers, len(starts)),
+                             initializer=_init_worker, initargs=(market_stats,)) as executor:
+        futures = [
+            (start, executor.submit(_compute_chunk, codes[start:start + chunk_size], spec_names))
+            for start in starts
+        ]
+        for start, future in futures:
+            for spec_name, columns in future.result().items():
+                out = values.setdefault(spec_name, {})
+                for name, column in columns.items():
+                    column = np.asarray(column)
+                    target = out.get(name)
+                    if target is None:
+                        target = out[name] = np.empty(n_rows, dtype=column.dtype)
+                    elif target.dtype != column.dtype:
+                        target = out[name] = target.astype(np.result_type(target.dtype, column.dtype))
+                    target[start:start + len(column)] = column
+
+    return values
@@ -0,0 +1,443 @@
+"""
+Feature Registry for Phone Number Price Prediction
+Declares every column of create_masterpiece_features with its dependencies so that
+a model's feature_names can be turned into a minimal execution plan.
+"""
+import numpy as np
+
+from src.feature_engine import (
+    DigitMatrix,
+    BASIC_FEATURES,
+    ADVANCED_FEATURES,
+    MASTER_FEATURES,
+    SPECIAL_FEATURES,
+    ENDING_PATTERN_LABELS
+)
+
+# Columns that are computed only as inputs of other features and never returned
+INTERMEDIATE_FEATURES = {'ending_pattern_type'}
+
+# Input columns that are never features
+NON_FEATURE_COLUMNS = ['phone_number', 'price', 'sample_weight']
+
+DEFAULT_MARKET_PRICE = 5000
+
+# ====================================================================================
+# FEATURE SPEC
+# ====================================================================================
+
+class FeatureSpec:
+    """
+    Registry entry for one feature (or a group of features computed together)
+
+    Parameters:
+    -----------
+    name : str
+        Unique spec name
+    func : callable
+        'digits'  -> func(dm)
+        'derived' -> func(*dependency_arrays)
+        'market'  -> func(dm, market_stats) returning dict of columns
+    depends : list
+        Feature columns this spec reads
+    source : str
+        One of 'digits', 'derived', 'market'
+    outputs : list, optional
+        Columns produced (defaults to [name])
+    tables : list, optional
+        Scoring tables read directly (CONFIG keys or src.features constants)
+    """
+
+    def __init__(self, name, func, depends=(), source='digits', outputs=None, tables=()):
+        self.name = name
+        self.func = func
+        self.depends = tuple(depends)
+        self.source = source
+        self.outputs = tuple(outputs) if outputs else (name,)
+        self.tables = tuple(tables)
+
+    def compute(self, dm, columns, market_stats=None):
+        """คำนวณ feature และคืน dict ของ column -> array"""
+        if self.source == 'digits':
+            return {self.name: self.func(dm)}
+        if self.source == 'derived':
+            return {self.name: self.func(*[columns[dep] for dep in self.depends])}
+        return self.func(dm, market_stats)
+
+    def __repr__(self):
+        return f"FeatureSpec({self.name!r}, depends={list(self.depends)})"
+
+# ====================================================================================
+# MARKET FEATURES (from training statistics)
+# ====================================================================================
+
+def market_features(dm, market_stats=None):
+    """
+    Market features from training statistics (no data leakage)
+
+    Column order follows the original pipeline: with statistics the premium
+    suffix price comes before popularity, with defaults it comes after.
+    """
+    n = len(dm)
+    if market_stats is None:
+        return {
+            'market_avg_price_4': np.full(n, DEFAULT_MARKET_PRICE),
+            'market_avg_price_3': np.full(n, DEFAULT_MARKET_PRICE),
+            'market_avg_price_2': np.full(n, DEFAULT_MARKET_PRICE),
+            'market_popularity_score': np.zeros(n, dtype=np.int64),
+            'market_premium_suffix_price': np.full(n, DEFAULT_MARKET_PRICE),
+        }
+
+    tables = market_tables(market_stats)
+    global_median = market_stats.get('global_median', DEFAULT_MARKET_PRICE)
+
+    def lookup(key, length, missing):
+        table = tables[key].get(length)
+        if table is None:
+            return np.full(n, missing, dtype=np.float64)
+        return table[dm.suffix_code(length)]
+
+    columns = {}
+    premium_value = np.full(n, global_median, dtype=np.float64)
+    matched = np.zeros(n, dtype=bool)
+    popularity_sum = np.zeros(n, dtype=np.float64)
+    for length in [4, 3, 2]:
+        avg_price = lookup('avg_prices', length, np.nan)
+        columns[f'market_avg_price_{length}'] = np.where(np.isnan(avg_price), global_median, avg_price)
+
+        # Longest premium suffix wins
+        premium = lookup('premium_suffix_stats', length, np.nan)
+        hit = ~matched & ~np.isnan(premium)
+        premium_value[hit] = premium[hit]
+        matched |= hit
+        popularity_sum += lookup('popularity', length, 0)
+    columns['market_premium_suffix_price'] = premium_value
+    columns['market_popularity_score'] = popularity_sum
+
+    return columns
+
+# Last converted dict statistics: (market_stats, table sizes, array tables)
+_market_tables_cache = None
+
+def market_tables(market_stats):
+    """
+    Dense suffix lookup tables (length -> array) for dict or array-backed statistics
+
+    Dict statistics are converted once and reused while the same dict is passed.
+    """
+    global _market_tables_cache
+    from src.data_handler import market_stats_to_arrays
+
+    if market_stats.get('format') == 'arrays':
+        return market_stats
+    sizes = tuple(len(market_stats.get(key, {})) for key in ['avg_prices', 'popularity', 'premium_suffix_stats'])
+    cached = _market_tables_cache
+    if cached is not None and cached[0] is market_stats and cached[1] == sizes:
+        return cached[2]
+    tables = market_stats_to_arrays(market_stats)
+    _market_tables_cache = (market_stats, sizes, tables)
+    return tables
+
+MARKET_COLUMNS = [
+    'market_avg_price_4', 'market_avg_price_3', 'market_avg_price_2',
+    'market_premium_suffix_price', 'market_popularity_score'
+]
+
+# ====================================================================================
+# DERIVED FEATURES
+# ====================================================================================
+
+def premium_signal_strength(suffix, tail_ratio, cluster, rare_penalty):
+    return suffix * 2.0 + tail_ratio * 5.0 + cluster * 1.7 - rare_penalty * 3.5
+
+def final_premium_score_v4(ending_power, famous_advanced, special_lucky_advanced, rarity,
+                           beauty, demand, position_weighted, abc_position, wave, balance,
+                           signal_strength, premium_suffix_price, rare_penalty):
+    return (
+        ending_power * 3.0 +
+        famous_advanced * 2.5 +
+        special_lucky_advanced * 2.0 +
+        rarity * 2.0 +
+        beauty * 1.5 +
+        demand * 1.5 +
+        position_weighted * 1.0 +
+        abc_position * 0.8 +
+        wave * 0.5 +
+        balance * 0.3 +
+        signal_strength * 1.8 +
+        premium_suffix_price * 0.0005 -
+        rare_penalty * 1.2
+    )
+
+def _cut(values, bins):
+    """pd.cut(values, bins, labels=False) without pandas: right-closed bins, NaN outside"""
+    values = np.asarray(values, dtype=np.float64)
+    codes = np.searchsorted(np.asarray(bins, dtype=np.float64), values, side='left') - 1
+    inside = (codes >= 0) & (codes < len(bins) - 1)
+    if inside.all():
+        return codes.astype(np.int64)
+    return np.where(inside, codes, np.nan)
+
+def ending_pattern_codes(values):
+    """
+    Codes of ending_pattern_type in the fixed, sorted ENDING_PATTERN_LABELS vocabulary
+
+    These are the pd.Categorical codes of a training set that contains every
+    pattern. A number's code never depends on the other numbers of its batch, so
+    single, batch and micro-batched predictions agree.
+    """
+    return np.searchsorted(ENDING_PATTERN_LABELS, np.asarray(values)).reshape(-1).astype(np.int8)
+
+DERIVED_FEATURES = [
+    ('premium_signal_strength',
+     ['premium_suffix_score', 'high_digit_tail_ratio', 'high_digit_cluster_score', 'rare_digit_penalty'],
+     premium_signal_strength),
+    ('entropy_adjusted_power', ['digit_entropy', 'power_sum'], lambda e, p: e * p),
+]
+
+INTERACTION_FEATURES = [
+    # Power interaction features
+    ('power_x_sum', ['power_sum', 'digit_sum'], lambda p, s: p * s),
+    ('power_x_unique', ['power_sum', 'unique_digits'], lambda p, u: p * u),
+    ('power_x_ending', ['power_sum', 'ending_score'], lambda p, e: p * e),
+    ('lucky_x_ending', ['special_lucky_score', 'ending_score'], lambda l, e: l * e),
+    # Ratio features
+    ('good_to_bad_ratio', ['good_digit_count', 'bad_digit_count'], lambda g, b: g / (b + 1)),
+    ('special_to_total_ratio', ['special_lucky_score', 'digit_sum'], lambda l, s: l / (s + 1)),
+    ('ending_to_total_ratio', ['ending_score', 'sequence_score'], lambda e, s: e / (s + e + 1)),
+    # Complex interaction features
+    ('complexity_x_power', ['complexity_score', 'power_sum'], lambda c, p: c * p),
+    ('rarity_x_demand', ['rarity_score', 'market_demand_score'], lambda r, d: r * d),
+    ('beauty_x_balance', ['mathematical_beauty_score', 'number_balance'], lambda b, n: b * n),
+    # Categorical features (fixed vocabularies / bins)
+    ('ending_pattern_encoded', ['ending_pattern_type'], ending_pattern_codes),
+    ('complexity_class', ['complexity_score'], lambda c: _cut(c, [-20, -5, 0, 5, 10, 20])),
+    ('estimated_tier', ['tier_classification_score'],
+     lambda t: _cut(t, [0, 100, 300, 600, 1000, float('inf')])),
+    # Polynomial features for key variables
+    ('ending_score_squared', ['ending_score'], lambda x: x ** 2),
+    ('power_sum_squared', ['power_sum'], lambda x: x ** 2),
+    ('special_lucky_score_squared', ['special_lucky_score'], lambda x: x ** 2),
+    ('rarity_score_squared', ['rarity_score'], lambda x: x ** 2),
+    # Log transformations for skewed features
+    ('log_ending_score', ['ending_score'], np.log1p),
+    ('log_sequence_score', ['sequence_score'], np.log1p),
+    ('log_tier_score', ['tier_classification_score'], np.log1p),
+    # Final Premium Score v4.0
+    ('final_premium_score_v4',
+     ['ending_power_score', 'famous_sequence_score_advanced', 'special_lucky_score_advanced',
+      'rarity_score', 'mathematical_beauty_score', 'market_demand_score',
+      'position_weighted_score', 'abc_position_score_advanced', 'wave_pattern',
+      'number_balance', 'premium_signal_strength', 'market_premium_suffix_price',
+      'rare_digit_penalty'],
+     final_premium_score_v4),
+]
+
+# ====================================================================================
+# SCORING TABLES READ BY EACH DIGIT FEATURE
+# ====================================================================================
+
+# Features not listed here depend on the feature code only
+FEATURE_TABLES = {
+    'good_digit_count': ['GOOD_DIGITS'],
+    'bad_digit_count': ['BAD_DIGITS'],
+    'premium_pair_count': ['PREMIUM_PAIRS'],
+    'ending_score': ['ENDING_PREMIUM'],
+    'sequence_score': ['LUCKY_SEQUENCES'],
+    'complexity_score': ['COMPLEXITY_SCORES'],
+    'power_sum': ['POWER_WEIGHTS'],
+    'special_lucky_score': ['SPECIAL_LUCKY_PAIRS'],
+    'mystical_pair_score': ['MYSTICAL_PAIRS'],
+    'has_forbidden': ['FORBIDDEN_PAIRS'],
+    'weighted_power_score': ['POWER_WEIGHTS'],
+    'has_lucky_combo': ['LUCKY_COMBOS'],
+    'prefix_score': ['POWER_WEIGHTS'],
+    'weighted_sum_score': ['POWER_WEIGHTS'],
+    'power_to_sum_ratio': ['POWER_WEIGHTS'],
+    'ending_power_concentration': ['POWER_WEIGHTS'],
+    'negative_pairs_count': ['FORBIDDEN_PAIRS'],
+    'position_weighted_score': ['POWER_WEIGHTS'],
+    'ending_power_score': ['ENDING_PREMIUM'],
+    'famous_sequence_score': ['FAMOUS_SEQUENCES'],
+    'famous_sequence_score_advanced': ['FAMOUS_SEQUENCES'],
+    'rarity_score': ['RARITY_SEQUENCES'],
+    'abc_position_score_advanced': ['POWER_WEIGHTS'],
+    'special_lucky_score_advanced': ['SPECIAL_LUCKY_PAIRS'],
+    'market_demand_score': ['MARKET_POPULAR_PATTERNS'],
+    'premium_suffix_score': ['PREMIUM_SUFFIX_WEIGHTS'],
+    'premium_prefix_score': ['PREMIUM_PREFIX_WEIGHTS'],
+    'high_digit_ratio': ['HIGH_VALUE_DIGITS'],
+    'high_digit_tail_ratio': ['HIGH_VALUE_DIGITS'],
+    'high_digit_cluster_score': ['HIGH_VALUE_DIGITS'],
+}
+FEATURE_TABLES.update({f'pos_{i}_power': ['POWER_WEIGHTS'] for i in range(10)})
+
+# ====================================================================================
+# REGISTRY
+# ====================================================================================
+
+def _build_registry():
+    registry = {}
+    for name, func in BASIC_FEATURES + ADVANCED_FEATURES + MASTER_FEATURES + SPECIAL_FEATURES:
+        registry[name] = FeatureSpec(name, func, tables=FEATURE_TABLES.get(name, ()))
+    for name, depends, func in DERIVED_FEATURES:
+        registry[name] = FeatureSpec(name, func, depends, source='derived')
+    registry['market_features'] = FeatureSpec(
+        'market_features', market_features, source='market', outputs=MARKET_COLUMNS
+    )
+    for name, depends, func in INTERACTION_FEATURES:
+        registry[name] = FeatureSpec(name, func, depends, source='derived')
+    return registry
+
+# Ordered: registry order is the column order of create_masterpiece_features
+FEATURE_REGISTRY = _build_registry()
+
+# column -> spec name
+FEATURE_PROVIDERS = {
+    column: spec.name for spec in FEATURE_REGISTRY.values() for column in spec.outputs
+}
+
+def get_all_feature_names():
+    """รายชื่อ feature ทั้งหมดตามลำดับของ pipeline"""
+    return [column for column in FEATURE_PROVIDERS if column not in INTERMEDIATE_FEATURES]
+
+def build_execution_plan(feature_names=None):
+    """
+    สร้าง execution plan ขั้นต่ำสำหรับ feature ที่ต้องการ
+
+    Parameters:
+    -----------
+    feature_names : list, optional
+        Required feature columns (None = all). Unknown names are ignored.
+
+    Returns:
+    --------
+    plan : list of FeatureSpec
+        Specs to run, in registry (dependency-safe) order
+    """
+    if feature_names is None:
+        return list(FEATURE_REGISTRY.values())
+
+    needed = set()
+    stack = [FEATURE_PROVIDERS[name] for name in feature_names if name in FEATURE_PROVIDERS]
+    while stack:
+        spec_name = stack.pop()
+        if spec_name in needed:
+            continue
+        needed.add(spec_name)
+        stack.extend(FEATURE_PROVIDERS[dep] for dep in FEATURE_REGISTRY[spec_name].depends)
+
+    return [spec for name, spec in FEATURE_REGISTRY.items() if name in needed]
+
+# ====================================================================================
+# COMPACT DTYPES
+# ====================================================================================
+
+_INT_DTYPES = [np.int8, np.int16, np.int32]
+
+def compact_column(values):
+    """
+    ลด dtype ของ column: flags/counts -> int8 (int16/int32 ถ้าเกินช่วง), scores -> float32
+    Other dtypes (strings) are returned unchanged.
+    """
+    values = np.asarray(values)
+    kind = values.dtype.kind
+    if kind == 'b':
+        return values.astype(np.int8)
+    if kind in 'iu':
+        if len(values) == 0:
+            return values.astype(np.int8)
+        low, high = values.min(), values.max()
+        for dtype in _INT_DTYPES:
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return values.astype(dtype, copy=False)
+        return values
+    if kind == 'f':
+        return values.astype(np.float32, copy=False)
+    return values
+
+def columns_to_matrix(columns, n_rows, dtype=np.float32):
+    """
+    เขียน columns ลง matrix ที่จองไว้ล่วงหน้า (column-major, ไม่มี copy ระหว่างทาง)
+
+    Returns:
+    --------
+    matrix : np.ndarray
+        (n_rows, n_columns) feature matrix
+    names : list
+        Column names in matrix order
+    """
+    names = list(columns)
+    matrix = np.empty((n_rows, len(names)), dtype=dtype, order='F')
+    for i, name in enumerate(names):
+        matrix[:, i] = columns[name]
+    return matrix, names
+
+# ====================================================================================
+# EXECUTION
+# ====================================================================================
+
+def compute_features(phone_numbers, market_stats=None, feature_names=None, feature_store=None,
+                     n_workers=1, chunk_size=None, compact=False):
+    """
+    คำนวณ features ตาม execution plan
+
+    Parameters:
+    -----------
+    phone_numbers : array-like of str
+        Cleaned 10-digit phone numbers
+    market_stats : dict, optional
+        Market statistics from training data
+    feature_names : list, optional
+        Required feature columns (None = all)
+    feature_store : FeatureStore, optional
+        Read digit/market features from (and save new ones to) a feature store.
+        Derived features are always recomputed.
+    n_workers : int, optional
+        Worker processes for digit/market features (1 = serial, None = BATCH_CONFIG)
+    chunk_size : int, optional
+        Numbers per worker task (None = BATCH_CONFIG['feature_chunk_size'])
+    compact : bool
+        Downcast columns (see compact_column). Columns are downcast as soon as no
+        later spec reads them, so full-precision copies do not pile up.
+
+    Returns:
+    --------
+    columns : dict
+        Ordered column -> array (intermediate columns removed)
+    """
+    dm = phone_numbers if isinstance(phone_numbers, DigitMatrix) else DigitMatrix.from_numbers(phone_numbers)
+
+    plan = build_execution_plan(feature_names)
+    base_specs = [spec for spec in plan if spec.source != 'derived']
+    stored = {}
+    if feature_store is not None:
+        stored = feature_store.load(dm, base_specs, market_stats, n_workers, chunk_size)
+    elif n_workers != 1:
+        from src.feature_parallel import compute_specs_parallel
+        stored = compute_specs_parallel(dm, base_specs, market_stats, n_workers, chunk_size)
+
+    # Dependencies keep full precision until the whole plan has run
+    dependencies = {dep for spec in plan for dep in spec.depends} if compact else set()
+
+    columns = {}
+    for spec in plan:
+        if spec.name in stored:
+            values = stored.pop(spec.name)
+        else:
+            values = spec.compute(dm, columns, market_stats)
+        if compact:
+            values = {
+                name: column if name in dependencies else compact_column(column)
+                for name, column in values.items()
+            }
+        columns.update(values)
+
+    if feature_names is None:
+        names = [name for name in columns if name not in INTERMEDIATE_FEATURES]
+    else:
+        names = [name for name in feature_names if name in columns]
+    if compact:
+        return {name: compact_column(columns.pop(name)) for name in names}
+    return {name: columns[name] for name in names}
@@ -0,0 +1,278 @@
+"""
+Persistent Feature Store for Phone Number Price Prediction
+Columnar on-disk store (one memory-mappable file per column) keyed by the cleaned
+phone number. Every column is tagged with a fingerprint of the feature code, the
+scoring tables it reads and, for market columns, the market statistics. A rerun only
+computes features for new numbers and for columns whose fingerprint changed.
+"""
+import os
+import json
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from src.config import CONFIG
+from src.feature_engine import DigitMatrix
+
+STORE_FORMAT_VERSION = 1
+
+# Files whose source defines the stored feature values
+FEATURE_CODE_FILES = ['feature_engine.py', 'pattern_matcher.py', 'feature_registry.py']
+
+# ====================================================================================
+# FINGERPRINTS
+# ====================================================================================
+
+def _json_default(value):
+    if isinstance(value, np.ndarray):
+        return [value.dtype.str, value.shape, hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest()]
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+def _hash(*parts):
+    payload = json.dumps(parts, sort_keys=True, default=_json_default, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def get_scoring_table(name):
+    """ตาราง scoring จาก CONFIG หรือค่าคงที่ใน src.features"""
+    if name in CONFIG:
+        return CONFIG[name]
+    from src import features
+    return getattr(features, name)
+
+def code_fingerprint():
+    """Fingerprint ของ source code ที่ใช้คำนวณ features"""
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha1()
+    for filename in FEATURE_CODE_FILES:
+        with open(os.path.join(src_dir, filename), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def market_stats_fingerprint(market_stats):
+    """Fingerprint ของ market statistics (None = ค่า default)"""
+    if market_stats is None:
+        return 'defaults'
+    return _hash(market_stats)
+
+def spec_fingerprint(spec, code_fp, stats_fp):
+    """Fingerprint ของ column ใน registry spec"""
+    tables = {name: get_scoring_table(name) for name in spec.tables}
+    return _hash(code_fp, tables, stats_fp if spec.source == 'market' else None)
+
+# ====================================================================================
+# FEATURE STORE
+# ====================================================================================
+
+class FeatureStore:
+    """
+    On-disk columnar feature store
+
+    Layout:
+        store_dir/manifest.json      row count, per-column fingerprint/dtype/row count
+        store_dir/keys.bin           int64 phone number codes (row order)
+        store_dir/columns/<name>.bin raw column values (np.memmap)
+
+    Parameters:
+    -----------
+    store_dir : str
+        Store directory (created if missing)
+    verbose : bool
+        Print update summaries
+    """
+
+    def __init__(self, store_dir, verbose=True):
+        self.store_dir = store_dir
+        self.columns_dir = os.path.join(store_dir, 'columns')
+        self.verbose = verbose
+        os.makedirs(self.columns_dir, exist_ok=True)
+        self.manifest = self._load_manifest()
+        self._index = None
+
+    # ============ Manifest ============
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.store_dir, 'manifest.json')
+
+    @property
+    def keys_path(self):
+        return os.path.join(self.store_dir, 'keys.bin')
+
+    def _empty_manifest(self):
+        return {'format_version': STORE_FORMAT_VERSION, 'n_rows': 0, 'columns': {}, 'outputs': {}}
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return self._empty_manifest()
+        with open(self.manifest_path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get('format_version') != STORE_FORMAT_VERSION:
+            print("⚠️ Feature store format changed - rebuilding")
+            return self._empty_manifest()
+        return manifest
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    @property
+    def n_rows(self):
+        return self.manifest['n_rows']
+
+    # ============ Raw column files ============
+
+    def _column_path(self, name):
+        return os.path.join(self.columns_dir, f'{name}.bin')
+
+    @staticmethod
+    def _read(path, dtype, n_rows):
+        if n_rows == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(n_rows,))
+
+    @staticmethod
+    def _write(path, values):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(np.ascontiguousarray(values).tobytes())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _append(path, values, n_existing, itemsize):
+        # ตัดส่วนที่เขียนค้างจากรอบที่ล้มเหลว แล้วต่อท้าย
+        mode = 'r+b' if os.path.exists(path) else 'wb'
+        with open(path, mode) as f:
+            f.truncate(n_existing * itemsize)
+            f.seek(0, os.SEEK_END)
+            f.write(np.ascontiguousarray(values).tobytes())
+
+    def keys(self):
+        """รหัสเบอร์ของทุกแถว (memory-mapped)"""
+        return self._read(self.keys_path, np.int64, self.n_rows)
+
+    def read_column(self, name):
+        """อ่าน column แบบ memory-mapped"""
+        meta = self.manifest['columns'][name]
+        return self._read(self._column_path(name), np.dtype(meta['dtype']), meta['n_rows'])
+
+    def _lookup(self, codes):
+        if self._index is None:
+            self._index = pd.Index(np.asarray(self.keys()))
+        return self._index.get_indexer(codes)
+
+    # ============ Update ============
+
+    def _add_numbers(self, codes):
+        indexer = self._lookup(codes)
+        new_codes = pd.unique(codes[indexer < 0])
+        if len(new_codes):
+            self._append(self.keys_path, new_codes.astype(np.int64), self.n_rows, 8)
+            self.manifest['n_rows'] += len(new_codes)
+            self._index = None
+        return len(new_codes)
+
+    def _store_values(self, spec, values, start, fingerprint):
+        n_rows = self.n_rows
+        for name, column in values.items():
+            column = np.asarray(column)
+            path = self._column_path(name)
+            meta = self.manifest['columns'].get(name)
+            if start > 0 and meta['dtype'] != column.dtype.str:
+                # dtype เปลี่ยน → เขียนใหม่ทั้ง column
+                column = np.concatenate([np.asarray(self.read_column(name)[:start]), column])
+                start = 0
+            if start == 0:
+                self._write(path, column)
+            else:
+                self._append(path, column, start, column.dtype.itemsize)
+            self.manifest['columns'][name] = {
+                'fingerprint': fingerprint,
+                'dtype': column.dtype.str,
+                'n_rows': n_rows
+            }
+        self.manifest['outputs'][spec.name] = list(values)
+
+    def sync(self, dm, specs, market_stats=None, n_workers=1, chunk_size=None):
+        """
+        เพิ่มเบอร์ใหม่และคำนวณ column ที่ขาด/หมดอายุ
+
+        Parameters:
+        -----------
+        dm : DigitMatrix
+            Numbers that must be present
+        specs : list of FeatureSpec
+            Non-derived registry specs that must be valid
+        market_stats : dict, optional
+            Market statistics used by market specs
+        n_workers, chunk_size : int, optional
+            Process-pool settings for the missing rows (see feature_parallel)
+        """
+        from src.feature_parallel import compute_specs_parallel
+
+        n_new = self._add_numbers(dm.codes)
+        code_fp = code_fingerprint()
+        stats_fp = market_stats_fingerprint(market_stats)
+
+        # Group specs by the first row that must be (re)computed
+        pending = {}
+        n_recomputed = 0
+        for spec in specs:
+            fingerprint = spec_fingerprint(spec, code_fp, stats_fp)
+            metas = [self.manifest['columns'].get(name) for name in spec.outputs]
+            if any(meta is None or meta['fingerprint'] != fingerprint for meta in metas):
+                start = 0
+                n_recomputed += 1
+            else:
+                start = min(meta['n_rows'] for meta in metas)
+            if start < self.n_rows:
+                pending.setdefault(start, []).append((spec, fingerprint))
+
+        if pending:
+            keys = np.asarray(self.keys())
+            for start, group in sorted(pending.items()):
+                part = DigitMatrix.from_codes(keys[start:])
+                values = compute_specs_parallel(part, [spec for spec, _ in group], market_stats,
+                                                n_workers, chunk_size)
+                for spec, fingerprint in group:
+                    self._store_values(spec, values[spec.name], start, fingerprint)
+
+        self._save_manifest()
+        if self.verbose and (n_new or n_recomputed):
+            print(f"   📦 Feature store: {n_new:,} new numbers, {n_recomputed} specs recomputed "
+                  f"({self.n_rows:,} numbers stored)")
+
+    def load(self, dm, specs, market_stats=None, n_workers=1, chunk_size=None):
+        """
+        คืนค่า features ของเบอร์ใน dm จาก store (sync ก่อนเสมอ)
+
+        Returns:
+        --------
+        values : dict
+            spec name -> dict of column -> array (row order of dm)
+        """
+        self.sync(dm, specs, market_stats, n_workers, chunk_size)
+        indexer = self._lookup(dm.codes)
+        values = {}
+        for spec in specs:
+            values[spec.name] = {
+                name: np.asarray(self.read_column(name)[indexer])
+                for name in self.manifest['outputs'][spec.name]
+            }
+        return values
+
+    def clear(self):
+        """ลบข้อมูลทั้งหมดใน store"""
+        for filename in os.listdir(self.columns_dir):
+            os.remove(os.path.join(self.columns_dir, filename))
+        if os.path.exists(self.keys_path):
+            os.remove(self.keys_path)
+        self.manifest = self._empty_manifest()
+        self._index = None
+        self._save_manifest()
@@ -14,7 +14,8 @@ import math
 import warnings
 warnings.filterwarnings('ignore')
 
-from src.config import CONFIG
+from src.config import CONFIG, FEATURE_MATRIX_CONFIG
+from src.pattern_matcher import PatternMatcher
 
 # Premium pattern configuration for high-value price signals
 PREMIUM_SUFFIX_WEIGHTS = {
@@ -53,6 +54,27 @@ PREMIUM_PREFIX_WEIGHTS = {
 }
 
 HIGH_VALUE_DIGITS = {'7', '8', '9'}
+
+LUCKY_COMBOS = ['168', '268', '369', '888', '999', '789', '456']
+
+RARITY_SEQUENCES = ['0000', '1111', '2222', '3333', '4444', '5555', '6666', '7777', '8888', '9999']
+
+MARKET_POPULAR_PATTERNS = {
+    '88': 30, '99': 30, '888': 50, '999': 50,
+    '8888': 100, '9999': 100, '168': 40, '268': 40,
+    '1234': 35, '5678': 35, '6789': 40
+}
+
+# All sequence tables compiled once into a single automaton (one scan per number)
+SEQUENCE_MATCHER = PatternMatcher({
+    'LUCKY_SEQUENCES': CONFIG['LUCKY_SEQUENCES'],
+    'FAMOUS_SEQUENCES': CONFIG['FAMOUS_SEQUENCES'],
+    'ENDING_PREMIUM': CONFIG['ENDING_PREMIUM'],
+    'PREMIUM_SUFFIX_WEIGHTS': PREMIUM_SUFFIX_WEIGHTS,
+    'LUCKY_COMBOS': LUCKY_COMBOS,
+    'RARITY_SEQUENCES': RARITY_SEQUENCES,
+    'MARKET_POPULAR_PATTERNS': MARKET_POPULAR_PATTERNS
+})
 
 # ====================================================================================
 # BASIC FEATURE FUNCTIONS
@@ -94,12 +116,13 @@ def get_premium_pair_count(n):
             count += 1
     return count
 
-def get_premium_suffix_score(n):
+def get_premium_suffix_score(n, matches=None):
     """คะแนน suffix สำหรับเบอร์พรีเมียม"""
-    for length in range(4, 1, -1):
-        suffix = n[-length:]
-        if suffix in PREMIUM_SUFFIX_WEIGHTS:
-            return PREMIUM_SUFFIX_WEIGHTS[suffix] * length
+    matches = SEQUENCE_MATCHER.scan(n) if matches is None else matches
+    match = SEQUENCE_MATCHER.suffix_value(matches, 'PREMIUM_SUFFIX_WEIGHTS', [4, 3, 2], len(n))
+    if match:
+        length, weight = match
+        return weight * length
     return 0.0
 
 def get_premium_prefix_score(n):
@@ -159,27 +182,22 @@ def get_rare_digit_penalty(n):
     rare_count = sum(1 for d in n if d in rare_digits)
     return rare_count / len(n)
 
-def get_ending_score(n):
+def get_ending_score(n, matches=None):
     """คะแนนท้ายเบอร์"""
-    last_4 = n[-4:]
-    last_3 = n[-3:]
-    last_2 = n[-2:]
-    
     score = 0
-    if last_4 in CONFIG['ENDING_PREMIUM']:
-        score += CONFIG['ENDING_PREMIUM'][last_4]
-    elif last_3 in CONFIG['ENDING_PREMIUM']:
-        score += CONFIG['ENDING_PREMIUM'][last_3]
-    elif last_2 in CONFIG['ENDING_PREMIUM']:
-        score += CONFIG['ENDING_PREMIUM'][last_2]
+    matches = SEQUENCE_MATCHER.scan(n) if matches is None else matches
+    match = SEQUENCE_MATCHER.suffix_value(matches, 'ENDING_PREMIUM', [4, 3, 2], len(n))
+    if match:
+        score += match[1]
     
     return score
 
-def get_sequence_score(n):
+def get_sequence_score(n, matches=None):
     """คะแนนเลขเรียงกัน"""
+    matches = SEQUENCE_MATCHER.scan(n) if matches is None else matches
     score = 0
     for seq, seq_score in CONFIG['LUCKY_SEQUENCES'].items():
-        if seq in n:
+        if seq in matches:
             score += seq_score
     return score
 
@@ -747,34 +765,37 @@ def calculate_number_balance(n):
     
     return balance_score
 
-def calculate_famous_sequence_score(n):
+def calculate_famous_sequence_score(n, matches=None):
     """คะแนนเลขชุดพิเศษ"""
+    matches = SEQUENCE_MATCHER.scan(n) if matches is None else matches
     score = 0
     
     for seq, seq_score in CONFIG['FAMOUS_SEQUENCES'].items():
-        if seq in n:
+        if seq in matches:
             score += seq_score
             
             # โบนัสตำแหน่ง
-            if n.endswith(seq):
+            if matches[seq][-1] == len(n) - len(seq):
                 score += seq_score * 0.5
     
     return score
 
-def calculate_famous_sequence_score_advanced(n):
+def calculate_famous_sequence_score_advanced(n, matches=None):
     """คะแนนเลขชุดพิเศษแบบขั้นสูง"""
+    matches = SEQUENCE_MATCHER.scan(n) if matches is None else matches
     score = 0
     
     for seq, seq_score in CONFIG['FAMOUS_SEQUENCES'].items():
-        if seq in n:
+        if seq in matches:
             base_score = seq_score
+            starts = matches[seq]
             
             # โบนัสตำแหน่ง
-            if n.endswith(seq):
+            if starts[-1] == len(n) - len(seq):
                 base_score *= 2.5
-            elif seq in n[-4:]:
+            elif starts[-1] >= len(n) - 4:
                 base_score *= 1.8
-            elif seq in n[:3]:
+            elif starts[0] + len(seq) <= 3:
                 base_score *= 1.3
             
             score += base_score
@@ -1209,7 +1230,7 @@ def get_wave_pattern_score(n):
     
     return score
 
-def calculate_rarity_score(n):
+def calculate_rarity_score(n, matches=None):
     """คะแนนความหายาก"""
     rarity = 0
     
@@ -1231,7 +1252,8 @@ def calculate_rarity_score(n):
         rarity += 50
     
     # Special sequences
-    if any(seq in n for seq in ['0000', '1111', '2222', '3333', '4444', '5555', '6666', '7777', '8888', '9999']):
+    matches = SEQUENCE_MATCHER.scan(n) if matches is None else matches
+    if any(seq in matches for seq in RARITY_SEQUENCES):
         rarity += 70
     
     return rarity
@@ -1299,22 +1321,17 @@ def get_special_lucky_score_advanced(n):
     
     return score
 
-def calculate_market_demand_score(n):
+def calculate_market_demand_score(n, matches=None):
     """คะแนนความต้องการของตลาด"""
     demand = 0
     
     # Popular patterns
-    popular_patterns = {
-        '88': 30, '99': 30, '888': 50, '999': 50,
-        '8888': 100, '9999': 100, '168': 40, '268': 40,
-        '1234': 35, '5678': 35, '6789': 40
-    }
-    
-    for pattern, score in popular_patterns.items():
-        if pattern in n:
+    matches = SEQUENCE_MATCHER.scan(n) if matches is None else matches
+    for pattern, score in MARKET_POPULAR_PATTERNS.items():
+        if pattern in matches:
             demand += score
             # Bonus if at end
-            if n.endswith(pattern):
+            if matches[pattern][-1] == len(n) - len(pattern):
                 demand += score * 0.5
     
     # Market preferences
@@ -1451,11 +1468,11 @@ def get_symmetry_score(n):
     
     return score
 
-def has_lucky_combo(n):
+def has_lucky_combo(n, matches=None):
     """มีชุดตัวเลขนำโชคหรือไม่"""
-    lucky_combos = ['168', '268', '369', '888', '999', '789', '456']
-    for combo in lucky_combos:
-        if combo in n:
+    matches = SEQUENCE_MATCHER.scan(n) if matches is None else matches
+    for combo in LUCKY_COMBOS:
+        if combo in matches:
             return 1
     return 0
 
@@ -1646,7 +1663,8 @@ Main feature creation functions and complete feature pipeline
 # MAIN FEATURE CREATION FUNCTION
 # ====================================================================================
 
-def create_masterpiece_features(df, market_stats=None):
+def create_masterpiece_features(df, market_stats=None, feature_names=None, feature_store=None,
+                                n_workers=1, chunk_size=None, compact=None, as_matrix=False, verbose=True):
     """
     สร้าง features ทั้งหมดสำหรับ DataFrame
     Enhanced Features v4.0 - Masterpiece Edition
@@ -1658,273 +1676,83 @@ def create_masterpiece_features(df, market_stats=None):
         DataFrame with phone_number column
     market_stats : dict, optional
         Market statistics from training data
+    feature_names : list, optional
+        Only compute these features (plus their dependencies) and return
+        them in this order. None computes every feature.
+    feature_store : FeatureStore, optional
+        Reuse stored features and only compute new numbers / changed columns
+    n_workers : int, optional
+        Worker processes (1 = serial, None = BATCH_CONFIG parallel_processing / n_workers)
+    chunk_size : int, optional
+        Numbers per worker task (None = BATCH_CONFIG['feature_chunk_size'])
+    compact : bool, optional
+        int8 flags/counts and float32 scores (None = FEATURE_MATRIX_CONFIG['compact_dtypes'])
+    as_matrix : bool
+        Return (matrix, feature_names) with a preallocated NumPy matrix of
+        FEATURE_MATRIX_CONFIG['matrix_dtype'] instead of a DataFrame
+    verbose : bool
+        Print progress banners (serving code passes False)
     """
-    print("\n🔧 Creating Masterpiece Features v4.0...")
-    print("   Target: 250+ High-Quality Features")
+    from src.feature_registry import compute_features, columns_to_matrix, NON_FEATURE_COLUMNS
+
+    if compact is None:
+        compact = FEATURE_MATRIX_CONFIG['compact_dtypes']
+
+    if verbose:
+        print("\n🔧 Creating Masterpiece Features v4.0...")
+        print("   Target: 250+ High-Quality Features")
     
     # Validate input
     if 'phone_number' not in df.columns:
         raise ValueError("DataFrame must contain 'phone_number' column")
     
-    # Create a copy to avoid modifying original
-    df = df.copy()
-    
-    # ============ Basic Features ============
-    print("\n   📊 Creating Basic Features...")
-    df['digit_sum'] = df['phone_number'].apply(get_digit_sum)
-    df['unique_digits'] = df['phone_number'].apply(get_unique_digits)
-    df['max_consecutive'] = df['phone_number'].apply(get_max_consecutive_digit)
-    df['has_pattern_2'] = df['phone_number'].apply(lambda x: has_repeating_pattern(x, 2))
-    df['has_pattern_3'] = df['phone_number'].apply(lambda x: has_repeating_pattern(x, 3))
-    df['good_digit_count'] = df['phone_number'].apply(get_good_digit_count)
-    df['bad_digit_count'] = df['phone_number'].apply(get_bad_digit_count)
-    df['premium_pair_count'] = df['phone_number'].apply(get_premium_pair_count)
-    df['ending_score'] = df['phone_number'].apply(get_ending_score)
-    df['sequence_score'] = df['phone_number'].apply(get_sequence_score)
-    df['has_triple'] = df['phone_number'].apply(has_triple_repeat)
-    df['has_quad'] = df['phone_number'].apply(has_quad_repeat)
-    df['ascending_count'] = df['phone_number'].apply(get_ascending_count)
-    df['descending_count'] = df['phone_number'].apply(get_descending_count)
-    df['mirror_pattern'] = df['phone_number'].apply(has_mirror_pattern)
-    df['complexity_score'] = df['phone_number'].apply(get_complexity_score)
-    df['power_sum'] = df['phone_number'].apply(get_power_sum)
-    df['special_lucky_score'] = df['phone_number'].apply(get_special_lucky_score)
-    df['mystical_pair_score'] = df['phone_number'].apply(get_mystical_pair_score)
-    df['has_forbidden'] = df['phone_number'].apply(has_forbidden_pair)
-    
-    # Digit frequency features
-    for digit in range(10):
-        df[f'count_{digit}'] = df['phone_number'].apply(lambda x: x.count(str(digit)))
-    
-    # Power features for each position
-    for i in range(10):
-        df[f'pos_{i}_power'] = df['phone_number'].apply(
-            lambda x: CONFIG['POWER_WEIGHTS'].get(x[i], 0)
-        )
+    if verbose:
+        if feature_names is None:
+            print("\n   📊 Creating Basic Features...")
+            print("   📊 Creating Advanced Features v3.0...")
+            print("   🏆 Creating Master Features v4.0...")
+            print("   ✨ Creating Special Features v5.0...")
+        else:
+            print(f"\n   📋 Creating {len(feature_names)} requested features (minimal plan)...")
     
-    # ============ Advanced Features v3.0 ============
-    print("   📊 Creating Advanced Features v3.0...")
-    df['sum_diff_halves'] = df['phone_number'].apply(get_sum_diff_halves)
-    df['num_peaks'] = df['phone_number'].apply(get_num_peaks)
-    df['num_valleys'] = df['phone_number'].apply(get_num_valleys)
-    df['longest_increasing'] = df['phone_number'].apply(get_longest_increasing_subsequence)
-    df['digit_entropy'] = df['phone_number'].apply(get_digit_entropy)
-    df['run_length_encoding'] = df['phone_number'].apply(get_run_length_encoding_size)
-    df['digit_distance_sum'] = df['phone_number'].apply(get_digit_distance_sum)
-    df['unique_ratio'] = df['phone_number'].apply(get_unique_digit_ratio)
-    df['has_arithmetic_seq'] = df['phone_number'].apply(has_arithmetic_sequence)
-    df['num_unique_pairs'] = df['phone_number'].apply(get_num_unique_pairs)
-    df['num_unique_triplets'] = df['phone_number'].apply(get_num_unique_triplets)
-    df['num_unique_no_zero'] = df['phone_number'].apply(
-        lambda x: len(set(x.replace('0', '')))
-    )
-    df['power_digit_ratio'] = df['phone_number'].apply(
-        lambda x: sum(1 for d in x if d in '56899') / len(x)
-    )
-    df['weighted_power_score'] = df['phone_number'].apply(
-        lambda x: sum(int(d) * CONFIG['POWER_WEIGHTS'].get(d, 0) for d in x)
-    )
+        # ============ Market-based Features (No Data Leakage) ============
+        if market_stats is not None:
+            print("   📊 Creating Market Features from Training Statistics...")
+        else:
+            # Default values if no market stats
+            print("   ⚠️ No market statistics provided - using defaults")
     
-    # ============ Features จาก v2.0 ============
-    df['digit_variance'] = df['phone_number'].apply(get_digit_variance)
-    df['alternating_pattern_score'] = df['phone_number'].apply(get_alternating_pattern_score)
-    df['ascending_sequences'] = df['phone_number'].apply(get_ascending_sequences)
-    df['descending_sequences'] = df['phone_number'].apply(get_descending_sequences)
-    df['has_repeated_block_2'] = df['phone_number'].apply(has_repeated_block)
-    df['has_repeated_block_3'] = df['phone_number'].apply(lambda x: has_repeated_block(x, 3))
-    df['max_consecutive_same'] = df['phone_number'].apply(get_max_consecutive_same)
-    df['symmetry_score'] = df['phone_number'].apply(get_symmetry_score)
-    df['has_lucky_combo'] = df['phone_number'].apply(has_lucky_combo)
-    
-    # Position-based features
-    df['first_4_sum'] = df['phone_number'].apply(lambda x: sum(int(d) for d in x[:4]))
-    df['middle_2_sum'] = df['phone_number'].apply(lambda x: sum(int(d) for d in x[4:6]))
-    df['last_4_sum'] = df['phone_number'].apply(lambda x: sum(int(d) for d in x[6:]))
-    df['middle_section_power'] = df['phone_number'].apply(analyze_middle_section)
-    df['max_ending_score'] = df['phone_number'].apply(analyze_ending_pattern)
-    
-    # Double, Triple, Quad scores
-    for i, (name, scores) in enumerate([('double', get_double_triple_quad_scores),
-                                        ('triple', get_double_triple_quad_scores),
-                                        ('quad', get_double_triple_quad_scores)]):
-        df[f'{name}_score'] = df['phone_number'].apply(lambda x: scores(x)[i])
-    
-    # Position-based analysis for each digit
-    for digit in range(10):
-        analysis = df['phone_number'].apply(lambda x: analyze_digit_positions_advanced(x, digit))
-        df[f'digit_{digit}_count'] = [a['count'] for a in analysis]
-        df[f'digit_{digit}_spread'] = [a['spread'] for a in analysis]
-        df[f'digit_{digit}_in_end'] = [a['in_end'] for a in analysis]
-    
-    # ============ Master Features v4.0 ============
-    print("   🏆 Creating Master Features v4.0...")
-    df['position_weights'] = df['phone_number'].apply(get_position_weights)
-    df['ending_pattern_type'] = df['phone_number'].apply(get_ending_pattern_type)
-    df['prefix_score'] = df['phone_number'].apply(get_prefix_score)
-    df['middle_pattern_score'] = df['phone_number'].apply(get_middle_pattern_score)
-    df['weighted_sum_score'] = df['phone_number'].apply(get_weighted_sum_score)
-    df['special_to_power_ratio'] = df['phone_number'].apply(get_special_to_normal_ratio)
-    df['power_to_sum_ratio'] = df['phone_number'].apply(get_power_to_sum_ratio)
-    df['ending_power_concentration'] = df['phone_number'].apply(get_ending_power_concentration)
-    df['negative_pairs_count'] = df['phone_number'].apply(get_negative_pairs_count)
-    df['investment_grade_score'] = df['phone_number'].apply(get_investment_grade_score)
-    df['market_tier_score'] = df['phone_number'].apply(get_market_tier_score)
-    df['has_triple_power'] = df['phone_number'].apply(has_triple_power_digit)
-    df['position_weighted_score'] = df['phone_number'].apply(calculate_position_weighted_score)
-    df['ending_power_score'] = df['phone_number'].apply(calculate_ending_power_score)
-    df['mirror_score'] = df['phone_number'].apply(calculate_mirror_score)
-    df['number_balance'] = df['phone_number'].apply(calculate_number_balance)
-    df['famous_sequence_score'] = df['phone_number'].apply(calculate_famous_sequence_score)
-    df['famous_sequence_score_advanced'] = df['phone_number'].apply(calculate_famous_sequence_score_advanced)
-    df['wave_pattern'] = df['phone_number'].apply(get_wave_pattern_score)
-    df['rarity_score'] = df['phone_number'].apply(calculate_rarity_score)
-    df['mathematical_beauty_score'] = df['phone_number'].apply(get_mathematical_beauty_score)
-    df['abc_position_score_advanced'] = df['phone_number'].apply(calculate_abc_position_score_advanced)
-    
-    # ============ Special Features v5.0 ============
-    print("   ✨ Creating Special Features v5.0...")
-    df['special_lucky_score_advanced'] = df['phone_number'].apply(get_special_lucky_score_advanced)
-    df['market_demand_score'] = df['phone_number'].apply(calculate_market_demand_score)
-    df['tier_classification_score'] = df['phone_number'].apply(get_tier_classification_score)
-    df['premium_suffix_score'] = df['phone_number'].apply(get_premium_suffix_score)
-    df['premium_prefix_score'] = df['phone_number'].apply(get_premium_prefix_score)
-    df['high_digit_ratio'] = df['phone_number'].apply(get_high_value_digit_ratio)
-    df['high_digit_tail_ratio'] = df['phone_number'].apply(get_high_digit_tail_ratio)
-    df['high_digit_cluster_score'] = df['phone_number'].apply(get_high_value_cluster_score)
-    df['digit_entropy'] = df['phone_number'].apply(get_digit_entropy)
-    df['pair_diversity_score'] = df['phone_number'].apply(get_pair_diversity_score)
-    df['rare_digit_penalty'] = df['phone_number'].apply(get_rare_digit_penalty)
-    df['premium_signal_strength'] = (
-        df['premium_suffix_score'] * 2.0 +
-        df['high_digit_tail_ratio'] * 5.0 +
-        df['high_digit_cluster_score'] * 1.7 -
-        df['rare_digit_penalty'] * 3.5
-    )
-    df['entropy_adjusted_power'] = df['digit_entropy'] * df['power_sum']
-    
-    # ============ Market-based Features (No Data Leakage) ============
-    if market_stats is not None:
-        print("   📊 Creating Market Features from Training Statistics...")
-        
-        # Apply market features using training statistics
-        def create_market_features_for_row(phone_number):
-            features = {}
-            
-            # Ending patterns
-            for length in [4, 3, 2]:
-                ending = phone_number[-length:]
-                if ending in market_stats.get('avg_prices', {}):
-                    features[f'market_avg_price_{length}'] = market_stats['avg_prices'][ending]
-                else:
-                    features[f'market_avg_price_{length}'] = market_stats.get('global_median', 5000)
-            # Premium suffix valuation
-            premium_stats = market_stats.get('premium_suffix_stats', {})
-            premium_value = market_stats.get('global_median', 5000)
-            for length in [4, 3, 2]:
-                ending = phone_number[-length:]
-                if ending in premium_stats:
-                    premium_value = premium_stats[ending]
-                    break
-            features['market_premium_suffix_price'] = premium_value
-            
-            # Pattern popularity
-            popularity_sum = 0
-            for length in [4, 3, 2]:
-                ending = phone_number[-length:]
-                if ending in market_stats.get('popularity', {}):
-                    popularity_sum += market_stats['popularity'][ending]
-            features['market_popularity_score'] = popularity_sum
-            
-            return pd.Series(features)
-        
-        # Apply to all rows
-        market_features = df['phone_number'].apply(create_market_features_for_row)
-        df = pd.concat([df, market_features], axis=1)
-    else:
-        # Default values if no market stats
-        print("   ⚠️ No market statistics provided - using defaults")
-        df['market_avg_price_4'] = 5000
-        df['market_avg_price_3'] = 5000
-        df['market_avg_price_2'] = 5000
-        df['market_popularity_score'] = 0
-        df['market_premium_suffix_price'] = 5000
-
-    # Power interaction features
-    df['power_x_sum'] = df['power_sum'] * df['digit_sum']
-    df['power_x_unique'] = df['power_sum'] * df['unique_digits']
-    df['power_x_ending'] = df['power_sum'] * df['ending_score']
-    df['lucky_x_ending'] = df['special_lucky_score'] * df['ending_score']
-    
-    # Ratio features
-    df['good_to_bad_ratio'] = df['good_digit_count'] / (df['bad_digit_count'] + 1)
-    df['special_to_total_ratio'] = df['special_lucky_score'] / (df['digit_sum'] + 1)
-    df['ending_to_total_ratio'] = df['ending_score'] / (df['sequence_score'] + df['ending_score'] + 1)
-    
-    # Complex interaction features
-    df['complexity_x_power'] = df['complexity_score'] * df['power_sum']
-    df['rarity_x_demand'] = df['rarity_score'] * df['market_demand_score']
-    df['beauty_x_balance'] = df['mathematical_beauty_score'] * df['number_balance']
-    
-    # Categorical features - encode and drop string columns
-    df['ending_pattern_encoded'] = pd.Categorical(df['ending_pattern_type']).codes
-    df.drop('ending_pattern_type', axis=1, inplace=True)  # Remove string column
-    df['complexity_class'] = pd.cut(
-        df['complexity_score'],
-        bins=[-20, -5, 0, 5, 10, 20],
-        labels=False  # Use numeric labels instead of strings
-    )
-
-    # Market-based features
-    df['estimated_tier'] = pd.cut(
-        df['tier_classification_score'],
-        bins=[0, 100, 300, 600, 1000, float('inf')],
-        labels=False  # Use numeric labels instead of strings
-    )
+    columns = compute_features(df['phone_number'], market_stats, feature_names, feature_store,
+                               n_workers, chunk_size, compact)
     
-    # Polynomial features for key variables
-    df['ending_score_squared'] = df['ending_score'] ** 2
-    df['power_sum_squared'] = df['power_sum'] ** 2
-    df['special_lucky_score_squared'] = df['special_lucky_score'] ** 2
-    df['rarity_score_squared'] = df['rarity_score'] ** 2
-    
-    # Log transformations for skewed features
-    df['log_ending_score'] = np.log1p(df['ending_score'])
-    df['log_sequence_score'] = np.log1p(df['sequence_score'])
-    df['log_tier_score'] = np.log1p(df['tier_classification_score'])
-    
-    # ============ Final Premium Score v4.0 ============
-    print("   🎯 Calculating Final Premium Score v4.0...")
-    df['final_premium_score_v4'] = (
-        df['ending_power_score'] * 3.0 +
-        df['famous_sequence_score_advanced'] * 2.5 +
-        df['special_lucky_score_advanced'] * 2.0 +
-        df['rarity_score'] * 2.0 +
-        df['mathematical_beauty_score'] * 1.5 +
-        df['market_demand_score'] * 1.5 +
-        df['position_weighted_score'] * 1.0 +
-        df['abc_position_score_advanced'] * 0.8 +
-        df['wave_pattern'] * 0.5 +
-        df['number_balance'] * 0.3 +
-        df['premium_signal_strength'] * 1.8 +
-        df['market_premium_suffix_price'] * 0.0005 -
-        df['rare_digit_penalty'] * 1.2
-    )
-    
-    # Drop phone_number column if it exists
-    if 'phone_number' in df.columns:
-        df = df.drop('phone_number', axis=1)
-
-    # Drop price column if it exists (for feature creation)
-    if 'price' in df.columns:
-        df = df.drop('price', axis=1)
-
+    # Keep other input columns, but drop phone_number / price
     # 🔴 CRITICAL: Drop sample_weight (causes data leakage!)
     # sample_weight is calculated from price → must NOT be a feature
-    if 'sample_weight' in df.columns:
-        df = df.drop('sample_weight', axis=1)
+    if verbose and 'sample_weight' in df.columns:
         print("   ⚠️  Removed 'sample_weight' feature (data leakage prevention)")
+    extra = [c for c in df.columns if c not in NON_FEATURE_COLUMNS and c not in columns]
+    
+    if feature_names is None:
+        names = extra + list(columns)
+    else:
+        names = [c for c in feature_names if c in columns or c in extra]
+    
+    # Assemble once (no intermediate copies of the frame)
+    def source(name):
+        return columns[name] if name in columns else df[name].to_numpy()
+    
+    if as_matrix:
+        matrix, names = columns_to_matrix(
+            {name: source(name) for name in names}, len(df), FEATURE_MATRIX_CONFIG['matrix_dtype']
+        )
+        if verbose:
+            print(f"\n✅ Created {len(names)} features successfully!")
+        return matrix, names
+    
+    df = pd.DataFrame({name: source(name) for name in names}, index=df.index)
 
-    print(f"\n✅ Created {len(df.columns)} features successfully!")
+    if verbose:
+        print(f"\n✅ Created {len(df.columns)} features successfully!")
 
     return df
 
@@ -1932,7 +1760,7 @@ def create_masterpiece_features(df, market_stats=None):
 # WRAPPER FUNCTION FOR COMPLETE PIPELINE
 # ====================================================================================
 
-def create_all_features(df_cleaned, market_stats=None):
+def create_all_features(df_cleaned, market_stats=None, feature_store=None, n_workers=None, chunk_size=None):
     """
     Create all features from cleaned dataframe
     
@@ -1942,6 +1770,12 @@ def create_all_features(df_cleaned, market_stats=None):
         Cleaned dataframe with 'phone_number' and 'price' columns
     market_stats : dict, optional
         Market statistics from training data only
+    feature_store : FeatureStore, optional
+        Persistent feature store (only new numbers / changed columns are computed)
+    n_workers : int, optional
+        Worker processes (None = BATCH_CONFIG parallel_processing / n_workers)
+    chunk_size : int, optional
+        Numbers per worker task (None = BATCH_CONFIG['feature_chunk_size'])
     
     Returns:
     --------
@@ -1957,7 +1791,10 @@ def create_all_features(df_cleaned, market_stats=None):
     print("="*100)
     
     # Create features
-    features_df = create_masterpiece_features(df_cleaned, market_stats)
+    features_df = create_masterpiece_features(
+        df_cleaned, market_stats, feature_store=feature_store,
+        n_workers=n_workers, chunk_size=chunk_size
+    )
     
     # Prepare target variable
     y = np.log1p(df_cleaned['price'])  # Log transform
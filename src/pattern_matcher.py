@@ -0,0 +1,158 @@
+"""
+Multi-Pattern Matcher for Phone Number Sequence Tables
+Compiles all scoring tables (LUCKY_SEQUENCES, FAMOUS_SEQUENCES, ENDING_PREMIUM, ...)
+once into a single Aho-Corasick automaton so that one scan per number reports every
+match with its position. Per-row cost no longer grows with the number of rules.
+"""
+from collections import deque
+
+import numpy as np
+
+class PatternMatcher:
+    """
+    Aho-Corasick automaton over digit strings shared by several tables
+
+    Parameters:
+    -----------
+    tables : dict
+        table name -> dict of pattern -> value (or iterable of patterns, value 1)
+    """
+
+    def __init__(self, tables):
+        self.tables = {}
+        self.patterns = []
+        self.index = {}
+
+        for name, table in tables.items():
+            table = dict(table) if isinstance(table, dict) else dict.fromkeys(table, 1)
+            self.tables[name] = table
+            for pattern in table:
+                if not pattern.isdigit():
+                    raise ValueError(f"Pattern must contain only digits: {pattern!r}")
+                if pattern not in self.index:
+                    self.index[pattern] = len(self.patterns)
+                    self.patterns.append(pattern)
+
+        self.lengths = np.array([len(p) for p in self.patterns], dtype=np.int64)
+        self._build_automaton()
+        self._build_code_index()
+
+    # ====================================================================================
+    # AUTOMATON
+    # ====================================================================================
+
+    def _build_automaton(self):
+        """สร้าง trie + failure links"""
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[node][ch] = nxt
+                node = nxt
+            self._out[node].append(pattern_id)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def scan(self, text):
+        """
+        สแกนเบอร์ครั้งเดียว คืนทุก pattern ที่พบพร้อมตำแหน่ง
+
+        Returns:
+        --------
+        matches : dict
+            pattern -> list of start positions
+        """
+        matches = {}
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for pattern_id in self._out[node]:
+                pattern = self.patterns[pattern_id]
+                matches.setdefault(pattern, []).append(i - len(pattern) + 1)
+        return matches
+
+    # ====================================================================================
+    # VECTORIZED MATCHING (digit matrix windows)
+    # ====================================================================================
+
+    def _build_code_index(self):
+        """ตารางรหัสตัวเลขที่เรียงแล้ว แยกตามความยาว pattern"""
+        self._codes = {}
+        for length in sorted(set(self.lengths.tolist())):
+            ids = np.flatnonzero(self.lengths == length)
+            codes = np.array([int(self.patterns[i]) for i in ids], dtype=np.int64)
+            order = np.argsort(codes)
+            self._codes[length] = (codes[order], ids[order])
+
+    def scan_windows(self, windows):
+        """
+        Match list ของทั้ง batch จาก window codes
+
+        Parameters:
+        -----------
+        windows : callable
+            length -> (N, W) int64 codes of every substring of that length
+
+        Returns:
+        --------
+        rows, pattern_ids, starts : np.ndarray
+            One entry per match
+        """
+        rows, pattern_ids, starts = [], [], []
+        for length, (codes, ids) in self._codes.items():
+            window_codes = windows(length)
+            pos = np.minimum(np.searchsorted(codes, window_codes), len(codes) - 1)
+            hit_rows, hit_starts = np.nonzero(codes[pos] == window_codes)
+            rows.append(hit_rows)
+            pattern_ids.append(ids[pos[hit_rows, hit_starts]])
+            starts.append(hit_starts)
+        return np.concatenate(rows), np.concatenate(pattern_ids), np.concatenate(starts)
+
+    # ====================================================================================
+    # TABLE ACCESS
+    # ====================================================================================
+
+    def table_ids(self, name, length=None):
+        """pattern ids ของ table ตามลำดับ key"""
+        return np.array([self.index[p] for p in self.tables[name]
+                         if length is None or len(p) == length], dtype=np.int64)
+
+    def table_values(self, name, length=None):
+        """ค่าของ table ตามลำดับ key"""
+        return np.array([v for p, v in self.tables[name].items()
+                         if length is None or len(p) == length])
+
+    def suffix_value(self, matches, name, lengths, text_length):
+        """
+        ค่าของ suffix ที่ยาวที่สุดใน table (first match ตาม lengths)
+
+        Returns:
+        --------
+        (length, value) or None
+        """
+        table = self.tables[name]
+        for length in lengths:
+            for pattern, starts in matches.items():
+                if len(pattern) == length and pattern in table and starts[-1] == text_length - length:
+                    return length, table[pattern]
+        return None
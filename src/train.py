@@ -13,6 +13,8 @@ import json
 from datetime import datetime
 from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
 from src.config import MODEL_CONFIG
+from src.data_handler import market_stats_to_arrays
+from src.compiled_model import export_compiled_model
 from sklearn.ensemble import (
     RandomForestRegressor, ExtraTreesRegressor, GradientBoostingRegressor,
     HistGradientBoostingRegressor, VotingRegressor
@@ -455,7 +457,7 @@ def create_ensemble_models(trained_models, X_train, y_train, X_test, y_test,
 # SAVE MODELS AND RESULTS
 # ====================================================================================
 
-def save_models(models, results, feature_names, preprocessor=None, save_dir='models/'):
+def save_models(models, results, feature_names, preprocessor=None, save_dir='models/', market_stats=None):
     """
     Save trained models and metadata
     
@@ -471,6 +473,8 @@ def save_models(models, results, feature_names, preprocessor=None, save_dir='mod
         Preprocessor object
     save_dir : str
         Directory to save models
+    market_stats : dict, optional
+        Training market statistics (stored as array tables with every model)
     
     Returns:
     --------
@@ -488,6 +492,10 @@ def save_models(models, results, feature_names, preprocessor=None, save_dir='mod
     
     saved_paths = {}
     
+    # Serving must use the training market statistics (memory-mappable arrays)
+    if market_stats is not None:
+        market_stats = market_stats_to_arrays(market_stats)
+    
     # Separate individual and ensemble models
     individual_models = {k: v for k, v in models.items() if 'Ensemble' not in k}
     ensemble_models = {k: v for k, v in models.items() if 'Ensemble' in k}
@@ -506,6 +514,7 @@ def save_models(models, results, feature_names, preprocessor=None, save_dir='mod
                 'model': model,
                 'model_name': model_name,
                 'feature_names': feature_names,
+                'market_stats': market_stats,
                 'r2_score': r2_score_val,
                 'timestamp': datetime.now().isoformat()
             }
@@ -527,6 +536,7 @@ def save_models(models, results, feature_names, preprocessor=None, save_dir='mod
                 'model': model,
                 'model_name': model_name,
                 'feature_names': feature_names,
+                'market_stats': market_stats,
                 'timestamp': datetime.now().isoformat()
             }
             
@@ -561,6 +571,7 @@ def save_models(models, results, feature_names, preprocessor=None, save_dir='mod
                 'model_name': best_model_name,
                 'feature_names': feature_names,
                 'preprocessor': preprocessor,
+                'market_stats': market_stats,
                 'r2_score': float(results.iloc[best_idx].get('R2_test', results.iloc[best_idx].get('r2', 0))),
                 'results_summary': results.to_dict(),
                 'timestamp': datetime.now().isoformat()
@@ -570,6 +581,12 @@ def save_models(models, results, feature_names, preprocessor=None, save_dir='mod
             joblib.dump(best_model_data, best_path)
             saved_paths['best_model'] = best_path
             print(f"\n   🏆 Saved best model ({best_model_name}) to {best_path}")
+            
+            # NumPy-only export for serving (the original artifact stays the fallback)
+            try:
+                saved_paths['best_model_compiled'] = export_compiled_model(best_path)
+            except Exception as e:
+                print(f"   ⚠️ Compiled export skipped for {best_model_name}: {str(e)}")
     
     # 4. Save metadata
     metadata = {
@@ -603,7 +620,7 @@ def save_models(models, results, feature_names, preprocessor=None, save_dir='mod
 
 def run_training_pipeline(X_train, X_test, y_train, y_test, sample_weight=None,
                          feature_names=None, preprocessor=None, 
-                         optimize=True, save_models_flag=True):
+                         optimize=True, save_models_flag=True, market_stats=None):
     """
     Run complete training pipeline
     
@@ -625,6 +642,8 @@ def run_training_pipeline(X_train, X_test, y_train, y_test, sample_weight=None,
         Whether to perform hyperparameter optimization
     save_models_flag : bool
         Whether to save trained models
+    market_stats : dict, optional
+        Market statistics of the training split, stored with every saved model
     
     Returns:
     --------
@@ -685,7 +704,8 @@ def run_training_pipeline(X_train, X_test, y_train, y_test, sample_weight=None,
     if save_models_flag:
         saved_paths = save_models(
             all_models, all_results, feature_names, 
-            preprocessor, save_dir='models/deployed/'
+            preprocessor, save_dir='models/deployed/',
+            market_stats=market_stats
         )
     
     # 6. Print final summary
@@ -742,13 +762,14 @@ def load_training_results(model_dir='models/deployed/'):
         print("❌ No training metadata found")
         return None
 
-def quick_train(X_train, X_test, y_train, y_test, sample_weight=None):
+def quick_train(X_train, X_test, y_train, y_test, sample_weight=None, market_stats=None):
     """Quick training without optimization for testing"""
     return run_training_pipeline(
         X_train, X_test, y_train, y_test,
         sample_weight=sample_weight,
         optimize=False,
-        save_models_flag=False
+        save_models_flag=False,
+        market_stats=market_stats
     )
 
 # ====================================================================================
@@ -0,0 +1,61 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/model_fixtures.py
+
+"""
+Shared setup for tests that serve a small trained model artifact
+"""
+import tempfile
+import joblib
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.linear_model import Ridge
+
+from src.features import create_masterpiece_features
+
+# Cheap engine features most serving tests train on
+FEATURE_NAMES = ['digit_sum', 'ending_score', 'rarity_score', 'power_sum']
+
+def training_data(seed, n_numbers=100):
+    """
+    สุ่มเบอร์ '08' + 8 หลัก พร้อมราคา แล้วสร้าง features ทั้งหมด
+
+    Returns:
+    --------
+    phones : list
+    train_df : pd.DataFrame
+        phone_number, price
+    features : pd.DataFrame
+        create_masterpiece_features(train_df)
+    """
+    rng = np.random.default_rng(seed)
+    phones = ['08' + ''.join(map(str, rng.integers(0, 10, 8))) for _ in range(n_numbers)]
+    train_df = pd.DataFrame({'phone_number': phones, 'price': rng.integers(500, 90000, len(phones))})
+    return phones, train_df, create_masterpiece_features(train_df)
+
+def save_artifact(path, model, feature_names, model_name='Ridge', **extra):
+    """joblib.dump a model artifact dict and return its path"""
+    joblib.dump({'model': model, 'model_name': model_name, 'feature_names': feature_names, **extra}, path)
+    return path
+
+def ridge_artifact(seed, n_numbers=100, feature_names=FEATURE_NAMES):
+    """
+    Temporary model directory with a Ridge best_model.pkl on log prices
+
+    Returns:
+    --------
+    model_dir : str
+        Remove it with shutil.rmtree when done
+    model_path : str
+    phones : list
+        Numbers the model was trained on
+    """
+    phones, train_df, features = training_data(seed, n_numbers)
+    model_dir = tempfile.mkdtemp()
+    model_path = save_artifact(os.path.join(model_dir, 'best_model.pkl'),
+                               Ridge().fit(features[feature_names], np.log1p(train_df['price'])), feature_names)
+    return model_dir, model_path, phones
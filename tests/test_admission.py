@@ -0,0 +1,167 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_admission.py
+
+import unittest
+import asyncio
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.admission import AdmissionController, AdmissionRejected, TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestAdmission(unittest.TestCase):
+    """Unit tests for admission control and rate limits"""
+
+    def make_controller(self, **kwargs):
+        params = dict(max_numbers=10, max_queued=20, bulk_share=0.5, queue_timeout=5, rate=0)
+        params.update(kwargs)
+        return AdmissionController(**params)
+
+    def test_token_bucket(self):
+        """Test refill, burst and the wait hint"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, burst=50, clock=clock)
+        self.assertEqual(bucket.take(50), 0.0)
+        self.assertAlmostEqual(bucket.take(20), 2.0)
+        clock.now = 2.0
+        self.assertEqual(bucket.take(20), 0.0)
+        # Larger than the burst: charged a full bucket instead of never passing
+        clock.now = 10.0
+        self.assertEqual(bucket.take(500), 0.0)
+
+    def test_rate_limits_per_client(self):
+        """Test default and per-key buckets"""
+        controller = self.make_controller(max_numbers=1000, rate=10, burst=100,
+                                          api_keys={'dealer': {'rate': 0}, 'partner': {'rate': 1000, 'burst': 500}})
+        client = controller.client_key(None, '10.0.0.1')
+        controller.release(controller.try_admit(100, 'bulk', client), 'bulk')
+        with self.assertRaises(AdmissionRejected) as context:
+            controller.try_admit(50, 'bulk', client)
+        self.assertEqual(context.exception.reason, 'rate_limited')
+        self.assertGreaterEqual(int(context.exception.retry_after_header), 1)
+
+        # Another address, an unlimited key and a key with a larger bucket are not affected
+        self.assertTrue(controller.try_admit(100, 'bulk', controller.client_key(None, '10.0.0.2')))
+        dealer = controller.client_key('dealer', '10.0.0.1')
+        for _ in range(5):
+            controller.release(controller.try_admit(100, 'bulk', dealer), 'bulk')
+        partner = controller.client_key('partner', '10.0.0.1')
+        controller.release(controller.try_admit(400, 'interactive', partner), 'interactive')
+        # Unknown keys fall back to the address bucket
+        self.assertEqual(controller.client_key('invented', '10.0.0.1'), client)
+        self.assertEqual(controller.stats()['rejected']['rate_limited'], 1)
+
+    def test_capacity_and_priority(self):
+        """Test that bulk work is capped and interactive waiters go first"""
+        controller = self.make_controller()
+
+        async def main():
+            granted = []
+            bulk = await controller.admit(5, 'bulk')
+            # The bulk lane is full (bulk_share=0.5) although total capacity is not
+            with self.assertRaises(AdmissionRejected):
+                controller.try_admit(1, 'bulk')
+            interactive = await controller.admit(5, 'interactive')
+
+            async def wait(n, lane):
+                cost = await controller.admit(n, lane)
+                granted.append(lane)
+                return cost
+
+            queued_bulk = asyncio.ensure_future(wait(3, 'bulk'))
+            await asyncio.sleep(0)
+            queued_interactive = asyncio.ensure_future(wait(3, 'interactive'))
+            await asyncio.sleep(0)
+            stats = controller.stats()
+
+            # Freed capacity goes to the interactive waiter although bulk queued first
+            controller.release(interactive, 'interactive')
+            self.assertEqual(controller.stats()['in_flight'], {'interactive': 3, 'bulk': 5})
+            self.assertEqual(controller.stats()['queued'], {'interactive': 0, 'bulk': 3})
+            controller.release(bulk, 'bulk')
+            await asyncio.gather(queued_bulk, queued_interactive)
+            return stats, granted
+
+        stats, granted = asyncio.run(main())
+        self.assertEqual(stats['in_flight'], {'interactive': 5, 'bulk': 5})
+        self.assertEqual(stats['queued'], {'interactive': 3, 'bulk': 3})
+        self.assertEqual(granted, ['interactive', 'bulk'])
+        self.assertEqual(controller.stats()['queued'], {'interactive': 0, 'bulk': 0})
+        self.assertEqual(controller.stats()['in_flight'], {'interactive': 3, 'bulk': 3})
+
+    def test_queue_full_and_timeout(self):
+        """Test 429 reasons when waiting is not possible"""
+        controller = self.make_controller(max_queued=5, queue_timeout=0.05)
+
+        async def main():
+            await controller.admit(10, 'interactive')
+            waiting = asyncio.ensure_future(controller.admit(5, 'interactive'))
+            await asyncio.sleep(0)
+            with self.assertRaises(AdmissionRejected) as full:
+                await controller.admit(1, 'interactive')
+            with self.assertRaises(AdmissionRejected) as timeout:
+                await waiting
+            return full.exception, timeout.exception
+
+        full, timeout = asyncio.run(main())
+        self.assertEqual(full.reason, 'queue_full')
+        self.assertEqual(timeout.reason, 'queue_timeout')
+        self.assertEqual(controller.stats()['queued'], {'interactive': 0, 'bulk': 0})
+        self.assertEqual(controller.stats()['rejected'], {'rate_limited': 0, 'queue_full': 1, 'queue_timeout': 1})
+
+    def test_rejections_keep_tokens(self):
+        """Test that busy, queue_full and queue_timeout rejections do not spend the client's quota"""
+        controller = self.make_controller(max_queued=10, queue_timeout=0.01, rate=0.001, burst=10)
+        client = controller.client_key(None, '10.0.0.1')
+
+        async def main():
+            busy = await controller.admit(10, 'interactive')
+            for _ in range(3):
+                with self.assertRaises(AdmissionRejected):
+                    controller.try_admit(10, 'interactive', client)
+            with self.assertRaises(AdmissionRejected) as timeout:
+                await controller.admit(10, 'interactive', client)
+            waiting = asyncio.ensure_future(controller.admit(10, 'interactive'))
+            await asyncio.sleep(0)
+            with self.assertRaises(AdmissionRejected) as full:
+                await controller.admit(10, 'interactive', client)
+            waiting.cancel()
+            await asyncio.gather(waiting, return_exceptions=True)
+            controller.release(busy, 'interactive')
+
+            # The whole bucket is still there
+            controller.release(await controller.admit(10, 'interactive', client), 'interactive')
+            return timeout.exception, full.exception
+
+        timeout, full = asyncio.run(main())
+        self.assertEqual((timeout.reason, full.reason), ('queue_timeout', 'queue_full'))
+        self.assertEqual(controller.stats()['rejected'], {'rate_limited': 0, 'queue_full': 4, 'queue_timeout': 1})
+        with self.assertRaises(AdmissionRejected) as limited:
+            controller.try_admit(10, 'interactive', client)
+        self.assertEqual(limited.exception.reason, 'rate_limited')
+
+    def test_streams_wait_for_tokens(self):
+        """Test that wait=True slows a client down instead of rejecting it"""
+        controller = self.make_controller(max_numbers=1000, rate=200, burst=20)
+        client = controller.client_key(None, 'stream')
+
+        async def main():
+            for _ in range(3):
+                async with controller.slot(20, 'bulk', client, wait=True):
+                    pass
+
+        asyncio.run(main())
+        self.assertEqual(controller.stats()['admitted']['bulk'], 3)
+        self.assertEqual(controller.stats()['rejected']['rate_limited'], 0)
+        self.assertEqual(controller.stats()['in_flight']['bulk'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
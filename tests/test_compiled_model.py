@@ -0,0 +1,155 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_compiled_model.py
+
+import unittest
+import tempfile
+import shutil
+from unittest.mock import patch
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.ensemble import (
+    RandomForestRegressor, ExtraTreesRegressor, GradientBoostingRegressor,
+    HistGradientBoostingRegressor, VotingRegressor, StackingRegressor
+)
+from sklearn.tree import DecisionTreeRegressor
+from sklearn.linear_model import Ridge
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVR
+
+from api.prediction import PredictionPipeline
+from src.compiled_model import (
+    compile_model, export_compiled_model, compiled_artifact_path, resolve_serving_artifact,
+    verification_numbers, verify_fast_path, CompiledModel, CompiledTrees, CompiledModelMismatchError
+)
+from tests.model_fixtures import FEATURE_NAMES, training_data, save_artifact
+
+class _WeightedEnsemble:
+    """Same attributes and predict rule as src.model_utils.WeightedEnsemble"""
+
+    def __init__(self, models, weights=None):
+        self.models = models
+        self.weights = weights
+
+    def predict(self, X):
+        predictions = np.array([model.predict(X) for _, model in self.models]).T
+        if self.weights is not None:
+            return np.average(predictions, axis=1, weights=self.weights)
+        return np.mean(predictions, axis=1)
+
+class TestCompiledModel(unittest.TestCase):
+    """Unit tests for the compiled array-based model"""
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(19)
+        cls.X = rng.normal(size=(400, 6)).astype(np.float32)
+        cls.y = cls.X[:, 0] * 2 + np.sin(cls.X[:, 1]) + rng.normal(size=400) * 0.1
+        cls.X_missing = cls.X.copy()
+        cls.X_missing[rng.random(cls.X.shape) < 0.1] = np.nan
+
+    def assert_compiled_matches(self, model, X):
+        compiled = compile_model(model)
+        np.testing.assert_allclose(compiled.predict(X), model.predict(X), rtol=1e-6, atol=1e-6)
+
+    def test_sklearn_trees(self):
+        """Test forests and boosting models, including missing values"""
+        for model in [DecisionTreeRegressor(max_depth=6), RandomForestRegressor(20, max_depth=8),
+                      ExtraTreesRegressor(10), HistGradientBoostingRegressor(max_iter=30)]:
+            model.fit(self.X, self.y)
+            self.assert_compiled_matches(model, self.X)
+            self.assert_compiled_matches(model, self.X_missing)
+
+        model = GradientBoostingRegressor(n_estimators=30).fit(self.X, self.y)
+        self.assert_compiled_matches(model, self.X)
+        self.assertIsInstance(compile_model(model).estimator, CompiledTrees)
+
+    def test_ensembles(self):
+        """Test weighted, voting and stacking ensembles"""
+        ridge = Ridge().fit(self.X, self.y)
+        forest = RandomForestRegressor(10, max_depth=6).fit(self.X, self.y)
+        self.assert_compiled_matches(_WeightedEnsemble([('ridge', ridge), ('rf', forest)], [0.3, 0.7]), self.X)
+        self.assert_compiled_matches(_WeightedEnsemble([('ridge', ridge), ('rf', forest)]), self.X)
+
+        voting = VotingRegressor([('ridge', Ridge()), ('rf', RandomForestRegressor(5))], weights=[1, 2])
+        self.assert_compiled_matches(voting.fit(self.X, self.y), self.X)
+
+        stacking = StackingRegressor([('ridge', Ridge()), ('gb', GradientBoostingRegressor(n_estimators=10))],
+                                     final_estimator=Ridge(), passthrough=True)
+        self.assert_compiled_matches(stacking.fit(self.X, self.y), self.X)
+
+    def test_contributions(self):
+        """Test that contributions plus bias reproduce every prediction"""
+        forest = RandomForestRegressor(10, max_depth=6).fit(self.X, self.y)
+        stacking = StackingRegressor([('ridge', Ridge()), ('rf', RandomForestRegressor(5, max_depth=4))],
+                                     final_estimator=Ridge(), passthrough=True).fit(self.X, self.y)
+        weighted = _WeightedEnsemble([('ridge', Ridge().fit(self.X, self.y)), ('rf', forest)], [1, 3])
+        hist = HistGradientBoostingRegressor(max_iter=20).fit(self.X, self.y)
+        cases = [(forest, self.X_missing), (hist, self.X_missing), (stacking, self.X), (weighted, self.X)]
+        for model, X in cases:
+            contributions = compile_model(model).contributions(X)
+            self.assertEqual(contributions.shape, (len(X), X.shape[1] + 1))
+            np.testing.assert_allclose(contributions.sum(axis=1), model.predict(X), rtol=1e-6, atol=1e-6)
+            # y depends on the first two features only
+            importance = np.abs(contributions[:, :-1]).mean(axis=0)
+            self.assertEqual(set(np.argsort(-importance)[:2]), {0, 1}, type(model).__name__)
+
+    def test_unsupported_model(self):
+        """Test that models without an array equivalent are rejected"""
+        with self.assertRaises(NotImplementedError):
+            compile_model(SVR().fit(self.X, self.y))
+
+    def test_export_and_serving(self):
+        """Test the compiled artifact and that serving prefers it"""
+        phones, train_df, features = training_data(5, 200)
+        feature_names = FEATURE_NAMES + ['unique_digits', 'ending_pattern_encoded']
+        features = features[feature_names]
+        preprocessor = StandardScaler().fit(features)
+        model = RandomForestRegressor(20, max_depth=8, random_state=0).fit(
+            preprocessor.transform(features), np.log1p(train_df['price']))
+
+        model_dir = tempfile.mkdtemp()
+        try:
+            model_path = save_artifact(os.path.join(model_dir, 'best_model.pkl'), model, feature_names,
+                                       'Random Forest', preprocessor=preprocessor)
+            original = PredictionPipeline(model_path=model_path)
+            self.assertEqual(resolve_serving_artifact(model_path), model_path)
+
+            compiled_path = export_compiled_model(model_path, n_verify=64)
+            self.assertEqual(compiled_path, compiled_artifact_path(model_path))
+            self.assertEqual(resolve_serving_artifact(model_path), compiled_path)
+
+            pipeline = PredictionPipeline(model_path=model_path)
+            self.assertIsInstance(pipeline.model, CompiledModel)
+            self.assertTrue(pipeline.model_info['compiled'])
+            numbers = phones[:20] + ['0888888888']
+            for number in numbers:
+                self.assertAlmostEqual(pipeline.predict_single(number)['predicted_price'],
+                                       original.predict_single(number)['predicted_price'], places=4)
+            batch = pipeline.predict_batch(numbers)['results']
+            expected = original.predict_batch(numbers)['results']
+            for result, reference in zip(batch, expected):
+                self.assertAlmostEqual(result['predicted_price'], reference['predicted_price'], places=4)
+
+            # A retrained artifact newer than its export is served as is
+            os.utime(compiled_path, (0, 0))
+            self.assertEqual(resolve_serving_artifact(model_path), model_path)
+
+            # The written artifact's single-number path is checked against the original model
+            numbers = verification_numbers(64)
+            expected = np.log1p([original.predict_single(number)['predicted_price'] for number in numbers])
+            self.assertLess(verify_fast_path(compiled_path, numbers, expected), 1e-4)
+            with self.assertRaises(CompiledModelMismatchError):
+                verify_fast_path(compiled_path, numbers, expected + 0.1)
+            with patch('src.compiled_model.array_predictor', lambda model: lambda X: model.predict(X) + 0.1):
+                with self.assertRaises(CompiledModelMismatchError):
+                    export_compiled_model(model_path, n_verify=16)
+            self.assertFalse(os.path.exists(compiled_path))
+        finally:
+            shutil.rmtree(model_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_feature_engine.py
+
+import unittest
+import time
+from unittest.mock import patch
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import features as F
+from src.feature_engine import (
+    DigitMatrix,
+    parse_phone_numbers,
+    BASIC_FEATURES,
+    ADVANCED_FEATURES,
+    MASTER_FEATURES,
+    SPECIAL_FEATURES,
+    SUFFIX_BLOCK,
+    PREFIX_BLOCK
+)
+from src.feature_fastpath import SCALAR_FEATURES, SingleNumberFeatures
+
+class TestFeatureEngine(unittest.TestCase):
+    """Vectorized engine must match the scalar feature functions exactly"""
+
+    def setUp(self):
+        """Set up test data"""
+        rng = np.random.default_rng(42)
+        self.phones = ['0' + ''.join(map(str, rng.integers(0, 10, 9))) for _ in range(300)]
+        for d in '0123456789':
+            self.phones += ['08' + d * 8, '0' + d * 9, '08123' + d * 5]
+        for _ in range(300):
+            digits = rng.choice(list('0123456789'), size=rng.integers(1, 4), replace=False)
+            self.phones.append('0' + ''.join(rng.choice(digits, 9)))
+        self.phones += [
+            '0812345678', '0898765432', '0812121212', '0812344321',
+            '0868886888', '0891689999', '0863956395', '0855555559'
+        ]
+        self.dm = DigitMatrix.from_numbers(self.phones)
+
+    def test_parse_phone_numbers(self):
+        """Test digit matrix parsing"""
+        digits = parse_phone_numbers(['0812345678', '0999999999'])
+        self.assertEqual(digits.shape, (2, 10))
+        self.assertEqual(digits.dtype, np.uint8)
+        self.assertEqual(digits[0].tolist(), [0, 8, 1, 2, 3, 4, 5, 6, 7, 8])
+
+        for bad in [['081234567'], ['08123456789'], ['08123x5678'], ['081234567๑']]:
+            with self.assertRaises(ValueError):
+                parse_phone_numbers(bad)
+
+        self.assertEqual(parse_phone_numbers([]).shape, (0, 10))
+
+    def test_matches_scalar_features(self):
+        """Test every engine column against its scalar function"""
+        for name, func in BASIC_FEATURES + ADVANCED_FEATURES + MASTER_FEATURES + SPECIAL_FEATURES:
+            expected = [SCALAR_FEATURES[name](x) for x in self.phones]
+            result = func(self.dm)
+            self.assertEqual(len(result), len(self.phones), name)
+            if name == 'ending_pattern_type':
+                self.assertEqual(list(result), expected, name)
+            else:
+                np.testing.assert_array_equal(
+                    np.asarray(result, dtype=float), np.asarray(expected, dtype=float), err_msg=name
+                )
+
+    def test_block_tables(self):
+        """Test that prefix/suffix block gathers equal direct computation"""
+        self.assertEqual(len(SUFFIX_BLOCK.matrix), 10000)
+        self.assertEqual(len(PREFIX_BLOCK.matrix), 1000)
+
+        block_features = [
+            (name, func) for name, func in BASIC_FEATURES + ADVANCED_FEATURES + MASTER_FEATURES + SPECIAL_FEATURES
+            if hasattr(func, 'block')
+        ]
+        self.assertGreater(len(block_features), 10)
+        for name, func in block_features:
+            np.testing.assert_array_equal(func(self.dm), func.compute(self.dm), err_msg=name)
+
+    def test_single_number_fast_path(self):
+        """Test that the scalar single-number vector equals the engine (float32)"""
+        from src.feature_registry import compute_features, get_all_feature_names
+        market_stats = {
+            'avg_prices': {'9999': 80000.0, '888': 30000.0, '99': 9000.0},
+            'premium_suffix_stats': {'9999': 90000.0, '888': 35000.0},
+            'popularity': {'9999': 4, '888': 7, '99': 12},
+            'global_median': 4500.0
+        }
+        names = get_all_feature_names() + ['unknown_feature']
+        for stats in [market_stats, None]:
+            fast = SingleNumberFeatures(names, stats)
+            expected = compute_features(self.phones, stats, names)
+            for i, number in enumerate(self.phones[::7]):
+                row = fast.vector(number)[0]
+                for j, name in enumerate(names[:-1]):
+                    np.testing.assert_array_equal(
+                        row[j], np.float32(expected[name][i * 7]), err_msg=f'{name} {number}'
+                    )
+                self.assertEqual(row[-1], 0)
+
+    def test_single_number_fast_path_latency(self):
+        """Test one sequence scan per number and the single-number latency budget"""
+        from src.feature_registry import get_all_feature_names
+        fast = SingleNumberFeatures(get_all_feature_names())
+        with patch.object(F.SEQUENCE_MATCHER, 'scan', wraps=F.SEQUENCE_MATCHER.scan) as scan:
+            fast.vector('0812345678')
+        self.assertEqual(scan.call_count, 1)
+
+        # Fastest of a few runs per number, so scheduling noise does not fail the test
+        timings = []
+        for number in self.phones[:200]:
+            best = float('inf')
+            for _ in range(3):
+                started = time.perf_counter()
+                fast.vector(number)
+                best = min(best, time.perf_counter() - started)
+            timings.append(best)
+        self.assertLess(np.percentile(timings, 99), 1e-3)
+
+    def test_create_masterpiece_features_columns(self):
+        """Test that the pipeline output keeps its column layout"""
+        import pandas as pd
+        df = pd.DataFrame({'phone_number': self.phones[:20], 'price': np.arange(20) * 100 + 100})
+        result = F.create_masterpiece_features(df)
+        self.assertEqual(len(result), 20)
+        self.assertNotIn('phone_number', result.columns)
+        self.assertNotIn('ending_pattern_type', result.columns)
+        for name, _ in BASIC_FEATURES + ADVANCED_FEATURES + SPECIAL_FEATURES:
+            self.assertIn(name, result.columns)
+
+if __name__ == '__main__':
+    unittest.main()
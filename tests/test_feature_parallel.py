@@ -0,0 +1,73 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_feature_parallel.py
+
+import unittest
+import tempfile
+import shutil
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import BATCH_CONFIG
+from src.features import create_masterpiece_features
+from src.feature_parallel import resolve_n_workers, resolve_chunk_size
+from src.feature_store import FeatureStore
+
+class TestFeatureParallel(unittest.TestCase):
+    """Unit tests for process-pool feature generation"""
+
+    def setUp(self):
+        """Set up test data"""
+        rng = np.random.default_rng(5)
+        phones = ['0' + ''.join(map(str, rng.integers(0, 10, 9))) for _ in range(250)]
+        phones += ['0888888888', '0812345678', '0999999999']
+        self.df = pd.DataFrame(
+            {'phone_number': phones, 'price': rng.integers(100, 100000, len(phones))},
+            index=np.arange(len(phones))[::-1]
+        )
+        self.market_stats = {
+            'avg_prices': {'9999': 80000.0, '888': 30000.0, '99': 9000.0},
+            'premium_suffix_stats': {'9999': 90000.0, '888': 35000.0},
+            'popularity': {'9999': 4, '888': 7, '99': 12},
+            'global_median': 4500.0
+        }
+
+    def test_matches_serial(self):
+        """Test that sharded generation equals the serial pipeline"""
+        for stats in [self.market_stats, None]:
+            expected = create_masterpiece_features(self.df, stats)
+            result = create_masterpiece_features(self.df, stats, n_workers=2, chunk_size=60)
+            pd.testing.assert_frame_equal(result, expected)
+
+    def test_with_feature_store(self):
+        """Test parallel computation of missing store rows"""
+        store_dir = tempfile.mkdtemp()
+        try:
+            store = FeatureStore(store_dir, verbose=False)
+            expected = create_masterpiece_features(self.df, self.market_stats)
+            result = create_masterpiece_features(
+                self.df, self.market_stats, feature_store=store, n_workers=2, chunk_size=100
+            )
+            pd.testing.assert_frame_equal(result, expected)
+        finally:
+            shutil.rmtree(store_dir, ignore_errors=True)
+
+    def test_resolve_settings(self):
+        """Test worker count and chunk size resolution"""
+        self.assertEqual(resolve_n_workers(3), 3)
+        self.assertEqual(resolve_n_workers(-1), os.cpu_count())
+        self.assertEqual(resolve_chunk_size(10), 10)
+        self.assertEqual(resolve_chunk_size(), BATCH_CONFIG['feature_chunk_size'])
+
+        original = BATCH_CONFIG['parallel_processing']
+        BATCH_CONFIG['parallel_processing'] = False
+        try:
+            self.assertEqual(resolve_n_workers(), 1)
+        finally:
+            BATCH_CONFIG['parallel_processing'] = original
+
+if __name__ == '__main__':
+    unittest.main()
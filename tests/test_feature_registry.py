@@ -0,0 +1,124 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_feature_registry.py
+
+import unittest
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_handler import market_stats_to_arrays
+from src.features import create_masterpiece_features
+from src.feature_registry import (
+    FEATURE_REGISTRY,
+    FEATURE_PROVIDERS,
+    build_execution_plan,
+    compact_column,
+    compute_features,
+    get_all_feature_names
+)
+
+class TestFeatureRegistry(unittest.TestCase):
+    """Unit tests for the dependency-aware feature registry"""
+
+    def setUp(self):
+        """Set up test data"""
+        rng = np.random.default_rng(7)
+        phones = ['0' + ''.join(map(str, rng.integers(0, 10, 9))) for _ in range(50)]
+        phones += ['0888888888', '0812345678', '0999999999', '0891689999']
+        self.df = pd.DataFrame({'phone_number': phones, 'price': rng.integers(100, 100000, len(phones))})
+        self.market_stats = {
+            'avg_prices': {'9999': 80000.0, '888': 30000.0, '99': 9000.0},
+            'premium_suffix_stats': {'9999': 90000.0, '888': 35000.0},
+            'popularity': {'9999': 4, '888': 7, '99': 12},
+            'global_median': 4500.0
+        }
+
+    def test_dependencies_are_registered(self):
+        """Test that every dependency has a provider declared before it"""
+        order = {name: i for i, name in enumerate(FEATURE_REGISTRY)}
+        for name, spec in FEATURE_REGISTRY.items():
+            for dep in spec.depends:
+                self.assertIn(dep, FEATURE_PROVIDERS, f"{name} -> {dep}")
+                self.assertLess(order[FEATURE_PROVIDERS[dep]], order[name], f"{name} -> {dep}")
+
+    def test_full_pipeline_columns(self):
+        """Test that the registry covers every pipeline column"""
+        features = create_masterpiece_features(self.df, self.market_stats)
+        self.assertEqual(list(features.columns), get_all_feature_names())
+
+    def test_minimal_plan(self):
+        """Test that the plan only contains the requested features and their dependencies"""
+        plan = [spec.name for spec in build_execution_plan(['power_x_ending'])]
+        self.assertEqual(plan, ['ending_score', 'power_sum', 'power_x_ending'])
+
+        plan = [spec.name for spec in build_execution_plan(['final_premium_score_v4'])]
+        self.assertIn('market_features', plan)
+        self.assertIn('premium_signal_strength', plan)
+        self.assertNotIn('digit_entropy', plan)
+        self.assertEqual(len(build_execution_plan(['not_a_feature'])), 0)
+
+    def test_minimal_plan_matches_full(self):
+        """Test that pruned feature values equal the full pipeline"""
+        requested = ['final_premium_score_v4', 'power_x_ending', 'ending_pattern_encoded',
+                     'estimated_tier', 'market_popularity_score', 'digit_5_spread', 'unknown']
+        for stats in [None, self.market_stats]:
+            full = create_masterpiece_features(self.df, stats)
+            pruned = create_masterpiece_features(self.df, stats, feature_names=requested)
+            self.assertEqual(list(pruned.columns), requested[:-1])
+            pd.testing.assert_frame_equal(pruned, full[requested[:-1]])
+
+    def test_ending_pattern_codes_do_not_depend_on_batch(self):
+        """Test that ending_pattern_encoded uses one fixed vocabulary"""
+        numbers = ['0812345678', '0812348811', '0812345567', '0888888888', '0812341222']
+        codes = compute_features(numbers, None, ['ending_pattern_encoded'])['ending_pattern_encoded']
+        self.assertEqual(codes.tolist(), [0, 1, 2, 3, 4])
+        for number, code in zip(numbers, codes):
+            alone = compute_features([number], None, ['ending_pattern_encoded'])['ending_pattern_encoded']
+            self.assertEqual(alone.tolist(), [code])
+
+    def test_array_market_stats(self):
+        """Test that array-backed market statistics give the same features"""
+        expected = create_masterpiece_features(self.df, self.market_stats)
+        result = create_masterpiece_features(self.df, market_stats_to_arrays(self.market_stats))
+        pd.testing.assert_frame_equal(result, expected)
+        self.assertTrue((expected['market_avg_price_2'] == 9000.0).any())
+        self.assertTrue((expected['market_premium_suffix_price'] == 90000.0).any())
+
+    def test_compact_dtypes(self):
+        """Test that compact columns keep their values within float32 precision"""
+        full = create_masterpiece_features(self.df, self.market_stats, compact=False)
+        compact = create_masterpiece_features(self.df, self.market_stats, compact=True)
+        self.assertEqual(list(compact.columns), list(full.columns))
+        for name in full.columns:
+            kind = full[name].dtype.kind
+            if kind in 'biu':
+                self.assertEqual(compact[name].dtype.kind, 'i', name)
+                np.testing.assert_array_equal(compact[name].to_numpy(), full[name].to_numpy(), err_msg=name)
+            elif kind == 'f':
+                self.assertEqual(compact[name].dtype, np.float32, name)
+                np.testing.assert_allclose(compact[name], full[name], rtol=1e-6, err_msg=name)
+
+        self.assertEqual(compact_column(np.array([True, False])).dtype, np.int8)
+        self.assertEqual(compact_column(np.array([0, 300])).dtype, np.int16)
+
+    def test_matrix_output(self):
+        """Test the NumPy matrix output"""
+        frame = create_masterpiece_features(self.df, self.market_stats)
+        matrix, names = create_masterpiece_features(self.df, self.market_stats, as_matrix=True)
+        self.assertEqual(names, list(frame.columns))
+        self.assertEqual(matrix.shape, frame.shape)
+        self.assertEqual(matrix.dtype, np.float32)
+        np.testing.assert_array_equal(matrix, frame.to_numpy(dtype=np.float32))
+
+        requested = ['digit_sum', 'market_avg_price_4']
+        matrix, names = create_masterpiece_features(
+            self.df, self.market_stats, feature_names=requested, as_matrix=True
+        )
+        self.assertEqual(names, requested)
+        self.assertEqual(matrix.shape, (len(self.df), 2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_feature_store.py
+
+import unittest
+import tempfile
+import shutil
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import CONFIG
+from src.features import create_masterpiece_features
+from src.feature_store import FeatureStore
+
+class TestFeatureStore(unittest.TestCase):
+    """Unit tests for the persistent feature store"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.store_dir = tempfile.mkdtemp()
+        rng = np.random.default_rng(11)
+        phones = ['0' + ''.join(map(str, rng.integers(0, 10, 9))) for _ in range(200)]
+        phones += ['0888888888', '0812345678', '0999999999', '0888888888']
+        self.df = pd.DataFrame({'phone_number': phones, 'price': rng.integers(100, 100000, len(phones))})
+        self.market_stats = {
+            'avg_prices': {'9999': 80000.0, '888': 30000.0, '99': 9000.0},
+            'premium_suffix_stats': {'9999': 90000.0, '888': 35000.0},
+            'popularity': {'9999': 4, '888': 7, '99': 12},
+            'global_median': 4500.0
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+
+    def test_matches_direct_computation(self):
+        """Test that stored features equal freshly computed ones"""
+        store = FeatureStore(self.store_dir, verbose=False)
+        for stats in [self.market_stats, None]:
+            expected = create_masterpiece_features(self.df, stats)
+            result = create_masterpiece_features(self.df, stats, feature_store=store)
+            pd.testing.assert_frame_equal(result, expected)
+
+            # Second pass is served from disk
+            result = create_masterpiece_features(self.df, stats, feature_store=FeatureStore(self.store_dir))
+            pd.testing.assert_frame_equal(result, expected)
+
+    def test_incremental_rows(self):
+        """Test that only new numbers are added"""
+        store = FeatureStore(self.store_dir, verbose=False)
+        create_masterpiece_features(self.df.iloc[:100], self.market_stats, feature_store=store)
+        self.assertEqual(store.n_rows, 100)
+        keys_before = np.asarray(store.keys()).copy()
+
+        store = FeatureStore(self.store_dir, verbose=False)
+        result = create_masterpiece_features(self.df, self.market_stats, feature_store=store)
+        self.assertEqual(store.n_rows, self.df['phone_number'].nunique())
+        np.testing.assert_array_equal(np.asarray(store.keys())[:100], keys_before)
+        pd.testing.assert_frame_equal(result, create_masterpiece_features(self.df, self.market_stats))
+
+    def test_table_change_invalidates_affected_columns(self):
+        """Test that changing a scoring table only invalidates the columns reading it"""
+        store = FeatureStore(self.store_dir, verbose=False)
+        create_masterpiece_features(self.df, self.market_stats, feature_store=store)
+        before = {name: meta['fingerprint'] for name, meta in store.manifest['columns'].items()}
+
+        original = CONFIG['GOOD_DIGITS']
+        CONFIG['GOOD_DIGITS'] = original | {'0'}
+        try:
+            create_masterpiece_features(self.df, self.market_stats, feature_store=store)
+        finally:
+            CONFIG['GOOD_DIGITS'] = original
+        after = {name: meta['fingerprint'] for name, meta in store.manifest['columns'].items()}
+
+        changed = [name for name in before if before[name] != after[name]]
+        self.assertEqual(changed, ['good_digit_count'])
+
+    def test_market_stats_change(self):
+        """Test that new market statistics only invalidate market columns"""
+        store = FeatureStore(self.store_dir, verbose=False)
+        create_masterpiece_features(self.df, self.market_stats, feature_store=store)
+        before = {name: meta['fingerprint'] for name, meta in store.manifest['columns'].items()}
+
+        stats = dict(self.market_stats, global_median=6000.0)
+        result = create_masterpiece_features(self.df, stats, feature_store=store)
+        after = {name: meta['fingerprint'] for name, meta in store.manifest['columns'].items()}
+
+        changed = sorted(name for name in before if before[name] != after[name])
+        self.assertTrue(all(name.startswith('market_') for name in changed))
+        self.assertEqual(len(changed), 5)
+        pd.testing.assert_frame_equal(result, create_masterpiece_features(self.df, stats))
+
+if __name__ == '__main__':
+    unittest.main()
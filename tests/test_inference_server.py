@@ -0,0 +1,84 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_inference_server.py
+
+import unittest
+import asyncio
+import shutil
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.prediction import PredictionPipeline
+from api.inference_server import (InferenceServer, InferenceClient, BlockingInferenceClient,
+                                  RemotePipeline, InferenceServerError)
+from tests.model_fixtures import ridge_artifact
+
+class TestInferenceServer(unittest.TestCase):
+    """Unit tests for the inference daemon and its clients"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Train a small model artifact"""
+        cls.model_dir, cls.model_path, cls.phones = ridge_artifact(21)
+        cls.socket_path = os.path.join(cls.model_dir, 'inference.sock')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+
+    def test_clients_share_one_model(self):
+        """Test async and blocking clients against a local pipeline"""
+        local = PredictionPipeline(model_path=self.model_path)
+        numbers = self.phones[:40]
+
+        async def main():
+            server = InferenceServer(self.socket_path, self.model_path)
+            await server.start()
+            try:
+                # Two web workers sending concurrently
+                workers = [InferenceClient(self.socket_path), InferenceClient(self.socket_path)]
+                results = await asyncio.gather(*[
+                    workers[i % 2].call('predict_single', number) for i, number in enumerate(numbers)
+                ])
+                batch = await workers[0].call('predict_batch', numbers[:5])
+                explanation = await workers[1].call('explain_prediction', numbers[0])
+                status = await workers[0].call('status')
+                with self.assertRaises(InferenceServerError):
+                    await workers[0].call('train')
+
+                # Flask-style worker on its own thread
+                remote = RemotePipeline(BlockingInferenceClient(self.socket_path))
+                blocking = await asyncio.get_running_loop().run_in_executor(
+                    None, remote.predict_single, numbers[1])
+                for worker in workers:
+                    worker.shutdown()
+                return results, batch, explanation, status, blocking
+            finally:
+                await server.stop()
+
+        results, batch, explanation, status, blocking = asyncio.run(main())
+        for number, result in zip(numbers, results):
+            self.assertAlmostEqual(result['predicted_price'], local.predict_single(number)['predicted_price'], places=4)
+        self.assertEqual(batch['successful'], 5)
+        self.assertIn('feature_contributions', explanation['explanation'])
+        self.assertTrue(status['ready'])
+        self.assertEqual(status['model_info']['model_name'], 'Ridge')
+        # Requests from both connections were micro-batched together
+        self.assertLess(status['batcher']['batches'], len(numbers))
+        self.assertAlmostEqual(blocking['predicted_price'], results[1]['predicted_price'], places=6)
+        self.assertFalse(os.path.exists(self.socket_path))
+
+    def test_unavailable_server(self):
+        """Test that a missing daemon surfaces as ConnectionError"""
+        async def main():
+            client = InferenceClient(self.socket_path)
+            with self.assertRaises(ConnectionError):
+                await client.call('predict_single', self.phones[0])
+
+        asyncio.run(main())
+        with self.assertRaises(ConnectionError):
+            BlockingInferenceClient(self.socket_path).call('status')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_market_statistics.py
+
+import unittest
+import tempfile
+import shutil
+import joblib
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_handler import calculate_market_statistics, market_stats_to_arrays, get_artifact_market_stats
+from src.features import PREMIUM_SUFFIX_WEIGHTS, create_masterpiece_features
+
+def reference_market_statistics(train_df):
+    """Row-by-row reference implementation"""
+    pattern_prices = {}
+    premium_prices = {}
+    for phone, price in zip(train_df['phone_number'].astype(str), train_df['price']):
+        for length in [3, 4]:
+            if len(phone) >= length:
+                pattern = phone[-length:]
+                pattern_prices.setdefault(pattern, []).append(price)
+                if pattern in PREMIUM_SUFFIX_WEIGHTS:
+                    premium_prices.setdefault(pattern, []).append(price)
+        if len(phone) >= 6:
+            pattern_prices.setdefault(phone[3:6], []).append(price)
+    return {
+        'avg_prices': {p: np.median(v) for p, v in pattern_prices.items() if len(v) >= 2},
+        'popularity': {p: len(v) for p, v in pattern_prices.items() if len(v) >= 2},
+        'premium_suffix_stats': {p: float(np.median(v)) for p, v in premium_prices.items() if len(v) >= 2}
+    }
+
+class TestMarketStatistics(unittest.TestCase):
+    """Unit tests for vectorized market statistics"""
+
+    def setUp(self):
+        """Set up test data"""
+        rng = np.random.default_rng(3)
+        phones = ['08' + ''.join(map(str, rng.integers(0, 10, 8))) for _ in range(400)]
+        phones += ['0812349999', '0899999999', '0800008888', '0812345888', '0812345678', '0861235678']
+        self.df = pd.DataFrame({'phone_number': phones, 'price': rng.integers(100, 100000, len(phones))})
+
+    def test_matches_reference(self):
+        """Test that grouped aggregation equals the row loop (values and key order)"""
+        expected = reference_market_statistics(self.df)
+        result = calculate_market_statistics(self.df)
+        for key, table in expected.items():
+            self.assertEqual(list(result[key]), list(table), key)
+            self.assertEqual(list(result[key].values()), list(table.values()), key)
+        self.assertEqual(result['n_train_samples'], len(self.df))
+        self.assertEqual(result['global_median'], float(self.df['price'].median()))
+
+    def test_array_tables(self):
+        """Test array-backed tables"""
+        stats = calculate_market_statistics(self.df)
+        arrays = calculate_market_statistics(self.df, as_arrays=True)
+        self.assertEqual(arrays['format'], 'arrays')
+        self.assertEqual(arrays['avg_prices'][3].shape, (1000,))
+        self.assertEqual(arrays['popularity'][4].shape, (10000,))
+
+        for key in ['avg_prices', 'popularity', 'premium_suffix_stats']:
+            for pattern, value in stats[key].items():
+                self.assertEqual(arrays[key][len(pattern)][int(pattern)], value)
+        self.assertEqual(np.isfinite(arrays['avg_prices'][4]).sum(),
+                         sum(len(p) == 4 for p in stats['avg_prices']))
+        self.assertEqual(market_stats_to_arrays(stats)['global_median'], stats['global_median'])
+
+    def test_artifact_round_trip(self):
+        """Test that statistics stored in a model artifact are memory-mapped on load"""
+        stats = calculate_market_statistics(self.df)
+        save_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(save_dir, 'model.pkl')
+            joblib.dump({'model': None, 'market_stats': market_stats_to_arrays(stats)}, path)
+            loaded = get_artifact_market_stats(joblib.load(path, mmap_mode='r'))
+            self.assertIsInstance(loaded['avg_prices'][4], np.memmap)
+
+            expected = create_masterpiece_features(self.df, stats)
+            pd.testing.assert_frame_equal(create_masterpiece_features(self.df, loaded), expected)
+        finally:
+            shutil.rmtree(save_dir, ignore_errors=True)
+
+        self.assertIsNone(get_artifact_market_stats({'model': None}))
+
+if __name__ == '__main__':
+    unittest.main()
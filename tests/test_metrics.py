@@ -0,0 +1,71 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_metrics.py
+
+import unittest
+import shutil
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import metrics
+from api.prediction import PredictionPipeline
+from tests.model_fixtures import ridge_artifact
+
+@unittest.skipUnless(metrics.METRICS_AVAILABLE, "prometheus_client not installed")
+class TestMetrics(unittest.TestCase):
+    """Unit tests for the Prometheus metrics"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Train a small model artifact"""
+        cls.model_dir, cls.model_path, cls.phones = ridge_artifact(8)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+
+    def sample(self, name, labels=None):
+        return metrics.REGISTRY.get_sample_value(name, labels or {}) or 0.0
+
+    def test_stage_metrics(self):
+        """Test per-stage histograms, batch sizes and error counts"""
+        pipeline = PredictionPipeline(model_path=self.model_path)
+        before = {stage: self.sample('phone_api_stage_seconds_count', {'stage': stage})
+                  for stage in metrics.STAGES}
+        batches = self.sample('phone_api_batch_size_count')
+        invalid = self.sample('phone_api_errors_total', {'type': 'invalid_number'})
+
+        pipeline.predict_single(self.phones[0])
+        pipeline.predict_batch(self.phones[1:6] + ['bad'])
+
+        after = {stage: self.sample('phone_api_stage_seconds_count', {'stage': stage})
+                 for stage in metrics.STAGES}
+        for stage in ['validation', 'features', 'predict', 'serialization']:
+            self.assertEqual(after[stage] - before[stage], 2, stage)
+        self.assertEqual(after['preprocessing'], before['preprocessing'])
+        self.assertEqual(self.sample('phone_api_batch_size_count') - batches, 1)
+        self.assertEqual(self.sample('phone_api_errors_total', {'type': 'invalid_number'}) - invalid, 1)
+
+    def test_service_collector(self):
+        """Test scrape-time cache and model-version values"""
+        pipeline = PredictionPipeline(model_path=self.model_path)
+        pipeline.predict_single(self.phones[0])
+        pipeline.predict_single(self.phones[0])
+
+        collector = metrics.ServiceCollector(lambda: {'service': pipeline})
+        samples = {(sample.name, tuple(sorted(sample.labels.items()))): sample.value
+                   for family in collector.collect() for sample in family.samples}
+
+        model_labels = (('model_name', 'Ridge'), ('model_version', pipeline.model_version))
+        self.assertEqual(samples[('phone_api_model_info', model_labels)], 1)
+        self.assertEqual(samples[('phone_api_cache_hits_total', ())], 1)
+        self.assertEqual(samples[('phone_api_cache_misses_total', ())], 1)
+        self.assertEqual(samples[('phone_api_cache_entries', ())], 1)
+
+        body, content_type = metrics.render_metrics()
+        self.assertIn(b'phone_api_stage_seconds_bucket', body)
+        self.assertTrue(content_type.startswith('text/plain'))
+
+if __name__ == '__main__':
+    unittest.main()
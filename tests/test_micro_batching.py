@@ -0,0 +1,154 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_micro_batching.py
+
+import unittest
+import asyncio
+import threading
+import time
+import tempfile
+import shutil
+import joblib
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrent.futures import ThreadPoolExecutor
+from sklearn.ensemble import RandomForestRegressor
+
+from api.batching import MicroBatcher
+from api.prediction import PredictionPipeline
+from src.features import create_masterpiece_features
+
+class RecordingPipeline:
+    """Pipeline stand-in that records how numbers were grouped"""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def predict_single(self, phone_number):
+        self.calls.append([phone_number])
+        return {'success': True, 'phone_number': phone_number, 'predicted_price': float(len(phone_number))}
+
+    def predict_batch(self, phone_numbers):
+        if self.fail:
+            raise RuntimeError('model failure')
+        self.calls.append(list(phone_numbers))
+        return {'results': [
+            {'success': True, 'phone_number': number, 'predicted_price': float(len(number))}
+            for number in phone_numbers
+        ]}
+
+class SlowPipeline(RecordingPipeline):
+    """Pipeline stand-in that takes a while and records how many calls overlap"""
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def predict_single(self, phone_number):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        return super().predict_single(phone_number)
+
+class TestMicroBatcher(unittest.TestCase):
+    """Unit tests for the async micro-batching dispatcher"""
+
+    def run_requests(self, batcher, numbers):
+        async def main():
+            try:
+                return await asyncio.gather(*(batcher.submit(number) for number in numbers),
+                                            return_exceptions=True)
+            finally:
+                await batcher.stop()
+        return asyncio.run(main())
+
+    def test_concurrent_requests_are_batched(self):
+        """Test that concurrent requests share batches and get their own results"""
+        pipeline = RecordingPipeline()
+        batcher = MicroBatcher(pipeline, max_batch_size=64, max_wait_ms=20)
+        numbers = [f'08{i:08d}' for i in range(150)]
+        results = self.run_requests(batcher, numbers)
+
+        self.assertEqual([r['phone_number'] for r in results], numbers)
+        self.assertEqual([len(call) for call in pipeline.calls], [64, 64, 22])
+        self.assertEqual(batcher.stats()['batches'], 3)
+
+    def test_single_request_uses_predict_single(self):
+        """Test that a lone request keeps the single-number path"""
+        pipeline = RecordingPipeline()
+        batcher = MicroBatcher(pipeline, max_batch_size=8, max_wait_ms=1)
+        results = self.run_requests(batcher, ['0812345678'])
+        self.assertEqual(results[0]['phone_number'], '0812345678')
+        self.assertEqual(pipeline.calls, [['0812345678']])
+
+    def test_lone_request_does_not_wait(self):
+        """Test that a request with nothing queued behind it is dispatched at once"""
+        pipeline = RecordingPipeline()
+        batcher = MicroBatcher(pipeline, max_batch_size=8, max_wait_ms=2000)
+        started = time.perf_counter()
+        self.run_requests(batcher, ['0812345678'])
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(pipeline.calls, [['0812345678']])
+
+    def test_batches_run_concurrently(self):
+        """Test that each executor worker gets a batch instead of one batch at a time"""
+        pipeline = SlowPipeline()
+        executor = ThreadPoolExecutor(max_workers=2)
+        batcher = MicroBatcher(pipeline, max_batch_size=1, max_wait_ms=0, executor=executor)
+        self.assertEqual(batcher.max_concurrent_batches, 2)
+        numbers = [f'08{i:08d}' for i in range(6)]
+        results = self.run_requests(batcher, numbers)
+        executor.shutdown(wait=True)
+        self.assertEqual([r['phone_number'] for r in results], numbers)
+        self.assertEqual(pipeline.max_running, 2)
+        self.assertEqual(batcher.stats()['in_flight'], 0)
+
+    def test_errors_reach_every_request(self):
+        """Test that a failing batch fails each waiting request"""
+        batcher = MicroBatcher(RecordingPipeline(fail=True), max_batch_size=8, max_wait_ms=20)
+        results = self.run_requests(batcher, ['0812345678', '0899999999'])
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+
+    def test_real_pipeline_matches_predict_single(self):
+        """Test that a batched /predict answer equals predict_single for the same number"""
+        rng = np.random.default_rng(14)
+        phones = ['08' + ''.join(map(str, rng.integers(0, 10, 8))) for _ in range(300)]
+        feature_names = ['ending_pattern_encoded', 'ending_score', 'digit_sum', 'rarity_score']
+        features = create_masterpiece_features(pd.DataFrame({'phone_number': phones, 'price': 0}),
+                                               feature_names=feature_names)
+        target = features['ending_pattern_encoded'] * 0.7 + features['digit_sum'] * 0.01
+        model_dir = tempfile.mkdtemp()
+        try:
+            model_path = os.path.join(model_dir, 'best_model.pkl')
+            joblib.dump({'model': RandomForestRegressor(20, random_state=0).fit(features, target),
+                         'model_name': 'RF', 'feature_names': feature_names}, model_path)
+            pipeline = PredictionPipeline(model_path=model_path)
+            pipeline.cache = None
+
+            # Every ending pattern in one group, plus repeats and an invalid number
+            numbers = ['0812345678', '0909090909', '0812345567', '0899998888', '0812341222',
+                       '0888888888', '0812345678', '12345'] + phones[:40]
+            batcher = MicroBatcher(pipeline, max_batch_size=64, max_wait_ms=20)
+            results = self.run_requests(batcher, numbers)
+            self.assertEqual(batcher.stats()['batches'], 1)
+            for number, result in zip(numbers, results):
+                expected = pipeline.predict_single(number)
+                self.assertEqual(result['success'], expected['success'], msg=number)
+                if expected['success']:
+                    self.assertAlmostEqual(result['predicted_price'], expected['predicted_price'],
+                                           places=6, msg=number)
+        finally:
+            shutil.rmtree(model_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_model_registry.py
+
+import unittest
+import tempfile
+import shutil
+import threading
+import json
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+
+from api.model_reload import prepare_pipeline
+from api.model_registry import (ModelRegistry, ShadowEvaluator, UnknownModelError, load_registry,
+                                DEFAULT_MODEL)
+from tests.model_fixtures import FEATURE_NAMES, training_data, save_artifact
+
+class TestModelRegistry(unittest.TestCase):
+    """Unit tests for multi-model serving and shadow evaluation"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Train a default model, a tier model and a shadow candidate on different features"""
+        cls.phones, train_df, features = training_data(23, 200)
+        y = np.log1p(train_df['price'])
+
+        cls.model_dir = tempfile.mkdtemp()
+        cls.feature_sets = {
+            'default': FEATURE_NAMES,
+            'tier': ['ending_score', 'unique_digits', 'special_lucky_score'],
+            'candidate': ['digit_sum', 'complexity_score', 'sequence_score']
+        }
+        models = {
+            'default': Ridge(),
+            'tier': RandomForestRegressor(10, max_depth=6, random_state=0),
+            'candidate': Ridge(alpha=50.0)
+        }
+        cls.paths = {name: save_artifact(os.path.join(cls.model_dir, f'{name}.pkl'),
+                                         model.fit(features[cls.feature_sets[name]], y), cls.feature_sets[name], name)
+                     for name, model in models.items()}
+        cls.pipelines = {name: prepare_pipeline(path) for name, path in cls.paths.items()}
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+
+    def make_registry(self, shadow=None, log_path=None):
+        registry = ModelRegistry(ShadowEvaluator(log_path or os.path.join(self.model_dir, 'shadow.jsonl')))
+        registry.add('default', self.pipelines['default'], 1.0)
+        registry.add('tier', self.pipelines['tier'], 1.0)
+        if shadow:
+            registry.add(shadow, self.pipelines[shadow], shadow=True)
+        return registry
+
+    def test_routing(self):
+        """Test sticky weighted routing and explicit model names"""
+        registry = self.make_registry('candidate')
+        numbers = ['0' + str(800000000 + i * 7919) for i in range(2000)]
+        routes = [registry.route(number) for number in numbers]
+        self.assertEqual(routes, [registry.route(number) for number in numbers])
+        self.assertNotIn('candidate', routes)
+        self.assertAlmostEqual(routes.count('tier') / len(routes), 0.5, delta=0.05)
+        self.assertEqual(registry.route(numbers[0], 'candidate'), 'candidate')
+        with self.assertRaises(UnknownModelError):
+            registry.route(numbers[0], 'missing')
+
+        registry.weights['tier'] = 0.0
+        self.assertEqual({registry.route(number) for number in numbers[:100]}, {'default'})
+
+    def test_batch_shares_one_feature_pass(self):
+        """Test that routed models share one feature pass and match their own pipelines"""
+        registry = self.make_registry()
+        calls = []
+        for pipeline in registry.models.values():
+            original = pipeline._create_features
+            pipeline._create_features = lambda numbers, names=None, original=original: (
+                calls.append(list(names)) or original(numbers, names))
+        try:
+            numbers = self.phones[:40] + ['bad-number', self.phones[0]]
+            summary = registry.predict_batch(numbers, False)
+        finally:
+            for pipeline in registry.models.values():
+                del pipeline._create_features
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(set(calls[0]), set(self.feature_sets['default']) | set(self.feature_sets['tier']))
+        self.assertEqual(summary['successful'], 41)
+        self.assertFalse(summary['results'][40]['success'])
+        self.assertEqual(summary['results'][41], summary['results'][0])
+        for number, result in zip(numbers[:40], summary['results']):
+            expected = registry.models[registry.route(number)].predict_single(number)
+            self.assertEqual(result['model_info']['model_name'], expected['model_info']['model_name'])
+            self.assertAlmostEqual(result['predicted_price'], expected['predicted_price'], places=6)
+            self.assertEqual(result['features'], expected['features'])
+
+        forced = registry.predict_batch(numbers[:5], False, 'tier')['results']
+        self.assertEqual({result['model_info']['model_name'] for result in forced}, {'tier'})
+        explained = registry.explain_batch(numbers[:6], False)['results']
+        for number, result in zip(numbers[:6], explained):
+            self.assertEqual(result['model_info']['model_name'], registry.route(number))
+
+    def test_shadow_evaluation(self):
+        """Test that shadow predictions are logged from the background thread"""
+        log_path = os.path.join(self.model_dir, 'shadow_test.jsonl')
+        registry = self.make_registry('candidate', log_path)
+        shadow = registry.models['candidate']
+        threads = []
+        original = shadow._create_features
+        shadow._create_features = lambda numbers, names=None: (
+            threads.append(threading.current_thread().name) or original(numbers, names))
+        try:
+            numbers = self.phones[50:80]
+            summary = registry.predict_batch(numbers + ['12345'])
+            single = registry.predict_single(self.phones[90])
+            registry.shadow.stop()
+        finally:
+            del shadow._create_features
+
+        with open(log_path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), len(numbers) + 1)
+        self.assertTrue(threads)
+        self.assertEqual(set(threads), {'shadow'})
+        by_number = {record['phone_number']: record for record in records}
+        for result in summary['results'][:-1] + [single]:
+            record = by_number[result['phone_number']]
+            self.assertEqual(record['shadow_model'], 'candidate')
+            self.assertEqual(record['model'], registry.route(result['phone_number']))
+            self.assertAlmostEqual(record['predicted_price'], result['predicted_price'], places=6)
+            self.assertAlmostEqual(record['shadow_price'], shadow.predict_single(result['phone_number'])['predicted_price'],
+                                   places=6)
+        stats = registry.stats()
+        self.assertTrue(stats['models']['candidate']['shadow'])
+        self.assertEqual(stats['models']['candidate']['traffic_share'], 0.0)
+        self.assertEqual(stats['shadow']['models']['candidate']['compared'], len(records))
+
+    def test_load_registry_and_reload(self):
+        """Test loading from config and replacing the default model"""
+        registry = load_registry({
+            DEFAULT_MODEL: {'weight': 3.0},
+            'tier': {'path': 'tier.pkl', 'weight': 1.0},
+            'broken': {'path': 'missing.pkl'}
+        }, self.model_dir)
+        self.assertEqual(list(registry.models), ['tier'])
+
+        serving = registry.with_model(DEFAULT_MODEL, self.pipelines['default'])
+        self.assertEqual(serving.stats()['models'][DEFAULT_MODEL]['traffic_share'], 0.75)
+        reloaded = serving.with_model(DEFAULT_MODEL, prepare_pipeline(self.paths['default']))
+        self.assertIsNot(reloaded.models[DEFAULT_MODEL], serving.models[DEFAULT_MODEL])
+        self.assertIs(reloaded.models['tier'], serving.models['tier'])
+        self.assertIs(reloaded.shadow, serving.shadow)
+        self.assertEqual(reloaded.weights, serving.weights)
+
+if __name__ == '__main__':
+    unittest.main()
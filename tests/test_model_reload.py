@@ -0,0 +1,205 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_model_reload.py
+
+import unittest
+import asyncio
+import tempfile
+import shutil
+import time
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.linear_model import Ridge
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import PolynomialFeatures
+
+from api.model_reload import ModelReloader, ModelValidationError, prepare_pipeline, warmup_numbers
+from src.config import MODEL_CONFIG
+from src.data_handler import calculate_market_statistics
+from src.features import create_all_features
+from tests.model_fixtures import FEATURE_NAMES, training_data, save_artifact
+
+try:
+    from src.model_utils import AdvancedPreprocessor, create_polynomial_features, create_interaction_features
+    TRAINING_AVAILABLE = True
+except ImportError:
+    TRAINING_AVAILABLE = False
+
+class TestModelReload(unittest.TestCase):
+    """Unit tests for background model reload"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Train two small model artifacts"""
+        _, train_df, features = training_data(3)
+        y = np.log1p(train_df['price'])
+        cls.feature_names = FEATURE_NAMES
+
+        cls.model_dir = tempfile.mkdtemp()
+        cls.artifacts = {}
+        for name, alpha in [('a', 1.0), ('b', 100.0)]:
+            cls.artifacts[name] = save_artifact(os.path.join(cls.model_dir, f'model_{name}.pkl'),
+                                                Ridge(alpha=alpha).fit(features[cls.feature_names], y),
+                                                cls.feature_names, f'Ridge-{name}')
+
+        # Model trained on a column the feature engine does not produce
+        cls.artifacts['bad'] = save_artifact(os.path.join(cls.model_dir, 'model_bad.pkl'), Ridge(),
+                                             cls.feature_names + ['legacy_score'], None)
+
+        # Fitted model with a column no training step produces
+        X = features[cls.feature_names].copy()
+        X['legacy_score'] = X['digit_sum'] * 2
+        cls.artifacts['legacy'] = save_artifact(os.path.join(cls.model_dir, 'model_legacy.pkl'),
+                                                Ridge().fit(X, y), list(X.columns), 'Ridge-legacy')
+
+        # Training features (create_all_features) with market statistics, as in training/main.py
+        _, cls.train_df, _ = training_data(16, 300)
+        cls.X_train, cls.y_train, _ = create_all_features(cls.train_df, calculate_market_statistics(cls.train_df))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+
+    def test_prepare_pipeline(self):
+        """Test validation and warmup"""
+        pipeline = prepare_pipeline(self.artifacts['a'], warmup_numbers(10))
+        self.assertEqual(pipeline.feature_names, self.feature_names)
+        self.assertEqual(len(pipeline.cache), 0)
+        self.assertEqual(len(warmup_numbers(10)), 10)
+
+        with self.assertRaises(ModelValidationError):
+            prepare_pipeline(self.artifacts['bad'])
+        with self.assertRaises(ModelValidationError):
+            prepare_pipeline(self.artifacts['legacy'])
+        pipeline = prepare_pipeline(self.artifacts['legacy'], warmup_numbers(10), strict=False)
+        self.assertTrue(pipeline.predict_single('0812345678')['success'])
+        prepare_pipeline(self.artifacts['legacy'], warmup_numbers(10), tolerated=['legacy_score'])
+
+    def test_reload_swaps_and_keeps_old_model_on_failure(self):
+        """Test the swap callback and failed reloads"""
+        installed = []
+        reloader = ModelReloader(self.artifacts['a'], lambda pipeline, path: installed.append(path))
+
+        async def main():
+            first = await reloader.reload()
+            second = await reloader.reload(self.artifacts['bad'])
+            third = await reloader.reload(self.artifacts['b'])
+            return first, second, third
+
+        first, second, third = asyncio.run(main())
+        self.assertTrue(first['success'] and third['success'])
+        self.assertFalse(second['success'])
+        self.assertIn('legacy_score', second['error'])
+        self.assertEqual(installed, [self.artifacts['a'], self.artifacts['b']])
+        self.assertTrue(reloader.ready)
+        self.assertEqual(reloader.model_path, self.artifacts['b'])
+
+    def test_reload_bumps_model_version(self):
+        """Test that every reload (a fresh pipeline each time) gets a new model_version"""
+        versions = []
+        reloader = ModelReloader(self.artifacts['a'], lambda pipeline, path: versions.append(pipeline.model_version))
+
+        async def main():
+            for _ in range(3):
+                self.assertTrue((await reloader.reload())['success'])
+
+        asyncio.run(main())
+        self.assertEqual(len(set(versions)), 3)
+        self.assertTrue(all(version.startswith('Ridge-a@') for version in versions))
+
+    def test_unknown_features_only_fail_a_reload(self):
+        """Test that the first load serves unknown feature names and later reloads keep them"""
+        reloader = ModelReloader(self.artifacts['legacy'], lambda pipeline, path: None)
+
+        async def main():
+            first = await reloader.reload()
+            unknown = reloader.status()['unknown_features']
+            # A retrained artifact with the same columns as the serving model
+            second = await reloader.reload(self.artifacts['legacy'])
+            third = await reloader.reload(self.artifacts['a'])
+            fourth = await reloader.reload(self.artifacts['legacy'])
+            return first, unknown, second, third, fourth
+
+        first, unknown, second, third, fourth = asyncio.run(main())
+        self.assertTrue(first['success'] and second['success'] and third['success'])
+        self.assertEqual(unknown, ['legacy_score'])
+        self.assertFalse(fourth['success'])
+        self.assertIn('legacy_score', fourth['error'])
+        self.assertEqual(reloader.status()['unknown_features'], [])
+        self.assertEqual(reloader.model_path, self.artifacts['a'])
+
+    def assert_hot_reloads(self, X, preprocessor=None):
+        """Deploy a forest on X like training/main.py deploy_model and hot-reload it twice"""
+        path = save_artifact(os.path.join(self.model_dir, 'best_model.pkl'),
+                             RandomForestRegressor(10, max_depth=6, random_state=0).fit(X, self.y_train),
+                             list(X.columns), 'Random Forest', preprocessor=preprocessor, config=MODEL_CONFIG)
+        reloader = ModelReloader(self.artifacts['a'], lambda pipeline, model_path: None)
+
+        async def main():
+            await reloader.reload()
+            return await reloader.reload(path), await reloader.reload(path)
+
+        first, second = asyncio.run(main())
+        self.assertTrue(first['success'], first.get('error'))
+        self.assertTrue(second['success'], second.get('error'))
+        self.assertEqual(reloader.n_reloads, 3)
+        unknown = reloader.status()['unknown_features']
+        self.assertTrue(any('_x_' in name for name in unknown))
+        self.assertTrue(any('_div_' in name for name in unknown))
+        self.assertTrue(any('^2' in name for name in unknown))
+
+    def test_reload_default_config_columns(self):
+        """Test hot reload of an artifact with the default MODEL_CONFIG column names"""
+        self.assertTrue(MODEL_CONFIG['use_polynomial_features'] and MODEL_CONFIG['use_feature_interactions'])
+        X = self.X_train.copy()
+        # create_polynomial_features: PolynomialFeatures names of high-cardinality columns
+        key_features = [col for col in X.columns if X[col].nunique() > 10][:10]
+        poly = PolynomialFeatures(degree=MODEL_CONFIG['polynomial_degree'], include_bias=False)
+        values = poly.fit_transform(X[key_features])
+        for name, column in zip(poly.get_feature_names_out(key_features), values.T):
+            if name not in X.columns:
+                X[name] = column
+        # create_interaction_features: products and ratios of the leading columns
+        leading = list(X.columns[:6])
+        for i, first in enumerate(leading):
+            for second in leading[i + 1:]:
+                X[f'{first}_x_{second}'] = X[first] * X[second]
+                X[f'{first}_div_{second}'] = X[first] / (X[second] + 1e-8)
+        self.assert_hot_reloads(X)
+
+    @unittest.skipUnless(TRAINING_AVAILABLE, "training dependencies not installed")
+    def test_reload_training_pipeline_artifact(self):
+        """Test hot reload of an artifact from run_preprocessing_pipeline's feature functions"""
+        preprocessor = AdvancedPreprocessor()
+        X = preprocessor.fit_transform(self.X_train)
+        X = create_polynomial_features(X, degree=MODEL_CONFIG['polynomial_degree'])
+        X = create_interaction_features(X)
+        self.assert_hot_reloads(X, preprocessor)
+
+    def test_file_watcher(self):
+        """Test that a changed model file is reloaded"""
+        path = os.path.join(self.model_dir, 'watched.pkl')
+        shutil.copy(self.artifacts['a'], path)
+        installed = []
+        reloader = ModelReloader(path, lambda pipeline, model_path: installed.append(pipeline.model_info['model_name']),
+                                 watch_interval=0.05)
+
+        async def main():
+            await reloader.reload()
+            reloader.start_watcher()
+            shutil.copy(self.artifacts['b'], path)
+            os.utime(path, (time.time() + 5, time.time() + 5))
+            for _ in range(200):
+                if len(installed) == 2:
+                    break
+                await asyncio.sleep(0.02)
+            await reloader.stop_watcher()
+
+        asyncio.run(main())
+        self.assertEqual(installed, ['Ridge-a', 'Ridge-b'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_pattern_matcher.py
+
+import unittest
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.pattern_matcher import PatternMatcher
+from src.features import SEQUENCE_MATCHER
+from src.feature_engine import DigitMatrix
+
+def brute_force_matches(text, patterns):
+    """ตำแหน่งที่พบทุก pattern ด้วยการเทียบทีละตำแหน่ง"""
+    matches = {}
+    for pattern in patterns:
+        for start in range(len(text) - len(pattern) + 1):
+            if text[start:start + len(pattern)] == pattern:
+                matches.setdefault(pattern, []).append(start)
+    return matches
+
+class TestPatternMatcher(unittest.TestCase):
+    """Unit tests for the multi-pattern matcher"""
+
+    def setUp(self):
+        """Set up test data"""
+        rng = np.random.default_rng(3)
+        self.phones = ['0' + ''.join(map(str, rng.integers(0, 10, 9))) for _ in range(300)]
+        self.phones += ['0888888888', '0812345678', '0999999999', '0891689999', '0868886888']
+
+    def test_overlapping_patterns(self):
+        """Test overlapping and nested patterns"""
+        matcher = PatternMatcher({'a': {'88': 1, '888': 2, '8889': 3}, 'b': ['89', '9']})
+        matches = matcher.scan('08888899')
+        self.assertEqual(matches['88'], [1, 2, 3, 4])
+        self.assertEqual(matches['888'], [1, 2, 3])
+        self.assertEqual(matches['8889'], [3])
+        self.assertEqual(matches['89'], [5])
+        self.assertEqual(matches['9'], [6, 7])
+        self.assertEqual(matcher.tables['b'], {'89': 1, '9': 1})
+
+    def test_invalid_pattern(self):
+        """Test that non-digit patterns are rejected"""
+        with self.assertRaises(ValueError):
+            PatternMatcher({'bad': ['8a']})
+
+    def test_scan_matches_brute_force(self):
+        """Test single scan against substring search for every table"""
+        for phone in self.phones:
+            self.assertEqual(
+                SEQUENCE_MATCHER.scan(phone),
+                brute_force_matches(phone, SEQUENCE_MATCHER.patterns),
+                phone
+            )
+
+    def test_scan_windows_matches_scan(self):
+        """Test that the batch match list equals per-number scans"""
+        dm = DigitMatrix.from_numbers(self.phones)
+        rows, pattern_ids, starts = SEQUENCE_MATCHER.scan_windows(dm.windows)
+        batch = [set() for _ in self.phones]
+        for row, pattern_id, start in zip(rows, pattern_ids, starts):
+            batch[row].add((SEQUENCE_MATCHER.patterns[pattern_id], int(start)))
+        for phone, found in zip(self.phones, batch):
+            expected = {(p, s) for p, starts_ in SEQUENCE_MATCHER.scan(phone).items() for s in starts_}
+            self.assertEqual(found, expected, phone)
+
+    def test_suffix_value(self):
+        """Test longest-suffix lookup from the match list"""
+        matches = SEQUENCE_MATCHER.scan('0812348888')
+        self.assertEqual(
+            SEQUENCE_MATCHER.suffix_value(matches, 'PREMIUM_SUFFIX_WEIGHTS', [4, 3, 2], 10),
+            (4, 1.00)
+        )
+        matches = SEQUENCE_MATCHER.scan('0812345670')
+        self.assertIsNone(SEQUENCE_MATCHER.suffix_value(matches, 'PREMIUM_SUFFIX_WEIGHTS', [4, 3, 2], 10))
+
+if __name__ == '__main__':
+    unittest.main()
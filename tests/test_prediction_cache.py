@@ -0,0 +1,74 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_prediction_cache.py
+
+import unittest
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.prediction_cache import PredictionCache
+
+class FakeClock:
+    """Manually advanced time source"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestPredictionCache(unittest.TestCase):
+    """Unit tests for the LRU + TTL prediction cache"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = PredictionCache(max_entries=3, ttl=10, clock=self.clock)
+
+    def test_hit_and_miss(self):
+        """Test lookups and hit/miss counters"""
+        self.assertIsNone(self.cache.get('a'))
+        self.cache.put('a', 1)
+        self.assertEqual(self.cache.get('a'), 1)
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted"""
+        for key in 'abc':
+            self.cache.put(key, key)
+        self.cache.get('a')
+        self.cache.put('d', 'd')
+
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('a'), 'a')
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_ttl_expiry(self):
+        """Test that entries expire after the TTL"""
+        self.cache.put('a', 1)
+        self.clock.now = 9.9
+        self.assertEqual(self.cache.get('a'), 1)
+        self.clock.now = 10.0
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['expirations'], 1)
+        self.assertEqual(len(self.cache), 0)
+
+        # No TTL → entries never expire
+        cache = PredictionCache(max_entries=3, ttl=None, clock=self.clock)
+        cache.put('a', 1)
+        self.clock.now = 1e9
+        self.assertEqual(cache.get('a'), 1)
+
+    def test_clear(self):
+        """Test invalidation"""
+        self.cache.put('a', 1)
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_prediction_executor.py
+
+import unittest
+import asyncio
+import shutil
+import threading
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.executor import PredictionExecutor, ExecutorBusyError
+from api.prediction import PredictionPipeline
+from tests.model_fixtures import ridge_artifact
+
+class SlowPipeline:
+    """Pipeline stand-in whose predictions block until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def predict_batch(self, phone_numbers):
+        self.release.wait(5)
+        return {'total': len(phone_numbers)}
+
+class TestPredictionExecutor(unittest.TestCase):
+    """Unit tests for the off-event-loop prediction pool"""
+
+    def test_event_loop_stays_responsive(self):
+        """Test that a running batch does not block other coroutines"""
+        pipeline = SlowPipeline()
+        executor = PredictionExecutor(pipeline, kind='thread', max_workers=1, timeout=5)
+
+        async def main():
+            batch = asyncio.ensure_future(executor.call('predict_batch', ['0812345678'] * 100))
+            await asyncio.sleep(0.01)
+            self.assertFalse(batch.done())
+            self.assertEqual(executor.stats()['in_flight'], 1)
+            pipeline.release.set()
+            return await batch
+
+        self.assertEqual(asyncio.run(main()), {'total': 100})
+        executor.shutdown(wait=True)
+
+    def test_queue_depth_and_timeout(self):
+        """Test busy rejection and per-call timeouts"""
+        pipeline = SlowPipeline()
+        executor = PredictionExecutor(pipeline, kind='thread', max_workers=1,
+                                      max_queue_depth=2, timeout=0.05)
+
+        async def main():
+            calls = [asyncio.ensure_future(executor.call('predict_batch', [])) for _ in range(2)]
+            await asyncio.sleep(0)
+            with self.assertRaises(ExecutorBusyError):
+                await executor.call('predict_batch', [])
+            results = await asyncio.gather(*calls, return_exceptions=True)
+            self.assertTrue(all(isinstance(r, asyncio.TimeoutError) for r in results))
+
+            # Queued work is cancelled; running work keeps its slot until the worker finishes it
+            self.assertEqual(executor.stats()['in_flight'], 1)
+            pipeline.release.set()
+            for _ in range(100):
+                if executor.stats()['in_flight'] == 0:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(executor.stats()['in_flight'], 0)
+
+        asyncio.run(main())
+        stats = executor.stats()
+        self.assertEqual((stats['rejected'], stats['timed_out']), (1, 2))
+        executor.shutdown(wait=True)
+
+        with self.assertRaises(ValueError):
+            PredictionExecutor(pipeline, kind='process')
+
+    def test_process_pool_matches_pipeline(self):
+        """Test that process workers with a preloaded model give the same predictions"""
+        model_dir, model_path, phones = ridge_artifact(5)
+        try:
+            pipeline = PredictionPipeline(model_path=model_path)
+            executor = PredictionExecutor(pipeline, model_path=model_path, kind='process',
+                                          max_workers=1, timeout=60)
+            result = asyncio.run(executor.call('predict_batch', phones[:10]))
+            executor.shutdown(wait=True)
+
+            expected = pipeline.predict_batch(phones[:10])
+            self.assertEqual([r['predicted_price'] for r in result['results']],
+                             [r['predicted_price'] for r in expected['results']])
+        finally:
+            shutil.rmtree(model_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,265 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_prediction_pipeline.py
+
+import unittest
+import copy
+import io
+import tempfile
+from contextlib import redirect_stdout
+import shutil
+from unittest.mock import patch
+import joblib
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.linear_model import Ridge
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+import api.prediction
+from api.prediction import PredictionPipeline
+from src.data_handler import calculate_market_statistics, market_stats_to_arrays
+from src.features import create_masterpiece_features
+
+class TestPredictionPipeline(unittest.TestCase):
+    """Unit tests for the serving prediction pipeline"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Train a small model artifact"""
+        rng = np.random.default_rng(21)
+        phones = ['08' + ''.join(map(str, rng.integers(0, 10, 8))) for _ in range(300)]
+        train_df = pd.DataFrame({'phone_number': phones, 'price': rng.integers(500, 90000, len(phones))})
+        market_stats = calculate_market_statistics(train_df)
+
+        features = create_masterpiece_features(train_df, market_stats)
+        cls.feature_names = ['digit_sum', 'ending_score', 'rarity_score', 'market_avg_price_4',
+                             'market_popularity_score', 'power_sum', 'unique_digits']
+        model = Ridge().fit(features[cls.feature_names], np.log1p(train_df['price']))
+
+        cls.model_dir = tempfile.mkdtemp()
+        cls.model_path = os.path.join(cls.model_dir, 'best_model.pkl')
+        joblib.dump({
+            'model': model,
+            'model_name': 'Ridge',
+            'feature_names': cls.feature_names,
+            'market_stats': market_stats_to_arrays(market_stats),
+            'r2_score': 0.5
+        }, cls.model_path)
+        cls.phones = phones
+
+        # Same model family trained on scaled features
+        preprocessor = StandardScaler().fit(features[cls.feature_names])
+        scaled_model = Ridge().fit(preprocessor.transform(features[cls.feature_names]), np.log1p(train_df['price']))
+        cls.scaled_model_path = os.path.join(cls.model_dir, 'scaled_model.pkl')
+        joblib.dump({
+            'model': scaled_model,
+            'feature_names': cls.feature_names,
+            'preprocessor': preprocessor,
+            'market_stats': market_stats_to_arrays(market_stats)
+        }, cls.scaled_model_path)
+
+        # Price driven by the ending pattern code so any re-coding changes the prediction
+        pattern_features = ['ending_pattern_encoded', 'ending_score', 'digit_sum']
+        target = features['ending_pattern_encoded'] * 0.7 + features['digit_sum'] * 0.01
+        cls.pattern_model_path = os.path.join(cls.model_dir, 'pattern_model.pkl')
+        joblib.dump({
+            'model': RandomForestRegressor(20, random_state=0).fit(features[pattern_features], target),
+            'model_name': 'RF',
+            'feature_names': pattern_features
+        }, cls.pattern_model_path)
+        # One number per ending pattern (all_different, double_double, one_pair, quad, triple_plus)
+        cls.pattern_numbers = ['0812345678', '0909090909', '0812345567', '0899998888', '0812341222']
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+
+    def setUp(self):
+        self.pipeline = PredictionPipeline(model_path=self.model_path)
+
+    def test_predict_single(self):
+        """Test single prediction result layout"""
+        result = self.pipeline.predict_single('081-234-5678')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['phone_number'], '0812345678')
+        self.assertGreater(result['predicted_price'], 0)
+        self.assertEqual(set(result['features']), set(PredictionPipeline.SUMMARY_FEATURES))
+        self.assertEqual(result['features']['special_lucky_score'], 0.0)
+
+        self.assertFalse(self.pipeline.predict_single('12345')['success'])
+
+    def test_fast_path_matches_dataframe_path(self):
+        """Test that the pandas-free single-number path equals the DataFrame path"""
+        for path in [self.model_path, self.scaled_model_path]:
+            fast = PredictionPipeline(model_path=path)
+            slow = PredictionPipeline(model_path=path)
+            slow.fast_features = None
+            self.assertIsNotNone(fast.fast_features)
+            for number in self.phones[:30] + ['0888888888', '0812345678']:
+                expected = slow.predict_single(number)
+                result = fast.predict_single(number)
+                self.assertTrue(result['success'])
+                self.assertAlmostEqual(result['predicted_price'] / expected['predicted_price'], 1.0, places=6)
+                self.assertEqual(result['features'], expected['features'])
+
+    def test_ending_patterns_single_matches_batch(self):
+        """Test fast path, DataFrame path and batch on every ending pattern"""
+        fast = PredictionPipeline(model_path=self.pattern_model_path)
+        slow = PredictionPipeline(model_path=self.pattern_model_path)
+        slow.fast_features = None
+        fast.cache = slow.cache = None
+        batch = fast.predict_batch(self.pattern_numbers)['results']
+        prices = set()
+        for number, batched in zip(self.pattern_numbers, batch):
+            single = fast.predict_single(number)['predicted_price']
+            self.assertAlmostEqual(single, slow.predict_single(number)['predicted_price'], places=6, msg=number)
+            self.assertAlmostEqual(single, batched['predicted_price'], places=6, msg=number)
+            prices.add(round(single, 6))
+        self.assertEqual(len(prices), len(self.pattern_numbers))
+
+    def test_predict_batch_matches_single(self):
+        """Test that batched predictions equal per-number predictions"""
+        numbers = self.phones[:20] + ['bad-number', '+66888888888']
+        summary = self.pipeline.predict_batch(numbers)
+        self.assertEqual(summary['total'], 22)
+        self.assertEqual(summary['failed'], 1)
+
+        for number, result in zip(numbers, summary['results']):
+            expected = self.pipeline.predict_single(number)
+            self.assertEqual(result['success'], expected['success'])
+            self.assertEqual(result['phone_number'], expected['phone_number'])
+            if expected['success']:
+                self.assertAlmostEqual(result['predicted_price'], expected['predicted_price'], places=6)
+                self.assertEqual(result['features'], expected['features'])
+                self.assertEqual(result['tier'], expected['tier'])
+        self.assertEqual(summary['results'][20]['error'], 'Invalid phone number format')
+
+    def test_mixed_batch_matches_single(self):
+        """Test that a number's price does not depend on the other numbers of its batch"""
+        pipeline = PredictionPipeline(model_path=self.pattern_model_path)
+        pipeline.cache = None
+        patterns = self.pattern_numbers + ['0888888888']
+        expected = {number: pipeline.predict_single(number)['predicted_price'] for number in patterns}
+        for batch in [patterns, patterns[:1] + patterns[2:3], patterns[::-1], [patterns[0]] + self.phones[:5]]:
+            for number, result in zip(batch, pipeline.predict_batch(batch)['results']):
+                if number in expected:
+                    self.assertAlmostEqual(result['predicted_price'], expected[number], places=6, msg=number)
+
+    def test_predict_batch_single_feature_pass(self):
+        """Test that a batch costs one feature pass"""
+        with patch.object(api.prediction, 'create_masterpiece_features',
+                          wraps=create_masterpiece_features) as mocked:
+            self.pipeline.predict_batch(self.phones[:50])
+        self.assertEqual(mocked.call_count, 1)
+
+    def test_serving_calls_are_quiet(self):
+        """Test that batch prediction and explanation skip the feature-engineering banners"""
+        self.pipeline.cache = None
+        with redirect_stdout(io.StringIO()) as output:
+            self.pipeline.predict_batch(self.phones[:5])
+            self.pipeline.explain_batch(self.phones[5:10])
+        self.assertEqual(output.getvalue(), '')
+
+        with redirect_stdout(io.StringIO()) as output:
+            create_masterpiece_features(pd.DataFrame({'phone_number': self.phones[:2]}))
+        self.assertIn('Creating Masterpiece Features', output.getvalue())
+
+    def test_explain_batch(self):
+        """Test explanations: one feature pass, same prices as predict, contributions"""
+        numbers = self.phones[:10] + ['bad-number', self.phones[0]]
+        with patch.object(api.prediction, 'create_masterpiece_features',
+                          wraps=create_masterpiece_features) as mocked:
+            summary = self.pipeline.explain_batch(numbers)
+        self.assertEqual(mocked.call_count, 1)
+        self.assertEqual(summary['failed'], 1)
+        self.assertIs(summary['results'][11], summary['results'][0])
+
+        for number, result in zip(numbers[:10], summary['results']):
+            expected = self.pipeline.predict_single(number)
+            self.assertAlmostEqual(result['predicted_price'] / expected['predicted_price'], 1.0, places=6)
+            self.assertEqual(result['features'], expected['features'])
+            explanation = result['explanation']
+            self.assertLessEqual(len(explanation['feature_contributions']), 5)
+            self.assertIn('complexity_score', explanation['feature_analysis']['ความหายาก'])
+
+        # Single explain: no DataFrame feature pass, same explanation as the batch
+        pipeline = PredictionPipeline(model_path=self.model_path)
+        with patch.object(api.prediction, 'create_masterpiece_features') as mocked:
+            single = pipeline.explain_prediction(self.phones[3])
+        mocked.assert_not_called()
+        self.assertAlmostEqual(single['predicted_price'] / summary['results'][3]['predicted_price'], 1.0, places=6)
+        self.assertEqual(single['explanation']['key_drivers'], summary['results'][3]['explanation']['key_drivers'])
+        contributions = single['explanation']['feature_contributions']
+        self.assertTrue(contributions)
+        self.assertEqual(contributions, sorted(contributions, key=lambda item: -abs(item['contribution'])))
+        self.assertFalse(pipeline.explain_prediction('12345')['success'])
+
+    def test_prediction_cache(self):
+        """Test cached single/batch/explain results and invalidation on reload"""
+        self.assertIsNotNone(self.pipeline.cache)
+        first = self.pipeline.predict_single('0888888888')
+        with patch.object(self.pipeline, '_predict_single_fast') as mocked:
+            second = self.pipeline.predict_single('088-888-8888')
+        mocked.assert_not_called()
+        self.assertEqual(second['predicted_price'], first['predicted_price'])
+        self.assertEqual(self.pipeline.cache.stats()['hits'], 1)
+
+        # Batch: cached numbers skip the feature pass, duplicates are predicted once
+        with patch.object(api.prediction, 'create_masterpiece_features',
+                          wraps=create_masterpiece_features) as mocked:
+            summary = self.pipeline.predict_batch(['0888888888', self.phones[0], self.phones[0]])
+        self.assertEqual(len(mocked.call_args[0][0]), 1)
+        self.assertEqual(summary['results'][0]['predicted_price'], first['predicted_price'])
+        self.assertEqual(summary['results'][1]['predicted_price'], summary['results'][2]['predicted_price'])
+
+        # Bulk jobs read the cache without filling it
+        size = len(self.pipeline.cache)
+        self.pipeline.predict_batch(self.phones[10:20], cache_results=False)
+        self.assertEqual(len(self.pipeline.cache), size)
+
+        explanation = self.pipeline.explain_prediction('0888888888')
+        self.assertEqual(self.pipeline.explain_prediction('0888888888')['explanation'],
+                         explanation['explanation'])
+
+        # Reloading the model invalidates every entry
+        version = self.pipeline.model_version
+        self.pipeline.load_model(self.scaled_model_path)
+        self.assertNotEqual(self.pipeline.model_version, version)
+        self.assertEqual(len(self.pipeline.cache), 0)
+        self.assertNotEqual(self.pipeline.predict_single('0888888888')['predicted_price'],
+                            first['predicted_price'])
+
+    def test_cached_results_are_isolated(self):
+        """Test that mutating a response never changes later cache hits"""
+        def snapshot(result):
+            return copy.deepcopy({key: value for key, value in result.items() if key != 'timestamp'})
+
+        def tamper(result):
+            result['price_range']['low'] = -1
+            result['features'].clear()
+            result['model_info']['model_name'] = 'tampered'
+
+        first = self.pipeline.predict_single('0888888888')
+        expected = snapshot(first)
+        tamper(first)
+        tamper(self.pipeline.predict_single('0888888888'))
+
+        # Batch: freshly cached results and cache hits are both copies
+        summary = self.pipeline.predict_batch([self.phones[0], '0888888888'])
+        batch_expected = snapshot(summary['results'][0])
+        for result in summary['results']:
+            tamper(result)
+
+        for number, wanted in (('0888888888', expected), (self.phones[0], batch_expected)):
+            cached = self.pipeline.predict_single(number)
+            self.assertEqual(snapshot(cached), wanted)
+        self.assertEqual(self.pipeline.model_info['model_name'], 'Ridge')
+        self.assertEqual(self.pipeline.cache.stats()['hits'], 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_prefork.py
+
+import unittest
+import asyncio
+import tempfile
+import shutil
+import threading
+import time
+import json
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.linear_model import Ridge
+
+from api.prefork import PreforkSupervisor, mapped_array_bytes
+from api.model_reload import ModelReloader, prepare_pipeline, artifact_mtime
+from src.compiled_model import export_compiled_model
+from tests.model_fixtures import FEATURE_NAMES, training_data, save_artifact
+
+class TestPrefork(unittest.TestCase):
+    """Unit tests for memory-mapped artifacts and pre-fork workers"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Train a forest artifact and its compiled export"""
+        cls.phones, train_df, features = training_data(22, 200)
+        features = features[FEATURE_NAMES]
+        y = np.log1p(train_df['price'])
+
+        cls.model_dir = tempfile.mkdtemp()
+        cls.model_path = save_artifact(os.path.join(cls.model_dir, 'best_model.pkl'),
+                                       RandomForestRegressor(20, max_depth=8, random_state=0).fit(features, y),
+                                       FEATURE_NAMES, 'Random Forest')
+        export_compiled_model(cls.model_path, n_verify=32)
+        cls.ridge_path = save_artifact(os.path.join(cls.model_dir, 'ridge.pkl'), Ridge().fit(features, y),
+                                       FEATURE_NAMES)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+
+    def test_compiled_artifact_is_memory_mapped(self):
+        """Test that the compiled tree tables load as np.memmap"""
+        pipeline = prepare_pipeline(self.model_path)
+        self.assertTrue(pipeline.model_info['compiled'])
+        tree_tables = [value for value in vars(pipeline.model.estimator).values() if isinstance(value, np.ndarray)]
+        self.assertTrue(tree_tables)
+        for table in tree_tables:
+            self.assertIsInstance(table, np.memmap)
+        self.assertGreaterEqual(mapped_array_bytes(pipeline), sum(table.nbytes for table in tree_tables))
+        self.assertTrue(pipeline.predict_single(self.phones[0])['success'])
+
+    def test_forked_workers_share_parent_model(self):
+        """Test that workers predict with the parent's pipeline and are restarted when they die"""
+        pipeline = prepare_pipeline(self.model_path)
+        expected = pipeline.predict_single(self.phones[1])['predicted_price']
+        out_dir = tempfile.mkdtemp(dir=self.model_dir)
+
+        def worker_main(worker_id):
+            result = pipeline.predict_single(self.phones[1])
+            marker = os.path.join(out_dir, f'started-{worker_id}')
+            if worker_id == 0 and not os.path.exists(marker):
+                # First worker 0 dies right away; the supervisor must replace it
+                open(marker, 'w').close()
+                os._exit(3)
+            with open(os.path.join(out_dir, f'result-{worker_id}.json'), 'w') as f:
+                json.dump({'pid': os.getpid(), 'price': result['predicted_price']}, f)
+            time.sleep(60)
+
+        supervisor = PreforkSupervisor(worker_main, workers=2, restart_delay=0, graceful_timeout=5)
+
+        def stop_when_done():
+            for _ in range(300):
+                if len([name for name in os.listdir(out_dir) if name.startswith('result-')]) == 2:
+                    break
+                time.sleep(0.05)
+            time.sleep(0.1)
+            supervisor.stop()
+
+        stopper = threading.Thread(target=stop_when_done)
+        stopper.start()
+        supervisor.run()
+        stopper.join()
+
+        self.assertEqual(supervisor.children, {})
+        self.assertEqual(supervisor.n_restarts, 1)
+        results = []
+        for worker_id in range(2):
+            with open(os.path.join(out_dir, f'result-{worker_id}.json')) as f:
+                results.append(json.load(f))
+        self.assertNotEqual(results[0]['pid'], results[1]['pid'])
+        for result in results:
+            self.assertNotEqual(result['pid'], os.getpid())
+            self.assertAlmostEqual(result['price'], expected, places=6)
+
+    def test_adopt_preloaded_pipeline(self):
+        """Test that an adopted pipeline is installed and a newer artifact is still picked up"""
+        path = os.path.join(self.model_dir, 'watched.pkl')
+        shutil.copy(self.ridge_path, path)
+        mtime = artifact_mtime(path)
+        pipeline = prepare_pipeline(path)
+        installed = []
+        reloader = ModelReloader(path, lambda new, model_path: installed.append(new), watch_interval=0.05)
+
+        async def main():
+            status = await reloader.adopt(pipeline, path, mtime)
+            # Artifact replaced after the parent loaded it (e.g. before a worker restart)
+            os.utime(path, (mtime + 5, mtime + 5))
+            reloader.start_watcher()
+            for _ in range(200):
+                if len(installed) == 2:
+                    break
+                await asyncio.sleep(0.02)
+            await reloader.stop_watcher()
+            return status
+
+        status = asyncio.run(main())
+        self.assertTrue(status['success'])
+        self.assertIs(installed[0], pipeline)
+        self.assertEqual(len(installed), 2)
+        self.assertIsNot(installed[1], pipeline)
+        self.assertTrue(reloader.ready)
+
+if __name__ == '__main__':
+    unittest.main()
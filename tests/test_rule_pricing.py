@@ -0,0 +1,117 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_rule_pricing.py
+
+import unittest
+import tempfile
+import shutil
+import joblib
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.linear_model import Ridge
+
+from api.prediction import PredictionPipeline
+from api.rule_pricing import (RulePricer, rule_signals, rule_signals_batch, calibrate_rule_pricer,
+                              export_rule_pricer, load_rule_pricer, rule_pricer_path, RULE_MODEL_NAME)
+from src.config import API_CONFIG
+from src.features import create_masterpiece_features
+
+class TestRulePricing(unittest.TestCase):
+    """Unit tests for the rule-based degraded mode"""
+
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(25)
+        cls.phones = ['0' + ''.join(map(str, rng.integers(0, 10, 9))) for _ in range(600)]
+        cls.phones += ['0888888888', '0999999999', '0812345678', '0891234888', '0866665555']
+        scores, tiers, price_tiers = rule_signals_batch(cls.phones)
+        # Model stand-in that only depends on the rule signals
+        cls.prices = np.expm1(7.0 + 0.0004 * scores + 0.001 * tiers + 0.2 * price_tiers)
+        cls.model_dir = tempfile.mkdtemp()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.model_dir, ignore_errors=True)
+
+    def test_signals_match_engine(self):
+        """Test that the scalar signals equal the vectorized feature engine"""
+        scores, tiers, price_tiers = rule_signals_batch(self.phones)
+        for i, number in enumerate(self.phones[::7]):
+            score, tier, price_tier = rule_signals(number)
+            self.assertAlmostEqual(score, scores[i * 7], places=6)
+            self.assertEqual(tier, tiers[i * 7])
+            self.assertEqual(price_tier, price_tiers[i * 7])
+
+    def test_calibration(self):
+        """Test that the mapping reproduces the prices it was calibrated on"""
+        pricer = calibrate_rule_pricer(self.phones, self.prices, model_name='stand-in')
+        self.assertGreater(pricer.info['r2'], 0.85)
+        self.assertLessEqual(len(pricer.knots), 32)
+        self.assertTrue(np.all(np.diff(pricer.knots) > 0))
+
+        predicted, _, _, _ = pricer.prices(self.phones)
+        single = [pricer.price(number)[0] for number in self.phones[:50]]
+        np.testing.assert_allclose(single, predicted[:50], rtol=1e-9)
+        self.assertLess(np.median(np.abs(np.log1p(predicted) - np.log1p(self.prices))), 0.1)
+        self.assertEqual(pricer.stats()['cache']['misses'], 50)
+
+        with self.assertRaises(ValueError):
+            calibrate_rule_pricer([], [])
+
+    def test_results_are_marked_degraded(self):
+        """Test PredictionPipeline-shaped results of the rules"""
+        pricer = calibrate_rule_pricer(self.phones, self.prices)
+        result = pricer.predict_single('089-123-4888', 'queue_full')
+        self.assertTrue(result['success'])
+        self.assertEqual(result['phone_number'], '0891234888')
+        self.assertTrue(result['degraded'])
+        self.assertEqual(result['degraded_reason'], 'queue_full')
+        self.assertEqual(result['model'], RULE_MODEL_NAME)
+        self.assertLess(result['price_range']['low'], result['predicted_price'])
+        self.assertGreater(result['price_range']['high'], result['predicted_price'])
+        self.assertFalse(pricer.predict_single('12345')['success'])
+
+        summary = pricer.predict_batch(['0891234888', 'bad', '0891234888', '0812345678'], 'timeout')
+        self.assertTrue(summary['degraded'])
+        self.assertEqual(summary['successful'], 3)
+        self.assertFalse(summary['results'][1]['success'])
+        self.assertIs(summary['results'][0], summary['results'][2])
+        self.assertAlmostEqual(summary['results'][0]['predicted_price'], result['predicted_price'], places=6)
+
+    def test_export_and_load(self):
+        """Test calibration against a model artifact and loading the rules without it"""
+        features = ['digit_sum', 'ending_score', 'final_premium_score_v4', 'tier_classification_score']
+        df = pd.DataFrame({'phone_number': self.phones, 'price': self.prices})
+        X = create_masterpiece_features(df, feature_names=features)[features]
+        model_path = os.path.join(self.model_dir, 'best_model.pkl')
+        joblib.dump({'model': Ridge().fit(X, np.log1p(self.prices)), 'model_name': 'ridge',
+                     'feature_names': features}, model_path)
+
+        rules_path = export_rule_pricer(model_path, self.phones + ['bad-number'])
+        self.assertEqual(rules_path, os.path.join(self.model_dir, 'best_model.rules.pkl'))
+        self.assertEqual(rule_pricer_path(os.path.join(self.model_dir, 'best_model.compiled.pkl')), rules_path)
+
+        # A broken model artifact does not prevent the rules from loading
+        with open(model_path, 'wb') as f:
+            f.write(b'not a pickle')
+        pricer = load_rule_pricer(model_path)
+        self.assertIsInstance(pricer, RulePricer)
+        self.assertEqual(pricer.info['model_name'], 'ridge')
+        self.assertEqual(pricer.info['n_numbers'], len(self.phones))
+        self.assertGreater(pricer.info['r2'], 0.5)
+        with self.assertRaises(Exception):
+            PredictionPipeline(model_path)
+
+        self.assertIsNone(load_rule_pricer(os.path.join(self.model_dir, 'missing.pkl')))
+        API_CONFIG['degraded_mode'] = False
+        try:
+            self.assertIsNone(load_rule_pricer(model_path))
+        finally:
+            API_CONFIG['degraded_mode'] = True
+
+if __name__ == '__main__':
+    unittest.main()
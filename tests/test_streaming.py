@@ -0,0 +1,110 @@
+# 📍 วางไว้ที่: ML_Project_Refactored/tests/test_streaming.py
+
+import unittest
+import asyncio
+import json
+import sys
+import os
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.streaming import parse_line, stream_predictions, iter_records, LineTooLongError
+
+async def byte_stream(data, piece=7):
+    """Body delivered in small pieces that split lines"""
+    for start in range(0, len(data), piece):
+        yield data[start:start + piece]
+
+class TestStreaming(unittest.TestCase):
+    """Unit tests for the NDJSON bulk valuation stream"""
+
+    def test_parse_line(self):
+        """Test accepted line formats"""
+        self.assertEqual(parse_line('0812345678'), ('0812345678', {}))
+        self.assertEqual(parse_line('"0812345678"'), ('0812345678', {}))
+        self.assertEqual(parse_line('{"phone_number": "0812345678", "id": 7}'), ('0812345678', {'id': 7}))
+        with self.assertRaises(ValueError):
+            parse_line('{"number": "0812345678"}')
+        with self.assertRaises(ValueError):
+            parse_line('{"phone_number": ')
+
+    def test_stream_predictions(self):
+        """Test chunked prediction, input order and per-line errors"""
+        calls = []
+
+        async def predict_batch(numbers):
+            calls.append(list(numbers))
+            return {'results': [{'success': True, 'phone_number': n, 'predicted_price': 1.0} for n in numbers]}
+
+        lines = [f'08{i:08d}' for i in range(7)]
+        lines.insert(2, '{"phone_number": "0899999999", "id": "a-1"}')
+        lines.insert(4, '{broken')
+        lines.insert(5, '')
+        body = ('\n'.join(lines) + '\n').encode()
+
+        async def main():
+            return [part async for part in stream_predictions(byte_stream(body), predict_batch, chunk_size=3)]
+
+        parts = asyncio.run(main())
+        records = [json.loads(line) for part in parts for line in part.splitlines()]
+
+        self.assertEqual(len(parts), 3)
+        self.assertEqual([len(call) for call in calls], [3, 2, 3])
+        self.assertEqual([r['line'] for r in records], [1, 2, 3, 4, 5, 7, 8, 9, 10])
+        self.assertEqual(records[2]['id'], 'a-1')
+        self.assertEqual(records[2]['phone_number'], '0899999999')
+        self.assertFalse(records[4]['success'])
+        self.assertEqual(sum(r['success'] for r in records), 8)
+
+    def test_chunk_failure(self):
+        """Test that a failing chunk is reported per line and the stream continues"""
+        async def predict_batch(numbers):
+            if '0800000000' in numbers:
+                raise asyncio.TimeoutError()
+            return {'results': [{'success': True, 'phone_number': n} for n in numbers]}
+
+        body = b'0800000000\n0811111111\n0822222222'
+
+        async def main():
+            return [part async for part in stream_predictions(byte_stream(body), predict_batch, chunk_size=1)]
+
+        records = [json.loads(part) for part in asyncio.run(main())]
+        self.assertEqual([r['success'] for r in records], [False, True, True])
+        self.assertIn('TimeoutError', records[0]['error'])
+
+    def test_line_limit(self):
+        """Test that an over-long line stops the stream instead of growing the buffer"""
+        async def predict_batch(numbers):
+            return {'results': [{'success': True, 'phone_number': n} for n in numbers]}
+
+        async def endless_line():
+            yield b'0811111111\n'
+            while True:
+                yield b'9' * 1024
+
+        async def records():
+            return [record async for record in iter_records(endless_line(), max_line_bytes=4096)]
+
+        with self.assertRaises(LineTooLongError) as raised:
+            asyncio.run(records())
+        self.assertEqual(raised.exception.line_number, 2)
+
+        # Before any result is streamed the error propagates (the endpoint answers 413)
+        async def collect(body, chunk_size):
+            return [part async for part in stream_predictions(byte_stream(body), predict_batch,
+                                                              chunk_size=chunk_size, max_line_bytes=16)]
+
+        body = b'0811111111\n' + b'9' * 17 + b'\n0822222222\n'
+        with self.assertRaises(LineTooLongError):
+            asyncio.run(collect(body, 2))
+
+        # Once results were streamed, the lines read so far are flushed and a final error line ends it
+        records = [json.loads(line) for part in asyncio.run(collect(body, 1)) for line in part.splitlines()]
+        self.assertEqual([r['line'] for r in records], [1, 2])
+        self.assertTrue(records[0]['success'])
+        self.assertFalse(records[1]['success'])
+        self.assertIn('exceeds 16 bytes', records[1]['error'])
+
+if __name__ == '__main__':
+    unittest.main()
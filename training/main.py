@@ -50,8 +50,10 @@ sys.path.insert(0, str(PROJECT_ROOT))
 
 # Import project modules
 try:
-    from src.config import CONFIG, MODEL_CONFIG, BASE_PATH, DATA_PATH, MODEL_PATH, RESULTS_PATH
-    from src.data_handler import load_and_clean_data
+    from src.config import (
+        CONFIG, MODEL_CONFIG, BASE_PATH, DATA_PATH, MODEL_PATH, RESULTS_PATH, FEATURE_STORE_CONFIG
+    )
+    from src.data_handler import load_and_clean_data, market_stats_to_arrays
     from src.features import create_all_features
     from src.data_splitter import split_data_stratified
     from src.model_utils import (
@@ -59,6 +61,7 @@ try:
         create_polynomial_features, create_interaction_features
     )
     from src.train import train_all_models, create_ensemble_models, save_models
+    from src.compiled_model import export_compiled_model
     from src.evaluate import (
         evaluate_ensemble_predictions, analyze_predictions,
         generate_evaluation_report
@@ -69,6 +72,7 @@ try:
     )
     from utils.helpers import setup_logging, timer, memory_usage, clean_memory
     from api.prediction import PredictionPipeline
+    from api.rule_pricing import export_rule_pricer
     from api.app import create_app
     
     print("✅ All modules imported successfully")
@@ -105,7 +109,7 @@ def run_data_pipeline(data_path=None):
         
         return df_raw, df_cleaned
 
-def run_feature_pipeline(df_cleaned, train_indices=None, market_stats=None):
+def run_feature_pipeline(df_cleaned, train_indices=None, market_stats=None, return_market_stats=False):
     """
     Run feature engineering pipeline
     
@@ -117,6 +121,8 @@ def run_feature_pipeline(df_cleaned, train_indices=None, market_stats=None):
         Training indices for calculating statistics
     market_stats : dict, optional
         Pre-calculated market statistics
+    return_market_stats : bool
+        Also return the market statistics (to store with the model artifact)
     """
     with timer("Feature Engineering"):
         # If train_indices provided, calculate stats from training data only
@@ -134,8 +140,14 @@ def run_feature_pipeline(df_cleaned, train_indices=None, market_stats=None):
             df_cleaned = calculate_sample_weights(df_cleaned, is_train=False)
             df_cleaned.iloc[train_indices, df_cleaned.columns.get_loc('sample_weight')] = train_df['sample_weight']
         
+        # Reuse stored features (only new numbers / changed columns are computed)
+        feature_store = None
+        if FEATURE_STORE_CONFIG.get('enabled', False):
+            from src.feature_store import FeatureStore
+            feature_store = FeatureStore(FEATURE_STORE_CONFIG['store_dir'])
+        
         # Create features with market stats
-        X, y, sample_weights = create_all_features(df_cleaned, market_stats)
+        X, y, sample_weights = create_all_features(df_cleaned, market_stats, feature_store=feature_store)
         
         # ... rest of code remains the same
         
@@ -147,9 +159,12 @@ def run_feature_pipeline(df_cleaned, train_indices=None, market_stats=None):
             'X': X,
             'y': y,
             'sample_weights': sample_weights,
-            'feature_names': list(X.columns)
+            'feature_names': list(X.columns),
+            'market_stats': market_stats
         }, features_path)
         
+        if return_market_stats:
+            return X, y, sample_weights, market_stats
         return X, y, sample_weights
 
 def run_preprocessing_pipeline(X_train, X_test, config):
@@ -359,7 +374,8 @@ def run_visualization_pipeline(results_df, y_test, predictions, feature_importan
             save_path=os.path.join(fig_path, 'dashboard.png')
         )
 
-def deploy_model(trained_models, results_df, feature_names, preprocessor=None):
+def deploy_model(trained_models, results_df, feature_names, preprocessor=None, market_stats=None,
+                 phone_numbers=None):
     """
     Deploy best model
     
@@ -373,6 +389,10 @@ def deploy_model(trained_models, results_df, feature_names, preprocessor=None):
         Feature names
     preprocessor : object, optional
         Preprocessor
+    market_stats : dict, optional
+        Training market statistics (stored as memory-mappable array tables)
+    phone_numbers : list, optional
+        Catalog used to calibrate the rule-based degraded mode (best_model.rules.pkl)
     
     Returns:
     --------
@@ -390,6 +410,7 @@ def deploy_model(trained_models, results_df, feature_names, preprocessor=None):
             'model_name': best_model_name,
             'feature_names': feature_names,
             'preprocessor': preprocessor,
+            'market_stats': market_stats_to_arrays(market_stats) if market_stats is not None else None,
             'r2_score': results_df.iloc[0]['R2_test'],
             'timestamp': datetime.now().isoformat(),
             'config': MODEL_CONFIG
@@ -402,6 +423,19 @@ def deploy_model(trained_models, results_df, feature_names, preprocessor=None):
         joblib.dump(deployment_data, deployment_path)
         print(f"\n✅ Model deployed to: {deployment_path}")
         
+        # NumPy-only export picked up by the API (best_model.compiled.pkl)
+        try:
+            export_compiled_model(deployment_path)
+        except Exception as e:
+            print(f"⚠️ Compiled export skipped: {str(e)}")
+        
+        # Rules the API answers with when the model is unavailable or overloaded
+        if phone_numbers is not None:
+            try:
+                export_rule_pricer(deployment_path, phone_numbers)
+            except Exception as e:
+                print(f"⚠️ Rule-based pricing calibration skipped: {str(e)}")
+        
         return deployment_path
 
 # ====================================================================================
@@ -451,7 +485,9 @@ def run_full_pipeline(args):
         )
         
         # 🔴 Pass train indices to feature pipeline
-        X, y, sample_weights = run_feature_pipeline(df_cleaned, train_indices=train_indices)
+        X, y, sample_weights, market_stats = run_feature_pipeline(
+            df_cleaned, train_indices=train_indices, return_market_stats=True
+        )
         print(f"✅ Features created: {X.shape[1]} features")
         
         # 🔴 Store indices for later use
@@ -467,6 +503,7 @@ def run_full_pipeline(args):
         X = features_data['X']
         y = features_data['y']
         sample_weights = features_data['sample_weights']
+        market_stats = features_data.get('market_stats')
         print(f"✅ Loaded existing features: {X.shape[1]} features")
         
         # Load indices if available
@@ -597,7 +634,8 @@ def run_full_pipeline(args):
         print("="*80)
         
         deployment_path = deploy_model(
-            trained_models, results_df, feature_names, preprocessor
+            trained_models, results_df, feature_names, preprocessor, market_stats,
+            phone_numbers=df_cleaned['phone_number'] if 'df_cleaned' in locals() else None
         )
         
         # Start API if requested
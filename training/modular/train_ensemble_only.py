@@ -34,7 +34,7 @@ sys.path.insert(0, str(project_root))
 try:
     from src.config import BASE_PATH
     from src.environment import detect_environment
-    from src.data_handler import load_and_clean_data
+    from src.data_handler import load_and_clean_data, market_stats_to_arrays
     from src.data_splitter import create_validation_set
     from src.model_utils import AdvancedPreprocessor
     from training.main import run_feature_pipeline
@@ -128,9 +128,10 @@ def main():
             random_state=42
         )
 
-        X, y_log, sample_weights = run_feature_pipeline(
+        X, y_log, sample_weights, market_stats = run_feature_pipeline(
             df_cleaned,
-            train_indices=train_indices
+            train_indices=train_indices,
+            return_market_stats=True
         )
         sample_weights = pd.Series(sample_weights, index=X.index)
 
@@ -246,6 +247,7 @@ def main():
             'r2_score': best_score,
             'preprocessor': preprocessor,
             'feature_names': X_val_processed.columns.tolist() if hasattr(X_val_processed, 'columns') else None,
+            'market_stats': market_stats_to_arrays(market_stats) if market_stats is not None else None,
             'timestamp': datetime.now().isoformat(),
             'all_scores': all_scores
         }